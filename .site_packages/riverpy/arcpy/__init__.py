@@ -0,0 +1,347 @@
+#!/usr/bin/python
+# NumPy stand-in for the arcpy subset that River Architect calls (headless runs without ArcGIS, e.g., on Linux)
+# riverpy is APPENDED to sys.path by all River Architect modules: a licensed ArcGIS arcpy always takes precedence
+try:
+    import os, sys, glob, logging
+    import numpy as np
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, glob, logging, numpy).")
+
+try:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    import cRaster
+    import fPolygonize
+    from cRaster import Raster, Extent, SpatialReference, normalize_path
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: riverpy/cRaster, riverpy/fPolygonize).")
+
+NUMPY_BACKEND = True  # identifies this stand-in (see fGlobal.numpy_backend)
+messages = []
+
+
+class ExecuteError(Exception):
+    pass
+
+
+class Environment:
+    def __init__(self):
+        self.overwriteOutput = True
+        self.outputCoordinateSystem = None
+        self.scratchWorkspace = None
+        self.mask = None
+
+    @property
+    def workspace(self):
+        return cRaster.environment["workspace"]
+
+    @workspace.setter
+    def workspace(self, directory):
+        cRaster.environment["workspace"] = None
+        cRaster.environment["workspace"] = normalize_path(directory) if directory else None
+
+    @property
+    def extent(self):
+        return cRaster.environment["extent"]
+
+    @extent.setter
+    def extent(self, value):
+        # value = None, "MAXOF", "MINOF", "DEFAULT", Extent, Raster, raster path or STR "XMin YMin XMax YMax"
+        if (value is None) or (str(value).upper() in ("DEFAULT", "")):
+            cRaster.environment["extent"] = None
+        elif isinstance(value, Extent):
+            cRaster.environment["extent"] = value
+        elif isinstance(value, Raster):
+            cRaster.environment["extent"] = value.extent
+        elif str(value).upper() in ("MAXOF", "MINOF"):
+            cRaster.environment["extent"] = str(value).upper()
+        else:
+            try:
+                cRaster.environment["extent"] = Extent(*[float(v) for v in str(value).split()])
+            except ValueError:
+                cRaster.environment["extent"] = Raster(value).extent
+
+    @property
+    def cellSize(self):
+        return cRaster.environment["cellSize"]
+
+    @cellSize.setter
+    def cellSize(self, value):
+        # value = None, "MAXOF", "MINOF", FLOAT, Raster or raster path
+        if (value is None) or (str(value).upper() in ("MAXOF", "MINOF", "DEFAULT", "")):
+            cRaster.environment["cellSize"] = None
+        elif isinstance(value, Raster):
+            cRaster.environment["cellSize"] = value.meanCellWidth
+        else:
+            try:
+                cRaster.environment["cellSize"] = float(value)
+            except ValueError:
+                cRaster.environment["cellSize"] = Raster(value).meanCellWidth
+
+    @property
+    def snapRaster(self):
+        return cRaster.environment["snapRaster"]
+
+    @snapRaster.setter
+    def snapRaster(self, value):
+        if (value is None) or isinstance(value, Raster):
+            cRaster.environment["snapRaster"] = value
+        else:
+            cRaster.environment["snapRaster"] = Raster(value)
+
+
+    @property
+    def compression(self):
+        return cRaster.environment["compression"] or "NONE"
+
+    @compression.setter
+    def compression(self, value):
+        # value = STR ("NONE", "LZW", "DEFLATE" or ArcGIS' "LZ77" - a quality or level suffix is ignored)
+        name = (str(value).split() or ["NONE"])[0].upper() if value else "NONE"
+        cRaster.environment["compression"] = {"LZ77": "DEFLATE"}.get(name, name)
+
+    @property
+    def tileSize(self):
+        return "%i %i" % ((cRaster.environment["tileSize"],) * 2) if cRaster.environment["tileSize"] else ""
+
+    @tileSize.setter
+    def tileSize(self, value):
+        # value = STR "WIDTH HEIGHT" (e.g., "256 256" - square tiles) or INT (None or "" writes strips)
+        try:
+            cRaster.environment["tileSize"] = int(str(value).split()[0])
+        except (IndexError, ValueError):
+            cRaster.environment["tileSize"] = None
+
+
+env = Environment()
+gp = env  # legacy arcpy.gp.overwriteOutput access
+
+
+class Point:
+    def __init__(self, X=None, Y=None, *args):
+        self.X = X
+        self.Y = Y
+
+
+class Result:
+    def __init__(self, *outputs):
+        self.outputs = list(outputs)
+
+    def getOutput(self, index):
+        return self.outputs[index]
+
+    def __getitem__(self, index):
+        return self.outputs[index]
+
+    def __str__(self):
+        return str(self.outputs[0]) if self.outputs else ""
+
+
+class Describe:
+    def __init__(self, value):
+        ras = value if isinstance(value, Raster) else Raster(value)
+        self.catalogPath = str(ras)
+        self.baseName = ras.name
+        self.name = os.path.basename(str(ras))
+        self.dataType = "RasterDataset"
+        self.extent = ras.extent
+        self.spatialReference = ras.spatialReference
+        self.meanCellWidth = ras.meanCellWidth
+        self.meanCellHeight = ras.meanCellHeight
+        self.width = ras.width
+        self.height = ras.height
+        self.bandCount = 1
+        self.noDataValue = ras.noDataValue
+        self.pixelType = ras.pixelType
+
+
+def AddError(message):
+    messages.append(str(message))
+    logging.getLogger("logfile").info(str(message))
+
+
+def AddMessage(message):
+    messages.append(str(message))
+
+
+def AddWarning(message):
+    messages.append(str(message))
+
+
+def CheckExtension(product):
+    return "Available"
+
+
+def CheckInExtension(product):
+    return "CheckedIn"
+
+
+def CheckOutExtension(product):
+    return "CheckedOut"
+
+
+def GetMessages(severity=0):
+    return "\n".join(messages)
+
+
+def ProductInfo():
+    return "NumPy"
+
+
+def Exists(dataset):
+    return os.path.exists(normalize_path(dataset))
+
+
+def ListRasters(wild_card="*", raster_type="All"):
+    # returns LIST of raster names in env.workspace (GeoTIFFs and extension-less cache rasters)
+    if not env.workspace:
+        return []
+    names = []
+    for path in sorted(glob.glob(os.path.join(env.workspace, wild_card or "*"))):
+        if not os.path.isfile(path):
+            continue
+        ext = os.path.splitext(path)[1].lower()
+        if (ext in (".tif", ".tiff")) or (ext == "" and str(raster_type).upper() in ("ALL", "GRID")):
+            names.append(os.path.basename(path))
+    return names
+
+
+def RasterToNumPyArray(in_raster, lower_left_corner=None, ncols=None, nrows=None, nodata_to_value=None):
+    # returns numpy array of in_raster, NoData pixels are set to nodata_to_value (default: the raster's NoData value)
+    ras = in_raster if isinstance(in_raster, Raster) else Raster(in_raster)
+    if nodata_to_value is None:
+        nodata_to_value = ras.noDataValue
+    data = ras.data.copy()
+    if ras.mask.any():
+        if (data.dtype.kind in "iu") and not float(nodata_to_value).is_integer():
+            data = data.astype(np.float64)
+        data[ras.mask] = nodata_to_value
+    # the sub-array extends from lower_left_corner up (nrows) and right (ncols)
+    row_end, col_start = ras.height, 0
+    if (lower_left_corner is not None) and (lower_left_corner.X is not None):
+        x0, dx, rx, y0, ry, dy = ras.geotransform
+        col_start = min(max(int(round((float(lower_left_corner.X) - x0) / dx)), 0), ras.width)
+        row_end = min(max(int(round((y0 - float(lower_left_corner.Y)) / -dy)), 0), ras.height)
+    row_start = max(row_end - int(nrows), 0) if nrows else 0
+    col_end = min(col_start + int(ncols), ras.width) if ncols else ras.width
+    data = data[row_start:row_end, col_start:col_end]
+    return data
+
+
+def NumPyArrayToRaster(in_array, lower_left_corner=None, x_cell_size=None, y_cell_size=None, value_to_nodata=None):
+    # converts a numpy array into a Raster (values equal to value_to_nodata become NoData)
+    array = np.asarray(in_array)
+    if x_cell_size is None:
+        x_cell_size = env.cellSize if env.cellSize else 1.0
+    if isinstance(x_cell_size, (Raster, str)):
+        x_cell_size = (x_cell_size if isinstance(x_cell_size, Raster) else Raster(x_cell_size)).meanCellWidth
+    if y_cell_size is None:
+        y_cell_size = x_cell_size
+    x_min, y_min = 0.0, 0.0
+    if lower_left_corner is not None:
+        x_min, y_min = float(lower_left_corner.X), float(lower_left_corner.Y)
+    geotransform = (x_min, float(x_cell_size), 0.0, y_min + array.shape[0] * float(y_cell_size), 0.0,
+                    -float(y_cell_size))
+    mask = np.zeros(array.shape, dtype=bool)
+    if value_to_nodata is not None:
+        mask = (array == value_to_nodata)
+    if array.dtype.kind == "f":
+        mask |= np.isnan(array)
+    spatial_reference = env.outputCoordinateSystem
+    if (spatial_reference is None) and (env.snapRaster is not None):
+        spatial_reference = env.snapRaster.spatialReference
+    return Raster(array, geotransform, mask=mask, spatial_reference=spatial_reference)
+
+
+def GetRasterProperties_management(in_raster, property_type="", band_index=None):
+    # returns Result with the requested property as STR (arcpy style)
+    ras = in_raster if isinstance(in_raster, Raster) else Raster(in_raster)
+    property_type = str(property_type).upper()
+    extent = ras.extent
+    properties = {"CELLSIZEX": lambda: ras.meanCellWidth, "CELLSIZEY": lambda: ras.meanCellHeight,
+                  "TOP": lambda: extent.YMax, "LEFT": lambda: extent.XMin,
+                  "RIGHT": lambda: extent.XMax, "BOTTOM": lambda: extent.YMin,
+                  "COLUMNCOUNT": lambda: ras.width, "ROWCOUNT": lambda: ras.height, "BANDCOUNT": lambda: 1,
+                  "MINIMUM": lambda: ras.minimum, "MAXIMUM": lambda: ras.maximum, "MEAN": lambda: ras.mean,
+                  "STD": lambda: ras.standardDeviation,
+                  "UNIQUEVALUECOUNT": lambda: np.unique(ras.valid_values()).size,
+                  "VALUETYPE": lambda: {"U8": 3, "S8": 4, "U16": 5, "S16": 6, "U32": 7, "S32": 8, "F32": 9,
+                                        "F64": 10}.get(ras.pixelType, 9),
+                  "ANYNODATA": lambda: int(ras.mask.any()), "ALLNODATA": lambda: int(ras.mask.all())}
+    try:
+        value = properties[property_type]()
+    except KeyError:
+        raise ExecuteError("ERROR: Unsupported raster property (%s)." % property_type)
+    if isinstance(value, float) and value.is_integer() and property_type in ("COLUMNCOUNT", "ROWCOUNT"):
+        value = int(value)
+    return Result(str(value))
+
+
+def CopyRaster_management(in_raster, out_rasterdataset, config_keyword="", background_value="", nodata_value="",
+                          onebit_to_eightbit="", colormap_to_RGB="", pixel_type="", *args, **kwargs):
+    # copies in_raster to out_rasterdataset (always written as GeoTIFF)
+    ras = in_raster if isinstance(in_raster, Raster) else Raster(in_raster)
+    pixel_types = {"1_BIT": np.uint8, "2_BIT": np.uint8, "4_BIT": np.uint8, "8_BIT_UNSIGNED": np.uint8,
+                   "8_BIT_SIGNED": np.int8, "16_BIT_UNSIGNED": np.uint16, "16_BIT_SIGNED": np.int16,
+                   "32_BIT_UNSIGNED": np.uint32, "32_BIT_SIGNED": np.int32, "32_BIT_FLOAT": np.float32,
+                   "64_BIT": np.float64}
+    out_path = normalize_path(out_rasterdataset)
+    if os.path.exists(out_path) and not env.overwriteOutput:
+        raise ExecuteError("ERROR: %s already exists." % out_path)
+    data = ras.data
+    if str(pixel_type).upper() in pixel_types.keys():
+        data = data.astype(pixel_types[str(pixel_type).upper()])
+    nodata = None
+    if not (str(nodata_value) == ""):
+        nodata = float(nodata_value)
+    Raster(data, ras.geotransform, mask=ras.mask, spatial_reference=ras.spatialReference,
+           nodata=nodata).save(out_path)
+    return Result(out_path)
+
+
+def Delete_management(in_data, data_type=""):
+    # deletes a raster, file or directory
+    path = str(in_data) if isinstance(in_data, Raster) else normalize_path(in_data)
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path, topdown=False):
+            for name in files:
+                os.remove(os.path.join(root, name))
+            for name in dirs:
+                os.rmdir(os.path.join(root, name))
+        os.rmdir(path)
+    elif os.path.isfile(path):
+        os.remove(path)
+        for ext in (".aux.xml", ".ovr", ".tfw"):
+            if os.path.isfile(path + ext):
+                os.remove(path + ext)
+    else:
+        raise ExecuteError("ERROR: %s does not exist." % path)
+    return Result(path)
+
+
+def RasterToPolygon_conversion(in_raster, out_polygon_features, simplify="SIMPLIFY", raster_field="Value", *args,
+                               **kwargs):
+    # converts an INTEGER raster to a polygon shapefile (fields Id, gridcode and F_AREA) - cells of equal value that
+    # share an edge form one polygon and the polygons follow the cell edges (NO_SIMPLIFY geometry for any simplify)
+    out_path = normalize_path(out_polygon_features)
+    if os.path.exists(out_path) and not env.overwriteOutput:
+        raise ExecuteError("ERROR: %s already exists." % out_path)
+    ras = in_raster if isinstance(in_raster, Raster) else Raster(in_raster)
+    try:
+        fPolygonize.polygonize(ras, out_path)
+    except ValueError as e:
+        AddError(str(e))
+        raise ExecuteError(str(e))
+    return Result(out_path)
+
+
+def __getattr__(name):
+    # geoprocessing tools outside the supported subset raise ExecuteError when called (as failing arcpy tools do)
+    if name.split("_")[-1] in ("management", "conversion", "analysis", "sa", "3d", "edit", "cartography"):
+        def unsupported_tool(*args, **kwargs):
+            AddError("ERROR: %s is not available in the NumPy backend (requires ArcGIS arcpy)." % name)
+            raise ExecuteError("%s is not available in the NumPy backend." % name)
+        return unsupported_tool
+    raise AttributeError("module 'arcpy' (NumPy backend) has no attribute '%s'" % name)
+
+
+from arcpy import sa
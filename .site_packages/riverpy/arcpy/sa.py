@@ -0,0 +1,36 @@
+#!/usr/bin/python
+# NumPy stand-in for the arcpy.sa (Spatial Analyst) functions that River Architect calls
+try:
+    import os, sys
+    import numpy as np
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, numpy).")
+
+try:
+    from cRaster import Raster
+    from fRasterAlgebra import Abs, CellStatistics, Con, Cos, Exp, Float, InList, Int, IsNull, Ln, Log10, Power, \
+        Reclassify, RemapValue, SetNull, Sin, Square, SquareRoot, as_raster
+    import fTerrain as fTe
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: riverpy/cRaster, riverpy/fRasterAlgebra, "
+          "riverpy/fTerrain).")
+
+__all__ = ["Abs", "CellStatistics", "Con", "Cos", "Exp", "ExtractByMask", "Float", "InList", "Int", "IsNull", "Ln",
+           "Log10", "Power", "Raster", "Reclassify", "RemapValue", "SetNull", "Sin", "Slope", "Square", "SquareRoot"]
+
+
+def ExtractByMask(in_raster, in_mask_data):
+    # in_mask_data = Raster or raster path (feature class masks require ArcGIS arcpy)
+    mask_ras = as_raster(in_mask_data)
+    if not isinstance(mask_ras, Raster):
+        import arcpy
+        raise arcpy.ExecuteError("ExtractByMask supports raster masks only in the NumPy backend.")
+    return Con(~IsNull(mask_ras), as_raster(in_raster))
+
+
+def Slope(in_raster, output_measurement="DEGREE", z_factor=1, *args):
+    # Horn's (1981) third-order finite difference method as in ArcGIS (see riverpy/fTerrain.py)
+    # output_measurement = STR ("DEGREE" or "PERCENT_RISE")
+    # NoData neighbours (and cells beyond the raster edge) take the value of the center cell
+    field = "slope_percent" if str(output_measurement).upper() == "PERCENT_RISE" else "slope"
+    return fTe.derive(as_raster(in_raster), [field], z_factor)[field]
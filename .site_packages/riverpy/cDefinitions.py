@@ -16,8 +16,9 @@ class FeatureReader:
         self.row_feat_names = 4
         self.row_feat_ids = 5
 
-        self.path2lf = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\LifespanDesign\\"
-        self.thresh_xlsx = self.path2lf + ".templates\\threshold_values.xlsx"
+        self.path2lf = config.dir2lf
+        self.thresh_xlsx = os.path.join(self.path2lf, ".templates", "threshold_values.xlsx")
+        self.wb = None
         try:
             self.wb = oxl.load_workbook(filename=self.thresh_xlsx, read_only=True, data_only=True)
             wb_open = True
@@ -33,7 +34,8 @@ class FeatureReader:
             print("FeatureReader: Could not find sheet \'thresholds\' in threshold_values.xlsx.")
 
     def close_wb(self):
-        self.wb.close()
+        if self.wb is not None:
+            self.wb.close()
 
     def get_feat_id(self, column_list):
         feature_id_list = []
@@ -0,0 +1,216 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging, json, hashlib, threading
+    import numpy as np
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, json, hashlib, threading, numpy).")
+
+try:
+    import cRaster as cRa
+    import fTerrain as fTe
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: cRaster, fTerrain).")
+
+
+class DerivedHydraulics:
+    # Per-discharge hydraulic fields derived from a HydraulicCube, stored next to the cube in
+    # 01_Conditions/CONDITION/.cube/derived_KEY/ (KEY identifies unit system, Manning's n and grain density)
+    # fields (one (n_discharges, rows, cols) float32 .npy each, NoData = NaN):
+    #   fr   = Froude number u / sqrt(g * h)
+    #   dcr  = u^2 * n^2 / h^(1/3) = critical grain size (Dcr) * (s - 1) * critical dimensionless bed shear stress
+    #   taux = dimensionless bed shear stress (u / (5.75 * log10(12.2 * h / (4.4 * D))))^2 / (g * (s - 1) * D)
+    #   se   = energy slope Slope(dem + h + u^2 / (2 * g)) in (--)
+    # taux and se also depend on the grain size (D) and dem rasters, which are stamped in manifest.json
+    # manifest.json also stores the cube layer identities (HydraulicCube.layer_stamps) that each field was derived
+    # from: after adding, removing or replacing a discharge, only the layers of that discharge are derived again
+    fields = ("dcr", "fr", "se", "taux")
+    version = 2
+
+    def __init__(self, cube, unit_system, n, *args, **kwargs):
+        # cube = HydraulicCube of the condition (must be current)
+        # unit_system = STR ("us" or "si")
+        # n = FLOAT of Manning's n in the unit system (s/ft^(1/3) or s/m^(1/3))
+        # kwargs: g = FLOAT gravity acceleration in the unit system (default: 9.81 m/s2 converted to the unit system)
+        #         s = FLOAT relative grain density (default: 2.68)
+        self.logger = logging.getLogger("logfile")
+        self.cube = cube
+        self.parameters = {"unit_system": str(unit_system), "n": float(n),
+                           "g": float(kwargs.get("g", 9.81 / 0.3048 if str(unit_system) == "us" else 9.81)),
+                           "s": float(kwargs.get("s", 2.68))}
+        key = hashlib.md5(json.dumps(self.parameters, sort_keys=True).encode()).hexdigest()[0:10]
+        self.dir2stack = os.path.join(cube.dir2cube, "derived_" + key)
+        self.manifest_path = os.path.join(self.dir2stack, "manifest.json")
+        self.manifest = {}
+        self.arrays = {}
+
+    @staticmethod
+    def raster_stamp(ras):
+        # returns LIST [path, mtime, size] of a file raster (in-memory rasters cannot be stamped: None)
+        try:
+            path = os.path.abspath(ras.path)
+            stat = os.stat(path)
+            return [path, stat.st_mtime, stat.st_size]
+        except (AttributeError, TypeError, OSError):
+            return None
+
+    def cube_stamp(self):
+        # returns LIST of the grid definition and the layer identities of the cube
+        return [list(self.cube.geotransform), list(self.cube.shape), self.cube.layer_stamps("h", "u")]
+
+    def read_manifest(self):
+        if not self.manifest:
+            try:
+                with open(self.manifest_path) as f:
+                    self.manifest = json.load(f)
+            except (IOError, ValueError):
+                self.manifest = {"version": self.version, "parameters": self.parameters, "fields": {}}
+        return self.manifest
+
+    def write_manifest(self):
+        tmp_path = "%s.%i.%i.tmp" % (self.manifest_path, os.getpid(), threading.get_ident())
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def is_current(self, field, *args):
+        # field = STR (see DerivedHydraulics.fields)
+        # args[0] = Raster of grain sizes (taux) or DEM (se) that the field was derived from
+        manifest = self.read_manifest()
+        try:
+            entry = manifest["fields"][field]
+            if not ((manifest["version"] == self.version) and (entry["cube"] == self.cube_stamp())):
+                return False
+            if not os.path.isfile(os.path.join(self.dir2stack, field + ".npy")):
+                return False
+            if args:
+                stamp = self.raster_stamp(args[0])
+                return (stamp is not None) and (entry["input"] == stamp)
+        except KeyError:
+            return False
+        return True
+
+    def get_previous_layers(self, field, *args):
+        # returns DICT {layer identity: layer index} of the existing field stack that can be reused (same grid and
+        # input raster) - empty if the field must be derived from scratch
+        try:
+            entry = self.read_manifest()["fields"][field]
+            if not (self.read_manifest()["version"] == self.version):
+                return {}
+            if not (entry["cube"][0:2] == self.cube_stamp()[0:2]):
+                return {}
+            if args and ((self.raster_stamp(args[0]) is None) or not (entry["input"] == self.raster_stamp(args[0]))):
+                return {}
+            if not os.path.isfile(os.path.join(self.dir2stack, field + ".npy")):
+                return {}
+            return {json.dumps(layer): i for i, layer in enumerate(entry["cube"][2])}
+        except (KeyError, TypeError):
+            return {}
+
+    def layer_stamps(self, field):
+        # returns LIST of the identities of the field layers (see HydraulicCube.layer_stamps) including the stamp of
+        # the input raster (taux, se) - cDischargeIndex reuses envelope layers of unchanged identities
+        entry = self.read_manifest()["fields"][field]
+        return [layer + [entry["input"]] for layer in entry["cube"][2]]
+
+    def build(self, field, *args):
+        # field = STR (see DerivedHydraulics.fields)
+        # args[0] = Raster of grain sizes (required for taux) or DEM (required for se)
+        if not os.path.exists(self.dir2stack):
+            os.makedirs(self.dir2stack, exist_ok=True)
+        cube_stamp = self.cube_stamp()
+        previous_layers = self.get_previous_layers(field, *args)
+        n_reuse = sum([1 for layer in cube_stamp[2] if json.dumps(layer) in previous_layers.keys()])
+        self.logger.info("      * deriving %s for %i discharges (%s) ..." % (
+            field, cube_stamp[2].__len__() - n_reuse, self.dir2stack))
+        g = self.parameters["g"]
+        h_cube = self.cube.get_array("h")
+        u_cube = self.cube.get_array("u")
+        geotransform, shape = self.cube.geotransform, self.cube.shape
+        ras_input = None
+        if field in ("taux", "se"):
+            data, mask = cRa.resample(args[0], geotransform, shape)
+            ras_input = np.where(mask, np.nan, np.asarray(data, dtype=np.float64))
+        self.arrays.pop(field, None)
+        # concurrent builds (process pool workers, reach threads) write separate files and replace fields atomically
+        field_path = os.path.join(self.dir2stack, field + ".npy")
+        previous_stack = np.load(field_path, mmap_mode="r") if n_reuse > 0 else None
+        tmp_path = "%s.%i.%i.tmp" % (field_path, os.getpid(), threading.get_ident())
+        stack = np.lib.format.open_memmap(tmp_path, mode="w+",
+                                          dtype=np.float32, shape=h_cube.shape)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for i in range(0, h_cube.shape[0]):
+                try:
+                    stack[i] = previous_stack[previous_layers[json.dumps(cube_stamp[2][i])]]
+                    continue
+                except (KeyError, TypeError):
+                    pass
+                h = np.asarray(h_cube[i], dtype=np.float64)
+                u = np.asarray(u_cube[i], dtype=np.float64)
+                if field == "fr":
+                    layer = u / np.sqrt(g * h)
+                elif field == "dcr":
+                    layer = np.square(u * self.parameters["n"]) / np.power(h, 1.0 / 3.0)
+                elif field == "taux":
+                    layer = np.square(u / (5.75 * np.log10(12.2 * h / (2 * 2.2 * ras_input)))) / (
+                        g * (self.parameters["s"] - 1) * ras_input)
+                elif field == "se":
+                    layer = self.energy_slope(ras_input + h + np.square(u) / (2 * g))
+                else:
+                    raise ValueError("ERROR: Unknown derived hydraulic field %s." % str(field))
+                layer[~np.isfinite(layer)] = np.nan
+                stack[i] = layer
+        stack.flush()
+        del stack, previous_stack
+        os.replace(tmp_path, field_path)
+        self.manifest = {}  # re-read the manifest that other processes may have updated
+        manifest = self.read_manifest()
+        if not (manifest.get("version") == self.version):
+            manifest = self.manifest = {"version": self.version, "parameters": self.parameters, "fields": {}}
+        manifest["fields"].update({field: {"cube": cube_stamp,
+                                           "input": self.raster_stamp(args[0]) if args else None}})
+        self.write_manifest()
+
+    def energy_slope(self, egl):
+        # returns numpy array of the PERCENT_RISE Slope / 100 of an energy grade line array (NaN = NoData)
+        ras_egl = cRa.Raster(egl, self.cube.geotransform, mask=np.isnan(egl))
+        ras_slope = fTe.derive(ras_egl, ["slope_percent"], 1.0)["slope_percent"]
+        return np.where(ras_slope.mask, np.nan, ras_slope.data / 100)
+
+    def get_array(self, field, *args):
+        # returns read-only memory-mapped numpy array (n_discharges, rows, cols) of field (builds it if required)
+        # args[0] = Raster of grain sizes (taux) or DEM (se)
+        if not self.is_current(field, *args):
+            self.build(field, *args)
+        if field not in self.arrays.keys():
+            self.arrays.update({field: np.load(os.path.join(self.dir2stack, field + ".npy"), mmap_mode="r")})
+        return self.arrays[field]
+
+    def get_index(self, raster_name):
+        # returns TUPLE (field, discharge index) of derived raster names (e.g., "fr001000") or None
+        name = os.path.splitext(os.path.basename(str(raster_name)))[0]
+        for field in self.fields:
+            if name.startswith(field):
+                index = self.cube.get_index("h" + name[len(field):])
+                if index is not None:
+                    return field, index[1]
+        return None
+
+    def get_raster(self, field, h_name, u_name, *args):
+        # h_name, u_name = STR of the flow depth and velocity raster names (e.g., "h001000", "u001000")
+        # args[0] = Raster of grain sizes (taux) or DEM (se)
+        # returns Raster of field at the discharge of h_name and u_name (None if they are not cube slices of the
+        # same discharge) - the raster name is field + discharge code (e.g., "fr001000")
+        h_index = self.cube.get_index(h_name)
+        u_index = self.cube.get_index(u_name)
+        if (h_index is None) or (u_index is None) or not ((h_index[0], u_index[0]) == ("h", "u")):
+            return None
+        if not (h_index[1] == u_index[1]):
+            return None
+        data = self.get_array(field, *args)[h_index[1]]
+        code = os.path.splitext(os.path.basename(str(h_name)))[0][1:]
+        return cRa.Raster(data, self.cube.geotransform, mask=np.isnan(data),
+                          spatial_reference=self.cube.spatial_reference, name=field + code)
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = DerivedHydraulics (%s)" % os.path.dirname(__file__))
+        print(dir(self))
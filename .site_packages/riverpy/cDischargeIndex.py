@@ -0,0 +1,230 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging, hashlib, json, threading
+    import numpy as np
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, hashlib, json, threading, numpy).")
+
+try:
+    import cRaster as cRa
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: cRaster).")
+
+
+class DischargeIndex:
+    # Per-pixel critical-discharge index of a Q-sorted parameter stack (n_discharges, rows, cols) such as a
+    # HydraulicCube parameter (h, u) - built once per condition, parameter and discharge selection
+    # the index stores the running maximum of the stack along the discharge axis (envelope, NoData = -inf) as
+    # PAR_envelope_KEY.npy next to the stack: each pixel column is non-decreasing, thus the index of the first discharge
+    # that exceeds any threshold is the number of envelope values below the threshold (searchsorted per pixel)
+    # envelopes are keyed by the identities of the included stack layers (source stamps, see
+    # HydraulicCube.layer_stamps) and PAR_envelope_KEY.json lists them: a new envelope continues the running maximum
+    # after the longest unchanged prefix of an existing envelope (e.g., adding the highest discharge only computes
+    # one layer) and envelopes of replaced or removed layers are deleted
+    def __init__(self, cube, par, *args, **kwargs):
+        # cube = HydraulicCube providing discharges and grid definition
+        # par = STR of the stack name (PAR.npy, e.g., "h" or "u")
+        # args[0] = LIST of INT discharge indices to include (default: all discharges of the cube)
+        # kwargs: dir2stack = STR of the directory containing PAR.npy (default: cube.dir2cube)
+        #         stamps = LIST of the identities of all stack layers (default: cube.layer_stamps(par))
+        self.logger = logging.getLogger("logfile")
+        self.cube = cube
+        self.par = par
+        try:
+            self.layers = sorted(int(i) for i in args[0])
+        except:
+            self.layers = list(range(0, cube.discharges.__len__()))
+        self.dir2stack = kwargs.get("dir2stack", cube.dir2cube)
+        self.stack_path = os.path.join(self.dir2stack, par + ".npy")
+        self.stamps = kwargs.get("stamps") or cube.layer_stamps(par)
+        self.layer_stamps = [self.stamps[i] for i in self.layers]
+        key = hashlib.md5(json.dumps(self.layer_stamps).encode()).hexdigest()[0:10]
+        self.envelope_path = os.path.join(self.dir2stack, "%s_envelope_%s.npy" % (par, key))
+        self.envelope = None
+
+    @property
+    def discharges(self):
+        # LIST of the included discharges in ascending order
+        discharges = self.cube.discharges
+        return [discharges[i] for i in self.layers]
+
+    def is_current(self):
+        # returns True if the envelope of the included layer identities exists
+        return os.path.isfile(self.envelope_path) and os.path.isfile(self.envelope_path.replace(".npy", ".json"))
+
+    def get_envelopes(self):
+        # returns LIST of TUPLES (npy path, LIST of layer identities) of the existing envelopes of the stack
+        envelopes = []
+        prefix = "%s_envelope_" % self.par
+        for file_name in sorted(os.listdir(self.dir2stack)):
+            if not (file_name.startswith(prefix) and file_name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.dir2stack, file_name)) as f:
+                    envelopes.append((os.path.join(self.dir2stack, file_name.replace(".json", ".npy")),
+                                      json.load(f)["layers"]))
+            except (IOError, ValueError, KeyError):
+                continue
+        return envelopes
+
+    def get_prefix(self):
+        # returns TUPLE (npy path, INT number of leading envelope layers that can be reused) of the existing envelope
+        # with the longest unchanged prefix (None, 0 if no envelope has the same first layer)
+        best_path, best_n = None, 0
+        for path, layers in self.get_envelopes():
+            n = 0
+            while (n < min(layers.__len__(), self.layer_stamps.__len__())) and (layers[n] == self.layer_stamps[n]):
+                n += 1
+            if (n > best_n) and os.path.isfile(path):
+                best_path, best_n = path, n
+        return best_path, best_n
+
+    def remove_obsolete(self):
+        # deletes envelopes that include layers which are no longer in the stack (replaced or removed discharges)
+        current = [json.dumps(stamp) for stamp in self.stamps]
+        for path, layers in self.get_envelopes():
+            if all(json.dumps(layer) in current for layer in layers):
+                continue
+            for obsolete in (path, path.replace(".npy", ".json")):
+                try:
+                    os.remove(obsolete)
+                except OSError:
+                    pass
+
+    def build(self):
+        # writes the running maximum of the included stack layers (NaN cells do not exceed any threshold)
+        prefix_path, n_prefix = self.get_prefix()
+        self.logger.info("      * building critical-discharge index of %s (%i discharges, %i reused) ..." % (
+            self.par, self.layers.__len__(), n_prefix))
+        stack = np.load(self.stack_path, mmap_mode="r")
+        # concurrent builds (process pool workers, reach threads) write separate files and replace envelopes atomically
+        tmp_path = "%s.%i.%i.tmp" % (self.envelope_path, os.getpid(), threading.get_ident())
+        envelope = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32,
+                                             shape=(self.layers.__len__(),) + tuple(stack.shape[1:]))
+        running_max = np.full(stack.shape[1:], -np.inf, dtype=np.float32)
+        if n_prefix > 0:
+            prefix = np.load(prefix_path, mmap_mode="r")
+            envelope[0:n_prefix] = prefix[0:n_prefix]
+            running_max[:] = prefix[n_prefix - 1]
+            del prefix
+        for k, i in enumerate(self.layers):
+            if k < n_prefix:
+                continue
+            np.fmax(running_max, stack[i], out=running_max)
+            envelope[k] = running_max
+        envelope.flush()
+        del envelope
+        os.replace(tmp_path, self.envelope_path)
+        tmp_path = "%s.%i.%i.tmp" % (self.envelope_path.replace(".npy", ".json"), os.getpid(), threading.get_ident())
+        with open(tmp_path, "w") as f:
+            json.dump({"par": self.par, "layers": self.layer_stamps}, f)
+        os.replace(tmp_path, self.envelope_path.replace(".npy", ".json"))
+        self.envelope = None
+        self.remove_obsolete()
+
+    def get_envelope(self):
+        # returns read-only memory-mapped envelope (builds the index if required)
+        if self.envelope is None:
+            if not self.is_current():
+                self.build()
+            self.envelope = np.load(self.envelope_path, mmap_mode="r")
+        return self.envelope
+
+    def get_window(self, geotransform, shape):
+        # returns TUPLE (row_off, col_off, n_rows, n_cols) of the cube cells covered by the grid defined by
+        # geotransform and shape (None if the grid is not aligned with the cube cells or does not overlap)
+        x0, dx, rx, y0, ry, dy = self.cube.geotransform
+        gx0, gdx, grx, gy0, gry, gdy = geotransform
+        if not (np.isclose(dx, gdx) and np.isclose(dy, gdy)):
+            return None
+        col_off, row_off = (gx0 - x0) / dx, (gy0 - y0) / dy
+        if not (np.isclose(col_off, round(col_off)) and np.isclose(row_off, round(row_off))):
+            return None
+        r0, c0 = max(int(round(row_off)), 0), max(int(round(col_off)), 0)
+        r1 = min(int(round(row_off)) + int(shape[0]), self.cube.shape[0])
+        c1 = min(int(round(col_off)) + int(shape[1]), self.cube.shape[1])
+        if (r1 <= r0) or (c1 <= c0):
+            return None
+        return r0, c0, r1 - r0, c1 - c0
+
+    def window_geotransform(self, window):
+        x0, dx, rx, y0, ry, dy = self.cube.geotransform
+        return x0 + window[1] * dx, dx, 0.0, y0 + window[0] * dy, 0.0, dy
+
+    def get_window_envelope(self, *args):
+        # args[0] = TUPLE (row_off, col_off, n_rows, n_cols) of cube cells (default: all cells)
+        envelope = self.get_envelope()
+        try:
+            row_off, col_off, n_rows, n_cols = args[0]
+            return envelope[:, row_off:row_off + n_rows, col_off:col_off + n_cols]
+        except (IndexError, TypeError):
+            return envelope
+
+    def first_exceedance(self, threshold, *args, **kwargs):
+        # threshold = FLOAT or numpy array (rows, cols) on the cube grid (or window)
+        # args[0] = BOOL array (rows, cols) of NoData thresholds (optional)
+        # kwargs: window = TUPLE (row_off, col_off, n_rows, n_cols) of cube cells (default: all cells)
+        # returns INT array (rows, cols) of the first included layer with a value >= threshold
+        #         (= number of included layers where nothing is exceeded)
+        envelope = self.get_window_envelope(kwargs.get("window"))
+        threshold = np.asarray(threshold, dtype=np.float64)
+        # layer counts fit in one byte for fewer than 255 discharges
+        k = np.zeros(envelope.shape[1:], dtype=np.uint8 if envelope.shape[0] < 255 else np.int32)
+        for layer in envelope:
+            k += (layer < threshold)
+        k[np.broadcast_to(np.isnan(threshold), k.shape)] = envelope.shape[0]
+        try:
+            k[np.asarray(args[0], dtype=bool)] = envelope.shape[0]
+        except IndexError:
+            pass
+        return k
+
+    def critical_discharge(self, threshold, *args, **kwargs):
+        # threshold = FLOAT or numpy array (rows, cols) on the cube grid (or window)
+        # args[0] = BOOL array (rows, cols) of NoData thresholds (optional)
+        # kwargs: window = TUPLE (row_off, col_off, n_rows, n_cols) of cube cells (default: all cells)
+        # returns Raster of the linearly interpolated discharge where each pixel first exceeds threshold
+        #         (NoData where no included discharge exceeds threshold)
+        envelope = self.get_window_envelope(kwargs.get("window"))
+        k = self.first_exceedance(threshold, *args, **kwargs)
+        n = envelope.shape[0]
+        discharges = np.asarray(self.discharges + [np.nan], dtype=np.float64)
+        q_crit = discharges[k]
+        rows, cols = np.nonzero((k > 0) & (k < n))
+        if rows.size > 0:
+            kk = k[rows, cols]
+            v0 = envelope[kk - 1, rows, cols].astype(np.float64)
+            v1 = envelope[kk, rows, cols].astype(np.float64)
+            t = np.broadcast_to(np.asarray(threshold, dtype=np.float64), k.shape)[rows, cols]
+            q0 = discharges[kk - 1]
+            q1 = discharges[kk]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                q_interp = q0 + (t - v0) / (v1 - v0) * (q1 - q0)
+            # pixels that were dry at the previous discharge (-inf) keep the first exceeding discharge
+            q_crit[rows, cols] = np.where(np.isfinite(q_interp), q_interp, q1)
+        geotransform = self.window_geotransform(kwargs["window"]) if kwargs.get("window") else self.cube.geotransform
+        return cRa.Raster(q_crit, geotransform, mask=(k >= n),
+                          spatial_reference=self.cube.spatial_reference, name="qcr_" + self.par)
+
+    def lifespans(self, threshold, lifespans, *args, **kwargs):
+        # threshold = FLOAT or numpy array (rows, cols) on the cube grid (or window)
+        # lifespans = LIST of FLOAT lifespans (years) of the included discharges (ascending discharge order)
+        # args[0] = BOOL array (rows, cols) of NoData thresholds (optional)
+        # kwargs: window = TUPLE (row_off, col_off, n_rows, n_cols) of cube cells (default: all cells)
+        # returns CodedRaster of the minimum lifespan among the exceeded discharges - requires lifespans that do not
+        #         decrease with discharge (the first exceeded discharge has the shortest lifespan), raises ValueError
+        lifespans = np.asarray(lifespans, dtype=np.float64)
+        if not (lifespans.__len__() == self.layers.__len__()):
+            raise ValueError("ERROR: Number of lifespans and discharges differ.")
+        if (np.diff(lifespans) < 0).any():
+            raise ValueError("ERROR: Lifespans decrease with discharge (no index lookup possible).")
+        k = self.first_exceedance(threshold, *args, **kwargs)
+        never = (k >= lifespans.__len__())
+        lookup = np.unique(lifespans)
+        codes = np.append(np.searchsorted(lookup, lifespans), 0).astype(np.uint8)[k]
+        geotransform = self.window_geotransform(kwargs["window"]) if kwargs.get("window") else self.cube.geotransform
+        return cRa.CodedRaster(codes, lookup, geotransform, mask=never, spatial_reference=self.cube.spatial_reference)
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = DischargeIndex (%s)" % os.path.dirname(__file__))
+        print(dir(self))
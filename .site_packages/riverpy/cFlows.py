@@ -134,8 +134,8 @@ class SeasonalFlowProcessor:
         self.min_year = 9999
         self.max_year = 1
         self.season_years = int()
-        self.xlsx_template = config.dir2ra + "00_Flows\\templates\\flow_duration_template.xlsx"
-        self.disc_xlsx_template = config.dir2ra + "00_Flows\\templates\\disc_freq_template.xlsx"
+        self.xlsx_template = os.path.join(config.dir2flows, "templates", "flow_duration_template.xlsx")
+        self.disc_xlsx_template = os.path.join(config.dir2flows, "templates", "disc_freq_template.xlsx")
         self.read_flow_series(input_xlsx)
 
     def add_years(self, curr_date, number_of_years):
@@ -209,7 +209,7 @@ class SeasonalFlowProcessor:
     def make_condition_flow2d_duration(self, condition):
         # condition = STR of CONDITION
         for fish in self.export_dict.keys():
-            xlsx_name = config.dir2ra + "00_Flows\\" + condition + "\\flow_duration_" + str(fish) + ".xlsx"
+            xlsx_name = os.path.join(config.dir2flows, condition, "flow_duration_" + str(fish) + ".xlsx")
             flows = FlowAssessment()
             Q = []
             pr = []
@@ -330,9 +330,9 @@ class SeasonalFlowProcessor:
         self.write_disc_freq2xlsx(condition, disc_freqs)
 
     def write_disc_freq2xlsx(self, condition, disc_freqs):
-        fG.chk_dir(config.dir2ra + "00_Flows\\" + condition + "\\")
+        fG.chk_dir(config.dir2flows + condition + os.sep)
         for fish in self.fish_seasons.keys():
-            export_xlsx_name = config.dir2ra + "00_Flows\\" + condition + "\\disc_freq_" + str(fish) + ".xlsx"
+            export_xlsx_name = os.path.join(config.dir2flows, condition, "disc_freq_" + str(fish) + ".xlsx")
             self.logger.info("   * writing to " + export_xlsx_name)
             try:
                 xlsx_write = cIO.Write(self.disc_xlsx_template)
@@ -372,9 +372,9 @@ class SeasonalFlowProcessor:
             self.logger.info("ERROR: The source discharge file contains non-detectable formats.")
 
     def write_flow_duration2xlsx(self, condition):
-        fG.chk_dir(config.dir2ra + "00_Flows\\" + condition + "\\")
+        fG.chk_dir(config.dir2flows + condition + os.sep)
         for fish in self.export_dict.keys():
-            export_xlsx_name = config.dir2ra + "00_Flows\\" + condition + "\\flow_duration_" + str(fish) + ".xlsx"
+            export_xlsx_name = os.path.join(config.dir2flows, condition, "flow_duration_" + str(fish) + ".xlsx")
             self.logger.info("   * writing to " + export_xlsx_name)
             try:
                 xlsx_write = cIO.Write(self.xlsx_template)
@@ -0,0 +1,647 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging, struct, zlib
+    import numpy as np
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, struct, zlib, numpy).")
+
+
+# TIFF field types: type_id: (numpy dtype character, byte size)
+TIFF_TYPES = {1: ("u1", 1), 2: ("S1", 1), 3: ("u2", 2), 4: ("u4", 4), 5: ("u4", 8), 6: ("i1", 1), 7: ("u1", 1),
+              8: ("i2", 2), 9: ("i4", 4), 10: ("i4", 8), 11: ("f4", 4), 12: ("f8", 8), 16: ("u8", 8), 17: ("i8", 8),
+              18: ("u8", 8)}
+
+# TIFF and GeoTIFF tags used by River Architect
+TAG_IMAGE_WIDTH = 256
+TAG_IMAGE_LENGTH = 257
+TAG_BITS_PER_SAMPLE = 258
+TAG_COMPRESSION = 259
+TAG_PHOTOMETRIC = 262
+TAG_STRIP_OFFSETS = 273
+TAG_SAMPLES_PER_PIXEL = 277
+TAG_ROWS_PER_STRIP = 278
+TAG_STRIP_BYTE_COUNTS = 279
+TAG_PLANAR_CONFIG = 284
+TAG_PREDICTOR = 317
+TAG_TILE_WIDTH = 322
+TAG_TILE_LENGTH = 323
+TAG_TILE_OFFSETS = 324
+TAG_TILE_BYTE_COUNTS = 325
+TAG_SAMPLE_FORMAT = 339
+TAG_MODEL_PIXEL_SCALE = 33550
+TAG_MODEL_TIEPOINT = 33922
+TAG_MODEL_TRANSFORMATION = 34264
+TAG_GEO_KEY_DIRECTORY = 34735
+TAG_GEO_DOUBLE_PARAMS = 34736
+TAG_GEO_ASCII_PARAMS = 34737
+TAG_GDAL_NODATA = 42113
+
+# compression identifiers
+COMPRESSION_NONE = 1
+COMPRESSION_LZW = 5
+COMPRESSION_DEFLATE = 8
+COMPRESSION_ADOBE_DEFLATE = 32946
+COMPRESSION_PACKBITS = 32773
+
+# GeoKeys
+KEY_MODEL_TYPE = 1024
+KEY_RASTER_TYPE = 1025
+KEY_GEOGRAPHIC_TYPE = 2048
+KEY_PROJECTED_CS_TYPE = 3072
+
+SAMPLE_FORMATS = {1: "u", 2: "i", 3: "f"}
+
+
+def dtype_to_tiff(dtype):
+    # returns (BitsPerSample, SampleFormat) of a numpy dtype
+    dtype = np.dtype(dtype)
+    if dtype.kind == "b":
+        dtype = np.dtype("u1")
+    sample_format = {"u": 1, "i": 2, "f": 3}[dtype.kind]
+    return dtype.itemsize * 8, sample_format
+
+
+def lzw_decode(data):
+    # decodes a TIFF (MSB first, early change) LZW stream
+    table = [bytes([i]) for i in range(256)] + [b"", b""]
+    out = bytearray()
+    bit_pos = 0
+    n_bits = 9
+    total_bits = len(data) * 8
+    previous = None
+    # pad the stream so that reading 3 bytes at the end never runs out of data
+    buffer = bytes(data) + b"\x00\x00\x00"
+    while bit_pos + n_bits <= total_bits:
+        byte_pos = bit_pos >> 3
+        chunk = (buffer[byte_pos] << 16) | (buffer[byte_pos + 1] << 8) | buffer[byte_pos + 2]
+        code = (chunk >> (24 - (bit_pos & 7) - n_bits)) & ((1 << n_bits) - 1)
+        bit_pos += n_bits
+        if code == 256:
+            # clear code
+            table = table[:258]
+            n_bits = 9
+            previous = None
+            continue
+        if code == 257:
+            # end of information
+            break
+        if previous is None:
+            entry = table[code]
+        elif code < len(table):
+            entry = table[code]
+            table.append(previous + entry[:1])
+        else:
+            entry = previous + previous[:1]
+            table.append(entry)
+        out += entry
+        previous = entry
+        table_size = len(table) + 1
+        if table_size >= 2047:
+            n_bits = 12
+        elif table_size >= 1023:
+            n_bits = 11
+        elif table_size >= 511:
+            n_bits = 10
+    return bytes(out)
+
+
+def lzw_encode(data):
+    # encodes bytes as a TIFF (MSB first, early change) LZW stream (see lzw_decode)
+    out = bytearray()
+    bits = 0  # bit buffer
+    n_buffered = 0
+    n_bits = 9
+    table = {}
+    next_code = 258
+    prefix = None
+    codes = [256]  # the stream starts with a clear code
+    for byte in bytes(data):
+        if prefix is None:
+            prefix = byte
+            continue
+        key = (prefix << 8) | byte
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        codes.append(prefix)
+        table[key] = next_code
+        next_code += 1
+        prefix = byte
+        if next_code >= 4094:
+            # the table is full: the decoder resets its table at the clear code
+            codes.append(256)
+            table = {}
+            next_code = 258
+    if prefix is not None:
+        codes.append(prefix)
+    codes.append(257)
+    # code widths: the decoder widens codes when its table (one entry behind the encoder) reaches 510, 1022, 2046
+    next_code = 258
+    previous = None
+    for code in codes:
+        bits = (bits << n_bits) | code
+        n_buffered += n_bits
+        while n_buffered >= 8:
+            n_buffered -= 8
+            out.append((bits >> n_buffered) & 0xFF)
+        bits &= (1 << n_buffered) - 1
+        if code == 256:
+            n_bits = 9
+            next_code = 258
+            previous = None
+            continue
+        if previous is not None:
+            next_code += 1
+        previous = code
+        if next_code + 1 >= 2047:
+            n_bits = 12
+        elif next_code + 1 >= 1023:
+            n_bits = 11
+        elif next_code + 1 >= 511:
+            n_bits = 10
+    if n_buffered > 0:
+        out.append((bits << (8 - n_buffered)) & 0xFF)
+    return bytes(out)
+
+
+def packbits_decode(data):
+    out = bytearray()
+    i = 0
+    n = len(data)
+    while i < n:
+        header = data[i]
+        i += 1
+        if header < 128:
+            out += data[i:i + header + 1]
+            i += header + 1
+        elif header > 128:
+            out += data[i:i + 1] * (257 - header)
+            i += 1
+    return bytes(out)
+
+
+class GeoTiffReader:
+    def __init__(self, path):
+        # path = STR of full path to a (Geo)TIFF file
+        self.path = path
+        self.logger = logging.getLogger("logfile")
+        self.byte_order = "<"
+        self.bigtiff = False
+        self.tags = {}
+        with open(self.path, "rb") as f:
+            self.read_ifd(f)
+        self.width = int(self.get_tag(TAG_IMAGE_WIDTH))
+        self.height = int(self.get_tag(TAG_IMAGE_LENGTH))
+        self.samples = int(self.get_tag(TAG_SAMPLES_PER_PIXEL, 1))
+        self.planar = int(self.get_tag(TAG_PLANAR_CONFIG, 1))
+        self.compression = int(self.get_tag(TAG_COMPRESSION, COMPRESSION_NONE))
+        self.predictor = int(self.get_tag(TAG_PREDICTOR, 1))
+        bits = int(np.atleast_1d(self.tags[TAG_BITS_PER_SAMPLE])[0])
+        sample_format = int(np.atleast_1d(self.get_tag(TAG_SAMPLE_FORMAT, 1))[0])
+        self.dtype = np.dtype(SAMPLE_FORMATS[sample_format] + str(bits // 8))
+        self.tiled = TAG_TILE_WIDTH in self.tags
+        if self.tiled:
+            self.block_cols = int(self.get_tag(TAG_TILE_WIDTH))
+            self.block_rows = int(self.get_tag(TAG_TILE_LENGTH))
+            self.offsets = np.atleast_1d(self.tags[TAG_TILE_OFFSETS]).astype(np.int64)
+            self.byte_counts = np.atleast_1d(self.tags[TAG_TILE_BYTE_COUNTS]).astype(np.int64)
+        else:
+            self.block_cols = self.width
+            self.block_rows = min(int(self.get_tag(TAG_ROWS_PER_STRIP, self.height)), self.height)
+            self.offsets = np.atleast_1d(self.tags[TAG_STRIP_OFFSETS]).astype(np.int64)
+            self.byte_counts = np.atleast_1d(self.tags[TAG_STRIP_BYTE_COUNTS]).astype(np.int64)
+        self.blocks_across = int(np.ceil(self.width / float(self.block_cols)))
+        self.blocks_down = int(np.ceil(self.height / float(self.block_rows)))
+        self.geotransform = self.read_geotransform()
+        self.geokeys = self.read_geokeys()
+        self.nodata = self.read_nodata()
+
+    def get_tag(self, tag, default=None):
+        try:
+            value = self.tags[tag]
+        except KeyError:
+            return default
+        if isinstance(value, np.ndarray) and value.size == 1:
+            return value[0]
+        return value
+
+    def read_ifd(self, f):
+        # reads the first image file directory (IFD) of the file
+        order = f.read(2)
+        if order == b"II":
+            self.byte_order = "<"
+        elif order == b"MM":
+            self.byte_order = ">"
+        else:
+            raise IOError("Not a TIFF file: %s" % str(self.path))
+        bo = self.byte_order
+        version = struct.unpack(bo + "H", f.read(2))[0]
+        if version == 42:
+            ifd_offset = struct.unpack(bo + "I", f.read(4))[0]
+            count_fmt, entry_fmt, entry_size, inline_size = "H", "HHI", 12, 4
+        elif version == 43:
+            self.bigtiff = True
+            f.read(4)  # offset byte size (8) and padding
+            ifd_offset = struct.unpack(bo + "Q", f.read(8))[0]
+            count_fmt, entry_fmt, entry_size, inline_size = "Q", "HHQ", 20, 8
+        else:
+            raise IOError("Unsupported TIFF version (%s) in %s" % (str(version), str(self.path)))
+        f.seek(ifd_offset)
+        n_entries = struct.unpack(bo + count_fmt, f.read(struct.calcsize(count_fmt)))[0]
+        raw_entries = f.read(n_entries * entry_size)
+        head_size = struct.calcsize(bo + entry_fmt)
+        for i in range(0, n_entries):
+            entry = raw_entries[i * entry_size:(i + 1) * entry_size]
+            tag, typ, count = struct.unpack(bo + entry_fmt, entry[:head_size])
+            value_field = entry[head_size:]
+            try:
+                char, size = TIFF_TYPES[typ]
+            except KeyError:
+                continue  # unknown field type: skip
+            n_bytes = size * count
+            if n_bytes <= inline_size:
+                data = value_field[:n_bytes]
+            else:
+                offset = struct.unpack(bo + ("Q" if self.bigtiff else "I"), value_field)[0]
+                position = f.tell()
+                f.seek(offset)
+                data = f.read(n_bytes)
+                f.seek(position)
+            if typ == 2:
+                self.tags[tag] = data.split(b"\x00")[0].decode("ascii", "replace")
+            elif typ in (5, 10):
+                values = np.frombuffer(data, dtype=np.dtype(bo + char)).astype(np.float64)
+                self.tags[tag] = values[0::2] / values[1::2]
+            else:
+                self.tags[tag] = np.frombuffer(data, dtype=np.dtype(bo + char))
+
+    def read_geokeys(self):
+        # returns DICT of {geokey_id: value} from the GeoKeyDirectoryTag
+        geokeys = {}
+        directory = self.tags.get(TAG_GEO_KEY_DIRECTORY)
+        if directory is None:
+            return geokeys
+        doubles = self.tags.get(TAG_GEO_DOUBLE_PARAMS, np.array([]))
+        ascii_params = self.tags.get(TAG_GEO_ASCII_PARAMS, "")
+        n_keys = int(directory[3])
+        for k in range(0, n_keys):
+            key_id, location, count, value = [int(v) for v in directory[4 * (k + 1):4 * (k + 2)]]
+            if location == 0:
+                geokeys.update({key_id: value})
+            elif location == TAG_GEO_DOUBLE_PARAMS:
+                geokeys.update({key_id: tuple(float(d) for d in doubles[value:value + count])})
+            elif location == TAG_GEO_ASCII_PARAMS:
+                geokeys.update({key_id: ascii_params[value:value + count].rstrip("|")})
+        return geokeys
+
+    def read_geotransform(self):
+        # returns GDAL-style geotransform (x_min, cell_width, 0, y_max, 0, -cell_height)
+        if TAG_MODEL_TRANSFORMATION in self.tags:
+            m = self.tags[TAG_MODEL_TRANSFORMATION]
+            return float(m[3]), float(m[0]), float(m[1]), float(m[7]), float(m[4]), float(m[5])
+        try:
+            scale = self.tags[TAG_MODEL_PIXEL_SCALE]
+            tie = self.tags[TAG_MODEL_TIEPOINT]
+        except KeyError:
+            return 0.0, 1.0, 0.0, float(self.height), 0.0, -1.0
+        x0 = float(tie[3]) - float(tie[0]) * float(scale[0])
+        y0 = float(tie[4]) + float(tie[1]) * float(scale[1])
+        try:
+            pixel_is_point = (self.read_geokeys().get(KEY_RASTER_TYPE, 1) == 2)
+        except:
+            pixel_is_point = False
+        if pixel_is_point:
+            x0 -= float(scale[0]) / 2.0
+            y0 += float(scale[1]) / 2.0
+        return x0, float(scale[0]), 0.0, y0, 0.0, -float(scale[1])
+
+    def read_nodata(self):
+        try:
+            return float(str(self.tags[TAG_GDAL_NODATA]).strip())
+        except:
+            return None
+
+    def decode_block(self, data, n_rows):
+        # converts compressed block bytes into an array of shape (n_rows, block_cols, samples)
+        if self.compression in (COMPRESSION_DEFLATE, COMPRESSION_ADOBE_DEFLATE):
+            data = zlib.decompress(data)
+        elif self.compression == COMPRESSION_LZW:
+            data = lzw_decode(data)
+        elif self.compression == COMPRESSION_PACKBITS:
+            data = packbits_decode(data)
+        elif not (self.compression == COMPRESSION_NONE):
+            raise IOError("Unsupported TIFF compression (%s) in %s" % (str(self.compression), str(self.path)))
+        samples = self.samples if self.planar == 1 else 1
+        row_values = self.block_cols * samples
+        n_values = n_rows * row_values
+        if self.predictor == 3:
+            # floating point predictor: byte-wise differencing of big-endian byte planes
+            size = self.dtype.itemsize
+            raw = np.frombuffer(data, dtype=np.uint8)[:n_values * size].reshape(n_rows, row_values * size)
+            raw = np.cumsum(raw, axis=1, dtype=np.uint8)
+            raw = raw.reshape(n_rows, size, row_values).transpose(0, 2, 1)
+            block = np.ascontiguousarray(raw).view(self.dtype.newbyteorder(">")).reshape(n_rows, row_values)
+        else:
+            block = np.frombuffer(data, dtype=self.dtype.newbyteorder(self.byte_order))[:n_values]
+            block = block.reshape(n_rows, row_values)
+            if self.predictor == 2:
+                block = block.reshape(n_rows, self.block_cols, samples)
+                block = np.cumsum(block, axis=1, dtype=block.dtype).reshape(n_rows, row_values)
+        return block.astype(self.dtype.newbyteorder("="), copy=False).reshape(n_rows, self.block_cols, samples)
+
+    def read(self, window=None, band=0):
+        # window = TUPLE (row_off, col_off, n_rows, n_cols) - default: the full raster
+        # band = INT of sample (band) index
+        # returns numpy array of shape (n_rows, n_cols)
+        if window is None:
+            window = (0, 0, self.height, self.width)
+        row_off, col_off, n_rows, n_cols = [int(w) for w in window]
+        out = np.zeros((n_rows, n_cols), dtype=self.dtype)
+        if self.nodata is not None:
+            try:
+                out[:] = self.nodata
+            except:
+                pass
+        r_start = max(row_off, 0)
+        c_start = max(col_off, 0)
+        r_end = min(row_off + n_rows, self.height)
+        c_end = min(col_off + n_cols, self.width)
+        if (r_end <= r_start) or (c_end <= c_start):
+            return out
+        band_shift = 0
+        if self.planar == 2:
+            band_shift = band * self.blocks_across * self.blocks_down
+        with open(self.path, "rb") as f:
+            for b_row in range(r_start // self.block_rows, (r_end - 1) // self.block_rows + 1):
+                for b_col in range(c_start // self.block_cols, (c_end - 1) // self.block_cols + 1):
+                    index = band_shift + b_row * self.blocks_across + b_col
+                    block_r0 = b_row * self.block_rows
+                    block_c0 = b_col * self.block_cols
+                    if self.tiled:
+                        block_n_rows = self.block_rows
+                    else:
+                        block_n_rows = min(self.block_rows, self.height - block_r0)
+                    if self.byte_counts[index] == 0:
+                        continue  # sparse block
+                    f.seek(int(self.offsets[index]))
+                    block = self.decode_block(f.read(int(self.byte_counts[index])), block_n_rows)
+                    block = block[:, :, band if self.planar == 1 else 0]
+                    # intersect block with requested window
+                    rr0 = max(r_start, block_r0)
+                    rr1 = min(r_end, block_r0 + block_n_rows)
+                    cc0 = max(c_start, block_c0)
+                    cc1 = min(c_end, block_c0 + self.block_cols)
+                    out[rr0 - row_off:rr1 - row_off, cc0 - col_off:cc1 - col_off] = \
+                        block[rr0 - block_r0:rr1 - block_r0, cc0 - block_c0:cc1 - block_c0]
+        return out
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = GeoTiffReader (%s)" % os.path.dirname(__file__))
+        print(dir(self))
+
+
+class GeoTiffWriter:
+    lzw_warned = False  # the slow LZW encoder is reported once per process
+
+    def __init__(self, path, width, height, dtype, geotransform, *args, **kwargs):
+        # path = STR of full path to output GeoTIFF
+        # width, height = INT number of columns and rows
+        # dtype = numpy dtype of output pixels
+        # geotransform = TUPLE (x_min, cell_width, 0, y_max, 0, -cell_height)
+        # args[0] = DICT of geokeys {geokey_id: value} (optional, e.g., from GeoTiffReader.geokeys)
+        # kwargs: nodata = FLOAT, tiled = BOOL, block_size = INT (tile edge length or rows per strip)
+        #         compression = STR ("NONE" (default), "DEFLATE" or "LZW" - the pure-Python LZW encoder is slow: LZW
+        #                       is meant for reading and for writing small rasters that other tools require as LZW)
+        #         predictor = INT (1 = none, 2 = horizontal differencing, 3 = floating point; default for compressed
+        #                     rasters: 3 for float and 2 for integer pixels)
+        #         level = INT of the DEFLATE compression level (default: 6)
+        self.path = path
+        self.logger = logging.getLogger("logfile")
+        self.width = int(width)
+        self.height = int(height)
+        self.dtype = np.dtype(dtype) if not (np.dtype(dtype).kind == "b") else np.dtype("u1")
+        self.geotransform = tuple(float(g) for g in geotransform)
+        try:
+            self.geokeys = dict(args[0])
+        except:
+            self.geokeys = {}
+        self.nodata = kwargs.get("nodata", None)
+        compression = str(kwargs.get("compression") or "NONE").upper()
+        if compression not in ("NONE", "DEFLATE", "LZW"):
+            raise ValueError("ERROR: Unsupported GeoTIFF compression (%s)." % compression)
+        if (compression == "LZW") and not GeoTiffWriter.lzw_warned:
+            GeoTiffWriter.lzw_warned = True
+            self.logger.info("WARNING: LZW compression of GeoTIFFs is slow (pure-Python encoder) - use DEFLATE.")
+        self.compression = {"NONE": COMPRESSION_NONE, "DEFLATE": COMPRESSION_ADOBE_DEFLATE,
+                            "LZW": COMPRESSION_LZW}[compression]
+        if self.compression == COMPRESSION_NONE:
+            self.predictor = 1
+        else:
+            self.predictor = int(kwargs.get("predictor", 3 if self.dtype.kind == "f" else 2))
+        self.level = int(kwargs.get("level", 6))
+        self.tiled = bool(kwargs.get("tiled", False))
+        block_size = int(kwargs.get("block_size", 256))
+        if self.tiled:
+            # TIFF tiles must have edge lengths that are multiples of 16
+            self.block_cols = max(16, block_size // 16 * 16)
+            self.block_rows = self.block_cols
+        else:
+            self.block_cols = self.width
+            self.block_rows = max(1, min(self.height, (2 ** 16) // max(1, self.width * self.dtype.itemsize)))
+        self.blocks_across = int(np.ceil(self.width / float(self.block_cols)))
+        self.blocks_down = int(np.ceil(self.height / float(self.block_rows)))
+        n_blocks = self.blocks_across * self.blocks_down
+        self.offsets = np.zeros(n_blocks, dtype=np.uint64)
+        self.byte_counts = np.zeros(n_blocks, dtype=np.uint64)
+        # use BigTIFF when the raw image size approaches the 4 GB limit of classic TIFF
+        self.bigtiff = bool(kwargs.get("bigtiff", self.width * self.height * self.dtype.itemsize > 3.8e9))
+        self.byte_order = "<"
+        dirname = os.path.dirname(self.path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        self.file = open(self.path, "wb")
+        if self.bigtiff:
+            self.file.write(b"II" + struct.pack("<HHHQ", 43, 8, 0, 0))
+        else:
+            self.file.write(b"II" + struct.pack("<HI", 42, 0))
+
+    def block_shape(self, b_row, b_col):
+        # returns the (rows, cols) of a block as it is stored in the file
+        if self.tiled:
+            return self.block_rows, self.block_cols
+        return min(self.block_rows, self.height - b_row * self.block_rows), self.width
+
+    def encode_block(self, block):
+        # block = numpy array with the storage shape of a block
+        if self.predictor == 3:
+            # floating point predictor: byte-wise differencing of big-endian byte planes
+            n_rows, n_cols = block.shape
+            raw = np.ascontiguousarray(block, dtype=self.dtype.newbyteorder(">")).view(np.uint8)
+            raw = np.ascontiguousarray(raw.reshape(n_rows, n_cols, self.dtype.itemsize).transpose(0, 2, 1))
+            raw = raw.reshape(n_rows, n_cols * self.dtype.itemsize)
+            raw[:, 1:] = raw[:, 1:] - raw[:, :-1]
+            data = raw.tobytes()
+        else:
+            block = np.ascontiguousarray(block, dtype=self.dtype.newbyteorder(self.byte_order))
+            if self.predictor == 2:
+                # horizontal differencing (unsigned views wrap around as the decoder's cumulative sum)
+                raw = block.view(np.dtype("u%i" % self.dtype.itemsize).newbyteorder(self.byte_order)).copy()
+                raw[:, 1:] = raw[:, 1:] - raw[:, :-1]
+                block = raw
+            data = block.tobytes()
+        if self.compression == COMPRESSION_ADOBE_DEFLATE:
+            return zlib.compress(data, self.level)
+        if self.compression == COMPRESSION_LZW:
+            return lzw_encode(data)
+        return data
+
+    def write_block(self, b_row, b_col, block):
+        # writes one strip or tile; blocks may be written in any order
+        # block = numpy array - tiles at the raster edge may be smaller than the tile size (padded here)
+        n_rows, n_cols = self.block_shape(b_row, b_col)
+        if not (block.shape == (n_rows, n_cols)):
+            padded = np.zeros((n_rows, n_cols), dtype=self.dtype)
+            if self.nodata is not None:
+                try:
+                    padded[:] = self.nodata
+                except:
+                    pass
+            padded[:block.shape[0], :block.shape[1]] = block
+            block = padded
+        data = self.encode_block(block)
+        index = b_row * self.blocks_across + b_col
+        self.file.seek(0, 2)
+        if self.file.tell() % 2:
+            self.file.write(b"\x00")  # word-align data
+        self.offsets[index] = self.file.tell()
+        self.byte_counts[index] = len(data)
+        self.file.write(data)
+
+    def write_window(self, row_off, col_off, array):
+        # writes an array that is aligned with block boundaries (row_off, col_off are multiples of the block size)
+        n_rows, n_cols = array.shape
+        for r in range(0, n_rows, self.block_rows):
+            for c in range(0, n_cols, self.block_cols):
+                self.write_block((row_off + r) // self.block_rows, (col_off + c) // self.block_cols,
+                                 array[r:r + self.block_rows, c:c + self.block_cols])
+
+    def write(self, array):
+        # writes a full (height, width) array
+        self.write_window(0, 0, np.asarray(array))
+
+    def make_geokey_tags(self):
+        # returns LIST of (tag, type, values) tuples with GeoKeyDirectory, GeoDoubleParams and GeoAsciiParams
+        if not self.geokeys:
+            return []
+        directory = []
+        doubles = []
+        ascii_params = ""
+        for key_id in sorted(self.geokeys.keys()):
+            value = self.geokeys[key_id]
+            if isinstance(value, str):
+                directory += [key_id, TAG_GEO_ASCII_PARAMS, len(value) + 1, len(ascii_params)]
+                ascii_params += value + "|"
+            elif isinstance(value, (tuple, list)):
+                directory += [key_id, TAG_GEO_DOUBLE_PARAMS, len(value), len(doubles)]
+                doubles += [float(v) for v in value]
+            else:
+                directory += [key_id, 0, 1, int(value)]
+        tags = [(TAG_GEO_KEY_DIRECTORY, 3, [1, 1, 0, len(directory) // 4] + directory)]
+        if doubles:
+            tags.append((TAG_GEO_DOUBLE_PARAMS, 12, doubles))
+        if ascii_params:
+            tags.append((TAG_GEO_ASCII_PARAMS, 2, ascii_params))
+        return tags
+
+    def make_tags(self):
+        bits, sample_format = dtype_to_tiff(self.dtype)
+        x0, dx, rx, y0, ry, dy = self.geotransform
+        offset_type = 16 if self.bigtiff else 4
+        tags = [(TAG_IMAGE_WIDTH, 4, [self.width]),
+                (TAG_IMAGE_LENGTH, 4, [self.height]),
+                (TAG_BITS_PER_SAMPLE, 3, [bits]),
+                (TAG_COMPRESSION, 3, [self.compression]),
+                (TAG_PHOTOMETRIC, 3, [1]),
+                (TAG_SAMPLES_PER_PIXEL, 3, [1]),
+                (TAG_PLANAR_CONFIG, 3, [1]),
+                (TAG_SAMPLE_FORMAT, 3, [sample_format])]
+        if self.predictor > 1:
+            tags.append((TAG_PREDICTOR, 3, [self.predictor]))
+        if self.tiled:
+            tags += [(TAG_TILE_WIDTH, 4, [self.block_cols]),
+                     (TAG_TILE_LENGTH, 4, [self.block_rows]),
+                     (TAG_TILE_OFFSETS, offset_type, self.offsets),
+                     (TAG_TILE_BYTE_COUNTS, offset_type, self.byte_counts)]
+        else:
+            tags += [(TAG_STRIP_OFFSETS, offset_type, self.offsets),
+                     (TAG_ROWS_PER_STRIP, 4, [self.block_rows]),
+                     (TAG_STRIP_BYTE_COUNTS, offset_type, self.byte_counts)]
+        if (rx == 0.0) and (ry == 0.0):
+            tags += [(TAG_MODEL_PIXEL_SCALE, 12, [dx, -dy, 0.0]),
+                     (TAG_MODEL_TIEPOINT, 12, [0.0, 0.0, 0.0, x0, y0, 0.0])]
+        else:
+            tags += [(TAG_MODEL_TRANSFORMATION, 12, [dx, rx, 0.0, x0, ry, dy, 0.0, y0,
+                                                     0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0])]
+        tags += self.make_geokey_tags()
+        if self.nodata is not None:
+            nd = float(self.nodata)
+            nd_str = str(int(nd)) if (nd.is_integer() and not (self.dtype.kind == "f")) else repr(nd)
+            tags.append((TAG_GDAL_NODATA, 2, nd_str))
+        return sorted(tags, key=lambda t: t[0])
+
+    def close(self):
+        # writes the image file directory (IFD) and closes the file
+        bo = self.byte_order
+        tags = self.make_tags()
+        inline_size = 8 if self.bigtiff else 4
+        self.file.seek(0, 2)
+        if self.file.tell() % 2:
+            self.file.write(b"\x00")
+        # write out-of-line tag values first
+        entries = []
+        for tag, typ, values in tags:
+            if typ == 2:
+                data = str(values).encode("ascii") + b"\x00"
+                count = len(data)
+            else:
+                data = np.asarray(values, dtype=np.dtype(bo + TIFF_TYPES[typ][0])).tobytes()
+                count = len(values)
+            if len(data) > inline_size:
+                position = self.file.tell()
+                self.file.write(data)
+                if self.file.tell() % 2:
+                    self.file.write(b"\x00")
+                value_field = struct.pack(bo + ("Q" if self.bigtiff else "I"), position)
+            else:
+                value_field = data + b"\x00" * (inline_size - len(data))
+            entries.append((tag, typ, count, value_field))
+        ifd_offset = self.file.tell()
+        if self.bigtiff:
+            self.file.write(struct.pack(bo + "Q", len(entries)))
+            for tag, typ, count, value_field in entries:
+                self.file.write(struct.pack(bo + "HHQ", tag, typ, count) + value_field)
+            self.file.write(struct.pack(bo + "Q", 0))
+            self.file.seek(8)
+            self.file.write(struct.pack(bo + "Q", ifd_offset))
+        else:
+            self.file.write(struct.pack(bo + "H", len(entries)))
+            for tag, typ, count, value_field in entries:
+                self.file.write(struct.pack(bo + "HHI", tag, typ, count) + value_field)
+            self.file.write(struct.pack(bo + "I", 0))
+            self.file.seek(4)
+            self.file.write(struct.pack(bo + "I", ifd_offset))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = GeoTiffWriter (%s)" % os.path.dirname(__file__))
+        print(dir(self))
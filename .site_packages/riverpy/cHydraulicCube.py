@@ -0,0 +1,285 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging, json, threading
+    import numpy as np
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, json, threading, numpy).")
+
+try:
+    import cRaster as cRa
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: cRaster).")
+
+
+class HydraulicCube:
+    # Memory-mapped store of a condition's flow depth (h), velocity (u) and velocity angle (va) rasters
+    # 01_Conditions/CONDITION/.cube/ contains one (n_discharges, rows, cols) float32 .npy file per parameter
+    # (NoData = NaN) and manifest.json with discharges, raster names, grid definition and source file stamps
+    # each discharge slice is a contiguous chunk that is read zero-copy with np.load(..., mmap_mode="r")
+    # rebuilds copy the slices of unchanged GeoTIFFs from the previous cube (same grid): adding, removing or replacing
+    # one discharge only reads the GeoTIFFs of that discharge
+    parameters = ("h", "u", "va")
+    version = 1
+    slice_rasters = {}  # {(dir2cube, manifest stamp, raster name): Raster} shared by all readers of a cube
+    slice_lock = threading.Lock()
+
+    def __init__(self, dir2condition, *args, **kwargs):
+        # dir2condition = STR of the condition directory (e.g., config.dir2conditions + "2008")
+        # kwargs: block_rows = INT of raster rows that are converted at a time when the cube is built (default: 1024)
+        self.logger = logging.getLogger("logfile")
+        self.dir2condition = cRa.normalize_path(dir2condition)
+        self.dir2cube = os.path.join(self.dir2condition, ".cube")
+        self.manifest_path = os.path.join(self.dir2cube, "manifest.json")
+        self.block_rows = int(kwargs.get("block_rows", 1024))
+        self.manifest = {}
+        self.arrays = {}
+
+    @staticmethod
+    def get_discharge(raster_name, par):
+        # returns FLOAT discharge of raster names such as h001000.tif, u001000.tif or va001000.tif (None otherwise)
+        name = os.path.splitext(raster_name)[0]
+        if not name.startswith(par):
+            return None
+        try:
+            return float(name[len(par):])
+        except ValueError:
+            return None
+
+    def scan_rasters(self):
+        # returns DICT {par: {discharge: raster name}} of the GeoTIFFs in the condition directory
+        rasters = {par: {} for par in self.parameters}
+        for file_name in sorted(os.listdir(self.dir2condition)):
+            if not file_name.endswith(".tif"):
+                continue
+            for par in ("va", "h", "u"):
+                q = self.get_discharge(file_name, par)
+                if q is not None:
+                    rasters[par].update({q: file_name})
+                    break
+        return rasters
+
+    def source_stamp(self, file_name):
+        stat = os.stat(os.path.join(self.dir2condition, file_name))
+        return [stat.st_mtime, stat.st_size]
+
+    def read_previous(self, geotransform, shape):
+        # returns DICT of the manifest of the existing cube if its slices can be reused on the grid (else {})
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if (manifest["version"] == self.version) and (manifest["geotransform"] == list(geotransform)) and (
+                    manifest["shape"] == list(shape)):
+                return manifest
+        except:
+            pass
+        return {}
+
+    def build(self):
+        # writes the cube and its manifest from the h, u and va GeoTIFFs of the condition
+        rasters = self.scan_rasters()
+        discharges = sorted(rasters["h"].keys())
+        if discharges.__len__() < 1:
+            self.logger.info("WARNING: No flow depth rasters (h*.tif) found in %s." % self.dir2condition)
+            return -1
+        self.logger.info("   * building hydraulic cube for %i discharges ..." % discharges.__len__())
+        h_rasters = [cRa.Raster(os.path.join(self.dir2condition, rasters["h"][q])) for q in discharges]
+        environment = cRa.environment.copy()
+        try:
+            cRa.environment.update({"extent": "MAXOF", "cellSize": None, "snapRaster": None})
+            geotransform, shape = cRa.make_grid(h_rasters)
+        finally:
+            cRa.environment.update(environment)
+        if not os.path.exists(self.dir2cube):
+            os.makedirs(self.dir2cube)
+        previous = self.read_previous(geotransform, shape)
+        self.arrays = {}
+        sources = {}
+        reused = 0
+        for par in self.parameters:
+            if rasters[par].__len__() < 1:
+                continue
+            self.logger.info("     -- writing %s.npy" % par)
+            par_path = os.path.join(self.dir2cube, par + ".npy")
+            previous_layers = {}  # {raster name: slice index in the previous cube}
+            previous_cube = None
+            if previous and os.path.isfile(par_path):
+                previous_layers = {name: i for i, name in enumerate(previous["rasters"].get(par, [])) if name}
+                previous_cube = np.load(par_path, mmap_mode="r")
+            tmp_path = "%s.%i.%i.tmp" % (par_path, os.getpid(), threading.get_ident())
+            cube = np.lib.format.open_memmap(tmp_path, mode="w+",
+                                             dtype=np.float32, shape=(discharges.__len__(),) + tuple(shape))
+            for i, q in enumerate(discharges):
+                try:
+                    name = rasters[par][q]
+                    stamp = self.source_stamp(name)
+                    sources.update({name: stamp})
+                    if (name in previous_layers.keys()) and (previous["sources"].get(name) == stamp):
+                        cube[i] = previous_cube[previous_layers[name]]
+                        reused += 1
+                        continue
+                    ras = cRa.Raster(os.path.join(self.dir2condition, name))
+                except (KeyError, IOError):
+                    cube[i] = np.nan
+                    continue
+                x0, dx, rx, y0, ry, dy = geotransform
+                for row_off in range(0, shape[0], self.block_rows):
+                    n_rows = min(self.block_rows, shape[0] - row_off)
+                    data, mask = ras.read_window((x0, dx, 0.0, y0 + row_off * dy, 0.0, dy), (n_rows, shape[1]))
+                    block = data.astype(np.float32)
+                    block[mask] = np.nan
+                    cube[i, row_off:row_off + n_rows] = block
+            cube.flush()
+            del cube, previous_cube
+            os.replace(tmp_path, par_path)
+        if reused > 0:
+            self.logger.info("     -- reused %i unchanged slices of the previous cube" % reused)
+        geokeys = h_rasters[0].spatialReference.geokeys
+        self.manifest = {"version": self.version,
+                         "condition": os.path.basename(self.dir2condition.rstrip("\\/")),
+                         "discharges": discharges,
+                         "rasters": {par: [rasters[par].get(q, "") for q in discharges] for par in self.parameters},
+                         "geotransform": list(geotransform),
+                         "shape": list(shape),
+                         "geokeys": {str(k): (list(v) if isinstance(v, tuple) else v) for k, v in geokeys.items()},
+                         "dtype": "float32",
+                         "sources": sources}
+        tmp_path = "%s.%i.%i.tmp" % (self.manifest_path, os.getpid(), threading.get_ident())
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+        self.logger.info("   * hydraulic cube written to %s" % self.dir2cube)
+        return 0
+
+    def read_manifest(self):
+        if not self.manifest:
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        return self.manifest
+
+    def is_current(self):
+        # returns True if the cube exists and no h, u, va GeoTIFF was added, removed or modified since it was built
+        if not os.path.isfile(self.manifest_path):
+            return False
+        try:
+            manifest = self.read_manifest()
+            if not (manifest["version"] == self.version):
+                return False
+            rasters = self.scan_rasters()
+            names = set([name for par in self.parameters for name in rasters[par].values()])
+            if not (names == set(manifest["sources"].keys())):
+                return False
+            for name, stamp in manifest["sources"].items():
+                if not (self.source_stamp(name) == stamp):
+                    return False
+        except:
+            return False
+        return True
+
+    @property
+    def discharges(self):
+        # LIST of discharges in ascending order (index of the first cube axis)
+        return list(self.read_manifest()["discharges"])
+
+    @property
+    def geotransform(self):
+        return tuple(self.read_manifest()["geotransform"])
+
+    @property
+    def shape(self):
+        return tuple(self.read_manifest()["shape"])
+
+    @property
+    def spatial_reference(self):
+        geokeys = {}
+        for key, value in self.read_manifest()["geokeys"].items():
+            geokeys.update({int(key): tuple(value) if isinstance(value, list) else value})
+        return cRa.spatial_reference_from_geokeys(geokeys)
+
+    def layer_stamps(self, *pars):
+        # pars = STR of the parameters that define a layer (default: "h", "u")
+        # returns LIST of the source identities of each discharge slice [discharge, [mtime, size] of every par] -
+        #         derived stacks (cDerivedHydraulics, cDischargeIndex) reuse their layers where the identity is unchanged
+        pars = pars or ("h", "u")
+        manifest = self.read_manifest()
+        stamps = []
+        for i, q in enumerate(manifest["discharges"]):
+            stamps.append([q] + [manifest["sources"].get(manifest["rasters"][par][i]) for par in pars])
+        return stamps
+
+    def get_raster_names(self, par):
+        # returns DICT {discharge: raster name} of parameter par (h, u or va)
+        manifest = self.read_manifest()
+        return {q: name for q, name in zip(manifest["discharges"], manifest["rasters"][par]) if name}
+
+    def get_array(self, par):
+        # returns read-only memory-mapped numpy array (n_discharges, rows, cols) of par (h, u or va)
+        if par not in self.arrays.keys():
+            self.arrays.update({par: np.load(os.path.join(self.dir2cube, par + ".npy"), mmap_mode="r")})
+        return self.arrays[par]
+
+    def get_index(self, raster_name):
+        # returns TUPLE (par, discharge index) of a raster name (e.g., "h001000" or "h001000.tif") or None
+        manifest = self.read_manifest()
+        name = os.path.splitext(os.path.basename(str(raster_name)))[0]
+        for par in self.parameters:
+            for i, stored_name in enumerate(manifest["rasters"][par]):
+                if stored_name and (os.path.splitext(stored_name)[0] == name):
+                    return par, i
+        return None
+
+    def get_slice(self, par, discharge):
+        # returns zero-copy (rows, cols) view of par at discharge
+        return self.get_array(par)[self.discharges.index(float(discharge))]
+
+    def get_raster(self, raster_name):
+        # returns Raster of a cube slice (e.g., raster_name="h001000") - NoData cells are the NaN cells
+        # readers of the same cube build share the slice rasters (one NaN mask per slice and common map algebra
+        # operands, see cRaster.window_memo) - rasters of previous builds are released
+        par, i = self.get_index(raster_name)
+        name = os.path.splitext(os.path.basename(str(raster_name)))[0]
+        # builds replace the manifest (new inode), thus rebuilds within the file system's time resolution are detected
+        stat = os.stat(self.manifest_path)
+        key = (self.dir2cube, (stat.st_mtime_ns, stat.st_ino), name)
+        with HydraulicCube.slice_lock:
+            if key in HydraulicCube.slice_rasters.keys():
+                return HydraulicCube.slice_rasters[key]
+        data = self.get_array(par)[i]
+        ras = cRa.Raster(data, self.geotransform, mask=np.isnan(data), spatial_reference=self.spatial_reference,
+                         name=name)
+        with HydraulicCube.slice_lock:
+            for old_key in [k for k in HydraulicCube.slice_rasters.keys() if (k[0] == key[0]) and (k[1] != key[1])]:
+                del HydraulicCube.slice_rasters[old_key]
+            return HydraulicCube.slice_rasters.setdefault(key, ras)
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = HydraulicCube (%s)" % os.path.dirname(__file__))
+        print(dir(self))
+
+
+update_lock = threading.Lock()
+
+
+def update_cube(dir2condition):
+    # builds the cube of the condition if it is missing (e.g., conditions created or copied before cubes existed) or
+    # rebuilds it once if discharges were added, removed or replaced
+    # (call before parameters are read concurrently - HydraulicCube readers do not build)
+    # dir2condition = STR of the condition directory
+    # returns the current HydraulicCube or None (no flow depth rasters or failed build - readers use the GeoTIFFs)
+    logger = logging.getLogger("logfile")
+    with update_lock:
+        try:
+            cube = HydraulicCube(dir2condition)
+            if not cube.is_current():
+                if os.path.isfile(cube.manifest_path):
+                    logger.info("   * updating hydraulic cube (modified discharges) ...")
+                else:
+                    logger.info("   * no hydraulic cube in %s yet ..." % cube.dir2condition)
+                cube.build()
+                cube = HydraulicCube(dir2condition)
+            if cube.is_current():
+                return cube
+        except Exception as e:
+            logger.info("WARNING: Hydraulic cube of %s failed (%s)." % (str(dir2condition), str(e)))
+    logger.info("WARNING: No hydraulic cube for %s - flow depth and velocity GeoTIFFs are read directly." %
+                str(dir2condition))
+    return None
@@ -62,7 +62,7 @@ class Read:
             self.wb = oxl.load_workbook(filename=full_file_name, read_only=read_mode, data_only=direct_data)
         except:
             self.wb = ""
-            self.logger.info("ERROR: Failed to access " + str(full_file_name).split("\\")[-1] + ".")
+            self.logger.info("ERROR: Failed to access " + os.path.basename(str(full_file_name)) + ".")
             self.logger.info("       (full name: " + str(full_file_name) + ")")
         try:
             self.ws = self.wb.worksheets[ws]
@@ -114,7 +114,7 @@ class Read:
         # col = CHR, e.g., col = "B"
         # start_row = INT
         self.logger.info(
-            "   * reading data column from " + str(self.xlsx_file).split("\\")[-1] + " (starting from " + str(column) + str(
+            "   * reading data column from " + os.path.basename(str(self.xlsx_file)) + " (starting from " + str(column) + str(
                 start_row) + ") ...")
 
         data = []
@@ -1,8 +1,8 @@
 #!/usr/bin/python
 try:
-    import os, sys, logging
+    import os, sys, logging, threading
 except:
-    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging).")
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, threading).")
 
 
 class Logger:
@@ -59,3 +59,59 @@ class Logger:
     def __call__(self, *args, **kwargs):
         print("Class Info: <type> = Logger (%s)" % os.path.dirname(__file__))
         print(dir(self))
+
+
+class LogCapture(logging.Handler):
+    # collects log records as picklable dictionaries (e.g., in process pool workers) that replay() passes to the
+    # handlers of another logger (e.g., the logfile of the main process) in a deterministic order
+    def __init__(self, *args):
+        logging.Handler.__init__(self, *args)
+        self.records = []
+
+    def emit(self, record):
+        entry = dict(record.__dict__)
+        entry.update({"msg": record.getMessage(), "args": None, "exc_info": None, "exc_text": None})
+        self.records.append(entry)
+
+    @staticmethod
+    def replay(logger, records):
+        # logger = logging.Logger that handles the records
+        # records = LIST of DICT (LogCapture.records)
+        for entry in records:
+            record = logging.makeLogRecord(entry)
+            if logger.isEnabledFor(record.levelno):
+                logger.handle(record)
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = LogCapture (%s)" % os.path.dirname(__file__))
+        print(dir(self))
+
+
+class ThreadLogCapture(LogCapture):
+    # replaces the handlers of a logger while threads run concurrently: records of threads that registered a key
+    # (e.g., a reach ID) are collected per key in self.keyed_records, records of other threads go to the replaced
+    # handlers - replay(logger, keyed_records[key]) writes them per key in a deterministic order
+    def __init__(self, handlers, *args):
+        LogCapture.__init__(self, *args)
+        self.targets = list(handlers)
+        self.keyed_records = {}
+        self.local = threading.local()
+
+    def register(self, key):
+        # key = hashable identifier of the records of the calling thread (None stops collecting)
+        self.local.key = key
+
+    def emit(self, record):
+        key = getattr(self.local, "key", None)
+        if key is None:
+            for handler in self.targets:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+            return
+        # Handler.handle holds the handler lock while emitting (one thread at a time)
+        self.records = self.keyed_records.setdefault(key, [])
+        LogCapture.emit(self, record)
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = ThreadLogCapture (%s)" % os.path.dirname(__file__))
+        print(dir(self))
@@ -2,12 +2,13 @@
 try:
     import os, sys, logging, shutil
     # load other RA routines
-    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\.site_packages\\riverpy\\")
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     import config
     sys.path.append(config.dir2oxl)
     import fGlobal as fGl
     import openpyxl as oxl  # modified package
     import datetime, random
+    import cHydraulicCube as cHC
 except:
     print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging).")
 
@@ -31,7 +32,7 @@ class MakeFlowTable:
         self.dict_Q_u_ras = {}
         self.dict_Q_va_ras = {}
 
-        self.dir_in_ras = config.dir2conditions + str(self.condition) + "\\"
+        self.dir_in_ras = config.dir2conditions + str(self.condition) + os.sep
         self.dir_xlsx_out = ""
 
         self.logger = logging.getLogger("logfile")
@@ -69,6 +70,21 @@ class MakeFlowTable:
             self.logger.info("ERROR: Invalid file name or data.")
 
     def get_condition_discharges(self):
+        try:
+            cube = cHC.HydraulicCube(self.dir_in_ras)
+            if cube.is_current():
+                # read discharges and raster names from the hydraulic cube manifest
+                self.logger.info("   * reading discharges and matching Rasters from hydraulic cube ...")
+                for par, ras_list in zip(["h", "u", "va"], [self.h_rasters, self.u_rasters, self.va_rasters]):
+                    [ras_list.append(ras_name) for ras_name in cube.get_raster_names(par).values()]
+                self.discharges = cube.discharges
+                self.dict_Q_h_ras = cube.get_raster_names("h")
+                self.dict_Q_u_ras = cube.get_raster_names("u")
+                self.dict_Q_va_ras = cube.get_raster_names("va")
+                self.discharges.sort(reverse=True)
+                return
+        except:
+            self.logger.info("WARNING: Could not read hydraulic cube - scanning Raster names instead.")
         ras_name_list = [rn for rn in os.listdir(self.dir_in_ras) if os.path.isdir(os.path.join(self.dir_in_ras, rn))]
         if ras_name_list.__len__() < 1:
             # look for geoTIFFs if ras_name_list is empty
@@ -100,7 +116,7 @@ class MakeFlowTable:
 
     def make_aquatic_condition_xlsx(self, fish_sn):
         # fish_sn == STR -- 4 digits indicating fish species and lifestage
-        self.logger.info("   * using workbook template: " + str(self.xlsx_template).split("\\")[-1])
+        self.logger.info("   * using workbook template: " + os.path.basename(str(self.xlsx_template)))
         # open relevant workbook
         self.wb_out_name = self.dir_xlsx_out + "{0}_sharea_{1}.xlsx".format(str(self.condition), fish_sn)
         self.open_wb_work_copy()
@@ -108,7 +124,7 @@ class MakeFlowTable:
         return self.wb_out_name
 
     def make_condition_xlsx(self):
-        self.logger.info("   * using workbook template: " + str(self.xlsx_template).split("\\")[-1])
+        self.logger.info("   * using workbook template: " + os.path.basename(str(self.xlsx_template)))
         # open relevant workbook
         self.wb_out_name = self.dir_in_ras + "flow_definitions.xlsx"
         self.open_wb_work_copy()
@@ -123,7 +139,7 @@ class MakeFlowTable:
         try:
             self.wb = oxl.load_workbook(filename=full_wb_path)
         except:
-            self.logger.info("ERROR: Failed to access " + str(full_wb_path).split("\\")[-1] + ".")
+            self.logger.info("ERROR: Failed to access " + os.path.basename(str(full_wb_path)) + ".")
         try:
             ws = int(ws)
         except:
@@ -204,8 +220,8 @@ class MakeFlowTable:
 
         if purpose.lower() == "sharc":
             self.logger.info("   * scan %s for ecohydraulically relevant flows" % self.condition)
-            self.xlsx_template = "{0}.templates\\CONDITION_sharea_template_{1}.xlsx".format(config.dir2sh, str(self.unit))
-            self.dir_xlsx_out = config.dir2sh + "SHArea\\"
+            self.xlsx_template = os.path.join(config.dir2sh, ".templates", "CONDITION_sharea_template_%s.xlsx" % str(self.unit))
+            self.dir_xlsx_out = config.dir2sh + "SHArea" + os.sep
             self.col_Q = "B"
             self.col_ras_h = "C"
             self.col_ras_u = "D"
@@ -213,7 +229,7 @@ class MakeFlowTable:
 
         if purpose.lower() == "q_return":
             self.logger.info("   * scan %s for available flows" % self.condition)
-            self.xlsx_template = config.dir2flows + "templates\\flow_return_period_template.xlsx"
+            self.xlsx_template = os.path.join(config.dir2flows, "templates", "flow_return_period_template.xlsx")
             self.dir_xlsx_out = self.dir_in_ras
             self.col_Q = "B"
             self.col_ras_h = "D"
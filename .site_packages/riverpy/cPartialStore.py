@@ -0,0 +1,99 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging, hashlib, json, threading
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, hashlib, json, threading).")
+
+try:
+    import fGlobal as fGl
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: fGlobal).")
+
+
+class PartialStore:
+    # Per-discharge partial results of a raster-producing Q-dependent stage (e.g., one CHSI raster per discharge)
+    # DIRECTORY/.partials_STAGE.json maps every partial (an output file name in DIRECTORY) to the key
+    # of the inputs and settings it was made of: adding, removing or replacing one discharge only invalidates the
+    # partials of that discharge, and the stage re-reduces the stack of current partials
+    def __init__(self, directory, stage):
+        # directory = STR of the directory that contains the partial output files
+        # stage = STR name of the Q-dependent stage (e.g., "chsi")
+        self.logger = logging.getLogger("logfile")
+        self.directory = fGl.native_path(directory)
+        self.manifest_path = os.path.join(self.directory, ".partials_%s.json" % str(stage))
+        self.lock = threading.Lock()
+        try:
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        except (IOError, ValueError):
+            self.manifest = {}
+        self.reused = 0
+        self.computed = 0
+
+    @staticmethod
+    def file_stamp(path):
+        # returns LIST [file name, mtime, size] of an input file (None if the file does not exist)
+        try:
+            stat = os.stat(fGl.native_path(str(path)))
+            return [os.path.basename(fGl.native_path(str(path))), stat.st_mtime, stat.st_size]
+        except (IOError, OSError):
+            return None
+
+    def make_key(self, paths, **settings):
+        # paths = LIST of input file paths
+        # settings = json-serializable parameters of the partial (e.g., curve data, thresholds)
+        # returns STR md5 hash
+        stamps = [self.file_stamp(p) for p in paths]
+        return hashlib.md5(json.dumps([stamps, settings], sort_keys=True, default=str).encode()).hexdigest()
+
+    def is_current(self, name, key):
+        # returns True if the partial output file name exists and was made of key
+        current = (self.manifest.get(name, {}).get("key") == key) and os.path.exists(
+            os.path.join(self.directory, name))
+        if current:
+            with self.lock:
+                self.reused += 1
+        return current
+
+    def update(self, name, key):
+        # records that the partial name was made of key
+        with self.lock:
+            self.manifest.update({name: {"key": key}})
+            self.computed += 1
+            self.write_manifest()
+
+    def prune(self, names, *args, **kwargs):
+        # removes the partials that are not in names (e.g., of removed discharges)
+        # args[0] = BOOL delete the partial output files and their side files (e.g., NAME.aux.xml) as well
+        # kwargs: prefix = STR only prune partials whose names start with prefix (default: "" = all partials)
+        # returns LIST of removed partial names
+        prefix = str(kwargs.get("prefix", ""))
+        removed = [n for n in self.manifest.keys() if n.startswith(prefix) and (n not in names)]
+        with self.lock:
+            for name in removed:
+                self.manifest.pop(name)
+                if not (args and args[0]) or not os.path.isdir(self.directory):
+                    continue
+                for file_name in os.listdir(self.directory):
+                    if file_name.startswith(name):
+                        try:
+                            os.remove(os.path.join(self.directory, file_name))
+                        except OSError:
+                            self.logger.info("WARNING: Could not remove obsolete %s." % file_name)
+            if removed:
+                self.write_manifest()
+        return removed
+
+    def write_manifest(self):
+        fGl.chk_dir(self.directory)
+        tmp_path = "%s.%i.%i.tmp" % (self.manifest_path, os.getpid(), threading.get_ident())
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def log_statistics(self):
+        self.logger.info("      * Per-discharge partials: %i reused, %i computed." % (self.reused, self.computed))
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = PartialStore (%s)" % os.path.dirname(__file__))
+        print(dir(self))
@@ -0,0 +1,786 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging, threading
+    import numpy as np
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, threading, numpy).")
+
+try:
+    import cGeoTiff as cGT
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: cGeoTiff).")
+
+
+
+class Environment(threading.local):
+    # geoprocessing environment of the NumPy raster engine (modified by the arcpy shim's env)
+    # extent = None, "MAXOF", "MINOF" or Extent; cellSize = None or FLOAT; snapRaster = None or Raster
+    # workspace = None or STR of the directory that relative raster names refer to
+    # compression = None or STR of saved GeoTIFFs ("NONE", "DEFLATE" or "LZW"); tileSize = None or INT tile edge length
+    # of saved GeoTIFFs (None: strips)
+    # every thread has its own settings (initially the defaults) - threads that work on behalf of another thread
+    # (e.g., reaches of cReachScheduler) start with update(copy()) of that thread's settings
+    def __init__(self, defaults):
+        self.settings = dict(defaults)
+
+    def copy(self):
+        return dict(self.settings)
+
+    def update(self, settings):
+        self.settings.update(settings)
+
+    def __getitem__(self, key):
+        return self.settings[key]
+
+    def __setitem__(self, key, value):
+        self.settings[key] = value
+
+
+environment = Environment({"extent": None, "cellSize": None, "snapRaster": None, "workspace": None,
+                           "compression": None, "tileSize": None})
+
+
+class WindowMemo(threading.local):
+    # per-thread memo of resampled rasters (nearest neighbour windows) while it is open - kernels that evaluate
+    # several analyses on the same tile (e.g., cFeaturePlan.FeatureBatch) read every input window once
+    # memorized arrays are shared between all users and must not be modified in place (map algebra never does)
+    def __init__(self):
+        self.entries = None  # {(id(raster), geotransform, shape): (raster, (data, mask))} or None (closed)
+
+    def open(self):
+        self.entries = {}
+
+    def close(self):
+        self.entries = None
+
+    def get(self, raster, geotransform, shape):
+        # returns TUPLE (data, mask) or None if the window is not memorized
+        if self.entries is None:
+            return None
+        try:
+            return self.entries[(id(raster), tuple(geotransform), tuple(shape))][1]
+        except KeyError:
+            return None
+
+    def put(self, raster, geotransform, shape, values):
+        # the raster is kept with its window, thus its id is not recycled while the memo is open
+        if self.entries is not None:
+            self.entries.update({(id(raster), tuple(geotransform), tuple(shape)): (raster, values)})
+        return values
+
+
+window_memo = WindowMemo()
+
+# default NoData values per numpy dtype kind (float NoData equals ArcGIS' default)
+NODATA_FLOAT = -3.4028234663852886e+38
+NODATA_INT = {1: 255, 2: -32768, 4: -2147483648, 8: -9223372036854775808}
+NODATA_UINT = {1: 255, 2: 65535, 4: 4294967295, 8: 18446744073709551615}
+
+
+def default_nodata(dtype):
+    dtype = np.dtype(dtype)
+    if dtype.kind == "f":
+        return NODATA_FLOAT
+    if dtype.kind == "u":
+        return NODATA_UINT[dtype.itemsize]
+    if dtype.kind == "b":
+        return 255
+    return NODATA_INT[dtype.itemsize]
+
+
+def normalize_path(path):
+    # converts Windows-style "\\" separators so that paths work on any platform
+    # relative names refer to environment["workspace"] (as in arcpy)
+    path = str(path)
+    if not (os.sep == "\\"):
+        path = path.replace("\\", os.sep)
+    if environment["workspace"] and not os.path.isabs(path):
+        path = os.path.join(normalize_path(os.path.abspath(environment["workspace"])), path)
+    return path
+
+
+class Extent:
+    def __init__(self, XMin=None, YMin=None, XMax=None, YMax=None, *args):
+        # XMin, YMin, XMax, YMax = FLOAT coordinates of the extent corners
+        # also accepts a LIST [XMin, YMin, XMax, YMax] as first argument (e.g., from cReachManager)
+        if isinstance(XMin, (list, tuple)):
+            XMin, YMin, XMax, YMax = XMin[0:4]
+        self.XMin = float(XMin) if XMin is not None else None
+        self.YMin = float(YMin) if YMin is not None else None
+        self.XMax = float(XMax) if XMax is not None else None
+        self.YMax = float(YMax) if YMax is not None else None
+
+    @property
+    def width(self):
+        return self.XMax - self.XMin
+
+    @property
+    def height(self):
+        return self.YMax - self.YMin
+
+    def __iter__(self):
+        return iter([self.XMin, self.YMin, self.XMax, self.YMax])
+
+    def __str__(self):
+        return "%s %s %s %s" % (str(self.XMin), str(self.YMin), str(self.XMax), str(self.YMax))
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = Extent (%s)" % os.path.dirname(__file__))
+        print(dir(self))
+
+
+class SpatialReference:
+    def __init__(self, code=0, *args):
+        # code = INT of EPSG (factory) code (0 = unknown)
+        # args[0] = DICT of GeoTIFF geokeys that define the coordinate system (optional)
+        try:
+            self.factoryCode = int(code)
+        except:
+            self.factoryCode = 0
+        try:
+            self.geokeys = dict(args[0])
+        except:
+            self.geokeys = {}
+        if not self.geokeys and self.factoryCode:
+            self.geokeys = {cGT.KEY_MODEL_TYPE: 1, cGT.KEY_RASTER_TYPE: 1,
+                            cGT.KEY_PROJECTED_CS_TYPE: self.factoryCode}
+
+    @property
+    def name(self):
+        if self.factoryCode:
+            return "EPSG:%i" % self.factoryCode
+        try:
+            return str(self.geokeys[1026])  # GTCitationGeoKey
+        except KeyError:
+            return "Unknown"
+
+    def __eq__(self, other):
+        try:
+            return (self.factoryCode == other.factoryCode) and (self.geokeys == other.geokeys)
+        except AttributeError:
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = object.__hash__
+
+    def __str__(self):
+        return self.name
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = SpatialReference (%s)" % os.path.dirname(__file__))
+        print(dir(self))
+
+
+def spatial_reference_from_geokeys(geokeys):
+    code = geokeys.get(cGT.KEY_PROJECTED_CS_TYPE, geokeys.get(cGT.KEY_GEOGRAPHIC_TYPE, 0))
+    if code == 32767:
+        code = 0  # user-defined coordinate system
+    return SpatialReference(code, geokeys)
+
+
+class Raster:
+    memory_counter = 0
+
+    def __init__(self, source, *args, **kwargs):
+        # source = STR of a raster path OR numpy array of pixel values
+        # args[0] = TUPLE geotransform (x_min, cell_width, 0, y_max, 0, -cell_height) - required for arrays
+        # kwargs: mask = BOOL array (True = NoData), nodata = FLOAT, spatial_reference = SpatialReference, name = STR
+        self.logger = logging.getLogger("logfile")
+        self.path = None
+        self._data = None
+        self._mask = None
+        self._spatial_reference = kwargs.get("spatial_reference", None)
+        self._nodata = kwargs.get("nodata", None)
+        if isinstance(source, Raster):
+            self.path = source.path
+            self._data = source.data
+            self._mask = source.mask
+            self.geotransform = source.geotransform
+            self.shape = source.shape
+            self._spatial_reference = source.spatialReference
+            self._nodata = source.noDataValue
+            self.name = source.name
+            return
+        if isinstance(source, np.ndarray) or isinstance(source, np.ma.MaskedArray):
+            data = source
+            mask = kwargs.get("mask", None)
+            if isinstance(data, np.ma.MaskedArray):
+                mask = np.ma.getmaskarray(data) if mask is None else (mask | np.ma.getmaskarray(data))
+                data = data.data
+            if data.dtype.kind == "b":
+                data = data.astype(np.uint8)
+            if mask is None:
+                mask = np.zeros(data.shape, dtype=bool)
+                if data.dtype.kind == "f":
+                    mask = ~np.isfinite(data)
+            self._data = data
+            self._mask = np.asarray(mask, dtype=bool)
+            try:
+                self.geotransform = tuple(float(g) for g in args[0])
+            except:
+                self.geotransform = (0.0, 1.0, 0.0, float(data.shape[0]), 0.0, -1.0)
+            self.shape = data.shape
+            Raster.memory_counter += 1
+            self.name = kwargs.get("name", "ras_memory_%i" % Raster.memory_counter)
+        else:
+            self.path = normalize_path(source)
+            self.name = os.path.splitext(os.path.basename(self.path))[0]
+            if not os.path.isfile(self.path):
+                raise IOError("ERROR: Cannot find raster %s." % str(self.path))
+            self.reader = cGT.GeoTiffReader(self.path)
+            self.geotransform = self.reader.geotransform
+            self.shape = (self.reader.height, self.reader.width)
+            if self._spatial_reference is None:
+                self._spatial_reference = spatial_reference_from_geokeys(self.reader.geokeys)
+            if self._nodata is None:
+                self._nodata = self.reader.nodata
+
+    def load(self):
+        # reads pixel values from disk (lazy: called on first data access)
+        self._data = self.reader.read()
+        self._mask = self.nodata_mask(self._data)
+
+    def nodata_mask(self, data):
+        mask = np.zeros(data.shape, dtype=bool)
+        if self._nodata is not None:
+            mask = (data == np.array(self._nodata).astype(data.dtype))
+        if data.dtype.kind == "f":
+            mask |= ~np.isfinite(data)
+        return mask
+
+    def read_window(self, geotransform, shape):
+        # returns TUPLE (data, mask) of the raster on the grid defined by geotransform and shape
+        # only the required part of the file is read if the raster is not yet loaded
+        if (self._data is not None) or (self.path is None):
+            return resample(self, geotransform, shape)
+        memorized = window_memo.get(self, geotransform, shape)
+        if memorized is not None:
+            return memorized
+        rows, cols, valid = grid_index(self, geotransform, shape)
+        if not valid.any():
+            return np.zeros(shape, dtype=self.reader.dtype), np.ones(shape, dtype=bool)
+        r0, r1 = int(rows.min()), int(rows.max()) + 1
+        c0, c1 = int(cols.min()), int(cols.max()) + 1
+        data = self.reader.read((r0, c0, r1 - r0, c1 - c0))
+        index = np.ix_(rows - r0, cols - c0)
+        return window_memo.put(self, geotransform, shape, (data[index], self.nodata_mask(data)[index] | ~valid))
+
+    @property
+    def data(self):
+        if self._data is None:
+            self.load()
+        return self._data
+
+    @property
+    def mask(self):
+        if self._mask is None:
+            self.load()
+        return self._mask
+
+    def masked(self):
+        # returns numpy masked array
+        return np.ma.MaskedArray(self.data, mask=self.mask)
+
+    def filled(self, value=np.nan):
+        # returns a copy of the pixel values with NoData pixels set to value
+        if (self.data.dtype.kind in "iu") and isinstance(value, float):
+            out = self.data.astype(np.float64)
+        else:
+            out = self.data.copy()
+        out[self.mask] = value
+        return out
+
+    @property
+    def extent(self):
+        x0, dx, rx, y0, ry, dy = self.geotransform
+        return Extent(x0, y0 + dy * self.shape[0], x0 + dx * self.shape[1], y0)
+
+    @property
+    def meanCellWidth(self):
+        return abs(self.geotransform[1])
+
+    @property
+    def meanCellHeight(self):
+        return abs(self.geotransform[5])
+
+    @property
+    def width(self):
+        return self.shape[1]
+
+    @property
+    def height(self):
+        return self.shape[0]
+
+    @property
+    def noDataValue(self):
+        if self._nodata is None:
+            return default_nodata(self.data.dtype)
+        return self._nodata
+
+    @property
+    def spatialReference(self):
+        if self._spatial_reference is None:
+            return SpatialReference(0)
+        return self._spatial_reference
+
+    @property
+    def pixelType(self):
+        dtype = self.data.dtype
+        return {"f": "F", "i": "S", "u": "U", "b": "U"}[dtype.kind] + str(dtype.itemsize * 8)
+
+    @property
+    def isInteger(self):
+        return self.data.dtype.kind in "iub"
+
+    def valid_values(self):
+        return self.data[~self.mask]
+
+    @property
+    def minimum(self):
+        values = self.valid_values()
+        return float(values.min()) if values.size > 0 else None
+
+    @property
+    def maximum(self):
+        values = self.valid_values()
+        return float(values.max()) if values.size > 0 else None
+
+    @property
+    def mean(self):
+        values = self.valid_values()
+        return float(values.mean()) if values.size > 0 else None
+
+    @property
+    def standardDeviation(self):
+        values = self.valid_values()
+        return float(values.std()) if values.size > 0 else None
+
+    def output_array(self):
+        # returns TUPLE (numpy array of the pixel values with NoData pixels set to noDataValue, noDataValue)
+        data = self.data
+        dtype = np.uint8 if data.dtype.kind == "b" else data.dtype
+        nodata = self.noDataValue
+        out = np.array(data, dtype=dtype)
+        if self.mask.any():
+            out[self.mask] = np.array(nodata).astype(dtype)
+        return out, nodata
+
+    def save(self, path, **kwargs):
+        # path = STR of output GeoTIFF
+        # kwargs: compression, tile_size (default: environment["compression"], environment["tileSize"])
+        path = normalize_path(path)
+        out, nodata = self.output_array()
+        write_geotiff(path, out, self.geotransform, self.spatialReference, nodata, **kwargs)
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+
+    # ---- map algebra operators ----
+    def unary(self, function, float_result=False):
+        data = self.data
+        if float_result and not (data.dtype.kind == "f"):
+            data = data.astype(np.float64)
+        with np.errstate(all="ignore"):
+            result = function(data)
+        mask = self.mask.copy()
+        if result.dtype.kind == "f":
+            mask |= ~np.isfinite(result)
+        return Raster(result, self.geotransform, mask=mask, spatial_reference=self._spatial_reference)
+
+    def binary(self, other, function, reverse=False, integer_result=False):
+        grid, values = align(self, other)
+        (a, ma), (b, mb) = values
+        if reverse:
+            a, b = b, a
+        with np.errstate(all="ignore"):
+            result = function(a, b)
+        if integer_result:
+            result = result.astype(np.int32)
+        mask = ma | mb
+        if result.dtype.kind == "f":
+            mask = mask | ~np.isfinite(result)
+        return Raster(result, grid[0], mask=mask, spatial_reference=self._spatial_reference)
+
+    def __add__(self, other):
+        return self.binary(other, np.add)
+
+    def __radd__(self, other):
+        return self.binary(other, np.add, reverse=True)
+
+    def __sub__(self, other):
+        return self.binary(other, np.subtract)
+
+    def __rsub__(self, other):
+        return self.binary(other, np.subtract, reverse=True)
+
+    def __mul__(self, other):
+        return self.binary(other, np.multiply)
+
+    def __rmul__(self, other):
+        return self.binary(other, np.multiply, reverse=True)
+
+    def __truediv__(self, other):
+        return self.binary(other, true_divide)
+
+    def __rtruediv__(self, other):
+        return self.binary(other, true_divide, reverse=True)
+
+    def __floordiv__(self, other):
+        return self.binary(other, np.floor_divide)
+
+    def __mod__(self, other):
+        return self.binary(other, np.mod)
+
+    def __pow__(self, other):
+        return self.binary(other, power)
+
+    def __rpow__(self, other):
+        return self.binary(other, power, reverse=True)
+
+    def __neg__(self):
+        return self.unary(np.negative)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return self.unary(np.abs)
+
+    def __eq__(self, other):
+        if other is None:
+            return False
+        return self.binary(other, np.equal, integer_result=True)
+
+    def __ne__(self, other):
+        if other is None:
+            return True
+        return self.binary(other, np.not_equal, integer_result=True)
+
+    def __lt__(self, other):
+        return self.binary(other, np.less, integer_result=True)
+
+    def __le__(self, other):
+        return self.binary(other, np.less_equal, integer_result=True)
+
+    def __gt__(self, other):
+        return self.binary(other, np.greater, integer_result=True)
+
+    def __ge__(self, other):
+        return self.binary(other, np.greater_equal, integer_result=True)
+
+    def __and__(self, other):
+        return self.binary(other, lambda a, b: (a != 0) & (b != 0), integer_result=True)
+
+    def __rand__(self, other):
+        return self.__and__(other)
+
+    def __or__(self, other):
+        return self.binary(other, lambda a, b: (a != 0) | (b != 0), integer_result=True)
+
+    def __ror__(self, other):
+        return self.__or__(other)
+
+    def __xor__(self, other):
+        return self.binary(other, lambda a, b: (a != 0) ^ (b != 0), integer_result=True)
+
+    def __rxor__(self, other):
+        return self.__xor__(other)
+
+    def __invert__(self):
+        return self.unary(lambda a: (a == 0).astype(np.int32))
+
+    __hash__ = object.__hash__
+
+    def __str__(self):
+        if self.path:
+            return str(self.path)
+        return str(self.name)
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = Raster (%s)" % os.path.dirname(__file__))
+        print(dir(self))
+
+
+class CodedRaster(Raster):
+    # Categorical raster (e.g., lifespans or morphological units) of UINT8 codes and a lookup table of class values
+    # NoData cells are a packed bitmask (1 bit per cell) - the class values are decoded on access (data), thus the
+    # raster keeps 1.125 instead of 9 bytes (float64 values and BOOL mask) per cell while it is stored or cached
+    def __init__(self, codes, lookup, *args, **kwargs):
+        # codes = UINT8 numpy array (rows, cols) of lookup indices
+        # lookup = LIST or numpy array of at most 256 class values (the dtype is the dtype of decoded data)
+        # args[0] = TUPLE geotransform (x_min, cell_width, 0, y_max, 0, -cell_height)
+        # kwargs: mask = BOOL array (True = NoData), nodata = FLOAT, spatial_reference = SpatialReference, name = STR
+        self.logger = logging.getLogger("logfile")
+        self.lookup = np.asarray(lookup)
+        if self.lookup.__len__() > 256:
+            raise ValueError("ERROR: Coded rasters have at most 256 classes.")
+        self.codes = np.asarray(codes, dtype=np.uint8)
+        self.shape = self.codes.shape
+        mask = kwargs.get("mask", None)
+        if mask is None:
+            mask = np.zeros(self.shape, dtype=bool)
+        self.packed_mask = np.packbits(np.asarray(mask, dtype=bool), axis=None)
+        self.path = None
+        self._data = None
+        self._mask = None
+        self._spatial_reference = kwargs.get("spatial_reference", None)
+        self._nodata = kwargs.get("nodata", None)
+        try:
+            self.geotransform = tuple(float(g) for g in args[0])
+        except:
+            self.geotransform = (0.0, 1.0, 0.0, float(self.shape[0]), 0.0, -1.0)
+        Raster.memory_counter += 1
+        self.name = kwargs.get("name", "ras_memory_%i" % Raster.memory_counter)
+
+    @classmethod
+    def encode(cls, ras, *args):
+        # ras = Raster with a small number of distinct values (e.g., a lifespan or MU raster)
+        # args[0] = LIST of class values that the lookup table includes in any case (e.g., all lifespans)
+        # returns CodedRaster of ras (ras itself if it is not a Raster or has more than 256 distinct values)
+        if isinstance(ras, CodedRaster) or not isinstance(ras, Raster):
+            return ras
+        data, mask = ras.data, ras.mask
+        values = data[~mask]
+        try:
+            lookup = np.union1d(values, np.asarray(args[0], dtype=data.dtype))
+        except IndexError:
+            lookup = np.unique(values)
+        if lookup.__len__() > 256:
+            return ras
+        codes = np.zeros(ras.shape, dtype=np.uint8)
+        codes[~mask] = np.searchsorted(lookup, values)
+        return cls(codes, lookup, ras.geotransform, mask=mask, spatial_reference=ras._spatial_reference,
+                   nodata=ras._nodata, name=ras.name)
+
+    @property
+    def data(self):
+        return self.lookup[self.codes]
+
+    @property
+    def mask(self):
+        return np.unpackbits(self.packed_mask, count=self.codes.size).reshape(self.shape).astype(bool)
+
+    @property
+    def nbytes(self):
+        # memory of the coded raster (without decoding)
+        return self.codes.nbytes + self.packed_mask.nbytes + self.lookup.nbytes
+
+    def recode(self, lookup):
+        # lookup = numpy array of class values that contains all classes of this raster (e.g., from merge_lookups)
+        # returns UINT8 array of the codes of this raster in lookup
+        remap = np.searchsorted(lookup, self.lookup).astype(np.uint8)
+        return remap[self.codes]
+
+    def resample(self, geotransform, shape):
+        # nearest neighbour resampling that keeps the codes (see resample)
+        # returns CodedRaster on the grid defined by geotransform and shape
+        if (self.geotransform == tuple(geotransform)) and (self.shape == tuple(shape)):
+            return self
+        if (self.shape[0] == 0) or (self.shape[1] == 0):
+            return CodedRaster(np.zeros(shape, dtype=np.uint8), self.lookup, geotransform,
+                               mask=np.ones(shape, dtype=bool), spatial_reference=self._spatial_reference)
+        rows, cols, valid = grid_index(self, geotransform, shape)
+        index = np.ix_(rows, cols)
+        return CodedRaster(self.codes[index], self.lookup, geotransform, mask=self.mask[index] | ~valid,
+                           spatial_reference=self._spatial_reference, nodata=self._nodata)
+
+
+class FilledRaster(Raster):
+    # Raster whose NoData cells read as a fill value (e.g., NoData lifespans that count as 0 in comparisons)
+    # replaces the Con(IsNull(ras) == 1, IsNull(ras) * value, ras) idiom: the fill is applied in one pass when the
+    # values are first read (instead of evaluating two IsNull rasters, a comparison, a product and a Con) - as with
+    # the idiom, only cells outside the extent of the source are NoData on the analysis grid
+    def __init__(self, source, value, *args):
+        # source = Raster
+        # value = FLOAT or INT fill value of NoData cells
+        # args[0] = TUPLE (geotransform, shape) of the analysis grid (default: make_grid([source]))
+        self.logger = logging.getLogger("logfile")
+        try:
+            self.geotransform, self.shape = tuple(args[0][0]), tuple(args[0][1])
+        except IndexError:
+            self.geotransform, self.shape = make_grid([source])
+        self.source = source
+        self.value = value
+        self.dtype = fill_dtype(source.data.dtype, value)
+        self.path = None
+        self._data = None
+        self._mask = None
+        self._spatial_reference = source.spatialReference
+        self._nodata = None
+        Raster.memory_counter += 1
+        self.name = "ras_memory_%i" % Raster.memory_counter
+
+    def load(self):
+        data = self.source.data.astype(self.dtype)
+        data[self.source.mask] = self.value
+        filled = Raster(data, self.source.geotransform, mask=np.zeros(data.shape, dtype=bool))
+        self._data, self._mask = resample(filled, self.geotransform, self.shape)
+        self.source = None  # the source is not required anymore
+
+
+def merge_lookups(rasters):
+    # rasters = LIST of CodedRaster objects
+    # returns numpy array of the sorted union of their lookup tables (None if the union has more than 256 classes)
+    lookup = rasters[0].lookup
+    for ras in rasters[1:]:
+        lookup = np.union1d(lookup, ras.lookup)
+    return lookup if lookup.__len__() <= 256 else None
+
+
+def write_geotiff(path, array, geotransform, spatial_reference, nodata, **kwargs):
+    # writes array (rows, cols) to the GeoTIFF path (an existing file is replaced)
+    # kwargs: compression = STR ("NONE", "DEFLATE" or "LZW" - default: environment["compression"])
+    #         tile_size = INT tile edge length (default: environment["tileSize"]; None: strips)
+    compression = kwargs.get("compression", environment["compression"])
+    tile_size = kwargs.get("tile_size", environment["tileSize"])
+    options = {"nodata": nodata, "compression": compression}
+    if tile_size:
+        options.update({"tiled": True, "block_size": int(tile_size)})
+    if os.path.exists(path):
+        os.remove(path)
+    with cGT.GeoTiffWriter(path, array.shape[1], array.shape[0], array.dtype, geotransform,
+                           spatial_reference.geokeys, **options) as writer:
+        writer.write(array)
+
+
+def fill_dtype(dtype, value):
+    # returns the numpy dtype of dtype values and the fill value as Con(IsNull(ras) == 1, IsNull(ras) * value, ras)
+    dtype = np.result_type((np.zeros(1, dtype=np.int32) * np.asarray(value)).dtype, dtype)
+    return np.dtype(np.int32) if dtype == np.int64 else dtype
+
+
+def fill_nodata(ras, value):
+    # ras = Raster
+    # value = FLOAT or INT fill value of NoData cells
+    # returns FilledRaster on the analysis grid (CodedRaster if ras is a CodedRaster: the fill value becomes a class
+    # of the lookup table and NoData cells of ras get its code)
+    geotransform, shape = make_grid([ras])
+    if isinstance(ras, CodedRaster):
+        dtype = fill_dtype(ras.lookup.dtype, value)
+        lookup = np.union1d(ras.lookup.astype(dtype), np.asarray([value], dtype=dtype))
+        if lookup.__len__() <= 256:
+            codes = np.searchsorted(lookup, ras.lookup.astype(dtype)).astype(np.uint8)[ras.codes]
+            codes[ras.mask] = np.searchsorted(lookup, np.asarray(value, dtype=dtype))
+            return CodedRaster(codes, lookup, ras.geotransform, spatial_reference=ras._spatial_reference).resample(
+                geotransform, shape)
+    return FilledRaster(ras, value, (geotransform, shape))
+
+
+def true_divide(a, b):
+    return np.true_divide(a, b, dtype=np.float64)
+
+
+def power(a, b):
+    if (np.asarray(a).dtype.kind in "iu") and (np.asarray(b).dtype.kind in "iu"):
+        # negative integer powers are not defined for integer arrays
+        return np.power(np.asarray(a, dtype=np.float64), b)
+    return np.power(a, b)
+
+
+def grid_extent(geotransform, shape):
+    x0, dx, rx, y0, ry, dy = geotransform
+    return x0, y0 + dy * shape[0], x0 + dx * shape[1], y0
+
+
+def make_grid(rasters):
+    # rasters = LIST of Raster objects
+    # returns TUPLE (geotransform, shape) of the common analysis grid
+    # the cell size and origin come from environment["cellSize"] / environment["snapRaster"] or the first raster
+    first = rasters[0]
+    x0, dx, rx, y0, ry, dy = first.geotransform
+    env_extent = environment["extent"]
+    same_grid = all((r.geotransform == first.geotransform) and (r.shape == first.shape) for r in rasters)
+    if same_grid and (environment["cellSize"] is None) and (env_extent is None or env_extent == "MAXOF" or
+                                                             env_extent == "MINOF"):
+        return first.geotransform, first.shape
+    if environment["cellSize"] is not None:
+        try:
+            dx = float(environment["cellSize"])
+            dy = -dx
+        except (TypeError, ValueError):
+            pass
+    snap = environment["snapRaster"]
+    if snap is not None:
+        x0, y0 = snap.geotransform[0], snap.geotransform[3]
+    if isinstance(env_extent, Extent):
+        xmin, ymin, xmax, ymax = env_extent.XMin, env_extent.YMin, env_extent.XMax, env_extent.YMax
+    else:
+        extents = [grid_extent(r.geotransform, r.shape) for r in rasters]
+        if env_extent == "MINOF":
+            xmin = max([e[0] for e in extents])
+            ymin = max([e[1] for e in extents])
+            xmax = min([e[2] for e in extents])
+            ymax = min([e[3] for e in extents])
+        else:
+            xmin = min([e[0] for e in extents])
+            ymin = min([e[1] for e in extents])
+            xmax = max([e[2] for e in extents])
+            ymax = max([e[3] for e in extents])
+    return snap_grid((x0, dx, 0.0, y0, 0.0, dy), (xmin, ymin, xmax, ymax))
+
+
+def snap_grid(geotransform, extent):
+    # geotransform = TUPLE of a grid that defines the cell size and the cell origin
+    # extent = TUPLE (xmin, ymin, xmax, ymax)
+    # returns TUPLE (geotransform, shape) of the grid cells that cover extent
+    x0, dx, rx, y0, ry, dy = geotransform
+    xmin, ymin, xmax, ymax = extent
+    # snap the extent to the cell grid (small tolerance avoids adding slivers from float round-off)
+    tol = 1e-6
+    col_start = int(np.floor((xmin - x0) / dx + tol))
+    col_end = int(np.ceil((xmax - x0) / dx - tol))
+    row_start = int(np.floor((y0 - ymax) / -dy + tol))
+    row_end = int(np.ceil((y0 - ymin) / -dy - tol))
+    shape = (max(row_end - row_start, 0), max(col_end - col_start, 0))
+    geotransform = (x0 + col_start * dx, dx, 0.0, y0 + row_start * dy, 0.0, dy)
+    return geotransform, shape
+
+
+def grid_index(raster, geotransform, shape):
+    # returns TUPLE (rows, cols, valid) - nearest neighbour source row and column indices of the grid cells
+    # defined by geotransform and shape, and a BOOL array that is False where cells are outside the raster
+    x0, dx, rx, y0, ry, dy = geotransform
+    sx0, sdx, srx, sy0, sry, sdy = raster.geotransform
+    x_centers = x0 + (np.arange(shape[1]) + 0.5) * dx
+    y_centers = y0 + (np.arange(shape[0]) + 0.5) * dy
+    cols = np.floor((x_centers - sx0) / sdx).astype(np.int64)
+    rows = np.floor((y_centers - sy0) / sdy).astype(np.int64)
+    valid = np.outer((rows >= 0) & (rows < raster.shape[0]), (cols >= 0) & (cols < raster.shape[1]))
+    cols = np.clip(cols, 0, max(raster.shape[1] - 1, 0))
+    rows = np.clip(rows, 0, max(raster.shape[0] - 1, 0))
+    return rows, cols, valid
+
+
+def resample(raster, geotransform, shape):
+    # nearest neighbour resampling of raster onto the grid defined by geotransform and shape
+    # returns TUPLE (data, mask)
+    if (raster.geotransform == tuple(geotransform)) and (raster.shape == tuple(shape)):
+        return raster.data, raster.mask
+    if (raster.shape[0] == 0) or (raster.shape[1] == 0):
+        return np.zeros(shape, dtype=raster.data.dtype), np.ones(shape, dtype=bool)
+    memorized = window_memo.get(raster, geotransform, shape)
+    if memorized is not None:
+        return memorized
+    rows, cols, valid = grid_index(raster, geotransform, shape)
+    index = np.ix_(rows, cols)
+    return window_memo.put(raster, geotransform, shape, (raster.data[index], raster.mask[index] | ~valid))
+
+
+def align(*operands):
+    # operands = Raster objects or scalars (at least one Raster)
+    # returns TUPLE (grid, LIST of (data, mask)) where scalars are returned as (scalar, False)
+    rasters = [o for o in operands if isinstance(o, Raster)]
+    if not rasters:
+        raise ValueError("ERROR: Map algebra requires at least one raster operand.")
+    grid = make_grid(rasters)
+    values = []
+    for o in operands:
+        if isinstance(o, Raster):
+            values.append(resample(o, grid[0], grid[1]))
+        else:
+            values.append((np.asarray(o), np.zeros(grid[1], dtype=bool)))
+    return grid, values
@@ -0,0 +1,107 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging, threading
+    from collections import OrderedDict
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: collections, os, sys, logging, threading).")
+
+try:
+    import cRaster as cRa
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: cRaster).")
+
+
+class RasterCache:
+    # Size-bounded least-recently-used (LRU) cache of decoded rasters keyed by file path and modification time
+    # cached rasters are shared between all users and must not be modified in place (map algebra never does)
+    def __init__(self, max_mb=2048, max_entries=256):
+        # max_mb = FLOAT of the maximum memory held by decoded (NumPy) rasters in megabytes
+        # max_entries = INT of the maximum number of cached rasters (limits ArcGIS raster handles without size info)
+        self.logger = logging.getLogger("logfile")
+        self.max_bytes = int(float(max_mb) * 1024 ** 2)
+        self.max_entries = int(max_entries)
+        self.entries = OrderedDict()  # {(path, mtime, size): (raster, bytes)}
+        self.cached_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.worker_tasks = 0  # tasks of worker processes whose hits and misses are included (add_statistics)
+        self.lock = threading.Lock()  # concurrent reaches (cReachScheduler) share the cache
+
+    @staticmethod
+    def make_key(path):
+        path = os.path.abspath(cRa.normalize_path(path))
+        stat = os.stat(path)
+        return path, stat.st_mtime, stat.st_size
+
+    @staticmethod
+    def raster_bytes(ras):
+        # returns the memory size of a NumPy-backed raster once decoded (ArcGIS rasters report 0 bytes)
+        # file rasters that are not loaded yet are sized from the GeoTIFF header (values and mask), thus the cache
+        # holds the lazy raster and windowed reads (read_window) do not decode the whole file
+        if isinstance(ras, cRa.CodedRaster):
+            return ras.nbytes
+        if not isinstance(ras, cRa.Raster):
+            return 0
+        n_cells = int(ras.shape[0]) * int(ras.shape[1])
+        if (ras._data is None) and (ras.path is not None):
+            return n_cells * (ras.reader.dtype.itemsize + 1)
+        return ras.data.nbytes + n_cells
+
+    def get(self, path, load_function):
+        # path = STR of a raster file
+        # load_function = callable that returns a raster from path (e.g., arcpy.Raster) on cache misses
+        try:
+            key = self.make_key(path)
+        except OSError:
+            # not a file (e.g., missing or a GRID name without extension): no caching
+            return load_function(path)
+        with self.lock:
+            if key in self.entries.keys():
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key][0]
+        ras = load_function(path)
+        n_bytes = self.raster_bytes(ras)
+        with self.lock:
+            self.misses += 1
+            if (n_bytes > self.max_bytes) or (key in self.entries.keys()):
+                return ras
+            self.entries.update({key: (ras, n_bytes)})
+            self.cached_bytes += n_bytes
+            self.evict()
+        return ras
+
+    def evict(self):
+        # removes least recently used rasters until the size and entry limits are respected
+        while (self.cached_bytes > self.max_bytes) or (self.entries.__len__() > self.max_entries):
+            key, (ras, n_bytes) = self.entries.popitem(last=False)
+            self.cached_bytes -= n_bytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.cached_bytes = 0
+
+    def add_statistics(self, hits, misses):
+        # adds the hits and misses of a task that used the cache of a worker process (e.g., parallel features)
+        with self.lock:
+            self.hits += int(hits)
+            self.misses += int(misses)
+            self.worker_tasks += 1
+
+    def log_statistics(self):
+        if self.worker_tasks:
+            self.logger.info("      * Raster cache: %i hits, %i misses (incl. %i worker tasks; %i rasters, %0.1f MB "
+                             "cached in this process)." % (self.hits, self.misses, self.worker_tasks,
+                                                           self.entries.__len__(), self.cached_bytes / 1024.0 ** 2))
+        else:
+            self.logger.info("      * Raster cache: %i hits, %i misses (%i rasters, %0.1f MB cached)." % (
+                self.hits, self.misses, self.entries.__len__(), self.cached_bytes / 1024.0 ** 2))
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = RasterCache (%s)" % os.path.dirname(__file__))
+        print(dir(self))
+
+
+# process-wide cache instance shared by all ParameterContainer objects
+raster_cache = RasterCache()
@@ -0,0 +1,89 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging, threading
+    from concurrent.futures import ThreadPoolExecutor
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: concurrent, os, sys, logging, threading).")
+
+try:
+    import cRaster as cRa
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: cRaster).")
+
+
+class RasterWriter:
+    # Background GeoTIFF writer of analysis outputs (NumPy backend)
+    # submit() materializes the output array in the calling thread (the geoprocessing environment is thread-local)
+    # and one writer thread encodes and writes the file, thus the computation of the next feature overlaps the disk
+    # I/O of the previous one - files are written to a temporary name and replaced atomically, and at most
+    # max_pending arrays wait in memory (submit blocks beyond)
+    def __init__(self, *args):
+        # args[0] = INT of max_pending writes (default: 4)
+        self.logger = logging.getLogger("logfile")
+        try:
+            self.max_pending = max(int(args[0]), 1)
+        except IndexError:
+            self.max_pending = 4
+        self.pool = None
+        self.futures = []
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        self.lock = threading.Lock()
+
+    def get_pool(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=1)
+            return self.pool
+
+    def submit(self, ras, path, **kwargs):
+        # ras = Raster to write
+        # path = STR of the output GeoTIFF
+        # kwargs: compression = STR ("NONE", "DEFLATE" or "LZW"; default: geoprocessing environment)
+        #         tile_size = INT of GeoTIFF tiles (default: geoprocessing environment; None writes strips)
+        out, nodata = ras.output_array()
+        settings = {"compression": kwargs.get("compression", cRa.environment["compression"]),
+                    "tile_size": kwargs.get("tile_size", cRa.environment["tileSize"])}
+        geotransform, spatial_reference = ras.geotransform, ras.spatialReference
+        self.slots.acquire()
+
+        out_path = cRa.normalize_path(path)
+
+        def write():
+            try:
+                tmp_path = "%s.%i.tmp" % (out_path, os.getpid())
+                cRa.write_geotiff(tmp_path, out, geotransform, spatial_reference, nodata, **settings)
+                os.replace(tmp_path, out_path)
+            finally:
+                self.slots.release()
+        self.append(self.get_pool().submit(write), path)
+
+    def call(self, function, *args, **kwargs):
+        # queues function(*args, **kwargs) after the pending writes (e.g., to store written outputs in the cache)
+        self.append(self.get_pool().submit(function, *args, **kwargs), str(getattr(function, "__name__", function)))
+
+    def append(self, future, label):
+        with self.lock:
+            self.futures = [f for f in self.futures if not f[0].done() or f[0].exception()]
+            self.futures.append((future, label))
+
+    def flush(self):
+        # waits for all pending writes and calls
+        # returns LIST of labels (output paths or function names) that failed
+        with self.lock:
+            futures, self.futures = self.futures, []
+        failed = []
+        for future, label in futures:
+            try:
+                future.result()
+            except Exception as e:
+                failed.append(label)
+                self.logger.info("ERROR: Could not write %s (%s)." % (label, str(e)))
+        return failed
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = RasterWriter (%s)" % os.path.dirname(__file__))
+        print(dir(self))
+
+
+# process-wide writer instance of lifespan and design rasters
+raster_writer = RasterWriter()
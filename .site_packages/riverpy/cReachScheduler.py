@@ -0,0 +1,123 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging, multiprocessing
+    from concurrent.futures import ThreadPoolExecutor
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: concurrent, os, sys, logging, multiprocessing).")
+
+try:
+    import cDefinitions as cDef
+    import cLogger as cLog
+    import cRaster as cRa
+    import cReachManager as cRM
+    import fGlobal as fGl
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: cDefinitions, cLogger, cRaster, cReachManager).")
+
+
+class ReachScheduler:
+    # Concurrent execution of per-reach computations
+    # the reach bounding boxes are read once from computation_extents.xlsx - every reach runs in its own thread with
+    # its own geoprocessing environment (cRaster.Environment), which is set to the reach extent, and read_window
+    # provides the reach window of input rasters (only the window is read from GeoTIFFs that are not yet loaded)
+    # ArcGIS arcpy has a process-wide environment: reaches run serially unless the NumPy backend is active
+    def __init__(self, reach_ids, *args, **kwargs):
+        # reach_ids = LIST of reach IDs (e.g., ["reach_00", "reach_02"] or ["none"])
+        # kwargs: extents = DICT {reach ID: [XMin, YMin, XMax, YMax] or "MAXOF"} (default: computation_extents.xlsx)
+        #         workers = INT of concurrent reaches (default: number of reaches, limited to the number of CPUs)
+        self.logger = logging.getLogger("logfile")
+        self.reach_ids = list(reach_ids)
+        self.extents = kwargs.get("extents") or self.read_extents()
+        workers = int(kwargs.get("workers", 0))
+        if workers < 1:
+            workers = multiprocessing.cpu_count()
+        self.workers = max(min(workers, self.reach_ids.__len__()), 1) if fGl.numpy_backend() else 1
+
+    def read_extents(self):
+        # returns DICT {reach ID: [XMin, YMin, XMax, YMax] or "MAXOF"}
+        reader = cRM.Read()
+        reaches = cDef.ReachDefinitions()
+        extents = {}
+        for reach_id in self.reach_ids:
+            try:
+                extents.update({reach_id: reader.get_reach_coordinates(reaches.dict_id_int_id[reach_id])})
+            except:
+                extents.update({reach_id: "MAXOF"})
+                self.logger.info("ERROR: Could not retrieve reach coordinates of %s." % str(reach_id))
+        return extents
+
+    def get_extent(self, reach_id):
+        # returns cRaster.Extent of the reach bounding box or "MAXOF"
+        extents = self.extents[reach_id]
+        if type(extents) == str:
+            return extents
+        return cRa.Extent(extents[0], extents[1], extents[2], extents[3])
+
+    def get_window(self, reach_id, ras):
+        # returns TUPLE (geotransform, shape) of the cells of ras that cover the reach bounding box (None: MAXOF)
+        extent = self.get_extent(reach_id)
+        if not isinstance(extent, cRa.Extent):
+            return None
+        return cRa.snap_grid(ras.geotransform, (extent.XMin, extent.YMin, extent.XMax, extent.YMax))
+
+    def read_window(self, reach_id, ras):
+        # returns in-memory Raster of ras in the reach window (ras if the reach has no bounding box or ras is not
+        # a NumPy-backed Raster)
+        if not isinstance(ras, cRa.Raster):
+            return ras
+        grid = self.get_window(reach_id, ras)
+        if grid is None:
+            return ras
+        data, mask = ras.read_window(*grid)
+        return cRa.Raster(data, grid[0], mask=mask, spatial_reference=ras.spatialReference, nodata=ras.noDataValue,
+                          name=ras.name)
+
+    def run(self, function):
+        # function = callable(reach ID, extents) where extents is [XMin, YMin, XMax, YMax] or "MAXOF"
+        # returns DICT {reach ID: function result} (None where function failed)
+        # the log messages of concurrent reaches are written per reach in the order of self.reach_ids
+        results = {}
+        if self.workers < 2:
+            for reach_id in self.reach_ids:
+                results.update({reach_id: self.run_reach(reach_id, function)})
+            return results
+        self.logger.info(" ->> Running %i reaches in %i threads ..." % (self.reach_ids.__len__(), self.workers))
+        settings = cRa.environment.copy()
+        capture = cLog.ThreadLogCapture(self.logger.handlers)
+        handlers, propagate = self.logger.handlers, self.logger.propagate
+        self.logger.handlers, self.logger.propagate = [capture], False
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = [(reach_id, pool.submit(self.run_reach, reach_id, function, settings, capture))
+                           for reach_id in self.reach_ids]
+                for reach_id, future in futures:
+                    results.update({reach_id: future.result()})
+        finally:
+            self.logger.handlers, self.logger.propagate = handlers, propagate
+        for reach_id in self.reach_ids:
+            cLog.LogCapture.replay(self.logger, capture.keyed_records.get(reach_id, []))
+        return results
+
+    def run_reach(self, reach_id, function, *args):
+        # args[0] = DICT of the geoprocessing environment of the calling thread (cRaster.Environment.copy())
+        # args[1] = cLogger.ThreadLogCapture that collects the log messages of the reach
+        try:
+            cRa.environment.update(args[0])
+            args[1].register(reach_id)
+        except IndexError:
+            pass
+        cRa.environment["extent"] = self.get_extent(reach_id)
+        try:
+            return function(reach_id, self.extents[reach_id])
+        except:
+            self.logger.info("ERROR: Computation of reach %s failed." % str(reach_id))
+            return None
+        finally:
+            try:
+                args[1].register(None)
+            except IndexError:
+                pass
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = ReachScheduler (%s)" % os.path.dirname(__file__))
+        print(dir(self))
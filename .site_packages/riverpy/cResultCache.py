@@ -0,0 +1,140 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging, hashlib, json, shutil, tempfile, threading
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, hashlib, json, shutil, tempfile, "
+          "threading).")
+
+try:
+    import config
+    import fGlobal as fGl
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: config, fGlobal).")
+
+
+class ResultCache:
+    # Content-addressed store of analysis outputs (e.g., lifespan and design rasters)
+    # an entry is keyed by the md5 hash of everything that determines the outputs (input files as path + mtime + size,
+    # thresholds, unit system, extents, code version) - unchanged analyses copy the stored outputs instead of
+    # recomputing them and entries of changed inputs are never hit again (invalidate() removes them)
+    def __init__(self, *args):
+        # args[0] = STR of the cache directory (default: LifespanDesign/.result_cache/)
+        self.logger = logging.getLogger("logfile")
+        try:
+            self.cache_dir = fGl.native_path(args[0])
+        except IndexError:
+            self.cache_dir = fGl.native_path(config.dir2lf + ".result_cache")
+        self.hits = 0
+        self.misses = 0
+        self.version = None
+        self.lock = threading.Lock()  # concurrent reaches (cReachScheduler) share the counters
+
+    def code_version(self):
+        # returns STR md5 hash of the Python sources of LifespanDesign and riverpy (computed once per process)
+        if self.version is None:
+            md5 = hashlib.md5()
+            for directory in (os.path.dirname(os.path.abspath(__file__)), fGl.native_path(config.dir2lf)):
+                for name in sorted(os.listdir(directory)):
+                    if name.endswith(".py"):
+                        with open(os.path.join(directory, name), "rb") as f:
+                            md5.update(name.encode() + f.read())
+            self.version = md5.hexdigest()
+        return self.version
+
+    @staticmethod
+    def directory_stamp(directory):
+        # returns LIST of [relative path, mtime, size] of all files in directory (hidden folders such as .cube are
+        # derived from the other files and skipped)
+        directory = fGl.native_path(directory)
+        stamp = []
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                stamp.append([os.path.relpath(path, directory).replace("\\", "/"), stat.st_mtime, stat.st_size])
+        return stamp
+
+    def make_key(self, **components):
+        # components = json-serializable descriptions of the inputs (numbers, strings, lists, dicts)
+        # returns STR md5 hash
+        components.update({"code_version": self.code_version()})
+        return hashlib.md5(json.dumps(components, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key, output_dir):
+        # copies the outputs stored under key to output_dir
+        # returns LIST of copied file names (None if key is not in the cache)
+        entry_dir = os.path.join(self.cache_dir, key)
+        try:
+            with open(os.path.join(entry_dir, "manifest.json"), "r") as f:
+                manifest = json.load(f)
+            for name in manifest["files"]:
+                source, target = os.path.join(entry_dir, name), os.path.join(fGl.native_path(output_dir), name)
+                if not self.is_copy(source, target):
+                    shutil.copy2(source, target)
+        except (OSError, ValueError, KeyError):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return manifest["outputs"]
+
+    def put(self, key, output_dir, outputs, **labels):
+        # stores copies of outputs (and their side files, e.g., .tif.aux.xml) from output_dir under key
+        # outputs = LIST of output file names in output_dir
+        # labels = json-serializable entry descriptions that invalidate() can match (e.g., condition="2008")
+        output_dir = fGl.native_path(output_dir)
+        files = [n for n in sorted(os.listdir(output_dir)) if any(n.startswith(o) for o in outputs)]
+        fGl.chk_dir(self.cache_dir)
+        tmp_dir = tempfile.mkdtemp(prefix=".%s" % key, dir=self.cache_dir)
+        try:
+            for name in files:
+                shutil.copy2(os.path.join(output_dir, name), os.path.join(tmp_dir, name))
+            with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+                json.dump({"outputs": list(outputs), "files": files, "labels": labels}, f, default=str)
+            os.replace(tmp_dir, os.path.join(self.cache_dir, key))
+        except OSError:
+            # the entry exists already (concurrent writer) or the outputs are locked
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @staticmethod
+    def is_copy(source, target):
+        # returns True if target is an unmodified copy2 of source (same size and modification time)
+        try:
+            stat_s, stat_t = os.stat(source), os.stat(target)
+        except OSError:
+            return False
+        return (stat_s.st_size == stat_t.st_size) and (stat_s.st_mtime == stat_t.st_mtime)
+
+    def invalidate(self, **labels):
+        # removes all entries (no labels) or the entries whose labels match all provided labels
+        # returns INT of removed entries
+        removed = 0
+        if not os.path.isdir(self.cache_dir):
+            return removed
+        for key in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, key)
+            if labels:
+                try:
+                    with open(os.path.join(entry_dir, "manifest.json"), "r") as f:
+                        entry_labels = json.load(f)["labels"]
+                except (OSError, ValueError, KeyError):
+                    continue
+                if not all(str(entry_labels.get(k)) == str(v) for k, v in labels.items()):
+                    continue
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            removed += 1
+        self.logger.info("      * Result cache: removed %i entries." % removed)
+        return removed
+
+    def log_statistics(self):
+        self.logger.info("      * Result cache: %i hits (skipped), %i misses (computed)." % (self.hits, self.misses))
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = ResultCache (%s)" % os.path.dirname(__file__))
+        print(dir(self))
+
+
+# process-wide cache instance of lifespan and design rasters
+result_cache = ResultCache()
@@ -0,0 +1,125 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging, struct, datetime
+    import numpy as np
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, struct, datetime, numpy).")
+
+SHAPE_POLYGON = 5
+FILE_CODE = 9994
+
+
+class ShapefileWriter:
+    # Streaming ESRI Shapefile writer of polygon features (.shp, .shx, .dbf)
+    # records are appended to the files batch by batch (no feature list in memory) and close() completes the headers
+    # (file lengths, bounding box, number of records)
+    def __init__(self, path, fields):
+        # path = STR of full path to the output shapefile (.shp)
+        # fields = LIST of attribute field definitions (name, type, width, decimals) - type is "N" (numeric) or
+        #          "C" (character), names have at most 10 characters (e.g., [("gridcode", "N", 9, 0)])
+        self.logger = logging.getLogger("logfile")
+        self.path = os.path.splitext(path)[0] + ".shp"
+        self.fields = [(str(f[0])[0:10], str(f[1]).upper(), int(f[2]), int(f[3])) for f in fields]
+        self.record_format = "".join([("%" + str(f[2]) + ("." + str(f[3]) + "f" if f[3] else "d")) if f[1] == "N" else
+                                      ("%-" + str(f[2]) + "s") for f in self.fields])
+        self.record_length = 1 + sum(f[2] for f in self.fields)
+        self.count = 0
+        self.bbox = [np.inf, np.inf, -np.inf, -np.inf]
+        for ext in (".shp", ".shx", ".dbf", ".prj", ".cpg"):
+            if os.path.isfile(os.path.splitext(self.path)[0] + ext):
+                os.remove(os.path.splitext(self.path)[0] + ext)
+        self.shp = open(self.path, "wb")
+        self.shx = open(os.path.splitext(self.path)[0] + ".shx", "wb")
+        self.dbf = open(os.path.splitext(self.path)[0] + ".dbf", "wb")
+        self.shp.write(b"\x00" * 100)
+        self.shx.write(b"\x00" * 100)
+        self.dbf.write(self.dbf_header())
+
+    def dbf_header(self):
+        today = datetime.date.today()
+        header_length = 32 + 32 * self.fields.__len__() + 1
+        header = struct.pack("<BBBBIHH20x", 3, today.year - 1900, today.month, today.day, self.count, header_length,
+                             self.record_length)
+        for name, field_type, width, decimals in self.fields:
+            header += struct.pack("<11sc4xBB14x", name.encode("ascii"), field_type.encode("ascii"), width, decimals)
+        return header + b"\x0d"
+
+    def write_polygon(self, rings, values):
+        # rings = LIST of float64 arrays (n, 2) of closed rings (first = last vertex) - outer rings clockwise and
+        #         holes counterclockwise
+        # values = LIST of attribute values in the order of fields
+        offsets = np.cumsum([0] + [r.__len__() for r in rings])
+        self.write_polygons(np.concatenate(rings), offsets, [0, rings.__len__()], [values])
+
+    def write_polygons(self, points, ring_offsets, polygon_rings, records):
+        # points = float64 array (n, 2) of the vertices of all rings (closed rings, see write_polygon)
+        # ring_offsets = INT array of the first point of every ring (and the number of points as last entry)
+        # polygon_rings = INT array of the first ring of every polygon (and the number of rings as last entry)
+        # records = LIST of attribute value TUPLES (one per polygon, in the order of fields)
+        points = np.ascontiguousarray(points, dtype="<f8")
+        ring_offsets = np.asarray(ring_offsets, dtype=np.int64)
+        polygon_rings = np.asarray(polygon_rings, dtype=np.int64)
+        if polygon_rings.__len__() < 2:
+            return
+        point_starts = ring_offsets[polygon_rings]
+        boxes = [np.minimum.reduceat(points[:, 0], point_starts[:-1]).tolist(),
+                 np.minimum.reduceat(points[:, 1], point_starts[:-1]).tolist(),
+                 np.maximum.reduceat(points[:, 0], point_starts[:-1]).tolist(),
+                 np.maximum.reduceat(points[:, 1], point_starts[:-1]).tolist()]
+        self.bbox = [min(self.bbox[0], min(boxes[0])), min(self.bbox[1], min(boxes[1])),
+                     max(self.bbox[2], max(boxes[2])), max(self.bbox[3], max(boxes[3]))]
+        point_bytes = memoryview(points.tobytes())
+        ring_offsets, polygon_rings, point_starts = ring_offsets.tolist(), polygon_rings.tolist(), point_starts.tolist()
+        shp, shx, dbf = [], [], []
+        offset = self.shp.tell()
+        for k in range(0, polygon_rings.__len__() - 1):
+            r0, r1 = polygon_rings[k], polygon_rings[k + 1]
+            p0, p1 = point_starts[k], point_starts[k + 1]
+            words = (44 + 4 * (r1 - r0) + 16 * (p1 - p0)) // 2
+            self.count += 1
+            shp.append(struct.pack(">2i", self.count, words))
+            shp.append(struct.pack("<i4d2i", SHAPE_POLYGON, boxes[0][k], boxes[1][k], boxes[2][k], boxes[3][k],
+                                   r1 - r0, p1 - p0))
+            shp.append(struct.pack("<%ii" % (r1 - r0), *[o - p0 for o in ring_offsets[r0:r1]]))
+            shp.append(point_bytes[p0 * 16:p1 * 16])
+            shx.append(struct.pack(">2i", offset // 2, words))
+            offset += 8 + words * 2
+            record = " " + self.record_format % tuple(records[k])
+            if not (record.__len__() == self.record_length):
+                raise ValueError("ERROR: Attribute values %s exceed the field widths." % str(records[k]))
+            dbf.append(record.encode("ascii"))
+        self.shp.write(b"".join(shp))
+        self.shx.write(b"".join(shx))
+        self.dbf.write(b"".join(dbf))
+
+    def main_header(self, file_length):
+        bbox = self.bbox if self.count else [0.0, 0.0, 0.0, 0.0]
+        return (struct.pack(">7i", FILE_CODE, 0, 0, 0, 0, 0, file_length // 2) +
+                struct.pack("<2i8d", 1000, SHAPE_POLYGON, bbox[0], bbox[1], bbox[2], bbox[3], 0.0, 0.0, 0.0, 0.0))
+
+    def close(self):
+        for f in (self.shp, self.shx):
+            file_length = f.tell()
+            f.seek(0)
+            f.write(self.main_header(file_length))
+            f.close()
+        self.dbf.write(b"\x1a")
+        self.dbf.seek(0)
+        self.dbf.write(self.dbf_header()[0:12])
+        self.dbf.close()
+        with open(os.path.splitext(self.path)[0] + ".cpg", "w") as f:
+            f.write("UTF-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            for f in (self.shp, self.shx, self.dbf):
+                f.close()
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = ShapefileWriter (%s)" % os.path.dirname(__file__))
+        print(dir(self))
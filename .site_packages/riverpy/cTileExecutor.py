@@ -0,0 +1,184 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging
+    import numpy as np
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, numpy).")
+
+try:
+    import cGeoTiff as cGT
+    import cRaster as cRa
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: cGeoTiff, cRaster).")
+
+
+class TileExecutor:
+    def __init__(self, rasters, *args, **kwargs):
+        # rasters = DICT {name: Raster or raster path} of (aligned or unaligned) input rasters
+        # kwargs: tile_size = INT of tile edge length in cells (rounded to a multiple of 16, default: 1024)
+        #         halo = INT of cells added around each tile for neighbourhood operations (e.g., 1 for Slope)
+        self.logger = logging.getLogger("logfile")
+        self.rasters = {}
+        for name, ras in rasters.items():
+            self.rasters.update({name: ras if isinstance(ras, cRa.Raster) else cRa.Raster(ras)})
+        self.tile_size = max(16, int(kwargs.get("tile_size", 1024)) // 16 * 16)
+        self.halo = int(kwargs.get("halo", 0))
+        # the output grid follows the geoprocessing environment (extent, cell size, snap raster) as map algebra
+        self.geotransform, self.shape = cRa.make_grid(list(self.rasters.values()))
+
+    def windows(self):
+        # yields TUPLES (row_off, col_off, n_rows, n_cols) of output tiles (without halo)
+        for row_off in range(0, self.shape[0], self.tile_size):
+            for col_off in range(0, self.shape[1], self.tile_size):
+                yield (row_off, col_off, min(self.tile_size, self.shape[0] - row_off),
+                       min(self.tile_size, self.shape[1] - col_off))
+
+    def window_geotransform(self, row_off, col_off):
+        x0, dx, rx, y0, ry, dy = self.geotransform
+        return x0 + col_off * dx, dx, 0.0, y0 + row_off * dy, 0.0, dy
+
+    def read_tile(self, window):
+        # window = TUPLE (row_off, col_off, n_rows, n_cols)
+        # returns DICT {name: Raster} of the tile extended by the halo (cells beyond the grid are NoData)
+        row_off, col_off, n_rows, n_cols = window
+        geotransform = self.window_geotransform(row_off - self.halo, col_off - self.halo)
+        shape = (n_rows + 2 * self.halo, n_cols + 2 * self.halo)
+        tiles = {}
+        for name, ras in self.rasters.items():
+            data, mask = ras.read_window(geotransform, shape)
+            tiles.update({name: cRa.Raster(data, geotransform, mask=mask, spatial_reference=ras.spatialReference,
+                                           name=name)})
+        return tiles
+
+    def crop_halo(self, ras, window):
+        # returns TUPLE (data, mask) of a tile result without halo cells
+        n_rows, n_cols = window[2], window[3]
+        if not (ras.shape == (n_rows + 2 * self.halo, n_cols + 2 * self.halo)):
+            # the function changed the tile grid: resample onto the output tile
+            return ras.read_window(self.window_geotransform(window[0], window[1]), (n_rows, n_cols))
+        h = self.halo
+        return ras.data[h:h + n_rows, h:h + n_cols], ras.mask[h:h + n_rows, h:h + n_cols]
+
+    @staticmethod
+    def get_dtype(dtype, name):
+        # returns the numpy dtype of the output name
+        # dtype = None (float64), numpy dtype or DICT {output name: numpy dtype} (missing names: float64)
+        # the output dtype never follows the tile results: map algebra may return integers in one tile and floats in
+        # another (e.g., Con with integer and float branches), which a writer of the first tile's type would truncate
+        if isinstance(dtype, dict):
+            dtype = dtype.get(name, None)
+        return np.dtype(np.float64 if dtype is None else dtype)
+
+    def run(self, function, out_paths, **kwargs):
+        # function = callable that receives a DICT {name: Raster} of tiles and returns a Raster or
+        #            a DICT {output_name: Raster}
+        # out_paths = STR of an output GeoTIFF or DICT {output_name: STR of output GeoTIFF}
+        # kwargs: dtype = numpy dtype or DICT {output_name: numpy dtype} of the outputs (default: float64)
+        # returns Raster (or DICT {output_name: Raster}) that reads the written GeoTIFF(s) lazily
+        single_output = not isinstance(out_paths, dict)
+        dtype = kwargs.get("dtype", None)
+        if single_output:
+            out_paths = {"out": out_paths}
+            dtype = {"out": dtype}
+        writers = {}
+        spatial_reference = list(self.rasters.values())[0].spatialReference
+        n_tiles = int(np.ceil(self.shape[0] / float(self.tile_size)) * np.ceil(self.shape[1] / float(self.tile_size)))
+        self.logger.info("      >>> Processing %i tiles (%i x %i cells, halo: %i) ..." % (
+            n_tiles, self.tile_size, self.tile_size, self.halo))
+        try:
+            for window in self.windows():
+                results = function(self.read_tile(window))
+                if single_output:
+                    results = {"out": results}
+                for name, path in out_paths.items():
+                    data, mask = self.crop_halo(results[name], window)
+                    if name not in writers.keys():
+                        writers.update({name: self.make_writer(path, self.get_dtype(dtype, name), spatial_reference)})
+                    out = np.array(data, dtype=writers[name].dtype)
+                    if mask.any():
+                        out[mask] = np.array(writers[name].nodata).astype(out.dtype)
+                    writers[name].write_window(window[0], window[1], out)
+        finally:
+            for writer in writers.values():
+                writer.close()
+        outputs = {}
+        for name, path in out_paths.items():
+            outputs.update({name: cRa.Raster(path)})
+        if single_output:
+            return outputs["out"]
+        return outputs
+
+    def run_algebra(self, function, out_paths, **kwargs):
+        # as run for functions that evaluate map algebra (Con, Float, CellStatistics, ...) on the tiles: the
+        # geoprocessing extent is the tile (including the halo) while function runs and is restored afterwards
+        extent = cRa.environment["extent"]
+
+        def tile_function(tiles):
+            cRa.environment["extent"] = list(tiles.values())[0].extent
+            return function(tiles)
+        try:
+            return self.run(tile_function, out_paths, **kwargs)
+        finally:
+            cRa.environment["extent"] = extent
+
+    def tile_extent(self, window):
+        # returns Extent of a tile extended by the halo
+        geotransform = self.window_geotransform(window[0] - self.halo, window[1] - self.halo)
+        return cRa.Extent(*cRa.grid_extent(geotransform, (window[2] + 2 * self.halo, window[3] + 2 * self.halo)))
+
+    def run_named(self, function, out_dir, **kwargs):
+        # function = callable that receives the Extent of a tile (including the halo) and returns a DICT
+        #            {output file name: Raster} - outputs that are missing in a tile are NoData in that tile
+        # out_dir = STR of the directory where the output GeoTIFFs are written
+        # kwargs: dtype = numpy dtype or DICT {output file name: numpy dtype} of the outputs (default: float64)
+        # returns DICT {output file name: Raster} that read the written GeoTIFFs lazily
+        writers = {}
+        written = {}
+        windows = list(self.windows())
+        spatial_reference = list(self.rasters.values())[0].spatialReference
+        self.logger.info("      >>> Processing %i tiles (%i x %i cells, halo: %i) ..." % (
+            windows.__len__(), self.tile_size, self.tile_size, self.halo))
+        try:
+            for window in windows:
+                results = function(self.tile_extent(window))
+                for name, ras in results.items():
+                    try:
+                        data, mask = self.crop_halo(ras, window)
+                    except AttributeError:
+                        # no raster (e.g., an empty analysis result) in this tile
+                        continue
+                    if name not in writers.keys():
+                        writers.update({name: self.make_writer(os.path.join(out_dir, name),
+                                                               self.get_dtype(kwargs.get("dtype", None), name),
+                                                               spatial_reference)})
+                        written.update({name: []})
+                    out = np.array(data, dtype=writers[name].dtype)
+                    if mask.any():
+                        out[mask] = np.array(writers[name].nodata).astype(out.dtype)
+                    writers[name].write_window(window[0], window[1], out)
+                    written[name].append(window)
+            for name, writer in writers.items():
+                # fill tiles without results
+                for window in windows:
+                    if window not in written[name]:
+                        writer.write_window(window[0], window[1], np.full(
+                            window[2:4], np.array(writer.nodata).astype(writer.dtype), dtype=writer.dtype))
+        finally:
+            for writer in writers.values():
+                writer.close()
+        outputs = {}
+        for name in writers.keys():
+            outputs.update({name: cRa.Raster(os.path.join(out_dir, name))})
+        return outputs
+
+    def make_writer(self, path, dtype, spatial_reference):
+        path = cRa.normalize_path(path)
+        if os.path.exists(path):
+            os.remove(path)
+        return cGT.GeoTiffWriter(path, self.shape[1], self.shape[0], dtype, self.geotransform,
+                                 spatial_reference.geokeys, nodata=cRa.default_nodata(dtype), tiled=True,
+                                 block_size=self.tile_size, compression=cRa.environment["compression"])
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = TileExecutor (%s)" % os.path.dirname(__file__))
+        print(dir(self))
@@ -3,34 +3,36 @@ try:
 except:
     print("ExceptionERROR: Missing fundamental packages (required: os, sys).")
 
-code_icon = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\templates\\code_icon.ico"
+# paths are built with os.sep (identical to the former "\\" paths on Windows, valid on Linux)
 
-dir2ra = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\"
-dir2co = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\Connectivity\\"
-dir2conditions = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\01_Conditions\\"
-dir2flows = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\00_Flows\\"
-dir2gs = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\GetStarted\\"
-dir2lf = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\LifespanDesign\\"
-dir2map = os.path.abspath(os.path.join(os.path.dirname(__file__), "..\\..")) + "\\02_Maps\\"
-dir2map_templates = os.path.abspath(os.path.join(os.path.dirname(__file__), "..\\..")) + "\\02_Maps\\templates\\"
-dir2ml = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\MaxLifespan\\"
-dir2mt = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\ModifyTerrain\\"
-dir2oxl = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\openpyxl\\"
-dir2pm = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\ProjectMaker\\"
-dir2rb = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\ModifyTerrain\\RiverBuilder\\"
-dir2ripy = os.path.dirname(__file__) + "\\"
-dir2templates = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\templates\\"
-dir2sh = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\SHArC\\"
-dir2va = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\VolumeAssessment\\"
+code_icon = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + os.sep + "templates" + os.sep + "code_icon.ico"
+
+dir2ra = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep
+dir2co = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "Connectivity" + os.sep
+dir2conditions = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "01_Conditions" + os.sep
+dir2flows = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "00_Flows" + os.sep
+dir2gs = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "GetStarted" + os.sep
+dir2lf = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "LifespanDesign" + os.sep
+dir2map = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "02_Maps" + os.sep
+dir2map_templates = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "02_Maps" + os.sep + "templates" + os.sep
+dir2ml = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "MaxLifespan" + os.sep
+dir2mt = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "ModifyTerrain" + os.sep
+dir2oxl = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + os.sep + "openpyxl" + os.sep
+dir2pm = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "ProjectMaker" + os.sep
+dir2rb = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "ModifyTerrain" + os.sep + "RiverBuilder" + os.sep
+dir2ripy = os.path.dirname(__file__) + os.sep
+dir2templates = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + os.sep + "templates" + os.sep
+dir2sh = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "SHArC" + os.sep
+dir2va = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "VolumeAssessment" + os.sep
 
 ft2ac = float(1 / 43560)
 m2ft = 0.3048
 
-empty_file = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\templates\\oups.txt"
-xlsx_aqua = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\templates\\Fish.xlsx"
-xlsx_dummy = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\templates\\empty.xlsx"
-xlsx_mu = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\templates\\morphological_units.xlsx"
-xlsx_reaches = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\ModifyTerrain\\.templates\\computation_extents.xlsx"
-xlsx_thresholds = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\LifespanDesign\\.templates\\threshold_values.xlsx"
-xlsx_volumes = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\VolumeAssessment\\.templates\\volumes_template.xlsx"
-xlsx_connectivity = os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')) + "\\Connectivity\\.templates\\disconnected_area_template.xlsx"
+empty_file = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + os.sep + "templates" + os.sep + "oups.txt"
+xlsx_aqua = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + os.sep + "templates" + os.sep + "Fish.xlsx"
+xlsx_dummy = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + os.sep + "templates" + os.sep + "empty.xlsx"
+xlsx_mu = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + os.sep + "templates" + os.sep + "morphological_units.xlsx"
+xlsx_reaches = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "ModifyTerrain" + os.sep + ".templates" + os.sep + "computation_extents.xlsx"
+xlsx_thresholds = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "LifespanDesign" + os.sep + ".templates" + os.sep + "threshold_values.xlsx"
+xlsx_volumes = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "VolumeAssessment" + os.sep + ".templates" + os.sep + "volumes_template.xlsx"
+xlsx_connectivity = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')) + os.sep + "Connectivity" + os.sep + ".templates" + os.sep + "disconnected_area_template.xlsx"
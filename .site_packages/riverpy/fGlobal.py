@@ -1,7 +1,10 @@
 try:
     import os, logging, sys, glob, webbrowser, time
     import numpy as np
-    from collections import Iterable  # used in the flatten function
+    try:
+        from collections.abc import Iterable  # used in the flatten function
+    except ImportError:
+        from collections import Iterable
     from bisect import bisect_left
 except:
     print("ExceptionERROR: Missing fundamental packages (required: bisect, collections, os, sys, glob, logging, time, webbrowser).")
@@ -33,6 +36,7 @@ def chk_is_empty(variable):
 
 
 def chk_dir(directory):
+    directory = native_path(directory)
     if not os.path.exists(directory):
         os.makedirs(directory)
 
@@ -155,6 +159,7 @@ def err_info(func):
 
 def file_names_in_dir(directory):
     # returns file names only (without directory)
+    directory = native_path(directory)
     return [name for name in os.listdir(directory) if os.path.isfile(os.path.join(directory, name))]
 
 
@@ -254,7 +259,7 @@ def make_output_dir(condition, reach_ids, habitat_analysis, relevant_feat_names)
         if feat_lyr_type > 0:
             for i in range(0, 9):
                 test_folder = str(condition) + reach_name + "_lyr" + str(feat_lyr_type) + str(i)
-                test_dir = config.dir2lf + "Output\\Rasters\\" + test_folder + "\\"
+                test_dir = os.path.join(config.dir2lf, "Output", "Rasters", test_folder) + os.sep
                 if not os.path.exists(test_dir):
                     os.makedirs(test_dir)
                     output_dir = test_dir
@@ -282,23 +287,38 @@ def make_output_dir(condition, reach_ids, habitat_analysis, relevant_feat_names)
                             print("Maximum folder size for this layer reached -- restarting at lyrX0.")
                             print("Consider better file structure; this time, old files are deleted.")
                             test_folder = str(condition) + "_lyr" + str(feat_lyr_type) + str(0)
-                            output_dir = config.dir2lf + "Output\\Rasters\\" + test_folder + "\\"
+                            output_dir = os.path.join(config.dir2lf, "Output", "Rasters", test_folder) + os.sep
                             break
         else:
-            output_dir = config.dir2lf + "Output\\Rasters\\" + str(condition) + reach_name + "lyr00\\"
+            output_dir = os.path.join(config.dir2lf, "Output", "Rasters", str(condition) + reach_name + "lyr00") + os.sep
     else:
-        output_dir = config.dir2lf + "Output\\Rasters\\" + str(condition) + reach_name + "_hab\\"
+        output_dir = os.path.join(config.dir2lf, "Output", "Rasters", str(condition) + reach_name + "_hab") + os.sep
 
     if not("output_dir" in locals()):
         print("No reach or feature layer or habitat_analysis information.")
         print("--> Output folder name corresponds to input condition.")
-        output_dir = config.dir2lf + "Output\\Rasters\\" + str(condition) + "\\"
+        output_dir = os.path.join(config.dir2lf, "Output", "Rasters", str(condition)) + os.sep
 
     chk_dir(output_dir)
 
     return output_dir
 
 
+def native_path(path):
+    # converts "\\"-separated River Architect paths into paths of the running platform (unchanged on Windows)
+    if os.sep == "\\":
+        return path
+    return str(path).replace("\\", os.sep)
+
+
+def numpy_backend():
+    # returns True if arcpy is the riverpy NumPy stand-in (riverpy/arcpy) rather than ArcGIS arcpy
+    try:
+        return bool(arcpy.NUMPY_BACKEND)
+    except:
+        return False
+
+
 def open_file(full_file_path):
     _f = full_file_path
     if os.path.isfile(_f):
@@ -351,7 +371,8 @@ def raster2shp(raster_name, out_shp_name=str(), simplify="NO_SIMPLIFY", calculat
         out_shp_name = raster_name.split(".")[0] + ".shp"
     arcpy.CheckOutExtension('Spatial')
     arcpy.RasterToPolygon_conversion(Int(arcpy.Raster(raster_name)), out_shp_name, simplify)
-    if calculate_area:
+    if calculate_area and not numpy_backend():
+        # the NumPy backend writes F_AREA with the polygons
         arcpy.AddField_management(out_shp_name, "F_AREA", "FLOAT", 9)
         arcpy.CalculateGeometryAttributes_management(out_shp_name, geometry_property=[["F_AREA", "AREA"]],
                                                      area_unit=out_shp_name)
@@ -408,6 +429,7 @@ def rm_dir(directory):
     # Deletes everything reachable from the directory named in 'directory', and the directory itself
     # assuming there are no symbolic links.
     # CAUTION:  This is dangerous!  For example, if directory == '/' deletes all disk files
+    directory = native_path(directory)
     for root, dirs, files in os.walk(directory, topdown=False):
         for name in files:
             os.remove(os.path.join(root, name))
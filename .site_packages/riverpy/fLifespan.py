@@ -0,0 +1,180 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging
+    import numpy as np
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, numpy).")
+
+
+def exceedance_stack(stack, threshold, *args, **kwargs):
+    # stack = numpy array (n, rows, cols) OR LIST of n (rows, cols) arrays with parameter values (e.g., h per discharge)
+    # threshold = FLOAT OR numpy array (rows, cols) - NaN thresholds are never exceeded
+    # args[0] = LIST of layer indices defining the order of the output layers (default: stack order)
+    # args[1] = numpy array (n, rows, cols) OR LIST of n BOOL arrays of NoData cells (default: non-finite values)
+    # kwargs: threshold_mask = BOOL array (rows, cols) of NoData thresholds
+    # returns BOOL numpy array (n, rows, cols) that is True where a layer is greater than or equal to threshold
+    try:
+        order = list(args[0])
+    except:
+        order = list(range(0, stack.__len__()))
+    try:
+        masks = args[1]
+    except:
+        masks = None
+    threshold = np.asarray(threshold, dtype=np.float64)
+    if kwargs.get("threshold_mask") is not None:
+        threshold = np.where(kwargs["threshold_mask"], np.nan, threshold)
+    shape = np.shape(stack[order[0]])
+    exceeded = np.empty((order.__len__(),) + tuple(shape), dtype=bool)
+    for k, i in enumerate(order):
+        # layer-wise comparison in float64 (as Float(ras) >= Float(threshold)) keeps the float64 copy to one layer
+        np.greater_equal(np.asarray(stack[i], dtype=np.float64), threshold, out=exceeded[k])
+        if masks is not None:
+            exceeded[k] &= ~np.asarray(masks[i], dtype=bool)
+    return exceeded
+
+
+def first_exceedance(exceeded):
+    # exceeded = BOOL numpy array (n, rows, cols)
+    # returns TUPLE (INT array of the first True layer per pixel, BOOL array that is True where no layer is True)
+    first = np.argmax(exceeded, axis=0)
+    never = ~np.take_along_axis(exceeded, first[np.newaxis], axis=0)[0]
+    return first, never
+
+
+def min_exceeded_lifespan(stack, threshold, lifespans, *args, **kwargs):
+    # vectorised equivalent of CellStatistics([Con(stack[i] >= threshold, lifespans[i]), ...], "MINIMUM", "DATA")
+    # stack = numpy array (n, rows, cols) OR LIST of n (rows, cols) arrays with parameter values
+    # threshold = FLOAT OR numpy array (rows, cols) - NaN thresholds are never exceeded
+    # lifespans = LIST of n FLOATs (years) corresponding to the stack layers
+    # args[0] = numpy array (n, rows, cols) OR LIST of n BOOL arrays of NoData cells (default: non-finite values)
+    # kwargs: threshold_mask = BOOL array (rows, cols) of NoData thresholds
+    # returns TUPLE (float64 array of the minimum exceeded lifespan, BOOL NoData array where nothing is exceeded)
+    codes, lookup, never = min_exceeded_lifespan_codes(stack, threshold, lifespans, *args, **kwargs)
+    return lookup[codes], never
+
+
+def min_exceeded_lifespan_codes(stack, threshold, lifespans, *args, **kwargs):
+    # categorical min_exceeded_lifespan (same arguments): the lifespans of a raster are a few classes, thus the
+    # result is returned as UINT8 codes of a lookup table instead of float64 values (see cRaster.CodedRaster)
+    # returns TUPLE (UINT8 array of lookup indices, float64 lookup table of the lifespan classes (ascending),
+    # BOOL NoData array where nothing is exceeded)
+    try:
+        masks = args[0]
+    except:
+        masks = None
+    lifespans = np.asarray(lifespans, dtype=np.float64)
+    lookup = np.unique(lifespans)
+    # sorting the layers by ascending lifespan makes the first exceeded layer the minimum lifespan (single argmax)
+    order = list(np.argsort(lifespans, kind="stable"))
+    exceeded = exceedance_stack(stack, threshold, order, masks, **kwargs)
+    first, never = first_exceedance(exceeded)
+    codes = np.searchsorted(lookup, lifespans[order]).astype(np.uint8)[first]
+    codes[never] = 0
+    return codes, lookup, never
+
+
+def threshold_stack(thresholds, shape, *args):
+    # thresholds = LIST of k FLOATs and/or numpy arrays (rows, cols) OR numpy array (k,) or (k, rows, cols)
+    # shape = TUPLE (rows, cols) of the stack layers
+    # args[0] = BOOL array (rows, cols) of NoData thresholds (set to NaN = never exceeded)
+    # returns float64 numpy array (k, 1, 1) of scalar thresholds or (k, rows, cols) that broadcasts against a layer
+    if not any(np.ndim(t) > 0 for t in thresholds):
+        thresholds = np.asarray(thresholds, dtype=np.float64).reshape(-1, 1, 1)
+    else:
+        thresholds = np.stack([np.broadcast_to(np.asarray(t, dtype=np.float64), shape) for t in thresholds])
+    try:
+        if args[0] is not None:
+            thresholds = np.where(args[0], np.nan, thresholds)
+    except IndexError:
+        pass
+    return thresholds
+
+
+def min_exceeded_lifespan_sweep(stack, thresholds, lifespans, *args, **kwargs):
+    # min_exceeded_lifespan for k thresholds at once: the thresholds are broadcast along a new leading axis against
+    # every stack layer, thus the stack is read once for all thresholds (e.g., a sensitivity sweep of taux_cr)
+    # stack = numpy array (n, rows, cols) OR LIST of n (rows, cols) arrays with parameter values
+    # thresholds = LIST of k FLOATs and/or arrays (rows, cols) OR numpy array (k,) or (k, rows, cols)
+    # lifespans = LIST of n FLOATs (years) corresponding to the stack layers
+    # args[0] = numpy array (n, rows, cols) OR LIST of n BOOL arrays of NoData cells (default: non-finite values)
+    # kwargs: threshold_mask = BOOL array (rows, cols) of NoData thresholds
+    # returns TUPLE (float64 array (k, rows, cols) of minimum exceeded lifespans, BOOL NoData array (k, rows, cols))
+    try:
+        masks = args[0]
+    except IndexError:
+        masks = None
+    lifespans = np.asarray(lifespans, dtype=np.float64)
+    shape = np.shape(stack[0])
+    thresholds = threshold_stack(thresholds, shape, kwargs.get("threshold_mask"))
+    k = thresholds.shape[0]
+    ras_lf = np.full((k,) + tuple(shape), np.nan)
+    never = np.ones((k,) + tuple(shape), dtype=bool)
+    exceeded = np.empty((k,) + tuple(shape), dtype=bool)
+    # layers in ascending lifespan order: the first exceedance of a pixel is its minimum lifespan (streaming argmax
+    # that keeps one (k, rows, cols) comparison in memory instead of (k, n, rows, cols))
+    for i in np.argsort(lifespans, kind="stable"):
+        np.greater_equal(np.asarray(stack[i], dtype=np.float64)[np.newaxis], thresholds, out=exceeded)
+        if masks is not None:
+            exceeded &= ~np.asarray(masks[i], dtype=bool)[np.newaxis]
+        exceeded &= never
+        ras_lf[exceeded] = lifespans[i]
+        never &= ~exceeded
+    return ras_lf, never
+
+
+def class_areas(ras_lf, nodata, classes, *args):
+    # ras_lf = float64 array (k, rows, cols) of lifespans (e.g., min_exceeded_lifespan_sweep)
+    # nodata = BOOL array (k, rows, cols)
+    # classes = LIST of lifespan classes (years)
+    # args[0] = FLOAT area of one cell (default: 1.0 = pixel counts)
+    # returns float64 array (k, classes) of the area per lifespan class and sweep value
+    try:
+        cell_area = float(args[0])
+    except IndexError:
+        cell_area = 1.0
+    valid = ~np.asarray(nodata, dtype=bool)
+    areas = np.empty((ras_lf.shape[0], classes.__len__()), dtype=np.float64)
+    for j, lf in enumerate(classes):
+        areas[:, j] = np.count_nonzero((ras_lf == float(lf)) & valid, axis=(1, 2)) * cell_area
+    return areas
+
+
+def accumulate_class_counts(counts, ras_lf, nodata, classes):
+    # streaming histogram of sampled lifespans (e.g., Monte Carlo batches) - the samples are not stored
+    # counts = UINT32 array (classes + 1, rows, cols) that is updated in place - the last bin counts the samples
+    #          without an exceeded lifespan (NoData)
+    # ras_lf = float64 array (k, rows, cols) of lifespans of k samples (e.g., min_exceeded_lifespan_sweep)
+    # nodata = BOOL array (k, rows, cols)
+    # classes = LIST of lifespan classes (years)
+    valid = ~np.asarray(nodata, dtype=bool)
+    for j, lf in enumerate(classes):
+        counts[j] += np.count_nonzero((ras_lf == float(lf)) & valid, axis=0).astype(counts.dtype)
+    counts[-1] += np.count_nonzero(~valid, axis=0).astype(counts.dtype)
+    return counts
+
+
+def count_percentile(counts, classes, q):
+    # counts = UINT32 array (classes + 1, rows, cols) of accumulate_class_counts
+    # classes = LIST of lifespan classes (years) in ascending order
+    # q = FLOAT percentile (e.g., 10.0)
+    # returns TUPLE (float64 array of the lifespan class at the q-th percentile (nearest rank), BOOL array that is
+    # True where the percentile falls into the NoData bin (lifespan not exceeded))
+    total = counts.sum(axis=0, dtype=np.int64)
+    rank = np.maximum(np.ceil(float(q) / 100.0 * total), 1)
+    index = np.argmax(np.cumsum(counts, axis=0, dtype=np.int64) >= rank[np.newaxis], axis=0)
+    values = np.append(np.asarray(classes, dtype=np.float64), np.nan)[index]
+    return values, index == classes.__len__()
+
+
+def failure_probability(counts, classes, design_lifespan):
+    # counts = UINT32 array (classes + 1, rows, cols) of accumulate_class_counts
+    # classes = LIST of lifespan classes (years) in ascending order
+    # design_lifespan = FLOAT (years)
+    # returns float64 array of the share of samples with a lifespan of design_lifespan or less
+    total = counts.sum(axis=0, dtype=np.int64)
+    failed = np.zeros(total.shape, dtype=np.int64)
+    for j, lf in enumerate(classes):
+        if float(lf) <= float(design_lifespan):
+            failed += counts[j]
+    return failed / np.maximum(total, 1)
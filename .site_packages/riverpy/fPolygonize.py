@@ -0,0 +1,251 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging, multiprocessing
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: concurrent, os, sys, logging, multiprocessing, "
+          "numpy).")
+
+try:
+    import cRaster as cRa
+    import cShapefile as cSh
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: cRaster, cShapefile).")
+
+# Raster to polygon conversion (NumPy backend) as RasterToPolygon_conversion with NO_SIMPLIFY
+# cells of equal value that share an edge (4-connectivity) form one polygon: the raster is processed in stripes of
+# rows (threads) that label runs of equal values, a union-find joins the runs of adjacent rows to connected components
+# and the cell edges between different components are merged to straight segments and linked to rings (the component
+# is on the right of every segment, thus outer rings are clockwise and holes counterclockwise as in ESRI shapefiles)
+# - the polygons are streamed to the shapefile in batches of components
+fields = [("Id", "N", 9, 0), ("gridcode", "N", 9, 0), ("F_AREA", "N", 19, 4)]
+
+
+def make_stripes(rows, tile_size):
+    # returns LIST of TUPLES (first row, last row + 1)
+    return [(r0, min(r0 + tile_size, rows)) for r0 in range(0, rows, tile_size)]
+
+
+def run_starts(runs):
+    # returns BOOL array that is True where a run of runs (INT array (rows, cols) of run ids) starts
+    starts = np.ones(runs.shape, dtype=bool)
+    starts[:, 1:] = runs[:, 1:] != runs[:, :-1]
+    return starts
+
+
+def stripe_runs(ras, geotransform, shape, r0, r1):
+    # returns TUPLE (INT32 array (r1 - r0, cols) of local run ids (-1 = NoData), INT64 array of run values)
+    x0, dx, rx, y0, ry, dy = geotransform
+    data, mask = ras.read_window((x0, dx, rx, y0 + r0 * dy, ry, dy), (r1 - r0, shape[1]))
+    if np.asarray(data).dtype.kind == "f":
+        raise ValueError("ERROR: Polygon conversion requires an integer raster.")
+    valid = ~mask
+    start = valid.copy()
+    start[:, 1:] &= ~(valid[:, :-1] & (data[:, 1:] == data[:, :-1]))
+    runs = np.cumsum(start.ravel(), dtype=np.int32).reshape(start.shape) - 1
+    runs[~valid] = -1
+    return runs, np.asarray(data[start], dtype=np.int64)
+
+
+def stripe_pairs(runs, run_values, r0, r1):
+    # returns TUPLE of INT64 arrays (upper run ids, lower run ids) of runs with equal values in the adjacent rows
+    # r0 ... r1 (the last row of the stripe is compared with the first row of the next stripe)
+    upper, lower = runs[r0:min(r1, runs.shape[0] - 1)], runs[r0 + 1:r1 + 1]
+    # overlapping runs share a column where one of them starts
+    candidate = (run_starts(upper) | run_starts(lower)) & (upper >= 0) & (lower >= 0)
+    upper, lower = upper[candidate].astype(np.int64), lower[candidate].astype(np.int64)
+    joined = run_values[upper] == run_values[lower]
+    n_runs = run_values.__len__()
+    return np.divmod(np.unique(upper[joined] * n_runs + lower[joined]), n_runs)
+
+
+def union_find(n, a, b):
+    # n = INT number of elements
+    # a, b = INT64 arrays of joined element pairs
+    # returns INT64 array of the root (smallest element) of every element's set
+    parent = np.arange(n, dtype=np.int64)
+    while a.size:
+        root_a, root_b = parent[a], parent[b]
+        apart = root_a != root_b
+        if not apart.any():
+            break
+        a, b, root_a, root_b = a[apart], b[apart], root_a[apart], root_b[apart]
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+    return parent
+
+
+def label_components(ras, **kwargs):
+    # ras = Raster of INTEGER values
+    # kwargs: tile_size = INT rows per stripe (default: 1024), workers = INT threads (default: number of CPUs)
+    # returns TUPLE (INT32 array of component labels on the analysis grid (-1 = NoData), INT64 array of component
+    # values, INT64 array of component cell counts, TUPLE (geotransform, shape)) - components are numbered in the
+    # order of their first cell (row by row)
+    geotransform, shape = cRa.make_grid([ras])
+    stripes = make_stripes(shape[0], int(kwargs.get("tile_size", 1024)))
+    workers = max(int(kwargs.get("workers", multiprocessing.cpu_count())), 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda s: stripe_runs(ras, geotransform, shape, s[0], s[1]), stripes))
+        offsets = np.cumsum([0] + [r[1].__len__() for r in results])
+        runs = np.empty(shape, dtype=np.int32)
+        for (r0, r1), (stripe, values), offset in zip(stripes, results, offsets):
+            runs[r0:r1] = stripe
+            runs[r0:r1][stripe >= 0] += offset
+        run_values = np.concatenate([r[1] for r in results] + [np.zeros(0, dtype=np.int64)])
+        del results
+        pairs = list(pool.map(lambda s: stripe_pairs(runs, run_values, s[0], s[1]), stripes))
+    roots = union_find(run_values.__len__(), np.concatenate([p[0] for p in pairs] + [np.zeros(0, dtype=np.int64)]),
+                       np.concatenate([p[1] for p in pairs] + [np.zeros(0, dtype=np.int64)]))
+    root_ids, run_components = np.unique(roots, return_inverse=True)
+    run_components = np.append(run_components.reshape(-1).astype(np.int32), np.int32(-1))
+    labels = run_components[runs]  # run id -1 (NoData) picks the appended -1
+    counts = np.bincount(labels[labels >= 0], minlength=root_ids.__len__())
+    return labels, run_values[root_ids], counts, (geotransform, shape)
+
+
+def merge_segments(major, minor, label):
+    # major, minor, label = INT arrays of unit edges sorted by major and minor position
+    # returns TUPLE of INT arrays (first edge, last edge) of the runs of consecutive edges of the same component
+    new = np.ones(label.__len__(), dtype=bool)
+    new[1:] = (major[1:] != major[:-1]) | (minor[1:] != minor[:-1] + 1) | (label[1:] != label[:-1])
+    first = np.flatnonzero(new)
+    return first, np.append(first[1:], label.__len__())[0:first.__len__()] - 1
+
+
+def stripe_segments(labels, r0, r1):
+    # returns TUPLE of INT64 arrays (component label, start vertex id, end vertex id, direction) of the straight
+    # boundary segments of the cells in rows r0 ... r1 - vertices are cell corners (id = row * (cols + 1) + col) and
+    # directions are 0 = east, 1 = south, 2 = west, 3 = north (the component is on the right)
+    rows, cols = labels.shape
+    block = labels[r0:r1]
+    outside = np.full((1, cols), -1, dtype=labels.dtype)
+    up = np.vstack((labels[r0 - 1:r0] if r0 > 0 else outside, block[:-1]))
+    down = np.vstack((block[1:], labels[r1:r1 + 1] if r1 < rows else outside))
+    left = np.pad(block, ((0, 0), (1, 0)), constant_values=-1)[:, :-1]
+    right = np.pad(block, ((0, 0), (0, 1)), constant_values=-1)[:, 1:]
+    n = cols + 1
+    segments = []
+    for direction, neighbour in enumerate((up, right, down, left)):
+        boundary = (block >= 0) & (block != neighbour)
+        if direction in (0, 2):
+            r, c = np.nonzero(boundary)
+            label = block[r, c]
+            first, last = merge_segments(r, c, label)
+        else:
+            c, r = np.nonzero(boundary.T)
+            label = block[r, c]
+            first, last = merge_segments(c, r, label)
+        r, c = r.astype(np.int64) + r0, c.astype(np.int64)
+        if direction == 0:
+            start, end = r[first] * n + c[first], r[first] * n + c[last] + 1
+        elif direction == 1:
+            start, end = r[first] * n + c[first] + 1, (r[last] + 1) * n + c[first] + 1
+        elif direction == 2:
+            start, end = (r[first] + 1) * n + c[last] + 1, (r[first] + 1) * n + c[first]
+        else:
+            start, end = (r[last] + 1) * n + c[first], r[first] * n + c[first]
+        segments.append((label[first].astype(np.int64), start, end, np.full(first.__len__(), direction,
+                                                                            dtype=np.int64)))
+    return tuple(np.concatenate([s[i] for s in segments]) for i in range(0, 4))
+
+
+def cycle_order(successor):
+    # successor = INT64 array of the next element of every element (a permutation of cycles)
+    # returns TUPLE (INT64 array of the elements sorted by cycle and position in the cycle, INT64 array of the
+    # smallest element of the cycle of every sorted element) - cycles are sorted by their smallest element, which
+    # comes first (pointer jumping: O(log(cycle length)) vectorized steps)
+    index = np.arange(successor.__len__(), dtype=np.int64)
+    root, jump = index.copy(), successor.copy()
+    while True:
+        np.minimum(root, root[jump], out=root)
+        jump = jump[jump]
+        if np.array_equal(root, root[successor]):
+            break
+    # distances to the last element of every cycle (the element before the root)
+    following = np.where(successor == root, index, successor)
+    distance = (following != index).astype(np.int64)
+    while True:
+        jumped = following[following]
+        if np.array_equal(jumped, following):
+            break
+        distance += distance[following]
+        following = jumped
+    order = np.lexsort((distance[root] - distance, root))
+    return order, root[order]
+
+
+def trace_rings(labels, **kwargs):
+    # labels = INT array of component labels (-1 = NoData, see label_components)
+    # kwargs: tile_size = INT rows per stripe (default: 1024), workers = INT threads (default: number of CPUs)
+    # returns TUPLE (INT64 array of the vertex ids of all closed rings (corners only), INT64 array of the first vertex
+    # of every ring (and the number of vertices as last entry), INT64 array of ring labels) - rings are sorted by
+    # component and the first ring of a component is its outer boundary
+    rows, cols = labels.shape
+    n_vertices = (rows + 1) * (cols + 1)
+    stripes = make_stripes(rows, int(kwargs.get("tile_size", 1024)))
+    with ThreadPoolExecutor(max_workers=max(int(kwargs.get("workers", multiprocessing.cpu_count())), 1)) as pool:
+        parts = list(pool.map(lambda s: stripe_segments(labels, s[0], s[1]), stripes))
+    label, start, end, direction = (np.concatenate([p[i] for p in parts] + [np.zeros(0, dtype=np.int64)])
+                                    for i in range(0, 4))
+    if label.__len__() == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    keys = (label * n_vertices + start) * 4 + direction
+    order = np.argsort(keys, kind="stable")
+    label, start, end, direction, keys = label[order], start[order], end[order], direction[order], keys[order]
+    successor = np.full(keys.__len__(), -1, dtype=np.int64)
+    for turn in (1, 0, 3):
+        # right turns first: cells of a component that touch at a corner only are not joined there (4-connectivity)
+        # - straight continuations only occur where a segment is split at a stripe boundary
+        candidates = (label * n_vertices + end) * 4 + (direction + turn) % 4
+        position = np.minimum(np.searchsorted(keys, candidates), keys.__len__() - 1)
+        found = (keys[position] == candidates) & (successor < 0)
+        successor[found] = position[found]
+    order, ring_roots = cycle_order(successor)
+    new_ring = np.ones(order.__len__(), dtype=bool)
+    new_ring[1:] = ring_roots[1:] != ring_roots[:-1]
+    ring_ids = np.cumsum(new_ring) - 1
+    firsts = np.flatnonzero(new_ring)
+    lasts = np.append(firsts[1:], order.__len__()) - 1
+    # corners only: segments that continue the direction of their predecessor (stripe boundaries) are dropped
+    ring_dirs = direction[order]
+    previous = np.roll(ring_dirs, 1)
+    previous[firsts] = ring_dirs[lasts]
+    corner = ring_dirs != previous
+    vertices, ring_ids = start[order][corner], ring_ids[corner]
+    ends = np.cumsum(np.bincount(ring_ids, minlength=firsts.__len__()))
+    starts = np.append(0, ends[:-1])
+    rings = np.insert(vertices, ends, vertices[starts])
+    offsets = np.append(starts + np.arange(0, starts.__len__()), rings.__len__())
+    return rings, offsets, label[order[firsts]]
+
+
+def polygonize(ras, out_path, **kwargs):
+    # ras = Raster of INTEGER values (or raster path) - the polygons are made on the analysis grid (environment)
+    # out_path = STR of the output shapefile (fields Id, gridcode and F_AREA (area in squared map units))
+    # kwargs: tile_size = INT rows per stripe (default: 1024), workers = INT threads (default: number of CPUs)
+    #         batch_size = INT of polygons written at once (default: 65536)
+    # returns INT number of polygons
+    logger = logging.getLogger("logfile")
+    ras = cRa.Raster(ras) if not isinstance(ras, cRa.Raster) else ras
+    labels, values, counts, (geotransform, shape) = label_components(ras, **kwargs)
+    rings, offsets, ring_labels = trace_rings(labels, **kwargs)
+    del labels
+    x0, dx, rx, y0, ry, dy = geotransform
+    areas = counts * abs(dx * dy)
+    polygon_rings = np.searchsorted(ring_labels, np.arange(0, values.__len__() + 1))
+    batch_size = max(int(kwargs.get("batch_size", 65536)), 1)
+    with cSh.ShapefileWriter(cRa.normalize_path(out_path), fields) as writer:
+        for k0 in range(0, values.__len__(), batch_size):
+            k1 = min(k0 + batch_size, values.__len__())
+            ring0, ring1 = polygon_rings[k0], polygon_rings[k1]
+            r, c = np.divmod(rings[offsets[ring0]:offsets[ring1]], shape[1] + 1)
+            writer.write_polygons(np.column_stack((x0 + c * dx, y0 + r * dy)),
+                                  offsets[ring0:ring1 + 1] - offsets[ring0], polygon_rings[k0:k1 + 1] - ring0,
+                                  list(zip(range(k0 + 1, k1 + 1), values[k0:k1].tolist(), areas[k0:k1].tolist())))
+    logger.info("      >>> Converted %s to %i polygons." % (str(ras.name), values.__len__()))
+    return int(values.__len__())
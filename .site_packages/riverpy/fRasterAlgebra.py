@@ -0,0 +1,438 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging, re, warnings
+    import numpy as np
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, re, numpy).")
+
+try:
+    from cRaster import CodedRaster, Raster, align, make_grid, merge_lookups, resample
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: cRaster).")
+
+# NumPy implementation of the ArcGIS Spatial Analyst map algebra functions used in River Architect
+# all functions accept Raster objects (or raster paths) and scalars; NoData propagates as in arcpy.sa
+
+
+def as_raster(value):
+    # converts raster paths to Raster objects and leaves scalars untouched
+    if isinstance(value, Raster):
+        return value
+    if isinstance(value, str):
+        return Raster(value)
+    return value
+
+
+def unary(value, function, float_result=False):
+    # applies a local function to a Raster - constants (e.g., Float(5)) are returned as constants
+    value = as_raster(value)
+    if isinstance(value, Raster):
+        return value.unary(function, float_result=float_result)
+    with np.errstate(all="ignore"):
+        return function(np.float64(value) if float_result else np.asarray(value))[()]
+
+
+def Abs(in_raster):
+    return unary(in_raster, np.abs)
+
+
+def CellStatistics(in_rasters, statistics_type="MEAN", ignore_nodata="DATA"):
+    # in_rasters = LIST of Raster objects, raster paths or scalars
+    # statistics_type = STR (MAXIMUM, MINIMUM, MEAN, MEDIAN, SUM, RANGE, STD)
+    # ignore_nodata = STR ("DATA": NoData cells are ignored; "NODATA": any NoData input results in NoData)
+    operands = [as_raster(r) for r in in_rasters]
+    statistics_type = str(statistics_type).upper()
+    if (statistics_type in ("MAXIMUM", "MAX", "MINIMUM", "MIN")) and all(isinstance(o, CodedRaster) for o in operands):
+        lookup = merge_lookups(operands)
+        if lookup is not None:
+            return coded_extreme(operands, lookup, statistics_type in ("MAXIMUM", "MAX"), ignore_nodata)
+    grid, values = align(*operands)
+    integer_input = all(np.asarray(v[0]).dtype.kind in "iub" for v in values)
+    if statistics_type not in ("MEDIAN", "STD"):
+        return streamed_statistics(grid, values, statistics_type, ignore_nodata, integer_input,
+                                   first_spatial_reference(operands))
+    stack = np.empty((values.__len__(),) + tuple(grid[1]), dtype=np.float64)
+    nodata = np.empty(stack.shape, dtype=bool)
+    for i, (data, mask) in enumerate(values):
+        stack[i] = data
+        nodata[i] = mask
+    stack[nodata] = np.nan
+    with np.errstate(all="ignore"):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            if statistics_type == "MEDIAN":
+                result = np.nanmedian(stack, axis=0)
+            else:
+                result = np.nanstd(stack, axis=0)
+    if str(ignore_nodata).upper() == "NODATA":
+        mask = nodata.any(axis=0)
+    else:
+        mask = nodata.all(axis=0)
+    mask = mask | ~np.isfinite(result)
+    return Raster(result, grid[0], mask=mask, spatial_reference=first_spatial_reference(operands))
+
+
+def coded_extreme(operands, lookup, maximum, ignore_nodata):
+    # CellStatistics MAXIMUM / MINIMUM of CodedRasters on their UINT8 codes (the merged lookup table is sorted,
+    # thus the order of the codes is the order of the class values)
+    # returns CodedRaster
+    geotransform, shape = make_grid(operands)
+    result = np.zeros(shape, dtype=np.uint8) if maximum else np.full(shape, 255, dtype=np.uint8)
+    n_valid = np.zeros(shape, dtype=np.uint16)
+    for ras in operands:
+        ras = ras.resample(geotransform, shape)
+        valid = ~ras.mask
+        codes = ras.recode(lookup)
+        if maximum:
+            np.maximum(result, np.where(valid, codes, 0).astype(np.uint8), out=result)
+        else:
+            np.minimum(result, np.where(valid, codes, 255).astype(np.uint8), out=result)
+        n_valid += valid
+    if str(ignore_nodata).upper() == "NODATA":
+        mask = n_valid < operands.__len__()
+    else:
+        mask = n_valid == 0
+    result[mask] = 0
+    if lookup.dtype.kind in "iub":
+        lookup = lookup.astype(np.int32)  # as the integer results of the other CellStatistics
+    return CodedRaster(result, lookup, geotransform, mask=mask, spatial_reference=first_spatial_reference(operands))
+
+
+def max_position(in_rasters, *args):
+    # single-pass CellStatistics(in_rasters, "MAXIMUM", "DATA") that also returns which raster has the maximum
+    # in_rasters = LIST of Raster objects or raster paths
+    # args[0] = STR tie rule: "FIRST" (default: the first raster in in_rasters with the maximum wins) or "LAST"
+    # returns TUPLE (Raster of the maximum (CodedRaster if all inputs are CodedRasters), UINT8 Raster of the 1-based
+    # position of the raster with the maximum) - both are NoData where all inputs are NoData
+    operands = [as_raster(r) for r in in_rasters]
+    if operands.__len__() > 255:
+        raise ValueError("ERROR: max_position supports at most 255 rasters.")
+    try:
+        last = str(args[0]).upper() == "LAST"
+    except IndexError:
+        last = False
+    lookup = merge_lookups(operands) if all(isinstance(o, CodedRaster) for o in operands) else None
+    geotransform, shape = make_grid(operands)
+    position = np.zeros(shape, dtype=np.uint8)
+    best = np.zeros(shape, dtype=np.uint8 if lookup is not None else np.float64)
+    with np.errstate(all="ignore"):
+        for i, ras in enumerate(operands):
+            if lookup is not None:
+                ras = ras.resample(geotransform, shape)
+                values, valid = ras.recode(lookup), ~ras.mask
+            else:
+                values, mask = resample(ras, geotransform, shape)
+                values = np.asarray(values, dtype=np.float64)
+                valid = ~mask & ~np.isnan(values)
+            wins = valid & ((position == 0) | ((values >= best) if last else (values > best)))
+            best[wins] = values[wins]
+            position[wins] = i + 1
+    mask = position == 0
+    spatial_reference = first_spatial_reference(operands)
+    if lookup is not None:
+        if lookup.dtype.kind in "iub":
+            lookup = lookup.astype(np.int32)  # as coded_extreme
+        maximum = CodedRaster(best, lookup, geotransform, mask=mask, spatial_reference=spatial_reference)
+    else:
+        mask = mask | ~np.isfinite(best)
+        if all(o.data.dtype.kind in "iub" for o in operands):
+            best = np.where(mask, 0, best).astype(np.int32)  # as streamed_statistics
+        maximum = Raster(best, geotransform, mask=mask, spatial_reference=spatial_reference)
+    return maximum, Raster(position, geotransform, mask=position == 0, spatial_reference=spatial_reference)
+
+
+def piecewise_linear(in_raster, x_values, y_values):
+    # single-pass evaluation of a curve (e.g., an HSI curve of Fish.xlsx) that equals the maximum of 0.0 and the nested
+    # Con((ras >= x[i-1]) & (ras < x[i]), linear interpolation) segments of cHSI.HHSI: the first segment starts at 0.0
+    # with the first y-value, thus cells at or beyond the last x-value are 0.0 and segments with NaN y-values are 0.0
+    # in_raster = Raster (or raster path or tile)
+    # x_values, y_values = LISTS of FLOATS of the curve points
+    # returns float64 Raster (NoData where the input is NoData or not finite)
+    x_points = np.concatenate(([0.0], np.asarray(x_values, dtype=np.float64)))
+    y_points = np.asarray(y_values, dtype=np.float64)
+    y_points = np.concatenate((y_points[0:1], y_points))
+
+    def evaluate(data):
+        result = np.zeros(data.shape, dtype=np.float64)
+        if x_points.__len__() < 2:
+            return np.where(np.isfinite(data), result, np.nan)
+        if np.all(np.diff(x_points) >= 0.0):
+            # ascending x-values: the segment of every cell follows from one binary search (empty segments of
+            # repeated x-values are never found)
+            upper = np.searchsorted(x_points, data, side="right")
+            inside = (upper >= 1) & (upper < x_points.__len__())
+            upper, values = upper[inside], data[inside]
+            result[inside] = y_points[upper - 1] + ((values - x_points[upper - 1]) / (
+                    x_points[upper] - x_points[upper - 1]) * (y_points[upper] - y_points[upper - 1]))
+        else:
+            for i in range(1, x_points.__len__()):
+                inside = (data >= x_points[i - 1]) & (data < x_points[i])
+                result[inside] = np.fmax(result[inside], y_points[i - 1] + ((data[inside] - x_points[i - 1]) / (
+                        x_points[i] - x_points[i - 1]) * (y_points[i] - y_points[i - 1])))
+        result = np.fmax(result, 0.0)
+        result[~np.isfinite(data)] = np.nan
+        return result
+    return unary(in_raster, evaluate, float_result=True)
+
+
+def streamed_statistics(grid, values, statistics_type, ignore_nodata, integer_input, spatial_reference):
+    # CellStatistics types that reduce the rasters one by one (no (n, rows, cols) float64 stack in memory)
+    # values = LIST of (data, mask) on grid (see align)
+    # returns Raster
+    shape = tuple(grid[1])
+    if statistics_type in ("MAXIMUM", "MAX", "MINIMUM", "MIN", "SUM", "MEAN", "RANGE"):
+        high = np.full(shape, -np.inf)
+        low = np.full(shape, np.inf)
+        total = np.zeros(shape)
+    else:
+        raise ValueError("ERROR: Unsupported CellStatistics type (%s)." % statistics_type)
+    n_present = np.zeros(shape, dtype=np.int32)  # cells that are not NoData
+    n_valid = np.zeros(shape, dtype=np.int32)  # cells that are not NoData or NaN
+    with np.errstate(all="ignore"):
+        for data, mask in values:
+            data = np.broadcast_to(np.asarray(data, dtype=np.float64), shape)
+            present = ~np.broadcast_to(np.asarray(mask, dtype=bool), shape)
+            valid = present & ~np.isnan(data)
+            if statistics_type in ("MAXIMUM", "MAX", "RANGE"):
+                np.maximum(high, np.where(valid, data, -np.inf), out=high)
+            if statistics_type in ("MINIMUM", "MIN", "RANGE"):
+                np.minimum(low, np.where(valid, data, np.inf), out=low)
+            if statistics_type in ("SUM", "MEAN"):
+                total += np.where(valid, data, 0.0)
+            n_present += present
+            n_valid += valid
+        if statistics_type in ("MAXIMUM", "MAX"):
+            result = high
+        elif statistics_type in ("MINIMUM", "MIN"):
+            result = low
+        elif statistics_type == "SUM":
+            result = total
+        elif statistics_type == "MEAN":
+            result = total / n_valid
+        else:
+            result = high - low
+    if str(ignore_nodata).upper() == "NODATA":
+        mask = n_present < values.__len__()
+    else:
+        mask = n_present == 0
+    mask = mask | ~np.isfinite(result)
+    if integer_input and statistics_type in ("MAXIMUM", "MAX", "MINIMUM", "MIN", "SUM", "RANGE"):
+        result = np.where(mask, 0, result).astype(np.int32)
+    return Raster(result, grid[0], mask=mask, spatial_reference=spatial_reference)
+
+
+def Con(in_conditional_raster, in_true_raster_or_constant, in_false_raster_or_constant=None, where_clause=None):
+    # in_conditional_raster = Raster (non-zero = True)
+    # in_true/false_raster_or_constant = Raster or scalar; cells are NoData where the false value is omitted
+    # where_clause = STR of a simple "VALUE <op> <number>" expression applied to the conditional raster
+    condition = as_raster(in_conditional_raster)
+    if where_clause:
+        condition = evaluate_where(condition, where_clause)
+    true_value = as_raster(in_true_raster_or_constant)
+    false_value = as_raster(in_false_raster_or_constant)
+    if isinstance(condition, Raster) and isinstance(true_value, CodedRaster) and (
+            (false_value is None) or isinstance(false_value, CodedRaster)):
+        coded = coded_con(condition, true_value, false_value)
+        if coded is not None:
+            return coded
+    if false_value is None:
+        grid, values = align(condition, true_value)
+        (c, mc), (t, mt) = values
+        selected = (c != 0) & ~mc
+        data = np.broadcast_to(t, grid[1])
+        mask = ~selected | (mt & selected)
+        result = scalar_dtype(np.array(data))
+        return Raster(result, grid[0], mask=mask, spatial_reference=first_spatial_reference([condition]))
+    grid, values = align(condition, true_value, false_value)
+    (c, mc), (t, mt), (f, mf) = values
+    selected = (c != 0)
+    result = scalar_dtype(np.where(selected, t, f))
+    mask = mc | np.where(selected, mt, mf)
+    if result.dtype.kind == "f":
+        mask |= ~np.isfinite(result)
+    return Raster(np.array(result), grid[0], mask=mask, spatial_reference=first_spatial_reference([condition]))
+
+
+def coded_con(condition, true_value, false_value):
+    # Con of CodedRasters that keeps the UINT8 codes (e.g., cropping a lifespan raster to the wetted area)
+    # returns CodedRaster or None if the lookup tables of true_value and false_value have more than 256 classes
+    operands = [condition, true_value] + ([] if false_value is None else [false_value])
+    lookup = merge_lookups(operands[1:])
+    if lookup is None:
+        return None
+    geotransform, shape = make_grid(operands)
+    c, mc = resample(condition, geotransform, shape)
+    selected = (c != 0)
+    true_value = true_value.resample(geotransform, shape)
+    if false_value is None:
+        mask = ~selected | mc | true_value.mask
+        codes = true_value.recode(lookup)
+    else:
+        false_value = false_value.resample(geotransform, shape)
+        mask = mc | np.where(selected, true_value.mask, false_value.mask)
+        codes = np.where(selected, true_value.recode(lookup), false_value.recode(lookup))
+    codes[mask] = 0
+    return CodedRaster(codes, lookup, geotransform, mask=mask, spatial_reference=condition.spatialReference)
+
+
+def Cos(in_raster):
+    return unary(in_raster, np.cos, float_result=True)
+
+
+def Exp(in_raster):
+    return unary(in_raster, np.exp, float_result=True)
+
+
+def Float(in_raster):
+    ras = as_raster(in_raster)
+    if isinstance(ras, CodedRaster):
+        # the lookup table is converted (the codes are shared)
+        if ras.lookup.dtype == np.float64:
+            return ras
+        return CodedRaster(ras.codes, ras.lookup.astype(np.float64), ras.geotransform, mask=ras.mask,
+                           spatial_reference=ras._spatial_reference, name=ras.name)
+    return unary(in_raster, lambda a: a.astype(np.float64), float_result=True)
+
+
+def Int(in_raster):
+    # truncates toward zero as arcpy.sa.Int
+    ras = as_raster(in_raster)
+    if not isinstance(ras, Raster):
+        return int(ras)
+    mask = ras.mask
+    with np.errstate(all="ignore"):
+        result = np.trunc(ras.data).astype(np.int32)
+    result[mask] = 0
+    return Raster(result, ras.geotransform, mask=mask.copy(), spatial_reference=ras.spatialReference)
+
+
+def InList(in_raster, in_list):
+    # returns 1 where the input value is in in_list and 0 elsewhere (NoData where the input is NoData)
+    # CodedRasters (e.g., MU classes) are compared on their UINT8 codes
+    ras = as_raster(in_raster)
+    if isinstance(ras, CodedRaster):
+        selected = np.isin(ras.lookup, np.asarray(in_list))
+        hit = selected[ras.codes]
+    else:
+        hit = np.isin(ras.data, np.asarray(in_list))
+    mask = ras.mask
+    return Raster((hit & ~mask).astype(np.int32), ras.geotransform, mask=mask, spatial_reference=ras.spatialReference)
+
+
+def IsNull(in_raster):
+    # returns 1 where the input is NoData and 0 elsewhere (never NoData)
+    ras = as_raster(in_raster)
+    mask = ras.mask
+    return Raster(mask.astype(np.int32), ras.geotransform, mask=np.zeros(mask.shape, dtype=bool),
+                  spatial_reference=ras.spatialReference)
+
+
+def Ln(in_raster):
+    return unary(in_raster, np.log, float_result=True)
+
+
+def Log10(in_raster):
+    return unary(in_raster, np.log10, float_result=True)
+
+
+def Power(in_raster_or_constant1, in_raster_or_constant2):
+    base = as_raster(in_raster_or_constant1)
+    exponent = as_raster(in_raster_or_constant2)
+    if isinstance(base, Raster):
+        return base.__pow__(exponent)
+    return exponent.__rpow__(base)
+
+
+def RemapValue(remap_table):
+    # remap_table = LIST of [old_value, new_value] pairs
+    return [[old, new] for old, new in remap_table]
+
+
+def Reclassify(in_raster, reclass_field, remap, missing_values="DATA"):
+    # in_raster = Raster
+    # reclass_field = STR (only "Value" is supported)
+    # remap = LIST from RemapValue
+    # missing_values = STR ("DATA": unmatched cells keep their value; "NODATA": unmatched cells become NoData)
+    ras = as_raster(in_raster)
+    data = ras.data
+    result = np.array(data, dtype=np.int64 if data.dtype.kind in "iub" else np.float64)
+    matched = np.zeros(data.shape, dtype=bool)
+    mask = ras.mask.copy()
+    for old, new in remap:
+        if isinstance(old, str):
+            if old.upper() == "NODATA":
+                hit = ras.mask
+            else:
+                continue
+        else:
+            hit = (data == old) & ~ras.mask
+        if isinstance(new, str) and new.upper() == "NODATA":
+            mask |= hit
+        else:
+            result[hit] = new
+            mask[hit] = False
+        matched |= hit
+    if str(missing_values).upper() == "NODATA":
+        mask |= ~matched
+    if result.dtype.kind == "i":
+        result = result.astype(np.int32)
+    return Raster(result, ras.geotransform, mask=mask, spatial_reference=ras.spatialReference)
+
+
+def SetNull(in_conditional_raster, in_false_raster_or_constant, where_clause=None):
+    # cells where the condition is True become NoData, all other cells take the false value
+    condition = as_raster(in_conditional_raster)
+    if where_clause:
+        condition = evaluate_where(condition, where_clause)
+    false_value = as_raster(in_false_raster_or_constant)
+    grid, values = align(condition, false_value)
+    (c, mc), (f, mf) = values
+    result = scalar_dtype(np.array(np.broadcast_to(f, grid[1])))
+    mask = mc | (c != 0) | mf
+    return Raster(result, grid[0], mask=mask, spatial_reference=first_spatial_reference([condition]))
+
+
+def Sin(in_raster):
+    return unary(in_raster, np.sin, float_result=True)
+
+
+def Square(in_raster):
+    return unary(in_raster, np.square)
+
+
+def SquareRoot(in_raster):
+    return unary(in_raster, np.sqrt, float_result=True)
+
+
+def evaluate_where(ras, where_clause):
+    # where_clause = STR such as "VALUE > 0" or "Value = 1"
+    expression = re.match(r"^\s*\"?value\"?\s*(<=|>=|<>|!=|==|=|<|>)\s*(-?[0-9.eE+-]+)\s*$", str(where_clause),
+                          re.IGNORECASE)
+    if not expression:
+        raise ValueError("ERROR: Unsupported where clause (%s)." % str(where_clause))
+    operator, value = expression.group(1), float(expression.group(2))
+    if operator in ("=", "=="):
+        return ras == value
+    if operator in ("<>", "!="):
+        return ras != value
+    if operator == "<":
+        return ras < value
+    if operator == "<=":
+        return ras <= value
+    if operator == ">":
+        return ras > value
+    return ras >= value
+
+
+def scalar_dtype(array):
+    # 64-bit integers originate from Python scalars - ArcGIS-compatible rasters use 32-bit integers
+    if array.dtype == np.int64:
+        return array.astype(np.int32)
+    return array
+
+
+def first_spatial_reference(operands):
+    for o in operands:
+        if isinstance(o, Raster):
+            return o.spatialReference
+    return None
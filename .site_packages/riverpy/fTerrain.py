@@ -0,0 +1,150 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging, hashlib, json, threading
+    import numpy as np
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, hashlib, json, threading, numpy).")
+
+try:
+    import cRaster as cRa
+    import cTileExecutor as cTE
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: cRaster, cTileExecutor).")
+
+# Terrain derivatives of DEMs (NumPy backend): slope and aspect follow Horn's (1981) third-order finite difference
+# method and the curvatures follow Zevenbergen and Thorne (1987) as the ArcGIS Spatial Analyst tools
+# fields (NoData where the DEM is NoData):
+#   slope             = slope in degrees (Slope(dem, "DEGREE"))
+#   slope_percent     = slope in percent rise (Slope(dem, "PERCENT_RISE"))
+#   aspect            = downslope direction in degrees clockwise from north (-1 = flat)
+#   curvature         = curvature in 1/100 z-units (positive = upwardly convex)
+#   profile_curvature = curvature in the direction of the maximum slope (negative = upwardly convex)
+#   plan_curvature    = curvature perpendicular to the maximum slope (positive = sidewardly convex)
+# terrain_rasters derives the fields tile-wise with a one-cell halo and stores them next to the DEM (.terrain/), thus
+# the lifespan, design and project analyses read the DEM once and reuse the fields until the DEM changes
+fields = ("slope", "slope_percent", "aspect", "curvature", "profile_curvature", "plan_curvature")
+version = 1
+
+
+def window_cells(ras, z_factor=1.0):
+    # ras = Raster of a DEM (or a DEM tile including its halo)
+    # returns LIST of the 9 float64 arrays [a, b, c, d, e, f, g, h, i] of the 3x3 windows around each cell (e = center,
+    # b = north) - NoData neighbours and cells beyond the raster edge take the value of the center cell
+    z = ras.data.astype(np.float64) * float(z_factor)
+    z[ras.mask] = np.nan
+    padded = np.pad(z, 1, mode="constant", constant_values=np.nan)
+    rows, cols = z.shape
+    cells = []
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            window = padded[1 + dr:rows + 1 + dr, 1 + dc:cols + 1 + dc]
+            cells.append(z if (dr == 0 and dc == 0) else np.where(np.isnan(window), z, window))
+    return cells
+
+
+def horn_gradients(cells, cell_width, cell_height):
+    # cells = LIST of 3x3 window arrays (see window_cells)
+    # returns TUPLE of numpy arrays (dz/dx, dz/dy) with x = east and y = south
+    a, b, c, d, e, f, g, h, i = cells
+    dz_dx = ((c + 2 * f + i) - (a + 2 * d + g)) / (8.0 * cell_width)
+    dz_dy = ((g + 2 * h + i) - (a + 2 * b + c)) / (8.0 * cell_height)
+    return dz_dx, dz_dy
+
+
+def aspect_degrees(dz_dx, dz_dy):
+    # returns numpy array of the compass direction (degrees clockwise from north) of the steepest descent (-1 = flat)
+    with np.errstate(all="ignore"):
+        aspect = np.degrees(np.arctan2(dz_dy, -dz_dx))
+    compass = np.where(aspect < 0, 90.0 - aspect, np.where(aspect > 90.0, 450.0 - aspect, 90.0 - aspect))
+    return np.where((dz_dx == 0) & (dz_dy == 0), -1.0, compass)
+
+
+def curvatures(cells, cell_width, cell_height):
+    # returns DICT {field: numpy array} of curvature, profile_curvature and plan_curvature (1/100 z-units)
+    a, b, c, d, e, f, g, h, i = cells
+    coef_d = ((d + f) / 2.0 - e) / cell_width ** 2
+    coef_e = ((b + h) / 2.0 - e) / cell_height ** 2
+    coef_f = (-a + c + g - i) / (4.0 * cell_width * cell_height)
+    coef_g = (-d + f) / (2.0 * cell_width)
+    coef_h = (b - h) / (2.0 * cell_height)
+    gradient = coef_g ** 2 + coef_h ** 2
+    with np.errstate(all="ignore"):
+        profile = np.where(gradient > 0, 2.0 * (coef_d * coef_g ** 2 + coef_e * coef_h ** 2 +
+                                                 coef_f * coef_g * coef_h) / gradient, 0.0)
+        plan = np.where(gradient > 0, -2.0 * (coef_d * coef_h ** 2 + coef_e * coef_g ** 2 -
+                                              coef_f * coef_g * coef_h) / gradient, 0.0)
+    return {"curvature": -200.0 * (coef_d + coef_e), "profile_curvature": 100.0 * profile,
+            "plan_curvature": 100.0 * plan}
+
+
+def derive(ras, names, z_factor=1.0):
+    # ras = Raster of a DEM (or a DEM tile including its halo)
+    # names = LIST of fields (see fields)
+    # z_factor = FLOAT that converts z-units to x,y-units
+    # returns DICT {field: Raster} (in memory)
+    unknown = [n for n in names if n not in fields]
+    if unknown:
+        raise ValueError("ERROR: Unknown terrain field(s) %s." % ", ".join(unknown))
+    cells = window_cells(ras, z_factor)
+    results = {}
+    if any(n in ("slope", "slope_percent", "aspect") for n in names):
+        dz_dx, dz_dy = horn_gradients(cells, ras.meanCellWidth, ras.meanCellHeight)
+        rise_run = np.sqrt(dz_dx ** 2 + dz_dy ** 2)
+        if "slope" in names:
+            results.update({"slope": np.degrees(np.arctan(rise_run))})
+        if "slope_percent" in names:
+            results.update({"slope_percent": rise_run * 100.0})
+        if "aspect" in names:
+            results.update({"aspect": aspect_degrees(dz_dx, dz_dy)})
+    if any("curvature" in n for n in names):
+        results.update({n: c for n, c in curvatures(cells, ras.meanCellWidth, ras.meanCellHeight).items()
+                        if n in names})
+    mask = ras.mask
+    return {n: cRa.Raster(results[n], ras.geotransform, mask=mask.copy(), spatial_reference=ras.spatialReference)
+            for n in names}
+
+
+def terrain_key(dem, names, z_factor, geotransform, shape):
+    # returns STR md5 hash of the DEM file (path, mtime, size), the fields, the z_factor and the output grid
+    stat = os.stat(dem.path)
+    return hashlib.md5(json.dumps([os.path.abspath(dem.path), stat.st_mtime, stat.st_size, sorted(names),
+                                   float(z_factor), list(geotransform), list(shape), version]).encode()).hexdigest()
+
+
+def terrain_rasters(dem, names, z_factor=1.0, **kwargs):
+    # dem = Raster or raster path of a DEM
+    # names = LIST of fields (see fields)
+    # z_factor = FLOAT that converts z-units to x,y-units
+    # kwargs: cache_dir = STR of the directory of stored fields (default: DEM_DIRECTORY/.terrain/)
+    #         store = BOOL (default: True) - False derives the fields in memory (e.g., for a tile of a fused analysis)
+    #         tile_size = INT (default: 1024)
+    # returns DICT {field: Raster} on the analysis grid (geoprocessing environment) - fields that are not stored yet
+    # for the DEM, z_factor and grid are derived in one tile-wise pass and written as GeoTIFFs
+    logger = logging.getLogger("logfile")
+    dem = cRa.Raster(dem) if not isinstance(dem, cRa.Raster) else dem
+    names = list(names)
+    if (dem.path is None) or not kwargs.get("store", True):
+        # in-memory DEMs (e.g., modified terrain) cannot be stamped
+        geotransform, shape = cRa.make_grid([dem])
+        data, mask = dem.read_window(geotransform, shape)
+        return derive(cRa.Raster(data, geotransform, mask=mask, spatial_reference=dem.spatialReference), names,
+                      z_factor)
+    cache_dir = kwargs.get("cache_dir", os.path.join(os.path.dirname(dem.path), ".terrain"))
+    executor = cTE.TileExecutor({"dem": dem}, tile_size=kwargs.get("tile_size", 1024), halo=1)
+    paths = {}
+    for name in names:
+        key = terrain_key(dem, [name], z_factor, executor.geotransform, executor.shape)
+        paths.update({name: os.path.join(cache_dir, "%s_%s.tif" % (name, key[0:12]))})
+    missing = [n for n in names if not os.path.isfile(paths[n])]
+    if missing:
+        logger.info("      >>> Deriving terrain %s of %s ..." % (", ".join(missing), str(dem.name)))
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+        # concurrent analyses write separate files and replace the stored fields atomically
+        tmp_paths = {n: "%s.%i.%i.tmp" % (paths[n], os.getpid(), threading.get_ident()) for n in missing}
+        executor.run(lambda tile: derive(tile["dem"], missing, z_factor), tmp_paths)
+        for name in missing:
+            os.replace(tmp_paths[name], paths[name])
+    else:
+        logger.info("      >>> Using stored terrain %s of %s." % (", ".join(names), str(dem.name)))
+    return {n: cRa.Raster(paths[n]) for n in names}
@@ -0,0 +1,130 @@
+#!/usr/bin/python
+try:
+    import os, sys, logging, multiprocessing
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: concurrent, os, sys, logging, multiprocessing, "
+          "numpy).")
+
+try:
+    import cRaster as cRa
+    import cTileExecutor as cTE
+except:
+    print("ExceptionERROR: Missing RiverArchitect packages (required: cRaster, cTileExecutor).")
+
+# Zonal statistics of rasters (NumPy backend) that replace the conversion of rasters to polygons for summing F_AREA
+# zones are INTEGER labels (e.g., the gridcode of RasterToPolygon) or a mask (all cells that are not NoData form zone 1)
+# and the statistics are reduced in one tile-wise pass (threads) with bincount:
+#   count         = number of zone cells
+#   area          = count * cell area (squared map units, as the F_AREA of the polygons)
+#   sum, mean, min, max = statistics of the value raster cells in the zone (NaN where the zone has no values)
+#   weighted_area = sum of cell area * weight (e.g., cHSI for the weighted usable area; NoData weights are 0)
+statistics = ("count", "area", "sum", "mean", "min", "max", "weighted_area")
+
+
+def reduce_tile(tile, mask_zones):
+    # tile = DICT {"zones": Raster, "values": Raster (optional), "weights": Raster (optional)}
+    # mask_zones = BOOL (True: all cells that are not NoData are zone 1)
+    # returns TUPLE (INT64 array of zones, DICT {reduction: float64 array}) of the zones in the tile
+    zones = tile["zones"]
+    present = ~zones.mask
+    if mask_zones:
+        labels = np.ones(int(present.sum()), dtype=np.int64)
+    elif np.asarray(zones.data).dtype.kind == "f":
+        raise ValueError("ERROR: Zonal statistics require an integer zone raster.")
+    else:
+        labels = np.asarray(zones.data)[present].astype(np.int64)
+    ids, index = np.unique(labels, return_inverse=True)
+    index = index.reshape(-1)
+    reductions = {"count": np.bincount(index, minlength=ids.__len__()).astype(np.float64)}
+    if "values" in tile.keys():
+        values = np.asarray(tile["values"].data, dtype=np.float64)[present]
+        valid = ~tile["values"].mask[present] & ~np.isnan(values)
+        values, valid_index = values[valid], index[valid]
+        reductions.update({"n": np.bincount(valid_index, minlength=ids.__len__()).astype(np.float64),
+                           "sum": np.bincount(valid_index, weights=values, minlength=ids.__len__())})
+        reductions.update({"min": np.full(ids.__len__(), np.inf), "max": np.full(ids.__len__(), -np.inf)})
+        np.minimum.at(reductions["min"], valid_index, values)
+        np.maximum.at(reductions["max"], valid_index, values)
+    if "weights" in tile.keys():
+        weights = np.asarray(tile["weights"].data, dtype=np.float64)[present]
+        weights[tile["weights"].mask[present] | np.isnan(weights)] = 0.0
+        reductions.update({"weight": np.bincount(index, weights=weights, minlength=ids.__len__())})
+    return ids, reductions
+
+
+def merge_reductions(total, part):
+    # total, part = TUPLES (INT64 array of zones, DICT {reduction: float64 array}) (see reduce_tile)
+    # returns TUPLE of the reductions of both
+    ids = np.union1d(total[0], part[0])
+    merged = {}
+    for name, part_values in part[1].items():
+        fill = np.inf if name == "min" else (-np.inf if name == "max" else 0.0)
+        values = np.full(ids.__len__(), fill)
+        for source_ids, source in ((total[0], total[1].get(name)), (part[0], part_values)):
+            if source is None:
+                continue
+            position = np.searchsorted(ids, source_ids)
+            if name == "min":
+                values[position] = np.minimum(values[position], source)
+            elif name == "max":
+                values[position] = np.maximum(values[position], source)
+            else:
+                values[position] += source
+        merged.update({name: values})
+    return ids, merged
+
+
+def zonal_statistics(zones, **kwargs):
+    # zones = Raster (or raster path) of INTEGER zone labels (mask=True: any raster)
+    # kwargs: values = Raster (or raster path) for sum, mean, min and max (default: None)
+    #         weights = Raster (or raster path) of cell weights for the weighted_area (default: None)
+    #         mask = BOOL all cells that are not NoData form zone 1 (default: False)
+    #         tile_size = INT (default: 1024), workers = INT threads (default: number of CPUs)
+    # returns DICT {INT zone: DICT {statistic: FLOAT}} on the analysis grid (geoprocessing environment)
+    logger = logging.getLogger("logfile")
+    mask_zones = bool(kwargs.get("mask", False))
+    rasters = {"zones": zones}
+    for name in ("values", "weights"):
+        if kwargs.get(name) is not None:
+            rasters.update({name: kwargs[name]})
+    executor = cTE.TileExecutor(rasters, tile_size=kwargs.get("tile_size", 1024))
+    workers = max(int(kwargs.get("workers", multiprocessing.cpu_count())), 1)
+    total = (np.zeros(0, dtype=np.int64), {})
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(lambda window: reduce_tile(executor.read_tile(window), mask_zones), executor.windows()):
+            total = merge_reductions(total, part)
+    cell_area = abs(executor.geotransform[1] * executor.geotransform[5])
+    ids, reductions = total
+    results = {}
+    for k, zone in enumerate(ids.tolist()):
+        count = reductions["count"][k]
+        stats = {"count": int(count), "area": float(count * cell_area)}
+        if "n" in reductions.keys():
+            n = reductions["n"][k]
+            stats.update({"sum": float(reductions["sum"][k]) if n else np.nan,
+                          "mean": float(reductions["sum"][k] / n) if n else np.nan,
+                          "min": float(reductions["min"][k]) if n else np.nan,
+                          "max": float(reductions["max"][k]) if n else np.nan})
+        if "weight" in reductions.keys():
+            stats.update({"weighted_area": float(reductions["weight"][k] * cell_area)})
+        results.update({zone: stats})
+    logger.info("      >>> Zonal statistics of %i zone(s) in %s." % (results.__len__(),
+                                                                     str(executor.rasters["zones"].name)))
+    return results
+
+
+def mask_statistics(mask, **kwargs):
+    # mask = Raster (or raster path) whose cells that are not NoData form the zone
+    # kwargs: values, weights, tile_size, workers (see zonal_statistics)
+    # returns DICT {statistic: FLOAT} of the mask zone (count and areas are 0 if the mask is empty)
+    kwargs.update({"mask": True})
+    stats = zonal_statistics(mask, **kwargs).get(1)
+    if stats is None:
+        stats = {"count": 0, "area": 0.0}
+        if kwargs.get("values") is not None:
+            stats.update({"sum": np.nan, "mean": np.nan, "min": np.nan, "max": np.nan})
+        if kwargs.get("weights") is not None:
+            stats.update({"weighted_area": 0.0})
+    return stats
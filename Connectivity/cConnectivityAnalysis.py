@@ -11,13 +11,16 @@ try:
 except:
     print("ExceptionERROR: Cannot import cGraph or cRatingCurves (check Connectivity directory)")
 try:
-    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\.site_packages\\riverpy\\")
+    sys.path.append(os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), ".site_packages", "riverpy"))
     import config
     import cFlows as cFl
     import cFish as cFi
     import fGlobal as fGl
     import cMakeTable as cMkT
     import cInputOutput as cIO
+    import cPartialStore as cPS
+    import cRaster as cRa
+    import fPolygonize as fPo
 except:
     print("ExceptionERROR: Missing RiverArchitect packages (required: riverpy).")
 
@@ -102,6 +105,9 @@ class ConnectivityAnalysis:
         fGl.chk_dir(self.areas_dir)
         self.disc_areas_dir = os.path.join(self.out_dir, "disc_areas\\")
         fGl.chk_dir(self.disc_areas_dir)
+        # per-discharge partials: interpolated velocities and shortest paths of unchanged discharges are kept
+        self.interp_partials = cPS.PartialStore(self.u_interp_dir, "interp")
+        self.path_partials = cPS.PartialStore(self.shortest_paths_dir, "paths")
         # populated by self.get_hydraulic_rasters()
         self.discharges = []
         self.Q_h_dict = {}
@@ -174,6 +180,15 @@ class ConnectivityAnalysis:
             dem_path = self.dir2condition + "dem.tif"
 
             h_path = self.Q_h_dict[Q]
+            key = self.interp_partials.make_key([h_path, dem_path, self.Q_u_dict[Q], self.Q_va_dict.get(Q, "")],
+                                                method=self.method, analyze_v=self.analyze_v)
+            if self.interp_partials.is_current(u_interp_basename, key) and os.path.isfile(h_interp_path):
+                self.logger.info("Using existing interpolated rasters (unchanged inputs, Q = %i %s)" % (Q, self.q_units))
+                self.Q_h_interp_dict[Q] = h_interp_path
+                if self.analyze_v:
+                    self.Q_u_interp_dict[Q] = u_interp_path
+                    self.Q_va_interp_dict[Q] = va_interp_path
+                continue
             wle = cWL.WLE(h_path, dem_path, self.h_interp_dir, unique_id=True, method=self.method)
             # check if interpolated depth already exists and uses selected interpolation method
             # if not, create new interpolated depth raster
@@ -192,6 +207,7 @@ class ConnectivityAnalysis:
                 va_ras.save(va_interp_path)
                 self.Q_u_interp_dict[Q] = u_interp_path
                 self.Q_va_interp_dict[Q] = va_interp_path
+                self.interp_partials.update(u_interp_basename, key)
         self.logger.info("OK")
 
     def get_hsi_rasters(self, cover=True):
@@ -243,6 +259,19 @@ class ConnectivityAnalysis:
         # integer type masked raster for polygon conversion
         bin_h = Con(h_ras > self.h_min, 1)
         self.logger.info("OK")
+        if fGl.numpy_backend():
+            # the largest area is the connected component with the most cells (no polygons with area fields)
+            self.logger.info("Labelling connected areas...")
+            labels, values, counts, (geotransform, shape) = fPo.label_components(bin_h)
+            if not counts.__len__():
+                self.logger.info("ERROR: No cells deeper than %s at Q = %i." % (str(self.h_min), int(Q_min)))
+                return
+            self.target = os.path.join(self.out_dir, "target.tif")
+            target = labels == int(np.argmax(counts))
+            cRa.Raster(target.astype(np.uint8), geotransform, mask=~target,
+                       spatial_reference=h_ras.spatialReference).save(self.target)
+            self.logger.info("OK.")
+            return
         # raster to polygon conversion
         self.logger.info("Converting raster to polygon...")
         areas_shp_path = os.path.join(self.cache, "areas%06d.shp" % int(Q_min))
@@ -293,6 +322,17 @@ class ConnectivityAnalysis:
         self.logger.info("Physical Habitat: %s - %s" % (self.species, self.lifestage))
         self.logger.info("\tminimum swimming depth  = %s %s" % (self.h_min, self.length_units))
         self.logger.info("\tmaximum swimming speed  = %s %s" % (self.u_max, self.u_units))
+        out_ras_basename = "path_lengths%06d.tif" % int(Q)
+        out_ras_name = os.path.join(self.shortest_paths_dir, out_ras_basename)
+        # the paths depend on the hydraulics of Q and on the target (lowest discharge)
+        key = self.path_partials.make_key(
+            [self.Q_h_dict[Q], self.Q_u_dict[Q], self.Q_va_dict.get(Q, ""), self.Q_h_dict[min(self.discharges)],
+             self.dir2condition + "dem.tif"],
+            method=self.method, analyze_v=self.analyze_v, h_min=self.h_min, u_max=self.u_max)
+        if self.path_partials.is_current(out_ras_basename, key):
+            self.logger.info("Using existing shortest paths raster (unchanged inputs): %s" % out_ras_name)
+            self.Q_escape_dict[Q] = out_ras_name
+            return
         path2h_ras = self.Q_h_interp_dict[Q]
         if self.analyze_v:
             path2u_ras = self.Q_u_interp_dict[Q]
@@ -303,9 +343,9 @@ class ConnectivityAnalysis:
         cg = cGraph.Graphy(path2h_ras, path2u_ras, path2va_ras, self.h_min, self.u_max, self.target)
         shortest_paths_ras = cg.find_shortest_paths()
         self.logger.info("Saving shortest paths raster...")
-        out_ras_name = os.path.join(self.shortest_paths_dir, "path_lengths%06d.tif" % int(Q))
         shortest_paths_ras.save(out_ras_name)
         self.Q_escape_dict[Q] = out_ras_name
+        self.path_partials.update(out_ras_basename, key)
         self.logger.info("OK")
 
     def disconnected_areas(self, Q):
@@ -523,6 +563,10 @@ class ConnectivityAnalysis:
         for Q in sorted(self.discharges, reverse=True):
             self.make_shortest_paths_map(Q)
             self.disconnected_areas(Q)
+        # shortest paths of removed discharges
+        for name in self.path_partials.prune(["path_lengths%06d.tif" % int(Q) for Q in self.discharges], True):
+            self.logger.info("Removed %s (discharge no longer in the condition)" % name)
+        self.path_partials.log_statistics()
         # close disconnected area workbook
         self.xlsx_writer.save_close_wb(self.xlsx)
 
@@ -9,7 +9,7 @@ try:
 except:
     print("ExceptionERROR: Missing fundamental packages (required: collections, numpy).")
 try:
-    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\.site_packages\\riverpy\\")
+    sys.path.append(os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), ".site_packages", "riverpy"))
     import config
     import cFish as cFi
     import fGlobal as fGl
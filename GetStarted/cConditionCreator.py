@@ -16,6 +16,7 @@ try:
     import cMakeTable as cMT
     import cMakeInp as cMI
     import cFlows as cFl
+    import cHydraulicCube as cHC
 except:
     print("ExceptionERROR: Missing RiverArchitect packages (required: riverpy).")
 
@@ -103,6 +104,17 @@ class ConditionCreator:
         except:
             self.error = True
 
+    def make_hydraulic_cube(self):
+        # writes the memory-mapped discharge x rows x cols store of h, u and va rasters (see riverpy/cHydraulicCube.py)
+        self.logger.info(" > Building hydraulic cube of %s ..." % self.condition)
+        try:
+            if cHC.HydraulicCube(self.dir2condition).build() < 0:
+                self.warning = True
+        except Exception as e:
+            self.logger.info(e)
+            self.logger.info("WARNING: Failed to build the hydraulic cube (rasters will be read from GeoTIFFs).")
+            self.warning = True
+
     def make_mu(self, unit, h_ras_dir, u_ras_dir):
         # unit = STR (either "us" or "si")
         mu = cMU.MU(unit, self.dir2condition)
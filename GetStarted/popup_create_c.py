@@ -238,6 +238,7 @@ class CreateCondition(object):
             new_condition.fix_alignment(snap_ras)
 
         new_condition.check_alignment(self.dir2new_condition)
+        new_condition.make_hydraulic_cube()
 
         self.top.bell()
         try:
@@ -0,0 +1,107 @@
+# !/usr/bin/python
+try:
+    import sys, os, logging, shutil, time
+    import numpy as np
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, shutil, time, numpy).")
+
+try:
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import feature_analysis as fa
+    sys.path.append(os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), ".site_packages", "riverpy"))
+    import cDefinitions as cDef
+    import cRaster as cRa
+    import cRasterCache as cRC
+    import fGlobal as fGl
+except:
+    print("ExceptionERROR: Cannot find RiverArchitect/.site_packages/riverpy.")
+
+
+def compare_outputs(dir_a, dir_b):
+    # returns LIST of STR describing output rasters that differ between dir_a and dir_b (empty if identical)
+    differences = []
+    names_a = sorted(n for n in os.listdir(dir_a) if n.endswith(".tif"))
+    names_b = sorted(n for n in os.listdir(dir_b) if n.endswith(".tif"))
+    for name in sorted(set(names_a) ^ set(names_b)):
+        differences.append("%s: missing in one output" % name)
+    for name in sorted(set(names_a) & set(names_b)):
+        ras_a = cRa.Raster(os.path.join(dir_a, name))
+        ras_b = cRa.Raster(os.path.join(dir_b, name))
+        if not ((ras_a.geotransform == ras_b.geotransform) and (ras_a.shape == ras_b.shape)):
+            differences.append("%s: different grid" % name)
+        elif not (np.array_equal(ras_a.mask, ras_b.mask) and
+                  np.array_equal(ras_a.data[~ras_a.mask], ras_b.data[~ras_b.mask])):
+            differences.append("%s: different values" % name)
+    return differences
+
+
+def run_mode(condition, reach_ids, feature_list, unit_system, manning_n, batch):
+    # returns TUPLE (FLOAT seconds, LIST of output directories) of a raster_maker run
+    cRC.raster_cache.clear()  # every run starts with decoding the inputs (stored caches are kept, see benchmark)
+    start = time.time()
+    outputs = fa.raster_maker(condition, reach_ids, feature_list, False, False, unit_system, False, manning_n,
+                              "standard", fused=True, batch=batch, use_cache=False)
+    return time.time() - start, outputs
+
+
+def benchmark(condition, *args):
+    # times raster_maker with one tile sweep per feature against the multi-feature batch sweep
+    # both modes parse the thresholds workbook and encode the output GeoTIFFs per feature, which dominate the runtime
+    # of small and medium grids - expect a speedup near 1.0x unless input reads dominate (large grids, slow disks)
+    # args[0] = LIST of feature names (default: all features of threshold_values.xlsx)
+    # args[1] = LIST of reach IDs (default: ["none"])
+    # args[2] = STR of the unit system (default: "us")
+    # args[3] = FLOAT of manning's n in s/m^(1/3) (default: 0.0473934)
+    # returns DICT {"single": seconds, "batch": seconds, "differences": LIST}
+    logger = logging.getLogger("logfile")
+    try:
+        feature_list = args[0] if args[0].__len__() > 0 else cDef.FeatureDefinitions(False).name_list
+    except:
+        feature_list = cDef.FeatureDefinitions(False).name_list
+    try:
+        reach_ids = args[1]
+    except:
+        reach_ids = ["none"]
+    try:
+        unit_system = args[2]
+    except:
+        unit_system = "us"
+    try:
+        manning_n = float(args[3])
+    except:
+        manning_n = 0.0473934
+    if not fGl.numpy_backend():
+        logger.info("ERROR: The batch benchmark requires the NumPy backend.")
+        return {}
+
+    # untimed warm-up run: the first run builds the hydraulic cube, the derived hydraulics and the terrain caches of
+    # the condition, which would otherwise be timed in the first mode only
+    run_mode(condition, reach_ids, feature_list, unit_system, manning_n, True)
+    t_single, outputs = run_mode(condition, reach_ids, feature_list, unit_system, manning_n, False)
+    copies = []
+    for out_dir in outputs:
+        copies.append(out_dir.rstrip("\\/") + "_single")
+        if os.path.exists(copies[-1]):
+            shutil.rmtree(copies[-1])
+        shutil.copytree(out_dir, copies[-1])
+    t_batch, outputs = run_mode(condition, reach_ids, feature_list, unit_system, manning_n, True)
+
+    differences = []
+    for out_dir, copy_dir in zip(outputs, copies):
+        differences += compare_outputs(copy_dir, out_dir)
+        shutil.rmtree(copy_dir)
+    print("Features: %i (%s)" % (feature_list.__len__(), ", ".join([str(f) for f in feature_list])))
+    print("One sweep per feature:  %8.1f s" % t_single)
+    print("Multi-feature batch:    %8.1f s (speedup: %0.2fx)" % (t_batch, t_single / max(t_batch, 1e-9)))
+    if differences:
+        print("WARNING: Outputs differ:\n * " + "\n * ".join(differences))
+    else:
+        print("Outputs are identical.")
+    return {"single": t_single, "batch": t_batch, "differences": differences}
+
+
+# enable script to run stand-alone
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    condition = str(input('Enter the condition (shape: >> XXXX, e.g., >> 2008 ) \n>> '))
+    benchmark(condition)
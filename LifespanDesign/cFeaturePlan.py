@@ -0,0 +1,254 @@
+#!/usr/bin/python
+try:
+    import sys, os, logging, threading
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, threading).")
+
+try:
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import cLifespanDesignAnalysis as cLDA
+    from cParameters import *
+    sys.path.append(os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), ".site_packages", "riverpy"))
+    import cRaster as cRa
+    import cTileExecutor as cTE
+    import fGlobal as fGl
+except:
+    print("ExceptionERROR: Cannot find package files (/.site_packages/riverpy/).")
+
+
+class FeaturePlan:
+    # Fused tile-wise evaluation of a feature's parameter chain (NumPy backend)
+    # the plan identifies the input rasters and the neighbourhood (halo) that the applicable parameters of the feature's
+    # parameter_list require and turns the chain into one kernel that runs all parameters, joins and output
+    # preparations on one tile of the analysis grid - intermediate rasters live in memory for a single tile only
+    # and inputs are decoded once (riverpy raster cache and hydraulic cube)
+    parameter_inputs = {"d2w": (("d2w",), ("threshold_d2w_low", "threshold_d2w_up")),
+                        "det": (("det",), ("threshold_det_low", "threshold_det_up")),
+                        "ds_compare_slopes": (("dem", "h", "u"), ()),
+                        "ds_filter": (("grains",), ("threshold_Dmaxf",)),
+                        "ds_stable_grains": (("h", "u"), ("threshold_taux",)),
+                        "ds_wood": (("h",), ()),
+                        "fill": (("dod",), ("threshold_fill",)),
+                        "fine_grains": (("h", "u", "grains"), ("threshold_taux",)),
+                        "Fr": (("h", "u"), ("threshold_Fr",)),
+                        "h": (("h",), ("threshold_h",)),
+                        "lf_bioengineering": (("dem", "d2w"), ("threshold_S0",)),
+                        "mobile_grains": (("h", "u", "grains"), ("threshold_taux",)),
+                        "mu": (("mu", "h", "u"), ()),
+                        "scour": (("dod",), ("threshold_scour",)),
+                        "sidech": (("sidech",), ()),
+                        "taux": (("h", "u", "grains"), ("threshold_taux",)),
+                        "tcd": (("dod",), ("threshold_fill", "threshold_scour")),
+                        "u": (("u",), ("threshold_u",))}
+    halo_parameters = ("ds_compare_slopes", "lf_bioengineering")  # parameters that apply Slope (3x3 neighbourhood)
+
+    def __init__(self, feature, feature_analysis, *args, **kwargs):
+        # feature = Feature object (cFeatures.FeatureContainer(...).feature)
+        # feature_analysis = cLifespanDesignAnalysis.ArcPyAnalysis object with verified feature settings
+        # args[0] = BOOL habitat join (default: False)
+        # args[1] = BOOL wildcard join (default: False)
+        # kwargs: tile_size = INT (default: 1024)
+        self.logger = logging.getLogger("logfile")
+        self.feature = feature
+        self.feature_analysis = feature_analysis
+        try:
+            self.habitat = bool(args[0])
+        except:
+            self.habitat = False
+        try:
+            self.wildcard = bool(args[1])
+        except:
+            self.wildcard = False
+        self.tile_size = int(kwargs.get("tile_size", 1024))
+        self.parameters = self.get_parameters()
+        self.failed = False  # True if the kernel failed in a tile (incomplete outputs)
+
+    def get_parameters(self):
+        # returns LIST of parameters in feature.parameter_list that have thresholds (or need none)
+        parameters = []
+        for par in self.feature.parameter_list:
+            try:
+                thresholds = self.parameter_inputs[par][1]
+            except KeyError:
+                continue
+            if (par == "mu") and (getattr(self.feature, "mu_method", -1) == -1):
+                continue
+            if (thresholds.__len__() == 0) or any(
+                    not (type(getattr(self.feature, t, [])) is list) for t in thresholds):
+                parameters.append(par)
+        return parameters
+
+    def get_inputs(self):
+        # returns DICT {input name: Raster} of the input rasters that define the analysis grid
+        condition = self.feature_analysis.condition
+        names = ["h"]  # lifespan rasters are cropped to the wetted area of the highest discharge
+        for par in self.parameters:
+            [names.append(n) for n in self.parameter_inputs[par][0] if n not in names]
+        if self.habitat:
+            names.append("chsi")
+        if self.wildcard:
+            names.append("wild")
+        containers = {"chsi": CHSI, "d2w": WaterTable, "dem": DEM, "det": DEMdet, "dod": DoD, "grains": GrainSizes,
+                      "h": FlowDepth, "mu": MU, "sidech": SideChannelDelineation, "u": FlowVelocity, "wild": Wildcard}
+        inputs = {}
+        for name in names:
+            try:
+                container = containers[name](condition)
+            except:
+                self.logger.info("WARNING: Could not load %s rasters for the analysis grid." % name)
+                continue
+            if name in ("h", "u"):
+                rasters = [r for r in container.rasters if str(r).__len__() > 1]
+            elif name == "dod":
+                rasters = [container.raster_scour]
+            else:
+                rasters = [container.raster]
+            for i, ras in enumerate(rasters):
+                if isinstance(ras, cRa.Raster):
+                    inputs.update({"%s%i" % (name, i): ras})
+        return inputs
+
+    def get_halo(self):
+        return 1 if any(par in self.halo_parameters for par in self.parameters) else 0
+
+    def make_kernel(self, step_function):
+        # step_function = callable(parameter_name, feature, feature_analysis) that returns feature_analysis
+        #                 (feature_analysis.analysis_call)
+        # returns the fused kernel: callable(tile Extent) that returns DICT {output file name: Raster}
+        fa = self.feature_analysis
+        feature = self.feature
+        habitat, wildcard = self.habitat, self.wildcard
+        parameters = [par for par in feature.parameter_list if par in self.parameters]
+
+        def kernel(extent):
+            tile_analysis = fa
+            tile_analysis.clear_rasters()
+            tile_analysis.tile_extent = extent
+            for par in parameters:
+                try:
+                    tile_analysis = step_function(par, feature, tile_analysis)
+                except:
+                    self.logger.info("ERROR: Failed checking " + par + " of " + feature.name + ".")
+            if habitat:
+                tile_analysis.join_with_habitat()
+            if wildcard:
+                tile_analysis.join_with_wildcard()
+            outputs = tile_analysis.get_output_rasters(feature.ds, feature.lf, feature.id)
+            [fa.written.append(name) for name in outputs.keys() if name not in fa.written]
+            return outputs
+        return kernel
+
+    def run(self, step_function):
+        # evaluates the planned chain tile by tile and writes the outputs to feature_analysis.output
+        # returns DICT {output file name: Raster}
+        self.logger.info("   >> Fused analysis of " + ", ".join(self.parameters))
+        return FeatureBatch([self], tile_size=self.tile_size).run(step_function)
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = FeaturePlan (%s)" % os.path.dirname(__file__))
+        print(dir(self))
+
+
+class FeatureBatch:
+    # Multi-feature sweep over the analysis grid (NumPy backend)
+    # plans (FeaturePlan objects) that share the analysis grid form one group that is evaluated with one
+    # TileExecutor: the kernels of all features run on one tile after the other while cRaster.window_memo is open,
+    # thus every input window of the tile is read once for all features (hydraulic cube slices and cached rasters
+    # are shared objects) and the outputs are written tile-wise - plans on different grids (e.g., MAXOF extents of different inputs) form
+    # separate groups, thus the outputs are identical to running FeaturePlan.run feature by feature
+    def __init__(self, plans, *args, **kwargs):
+        # plans = LIST of FeaturePlan objects (feature analyses of the same condition and output directory)
+        # kwargs: tile_size = INT (default: 1024)
+        self.logger = logging.getLogger("logfile")
+        self.plans = plans
+        self.tile_size = int(kwargs.get("tile_size", 1024))
+
+    def get_groups(self):
+        # returns LIST of TUPLES (LIST of FeaturePlans, DICT {input name: Raster}) of plans with a common grid
+        groups = []
+        grids = []
+        for plan in self.plans:
+            plan.feature_analysis.tile_extent = None
+            plan.feature_analysis.set_extent()
+            inputs = plan.get_inputs()
+            if inputs.__len__() < 1:
+                self.logger.info("ERROR: No input rasters found for %s." % str(plan.feature.id))
+                continue
+            grid = cRa.make_grid(list(inputs.values()))
+            if grid in grids:
+                group_plans, group_inputs = groups[grids.index(grid)]
+                group_plans.append(plan)
+                group_inputs.update(inputs)
+            else:
+                grids.append(grid)
+                groups.append(([plan], dict(inputs)))
+        return groups
+
+    def make_kernel(self, plans, step_function):
+        # returns callable(tile Extent) that returns DICT {output file name: Raster} of all plans
+        kernels = [(plan, plan.make_kernel(step_function)) for plan in plans]
+
+        def kernel(extent):
+            outputs = {}
+            cRa.window_memo.open()
+            try:
+                for plan, feature_kernel in kernels:
+                    try:
+                        outputs.update(feature_kernel(extent))
+                    except:
+                        plan.failed = True
+                        self.logger.info("ERROR: Fused analysis of %s failed in tile %s." % (str(plan.feature.id),
+                                                                                             str(extent)))
+            finally:
+                cRa.window_memo.close()
+            return outputs
+        return kernel
+
+    def run(self, step_function):
+        # step_function = callable(parameter_name, feature, feature_analysis) that returns feature_analysis
+        # returns DICT {output file name: Raster} of all plans
+        outputs = {}
+        for plans, inputs in self.get_groups():
+            if self.plans.__len__() > 1:
+                self.logger.info("   >> Fused analysis of %s (shared input tiles: %s)" % (
+                    ", ".join([str(plan.feature.id) for plan in plans]), ", ".join(sorted(inputs.keys()))))
+            plans[0].feature_analysis.set_extent()
+            executor = cTE.TileExecutor(inputs, tile_size=self.tile_size, halo=max([p.get_halo() for p in plans]))
+            kernel = self.make_kernel(plans, step_function)
+            output_dir = plans[0].feature_analysis.output
+            tile_filter = TileLogFilter()
+
+            def logged_kernel(extent):
+                # parameter messages are logged for the first tile only
+                tile_filter.tiles += 1
+                return kernel(extent)
+            self.logger.addFilter(tile_filter)
+            try:
+                group_outputs = executor.run_named(logged_kernel, output_dir)
+            finally:
+                self.logger.removeFilter(tile_filter)
+                for plan in plans:
+                    plan.feature_analysis.tile_extent = None
+            for plan in plans:
+                # keep the names of outputs that were actually written (tiles with results)
+                plan.feature_analysis.written = [n for n in plan.feature_analysis.written if n in group_outputs.keys()]
+            for name in group_outputs.keys():
+                self.logger.info("   >> Wrote " + str(output_dir) + name)
+            outputs.update(group_outputs)
+        return outputs
+
+    def __call__(self, *args, **kwargs):
+        print("Class Info: <type> = FeatureBatch (%s)" % os.path.dirname(__file__))
+        print(dir(self))
+
+
+class TileLogFilter(logging.Filter):
+    # suppresses messages below WARNING of the creating thread after the first tile (the parameter messages repeat
+    # for every tile) - other threads (e.g., concurrent reaches) keep logging
+    def __init__(self, *args):
+        logging.Filter.__init__(self, *args)
+        self.thread = threading.get_ident()
+        self.tiles = 0
+
+    def filter(self, record):
+        return (self.tiles < 2) or (record.levelno >= logging.WARNING) or not (record.thread == self.thread)
@@ -1,11 +1,22 @@
 #!/usr/bin/python
-import random
+import tempfile
+try:
+    import numpy as np
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: numpy).")
 try:
     from cParameters import *
     from cReadInpLifespan import *
-    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\.site_packages\\riverpy\\")
+    sys.path.append(os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), ".site_packages", "riverpy"))
     import fGlobal as fGl
     import config
+    import cDerivedHydraulics as cDH
+    import cDischargeIndex as cDI
+    import cHydraulicCube as cHC
+    import cRaster as cRa
+    import cRasterWriter as cRW
+    import fLifespan as fLs
+    import fTerrain as fTe
 except:
     print("ExceptionERROR: Cannot find package files (/.site_packages/riverpy/).")
 
@@ -19,6 +30,10 @@ except:
     print("ExceptionERROR: Spatial Analyst (arcpy.sa) is not available (check license?)")
 
 
+# directory where ArcPyAnalysis objects create their .cache folders (process pool workers use one directory each)
+cache_root = config.dir2lf
+
+
 class ArcPyAnalysis:
     # This is class requires arcpy
     # analysis functions make lifespan rasters
@@ -30,15 +45,17 @@ class ArcPyAnalysis:
         # args[2] = FLOAT defining mannings n in s/m^(1/3)
         self.raster_info_lf = ""
         self.condition = str(condition)
-        self.cache = config.dir2lf + ".cache%s\\" % str(random.randint(100, 999))
+        self.cache = tempfile.mkdtemp(prefix=".cache", dir=cache_root) + "\\"  # unique (no collisions)
         fGl.chk_dir(self.cache)
         self.extent_type = "standard"
+        self.tile_extent = None  # arcpy.Extent of a tile in fused tile-wise analyses (see cFeaturePlan.py)
         self.threshold_freq = 0.0
         self.inverse_tcd = False
 
         self.raster_dict_ds = {}
         self.raster_info_lf = "init"
         self.raster_dict_lf = {}
+        self.written = []  # names of the output rasters that were written to self.output
         self.reach_extents = reach_extents
         self.habitat_matching = habitat_analysis
         try:
@@ -50,6 +67,7 @@ class ArcPyAnalysis:
             unit_system = args[1]
         except:
             unit_system = "us"
+        self.unit_system = unit_system
 
         try:
             __n__ = float(args[2])
@@ -72,6 +90,7 @@ class ArcPyAnalysis:
         self.g = 9.81 / self.ft2m   # (ft/s2) gravity acceleration
         self.s = 2.68               # (--) relative grain density (ratio of rho_s and rho_w)
         self.sf = 0.99              # (--) default safety factor
+        self.derived_hydraulics = None  # DerivedHydraulics store of the last get_derived_rasters call (NumPy backend)
 
         self.info = Info(condition)
         self.lifespans = self.info.lifespan_read()  # LIST with definition of lifespans in years from CONDITION/input_definitions.inp
@@ -89,7 +108,12 @@ class ArcPyAnalysis:
             self.logger.info("      >>> Calculating terrain slope ...")
             out_measurement = "PERCENT_RISE"
             z_factor = 1.0
-            ras_S0 = Float((Slope(dem.raster, out_measurement, z_factor))/100)  # (--)
+            if fGl.numpy_backend():
+                # tile-wise slope with a one-cell halo, stored per DEM (tiles of fused analyses are not stored)
+                ras_S0 = Float(fTe.terrain_rasters(dem.raster, ["slope_percent"], z_factor,
+                                                   store=(self.tile_extent is None))["slope_percent"] / 100)
+            else:
+                ras_S0 = Float((Slope(dem.raster, out_measurement, z_factor))/100)  # (--)
 
             self.logger.info("      >>> Applying threshold values ...")
             try:
@@ -125,17 +149,15 @@ class ArcPyAnalysis:
         if str(d2w.raster).__len__() > 1:
             if not(self.raster_dict_lf.items().__len__() > 0):
                 # routine to override noData pixels if required.
-                temp_d2w = Con((IsNull(d2w.raster) == 1), (IsNull(d2w.raster) * 0), d2w.raster)
+                temp_d2w = self.fill_nodata(d2w.raster, 0)
                 d2w.raster = temp_d2w
 
             self.ras_d2w = Con(((d2w.raster >= threshold_low) & (d2w.raster <= threshold_up)), 1.0)
 
             if self.verify_raster_info():
                 self.logger.info("          * based on raster: " + self.raster_info_lf)
-                temp_ras_base = Con((IsNull(self.raster_dict_lf[self.raster_info_lf]) == 1),
-                                    (IsNull(self.raster_dict_lf[self.raster_info_lf]) * 0),
-                                    self.raster_dict_lf[self.raster_info_lf])
-                temp_ras_d2w = Con((IsNull(self.ras_d2w) == 1), (IsNull(self.ras_d2w) * 0), self.ras_d2w)
+                temp_ras_base = self.fill_nodata(self.raster_dict_lf[self.raster_info_lf], 0)
+                temp_ras_d2w = self.fill_nodata(self.ras_d2w, 0)
                 ras_d2w_new = Con(((temp_ras_d2w == 1.0) & (temp_ras_base > 0)), temp_ras_base)
                 self.ras_d2w = ras_d2w_new
             self.raster_info_lf = "ras_d2w"
@@ -156,7 +178,7 @@ class ArcPyAnalysis:
         if str(det.raster).__len__() > 1:
             if not(self.raster_dict_lf.items().__len__() > 0):
                 # routine to override noData pixels if required.
-                temp_det = Con((IsNull(det.raster) == 1), (IsNull(det.raster) * 0), det.raster)
+                temp_det = self.fill_nodata(det.raster, 0)
                 det.raster = temp_det
 
             self.ras_det = Con(((det.raster >= threshold_low) & (det.raster <= threshold_up)), 1)
@@ -164,9 +186,7 @@ class ArcPyAnalysis:
             if self.verify_raster_info():
                 self.logger.info("          * based on raster: " + self.raster_info_lf)
                 # make temp_ras without noData pixels --> det is inclusive!
-                temp_ras = Con((IsNull(self.raster_dict_lf[self.raster_info_lf]) == 1),
-                               (IsNull(self.raster_dict_lf[self.raster_info_lf]) * 0),
-                               self.raster_dict_lf[self.raster_info_lf])
+                temp_ras = self.fill_nodata(self.raster_dict_lf[self.raster_info_lf], 0)
                 # compare temp_ras with raster_dict but use self.ras_... values if condition is True
                 # special case det: usage of logical OR instead of AND (only application is Widen)
                 ras_det_new = Con(((self.ras_det == 1) | (temp_ras > 0)), 1.0)
@@ -188,7 +208,7 @@ class ArcPyAnalysis:
         if str(dod.raster_fill).__len__() > 1:
             if not(self.raster_dict_lf.items().__len__() > 0):
                 # routine to override noData pixels if required.
-                temp_fill = Con((IsNull(dod.raster_fill) == 1), (IsNull(dod.raster_fill) * 0), dod.raster_fill)
+                temp_fill = self.fill_nodata(dod.raster_fill, 0)
                 dod.raster_fill = temp_fill
 
             if not self.inverse_tcd:
@@ -207,7 +227,7 @@ class ArcPyAnalysis:
                     self.logger.info(
                         "          * using default max. lifespan (error in input.inp definitions): " + str(max_lf))
                 if not self.inverse_tcd:
-                    temp_ras = Con((IsNull(self.ras_tcd) == 1), (IsNull(self.ras_tcd) * max_lf), self.ras_tcd)
+                    temp_ras = self.fill_nodata(self.ras_tcd, max_lf)
                     # compare temp_ras with raster_dict but use self.ras_... values if condition is True
                     ras_tcd_new = Con((temp_ras == 1.0), self.ras_tcd, self.raster_dict_lf[self.raster_info_lf])
                 else:
@@ -236,16 +256,22 @@ class ArcPyAnalysis:
         Dmean = GrainSizes(self.condition)  # (ft)
         D85_fines = 0.25 * Dmean.raster / 5  # (ft) 0.25 for D15(coarse), 5 for fine conversion
 
-        Dcr_raster_list = []
-        for i in range(0, h.raster_names.__len__()):
-            if (str(u.rasters[i]).__len__() > 0) and (str(h.rasters[i]).__len__() > 0):
-                __ras__ = (Square(u.rasters[i] * self.n) / ((self.s - 1) *
-                                                            threshold_taux * Power(h.rasters[i], (1 / 3))))
-                Dcr_raster_list.append(__ras__)
-            else:
-                self.logger.info("          * empty Raster operation for {0} and {1}".format(str(u.rasters[i]), str(h.rasters[i])))
+        Dcr_raster_list = self.get_derived_rasters("dcr", h, u)
+        if Dcr_raster_list is not None:
+            # Dcr >= D85 <=> dcr >= D85 * (s - 1) * taux_cr (dcr = stored u^2 * n^2 / h^(1/3))
+            Dcr_threshold = D85_fines * Float(self.s - 1) * threshold_taux
+        else:
+            Dcr_raster_list = []
+            Dcr_threshold = D85_fines
+            for i in range(0, h.raster_names.__len__()):
+                if (str(u.rasters[i]).__len__() > 0) and (str(h.rasters[i]).__len__() > 0):
+                    __ras__ = (Square(u.rasters[i] * self.n) / ((self.s - 1) *
+                                                                threshold_taux * Power(h.rasters[i], (1 / 3))))
+                    Dcr_raster_list.append(__ras__)
+                else:
+                    self.logger.info("          * empty Raster operation for {0} and {1}".format(str(u.rasters[i]), str(h.rasters[i])))
         if any(str(e).__len__() > 0 for e in Dcr_raster_list):
-            self.ras_Dcf = self.compare_raster_set(Dcr_raster_list, D85_fines)
+            self.ras_Dcf = self.compare_raster_set(Dcr_raster_list, Dcr_threshold, "dcr")
             try:
                 self.ras_Dcf.extent  # crashes if CellStatistics failed
                 if self.verify_raster_info():
@@ -258,10 +284,8 @@ class ArcPyAnalysis:
                         self.logger.info(
                             "          * using default max. lifespan (error in input.inp definitions): " + str(max_lf))
                     # make temp_ras without noData pixels
-                    temp_ras_base = Con((IsNull(self.raster_dict_lf[self.raster_info_lf]) == 1),
-                                        (IsNull(self.raster_dict_lf[self.raster_info_lf]) * 0),
-                                        self.raster_dict_lf[self.raster_info_lf])
-                    temp_ras_dcf = Con((IsNull(self.ras_Dcf) == 1), (IsNull(self.ras_Dcf) * max_lf), self.ras_Dcf)
+                    temp_ras_base = self.fill_nodata(self.raster_dict_lf[self.raster_info_lf], 0)
+                    temp_ras_dcf = self.fill_nodata(self.ras_Dcf, max_lf)
                     # compare temp_ras with raster_dict but use self.ras_... values if condition is True
                     ras_Dcr_new = Con(((temp_ras_dcf < temp_ras_base) & (temp_ras_dcf > 0)),
                                       temp_ras_dcf, self.raster_dict_lf[self.raster_info_lf])
@@ -287,15 +311,17 @@ class ArcPyAnalysis:
         h = FlowDepth(self.condition)
         u = FlowVelocity(self.condition)
 
-        Fr_raster_list = []
-        for i in range(0, h.raster_names.__len__()):
-            if (str(u.rasters[i]).__len__() > 1) and (str(h.rasters[i]).__len__() > 1):
-                __ras__ = u.rasters[i] / SquareRoot(self.g * h.rasters[i])
-                Fr_raster_list.append(__ras__)
-            else:
-                self.logger.info("          * empty Raster operation for {0} and {1}".format(str(u.rasters[i]), str(h.rasters[i])))
+        Fr_raster_list = self.get_derived_rasters("fr", h, u)
+        if Fr_raster_list is None:
+            Fr_raster_list = []
+            for i in range(0, h.raster_names.__len__()):
+                if (str(u.rasters[i]).__len__() > 1) and (str(h.rasters[i]).__len__() > 1):
+                    __ras__ = u.rasters[i] / SquareRoot(self.g * h.rasters[i])
+                    Fr_raster_list.append(__ras__)
+                else:
+                    self.logger.info("          * empty Raster operation for {0} and {1}".format(str(u.rasters[i]), str(h.rasters[i])))
         if any(str(e).__len__() > 0 for e in Fr_raster_list):
-            self.ras_Fr = self.compare_raster_set(Fr_raster_list, threshold_Fr)
+            self.ras_Fr = self.compare_raster_set(Fr_raster_list, threshold_Fr, "fr")
             try:
                 self.ras_Fr.extent  # crashes if CellStatistics failed
                 if self.verify_raster_info():
@@ -307,10 +333,8 @@ class ArcPyAnalysis:
                         max_lf = 50.0
                         self.logger.info(
                             "          * using default max. lifespan (error in input.inp definitions): " + str(max_lf))
-                    temp_ras_base = Con((IsNull(self.raster_dict_lf[self.raster_info_lf]) == 1),
-                                        (IsNull(self.raster_dict_lf[self.raster_info_lf]) * 0),
-                                        Float(self.raster_dict_lf[self.raster_info_lf]))
-                    temp_ras_Fr = Con((IsNull(self.ras_Fr) == 1), (IsNull(self.ras_Fr) * max_lf), Float(self.ras_Fr))
+                    temp_ras_base = self.fill_nodata(Float(self.raster_dict_lf[self.raster_info_lf]), 0)
+                    temp_ras_Fr = self.fill_nodata(Float(self.ras_Fr), max_lf)
                     ras_Fr_new = Con((temp_ras_Fr < temp_ras_base), temp_ras_Fr, Float(self.raster_dict_lf[self.raster_info_lf]))
                     self.ras_Fr = ras_Fr_new
 
@@ -333,7 +357,7 @@ class ArcPyAnalysis:
 
         h = FlowDepth(self.condition)
         if any(str(e).__len__() > 0 for e in h.rasters):
-            self.ras_dth = self.compare_raster_set(h.rasters, threshold_h)
+            self.ras_dth = self.compare_raster_set(h.rasters, threshold_h, "h")
             try:
                 self.ras_dth.extent  # crashes if CellStatistics failed
                 try:
@@ -341,7 +365,7 @@ class ArcPyAnalysis:
                     self.logger.info("          * max. lifespan: " + str(max_lf))
                 except:
                     max_lf = 50.0
-                ras_h_new = Con((IsNull(self.ras_dth) == 1), (IsNull(self.ras_dth) * max_lf), Float(self.ras_dth))
+                ras_h_new = self.fill_nodata(Float(self.ras_dth), max_lf)
                 self.ras_dth = ras_h_new
                 self.raster_info_lf = "ras_dth"
                 self.raster_dict_lf.update({self.raster_info_lf: self.ras_dth})
@@ -360,20 +384,26 @@ class ArcPyAnalysis:
         u = FlowVelocity(self.condition)
         Dmean = GrainSizes(self.condition)  # in ft or m
 
-        Dcr_raster_list = []
-        for i in range(0, h.raster_names.__len__()):
-            if (str(u.rasters[i]).__len__() > 1) and (str(h.rasters[i]).__len__() > 1):
-                __ras__ = (Square(u.rasters[i] * Float(self.n)) / (Float(self.s - 1) *
-                                                                   threshold_taux * Power(h.rasters[i], (1 / 3)))) / Float(self.sf)
-                Dcr_raster_list.append(__ras__)
-            else:
-                try:
-                    self.logger.info("          * empty Raster operation for {0}-years lifespan".format(str(self.lifespans[i])))
-                except:
-                    self.logger.info("          * empty Raster operation (missing lifespan definitions?!)")
+        Dcr_raster_list = self.get_derived_rasters("dcr", h, u)
+        if (Dcr_raster_list is not None) and (str(Dmean.raster).__len__() > 1):
+            # Dcr >= Dmean <=> dcr >= Dmean * (s - 1) * taux_cr * sf (dcr = stored u^2 * n^2 / h^(1/3))
+            Dcr_threshold = Dmean.raster * Float(self.s - 1) * threshold_taux * Float(self.sf)
+        else:
+            Dcr_raster_list = []
+            Dcr_threshold = Dmean.raster
+            for i in range(0, h.raster_names.__len__()):
+                if (str(u.rasters[i]).__len__() > 1) and (str(h.rasters[i]).__len__() > 1):
+                    __ras__ = (Square(u.rasters[i] * Float(self.n)) / (Float(self.s - 1) *
+                                                                       threshold_taux * Power(h.rasters[i], (1 / 3)))) / Float(self.sf)
+                    Dcr_raster_list.append(__ras__)
+                else:
+                    try:
+                        self.logger.info("          * empty Raster operation for {0}-years lifespan".format(str(self.lifespans[i])))
+                    except:
+                        self.logger.info("          * empty Raster operation (missing lifespan definitions?!)")
 
         if any(str(e).__len__() > 0 for e in Dcr_raster_list) and (str(Dmean.raster).__len__() > 0):
-            self.ras_Dcr = self.compare_raster_set(Dcr_raster_list, Dmean.raster)
+            self.ras_Dcr = self.compare_raster_set(Dcr_raster_list, Dcr_threshold, "dcr")
             try:
                 self.ras_Dcr.extent  # crashes if CellStatistics failed
                 if not(self.threshold_freq == 0.0):
@@ -382,10 +412,8 @@ class ArcPyAnalysis:
 
                 if self.verify_raster_info():
                     self.logger.info("          * based on raster: " + self.raster_info_lf)
-                    temp_ras_Dcr = Con((IsNull(self.ras_Dcr) == 1), (IsNull(self.ras_Dcr) * 0), self.ras_Dcr)
-                    temp_ras_base = Con((IsNull(self.raster_dict_lf[self.raster_info_lf]) == 1),
-                                        (IsNull(self.raster_dict_lf[self.raster_info_lf]) * 0),
-                                        self.raster_dict_lf[self.raster_info_lf])
+                    temp_ras_Dcr = self.fill_nodata(self.ras_Dcr, 0)
+                    temp_ras_base = self.fill_nodata(self.raster_dict_lf[self.raster_info_lf], 0)
                     ras_Dcr_new = Con(((temp_ras_Dcr < temp_ras_base) & (temp_ras_Dcr > 0)),
                                       self.ras_Dcr, self.raster_dict_lf[self.raster_info_lf])
                     self.ras_Dcr = ras_Dcr_new
@@ -408,24 +436,33 @@ class ArcPyAnalysis:
             if method == 0:
                 self.logger.info("          MU: using exclusive method.")
                 try:
-                    temp_dict = {}
-                    for morph_unit in mu_bad:
-                        temp_dict.update({morph_unit: Con((mu.raster == mu.mu_dict[morph_unit]), 1.0, 0)})
-                    self.ras_mu = CellStatistics(fGl.dict_values2list(temp_dict.values()), "SUM", "DATA")
-                    temp_ras = Con((self.ras_mu >= 1), 0, 1.0)
-                    self.ras_mu = temp_ras
+                    if fGl.numpy_backend():
+                        # one pass over the UINT8 MU codes instead of one float raster per MU
+                        self.ras_mu = Con(InList(mu.raster, [mu.mu_dict[morph_unit] for morph_unit in mu_bad]),
+                                          0, 1.0)
+                    else:
+                        temp_dict = {}
+                        for morph_unit in mu_bad:
+                            temp_dict.update({morph_unit: Con((mu.raster == mu.mu_dict[morph_unit]), 1.0, 0)})
+                        self.ras_mu = CellStatistics(fGl.dict_values2list(temp_dict.values()), "SUM", "DATA")
+                        temp_ras = Con((self.ras_mu >= 1), 0, 1.0)
+                        self.ras_mu = temp_ras
                 except:
                     self.logger.info("ERROR: Could not assign MU raster.")
 
             if method == 1:
                 self.logger.info("          MU: using inclusive method.")
                 try:
-                    temp_dict = {}
-                    for morph_unit in mu_good:
-                        temp_dict.update({morph_unit: Con((mu.raster == mu.mu_dict[morph_unit]), 1.0, 0)})
-                    self.ras_mu = CellStatistics(fGl.dict_values2list(temp_dict.values()), "SUM", "DATA")
-                    temp_ras = Con((self.ras_mu >= 1), 1.0, 0)
-                    self.ras_mu = temp_ras
+                    if fGl.numpy_backend():
+                        self.ras_mu = Con(InList(mu.raster, [mu.mu_dict[morph_unit] for morph_unit in mu_good]),
+                                          1.0, 0)
+                    else:
+                        temp_dict = {}
+                        for morph_unit in mu_good:
+                            temp_dict.update({morph_unit: Con((mu.raster == mu.mu_dict[morph_unit]), 1.0, 0)})
+                        self.ras_mu = CellStatistics(fGl.dict_values2list(temp_dict.values()), "SUM", "DATA")
+                        temp_ras = Con((self.ras_mu >= 1), 1.0, 0)
+                        self.ras_mu = temp_ras
                 except:
                     self.logger.info("ERROR: Could not assign MU raster.")
                     try:
@@ -442,10 +479,8 @@ class ArcPyAnalysis:
                 if self.verify_raster_info():
                     self.logger.info("          * based on raster: " + self.raster_info_lf)
                     # make temp_ras without noData pixels for both ras_mu and ras_dict
-                    temp_ras_mu = Con((IsNull(self.ras_mu) == 1), (IsNull(self.ras_mu) * 0), self.ras_mu)
-                    temp_ras_di = Con((IsNull(self.raster_dict_lf[self.raster_info_lf]) == 1),
-                                      (IsNull(self.raster_dict_lf[self.raster_info_lf]) * 0),
-                                      self.raster_dict_lf[self.raster_info_lf])
+                    temp_ras_mu = self.fill_nodata(self.ras_mu, 0)
+                    temp_ras_di = self.fill_nodata(self.raster_dict_lf[self.raster_info_lf], 0)
                     # compare temp_ras with raster_dict but use self.ras_... values if condition is True
                     ras_mu_new = Con(((temp_ras_mu == 1.0) & (temp_ras_di > 0)), temp_ras_di)
                     self.ras_mu = ras_mu_new
@@ -469,7 +504,7 @@ class ArcPyAnalysis:
         if str(dod.raster_scour).__len__() > 1:
             if not(self.raster_dict_lf.items().__len__() > 0):
                 # routine to override noData pixels if required.
-                temp_scour = Con((IsNull(dod.raster_scour) == 1), (IsNull(dod.raster_scour) * 0), dod.raster_scour)
+                temp_scour = self.fill_nodata(dod.raster_scour, 0)
                 dod.raster_scour = temp_scour
 
             if not self.inverse_tcd:
@@ -489,7 +524,7 @@ class ArcPyAnalysis:
                         self.logger.info(
                             "          * using default max. lifespan (error in input.inp definitions): " + str(
                                 max_lf))
-                    temp_ras = Con((IsNull(self.ras_tcd) == 1), (IsNull(self.ras_tcd) * max_lf), Float(self.ras_tcd))
+                    temp_ras = self.fill_nodata(Float(self.ras_tcd), max_lf)
                     # compare temp_ras with raster_dict but use self.ras_... values if condition is True
                     ras_tcd_new = Con((temp_ras == 1.0), self.ras_tcd, self.raster_dict_lf[self.raster_info_lf])
                 else:
@@ -513,16 +548,18 @@ class ArcPyAnalysis:
         u = FlowVelocity(self.condition)
         grains = GrainSizes(self.condition)
         if str(grains.raster).__len__() > 1:
-            tx_raster_list = []
-            for i in range(0, h.raster_names.__len__()):
-                if (str(u.rasters[i]).__len__() > 1) and (str(h.rasters[i]).__len__() > 1):
-                    __ras__ = (self.rho_w * Square(u.rasters[i] / (5.75 * Log10(12.2 * h.rasters[i] /
-                               (2 * 2.2 * grains.raster))))) / (self.rho_w * self.g * (self.s - 1) * grains.raster)
-                    tx_raster_list.append(__ras__)
-                else:
-                    self.logger.info("          * empty Raster operation for {0} and {1}".format(str(u.rasters[i]), str(h.rasters[i])))
+            tx_raster_list = self.get_derived_rasters("taux", h, u, grains.raster)
+            if tx_raster_list is None:
+                tx_raster_list = []
+                for i in range(0, h.raster_names.__len__()):
+                    if (str(u.rasters[i]).__len__() > 1) and (str(h.rasters[i]).__len__() > 1):
+                        __ras__ = (self.rho_w * Square(u.rasters[i] / (5.75 * Log10(12.2 * h.rasters[i] /
+                                   (2 * 2.2 * grains.raster))))) / (self.rho_w * self.g * (self.s - 1) * grains.raster)
+                        tx_raster_list.append(__ras__)
+                    else:
+                        self.logger.info("          * empty Raster operation for {0} and {1}".format(str(u.rasters[i]), str(h.rasters[i])))
             if any(str(e).__len__() > 0 for e in tx_raster_list):
-                self.ras_taux = self.compare_raster_set(tx_raster_list, threshold_taux)
+                self.ras_taux = self.compare_raster_set(tx_raster_list, threshold_taux, "taux")
                 try:
                     self.ras_taux.extent  # crashes if CellStatistics failed
                     if self.verify_raster_info():
@@ -535,10 +572,8 @@ class ArcPyAnalysis:
                             self.logger.info(
                                 "          * using default max. lifespan (error in input.inp definitions): " + str(max_lf))
                         # make temp_ras without noData pixels
-                        temp_ras_base = Con((IsNull(self.raster_dict_lf[self.raster_info_lf]) == 1),
-                                            (IsNull(self.raster_dict_lf[self.raster_info_lf]) * 0),
-                                            Float(self.raster_dict_lf[self.raster_info_lf]))
-                        temp_ras_tx = Con((IsNull(self.ras_taux) == 1), (IsNull(self.ras_taux) * max_lf), Float(self.ras_taux))
+                        temp_ras_base = self.fill_nodata(Float(self.raster_dict_lf[self.raster_info_lf]), 0)
+                        temp_ras_tx = self.fill_nodata(Float(self.ras_taux), max_lf)
                         # compare temp_ras with raster_dict but use self.ras_... values if condition is True
                         ras_taux_new = Con((temp_ras_tx < temp_ras_base),
                                            self.ras_taux, Float(self.raster_dict_lf[self.raster_info_lf]))
@@ -566,9 +601,9 @@ class ArcPyAnalysis:
         if (str(dod.raster_fill).__len__() > 1) or (str(dod.raster_scour).__len__() > 1):
             if not(self.raster_dict_lf.items().__len__() > 0):
                 # routine to override noData pixels -- applies when raster_dict_lf is still empty
-                temp_fill = Con((IsNull(dod.raster_fill) == 1), (IsNull(dod.raster_fill) * 0), dod.raster_fill)
+                temp_fill = self.fill_nodata(dod.raster_fill, 0)
                 dod.raster_fill = temp_fill
-                temp_scour = Con((IsNull(dod.raster_scour) == 1), (IsNull(dod.raster_scour) * 0), dod.raster_scour)
+                temp_scour = self.fill_nodata(dod.raster_scour, 0)
                 dod.raster_scour = temp_scour
 
             if not self.inverse_tcd:
@@ -586,7 +621,7 @@ class ArcPyAnalysis:
                     max_lf = 50.0
                     self.logger.info(
                         "          * using default max. lifespan (error in input.inp definitions): " + str(max_lf))
-                temp_ras = Con((IsNull(self.ras_tcd) == 1), (IsNull(self.ras_tcd) * max_lf), Float(self.ras_tcd))
+                temp_ras = self.fill_nodata(Float(self.ras_tcd), max_lf)
                 # compare temp_ras with raster_dict but use self.ras_... values if condition is True
                 ras_tcd_new = Con((temp_ras == 1.0), self.ras_tcd, Float(self.raster_dict_lf[self.raster_info_lf]))
                 self.ras_tcd = ras_tcd_new
@@ -607,16 +642,14 @@ class ArcPyAnalysis:
 
         u = FlowVelocity(self.condition)
         if any(str(e).__len__() > 0 for e in u.rasters):
-            self.ras_vel = self.compare_raster_set(u.rasters, threshold_u)
+            self.ras_vel = self.compare_raster_set(u.rasters, threshold_u, "u")
             try:
                 self.ras_vel.extent  # crashes if CellStatistics failed
                 if self.verify_raster_info():
                     self.logger.info("          * based on raster: " + self.raster_info_lf)
                     # make temp_ras without noData pixels
-                    temp_ras_u = Con((IsNull(self.ras_vel) == 1), (IsNull(self.ras_vel) * 0), self.ras_vel)
-                    temp_ras_base = Con((IsNull(self.raster_dict_lf[self.raster_info_lf]) == 1),
-                                        (IsNull(self.raster_dict_lf[self.raster_info_lf]) * 0),
-                                        self.raster_dict_lf[self.raster_info_lf])
+                    temp_ras_u = self.fill_nodata(self.ras_vel, 0)
+                    temp_ras_base = self.fill_nodata(self.raster_dict_lf[self.raster_info_lf], 0)
                     # compare temp_ras with raster_dict but use self.ras_... values if condition is True
                     ras_vel_new = Con(((temp_ras_u < temp_ras_base) & (temp_ras_u > 0)), Float(self.ras_vel),
                                       Float(self.raster_dict_lf[self.raster_info_lf]))
@@ -629,10 +662,82 @@ class ArcPyAnalysis:
         else:
             self.logger.info("          * Nothing to do (no Rasters provided).")
 
-    def compare_raster_set(self, raster_set, threshold):
+    def compare_discharge_index(self, par, raster_set, threshold):
+        # NumPy backend: looks up the minimum exceeded lifespan in the critical-discharge index of the condition's
+        # hydraulic cube (see riverpy/cDischargeIndex.py) - returns None if the index is not applicable
+        # par = STR of a hydraulic cube parameter (h, u) or a derived hydraulic field (see get_derived_rasters)
+        if par in cDH.DerivedHydraulics.fields:
+            store = self.derived_hydraulics
+            if store is None:
+                return None
+            cube = store.cube
+        else:
+            cube = cHC.HydraulicCube(config.dir2conditions + self.condition)
+            store = cube
+        if not cube.is_current():
+            return None
+        layers = {}  # {discharge index: lifespan}
+        rasters = []
+        r_index = 0
+        for ras in raster_set:
+            if str(ras).__len__() > 1:
+                index = store.get_index(str(ras))
+                if (index is None) or not (index[0] == par) or (index[1] in layers.keys()):
+                    return None
+                try:
+                    layers.update({index[1]: float(self.lifespans[r_index])})
+                except:
+                    return None
+                rasters.append(ras)
+            r_index += 1
+        if not (layers.__len__() > 1):
+            return None
+        if store is cube:
+            q_index = cDI.DischargeIndex(cube, par, list(layers.keys()))
+        else:
+            try:
+                stamps = store.layer_stamps(par)
+            except KeyError:
+                return None
+            q_index = cDI.DischargeIndex(cube, par, list(layers.keys()), dir2stack=store.dir2stack, stamps=stamps)
+        if isinstance(threshold, cRa.Raster):
+            rasters.append(threshold)
+        geotransform, shape = cRa.make_grid(rasters)
+        # only the cube cells of the analysis grid (e.g., a reach or tile extent) are looked up
+        window = q_index.get_window(geotransform, shape)
+        if window is None:
+            window_geotransform, window_shape = cube.geotransform, cube.shape
+        else:
+            window_geotransform, window_shape = q_index.window_geotransform(window), window[2:4]
+        if isinstance(threshold, cRa.Raster):
+            threshold_value, threshold_mask = cRa.resample(threshold, window_geotransform, window_shape)
+        else:
+            threshold_value, threshold_mask = float(threshold), None
+        try:
+            if threshold_mask is None:
+                ras_lf = q_index.lifespans(threshold_value, [layers[i] for i in q_index.layers], window=window)
+            else:
+                ras_lf = q_index.lifespans(threshold_value, [layers[i] for i in q_index.layers], threshold_mask,
+                                           window=window)
+        except ValueError:
+            return None
+        self.logger.info("          * using critical-discharge index (%s)" % par)
+        return ras_lf.resample(geotransform, shape)
+
+    def compare_raster_set(self, raster_set, threshold, *args):
         # raster_set: LIST containing one or more arcpy.Raster() entries
         # threshold: float with threshold or raster with thresholds
+        # args[0]: STR of the hydraulic cube parameter (e.g., "h") or derived field (e.g., "fr") of raster_set
+        #          enables critical-discharge index lookups
         self.set_extent()
+        if fGl.numpy_backend():
+            try:
+                ras_lf = self.compare_discharge_index(args[0], raster_set, threshold)
+                if ras_lf is not None:
+                    return ras_lf
+            except IndexError:
+                pass
+            return self.compare_raster_stack(raster_set, threshold)
         __ras__ = []  # initial raster assignment
         r_index = 0
         for ras in raster_set:
@@ -652,6 +757,39 @@ class ArcPyAnalysis:
         except:
             self.logger.error("ERROR: Could not calculate CellStatistics (Raster comparison).")
 
+    def compare_raster_stack(self, raster_set, threshold):
+        # NumPy backend of compare_raster_set: stacks the aligned rasters (n, rows, cols) and returns the minimum
+        # exceeded lifespan per pixel with a single argmax along the stack axis (see riverpy/fLifespan.py) as
+        # CodedRaster (UINT8 lifespan codes)
+        rasters = []
+        lifespans = []
+        r_index = 0
+        for ras in raster_set:
+            try:
+                if str(ras).__len__() > 1:
+                    lifespans.append(float(self.lifespans[r_index]))
+                    rasters.append(ras)
+            except:
+                self.logger.error("ERROR: Incoherent data in " + str(ras) + " (raster comparison).")
+                self.logger.info("ERROR HINT: Verify Raster definitions in 01_Conditions/%s/input_definitions.inp." % self.condition)
+            r_index += 1
+        if not(rasters.__len__() > 1):
+            self.logger.info("          * Nothing to do (CellStatistics returns None-types)")
+            return None
+        try:
+            if isinstance(threshold, cRa.Raster):
+                grid, values = cRa.align(*(rasters + [threshold]))
+                threshold_value, threshold_mask = values.pop()
+            else:
+                grid, values = cRa.align(*rasters)
+                threshold_value, threshold_mask = float(threshold), None
+            codes, lookup, nodata = fLs.min_exceeded_lifespan_codes(
+                [v[0] for v in values], threshold_value, lifespans, [v[1] for v in values],
+                threshold_mask=threshold_mask)
+            return cRa.CodedRaster(codes, lookup, grid[0], mask=nodata, spatial_reference=rasters[0].spatialReference)
+        except:
+            self.logger.error("ERROR: Could not calculate CellStatistics (Raster comparison).")
+
     @fGl.err_info
     @fGl.spatial_license
     def design_filter(self, Dmaxf):
@@ -687,19 +825,28 @@ class ArcPyAnalysis:
         Se_dict = {}
         cSe_dict = {}
 
-        S0 = (Slope(dem.raster, outMeasurement, zFactor))/100  # (--)
+        if fGl.numpy_backend():
+            S0 = fTe.terrain_rasters(dem.raster, ["slope_percent"], zFactor,
+                                     store=(self.tile_extent is None))["slope_percent"] / 100  # (--)
+        else:
+            S0 = (Slope(dem.raster, outMeasurement, zFactor))/100  # (--)
 
         if h.raster_names.__len__() >= u.raster_names.__len__():
             self.logger.info("      >>> Module successfully launched - please wait ...")
+            Se_stored = self.get_derived_rasters("se", h, u, dem.raster)
             for ras_no in range(0, h.raster_names.__len__()):
-                # compute energetic level
-                egl_dict.update(
-                    {ras_no: dem.raster + h.rasters[ras_no] + (Square(u.rasters[ras_no]) / (2 * self.g))})
-                # uncomment the following line to use minimum energy slope instead
-                # egl_dict.update({ras_no: dem.raster + 1.5 * Power((((Square(h.rasters[ras_no]) *
-                #                          (Square(u.rasters[ras_no]))) / self.g)), (1/3))})
-                # compute energy slope Se
-                Se_dict.update({ras_no: (Slope(egl_dict[ras_no], outMeasurement, zFactor))/100})
+                if Se_stored is not None:
+                    # energy slope derived once per condition and unit system (see riverpy/cDerivedHydraulics.py)
+                    Se_dict.update({ras_no: Se_stored[ras_no]})
+                else:
+                    # compute energetic level
+                    egl_dict.update(
+                        {ras_no: dem.raster + h.rasters[ras_no] + (Square(u.rasters[ras_no]) / (2 * self.g))})
+                    # uncomment the following line to use minimum energy slope instead
+                    # egl_dict.update({ras_no: dem.raster + 1.5 * Power((((Square(h.rasters[ras_no]) *
+                    #                          (Square(u.rasters[ras_no]))) / self.g)), (1/3))})
+                    # compute energy slope Se
+                    Se_dict.update({ras_no: (Slope(egl_dict[ras_no], outMeasurement, zFactor))/100})
                 # result = compare Se and S0 (Se / S0)
                 ras_name = "cSe_" + h.raster_names[ras_no][1:4]
                 cSe_dict.update({ras_name: Con(~(((Se_dict[ras_no] / S0) == 1) | ((Se_dict[ras_no] / S0) < 0)),
@@ -717,7 +864,7 @@ class ArcPyAnalysis:
         self.sch = SideChannelDelineation(self.condition)
         # routine to override noData pixels if required.
         if str(self.sch.raster).__len__() > 1:
-            self.ras_sch = Con((IsNull(self.sch.raster) == 1), (IsNull(self.sch.raster) * 0), self.sch.raster)
+            self.ras_sch = self.fill_nodata(self.sch.raster, 0)
             remap = RemapValue([[0, 0], [1, 200], [2, 127], [3, 47], [4, 25], [5, 12], [6, 9]])
             reclass = Reclassify(self.ras_sch, "VALUE", remap, "DATA")
 
@@ -751,7 +898,13 @@ class ArcPyAnalysis:
             i = 0
             self.logger.info("WARNING: Design map - Could not assign frequency threshold. Using default.")
         if (str(h.rasters[i]).__len__() > 1) and (str(u.rasters[i]).__len__() > 1):
-            self.ras_Dst = (Square(u.rasters[i] * self.n) / ((self.s - 1) * threshold_taux * Power(h.rasters[i], (1 / 3)))) * self.ft2in * self.sf
+            dcr_stored = self.get_derived_rasters("dcr", h, u)
+            if dcr_stored is not None:
+                # stored dcr = u^2 * n^2 / h^(1/3) (see riverpy/cDerivedHydraulics.py)
+                ras_dcr = self.derived_hydraulics.get_raster("dcr", h.raster_names[i], u.raster_names[i])
+                self.ras_Dst = (ras_dcr / ((self.s - 1) * threshold_taux)) * self.ft2in * self.sf
+            else:
+                self.ras_Dst = (Square(u.rasters[i] * self.n) / ((self.s - 1) * threshold_taux * Power(h.rasters[i], (1 / 3)))) * self.ft2in * self.sf
 
             temp_ras = Con(self.ras_Dst < 300, self.ras_Dst)  # eliminate outliers at structures (PowerHouse, Sills)
             self.ras_Dst = temp_ras
@@ -777,6 +930,39 @@ class ArcPyAnalysis:
             self.ras_Dw = temp_ras
             self.raster_dict_ds.update({"ras_ds_Dw": self.ras_Dw})
 
+    def fill_nodata(self, ras, value):
+        # returns ras with NoData pixels set to value (e.g., 0 or max_lf before comparing lifespan rasters)
+        # the NumPy backend fills the pixels when they are read instead of evaluating the Con(IsNull) expression
+        if fGl.numpy_backend() and isinstance(ras, cRa.Raster):
+            return cRa.fill_nodata(ras, value)
+        return Con((IsNull(ras) == 1), (IsNull(ras) * value), ras)
+
+    def get_derived_rasters(self, field, h, u, *args):
+        # NumPy backend: returns LIST of stored derived hydraulic rasters (see riverpy/cDerivedHydraulics.py) for the
+        # non-empty h.rasters and u.rasters pairs, or None if the condition has no current hydraulic cube
+        # field: STR ("dcr", "fr", "se" or "taux")
+        # args[0]: Raster of grain sizes (taux) or DEM (se)
+        self.derived_hydraulics = None
+        if not fGl.numpy_backend():
+            return None
+        cube = cHC.HydraulicCube(config.dir2conditions + self.condition)
+        if not cube.is_current():
+            return None
+        store = cDH.DerivedHydraulics(cube, self.unit_system, self.n, g=self.g, s=self.s)
+        rasters = []
+        try:
+            for i in range(0, h.raster_names.__len__()):
+                if (str(u.rasters[i]).__len__() > 1) and (str(h.rasters[i]).__len__() > 1):
+                    ras = store.get_raster(field, h.raster_names[i], u.raster_names[i], *args)
+                    if ras is None:
+                        return None
+                    rasters.append(ras)
+        except:
+            self.logger.info("WARNING: Could not use stored %s rasters (recalculating)." % field)
+            return None
+        self.derived_hydraulics = store
+        return rasters
+
     @fGl.err_info
     @fGl.spatial_license
     def join_with_habitat(self):
@@ -788,7 +974,7 @@ class ArcPyAnalysis:
             chsi_threshold = 0.5
 
             # set NoData to non-habitat values (=0)
-            base_chsi = Con(IsNull(chsi.raster), IsNull(chsi.raster) * 0, chsi.raster)
+            base_chsi = self.fill_nodata(chsi.raster, 0)
 
             if self.verify_raster_info() and (self.raster_dict_lf.__len__() > 0):
                 self.logger.info("           ... using lifespan raster: " + self.raster_info_lf)
@@ -818,7 +1004,7 @@ class ArcPyAnalysis:
         wildcard = Wildcard(self.condition)
         if str(wildcard.raster).__len__() > 1:
             # make temp_ras without noData pixels
-            temp_ras = Con((IsNull(wildcard.raster) == 1), (IsNull(wildcard.raster) * 0), wildcard.raster)
+            temp_ras = self.fill_nodata(wildcard.raster, 0)
 
             if self.verify_raster_info():
                 self.logger.info("            ...  to lifespan raster: " + self.raster_info_lf)
@@ -835,6 +1021,205 @@ class ArcPyAnalysis:
                     del self.raster_dict_ds[ras_ds]
                     i += 1
 
+    def clear_rasters(self):
+        # resets the lifespan and design rasters (e.g., before analysing the next tile of a fused analysis)
+        self.raster_dict_ds = {}
+        self.raster_dict_lf = {}
+        self.raster_info_lf = "init"
+
+    def get_design_name(self, ras, name):
+        # returns STR of the output file name of the design raster ras (key of raster_dict_ds) for feature name
+        par_name = ras[4:]
+        __full_name__ = par_name.split('.')[0] + "_" + name.split('.')[0] + '.tif'
+        if __full_name__.__len__() > 17:
+            __full_name__ = __full_name__[0:13] + '.tif'
+        return __full_name__
+
+    def get_lifespan_name(self, name):
+        # returns STR of the output file name of the lifespan raster for feature name (e.g., "grav.tif")
+        if name.__len__() > 13:
+            name = name[:10].split(".")[0] + '.tif'
+        __full_name__ = "lf_" + name
+        if __full_name__.__len__() > 17:
+            __full_name__ = __full_name__[0:13] + '.tif'
+        return __full_name__
+
+    def get_lifespan_raster(self):
+        # returns the final lifespan raster cropped to the wetted area of the highest discharge
+        try:
+            h = FlowDepth(self.condition)
+            return Con(Float(h.rasters[-1]) > 0.000, Float(self.raster_dict_lf[self.raster_info_lf]))
+        except:
+            self.logger.info("WARNING: Could not crop lifespan Raster extents to wetted area.")
+            return self.raster_dict_lf[self.raster_info_lf]
+
+    def get_output_rasters(self, ds, lf, name):
+        # returns DICT {output file name: Raster} of the rasters that save_manager writes to self.output
+        outputs = {}
+        if lf and not(self.raster_info_lf == "init"):
+            outputs.update({self.get_lifespan_name(name + '.tif'): self.get_lifespan_raster()})
+        if ds and not lf and not bool(self.raster_dict_ds):
+            try:
+                self.raster_dict_ds.update({self.raster_info_lf: self.raster_dict_lf[self.raster_info_lf]})
+            except KeyError:
+                pass
+        if ds:
+            for ras in self.raster_dict_ds.keys():
+                outputs.update({self.get_design_name(ras, name + '.tif'): self.raster_dict_ds[ras]})
+        return outputs
+
+    def get_n_factor(self, n):
+        # returns FLOAT factor of the thresholds of dcr (made with self.n) that corresponds to Manning's n
+        # n = FLOAT in s/m^(1/3) (None: self.n) - (n / self.n)^2 * dcr >= threshold
+        if n is None:
+            return 1.0
+        return (self.n / (n / 1.49 if self.unit_system == "us" else n)) ** 2
+
+    def get_sweep_rasters(self, parameter):
+        # returns TUPLE (LIST of the parameter rasters per discharge, Raster or FLOAT factor of the thresholds) that
+        # sweep and monte_carlo compare with the swept or sampled thresholds
+        # parameter = STR ("h", "u", "Fr", "taux" or "mobile_grains")
+        h = FlowDepth(self.condition)
+        u = FlowVelocity(self.condition)
+        if parameter == "h":
+            return h.rasters, 1.0 / self.ft2m
+        if parameter == "u":
+            return u.rasters, 1.0 / self.ft2m
+        rasters = []
+        if parameter == "Fr":
+            rasters = self.get_derived_rasters("fr", h, u)
+            if rasters is None:
+                rasters = [u.rasters[i] / SquareRoot(self.g * h.rasters[i]) if (
+                    (str(u.rasters[i]).__len__() > 1) and (str(h.rasters[i]).__len__() > 1)) else ""
+                           for i in range(0, h.raster_names.__len__())]
+            return rasters, 1.0
+        if parameter == "taux":
+            grains = GrainSizes(self.condition)
+            rasters = self.get_derived_rasters("taux", h, u, grains.raster)
+            if rasters is None:
+                rasters = [(self.rho_w * Square(u.rasters[i] / (5.75 * Log10(12.2 * h.rasters[i] / (
+                    2 * 2.2 * grains.raster))))) / (self.rho_w * self.g * (self.s - 1) * grains.raster) if (
+                    (str(u.rasters[i]).__len__() > 1) and (str(h.rasters[i]).__len__() > 1)) else ""
+                           for i in range(0, h.raster_names.__len__())]
+            return rasters, 1.0
+        if parameter == "mobile_grains":
+            # Dcr >= Dmean <=> dcr >= Dmean * (s - 1) * taux_cr * sf (dcr = u^2 * n^2 / h^(1/3))
+            Dmean = GrainSizes(self.condition)
+            rasters = self.get_derived_rasters("dcr", h, u)
+            if rasters is None:
+                rasters = [Square(u.rasters[i] * Float(self.n)) / Power(h.rasters[i], (1 / 3)) if (
+                    (str(u.rasters[i]).__len__() > 1) and (str(h.rasters[i]).__len__() > 1)) else ""
+                           for i in range(0, h.raster_names.__len__())]
+            return rasters, Dmean.raster * Float(self.s - 1) * Float(self.sf)
+        raise ValueError("ERROR: Threshold sweeps are not available for %s." % str(parameter))
+
+    def get_sweep_stack(self, parameter):
+        # returns TUPLE (grid, LIST of (data, mask) per discharge, FLOAT or array of the threshold factor, BOOL array
+        # of NoData threshold factors or None, LIST of lifespans, SpatialReference) or None if there is nothing to do
+        try:
+            raster_set, factor = self.get_sweep_rasters(parameter)
+        except ValueError as e:
+            self.logger.info(e.args[0])
+            return None
+        rasters = []
+        lifespans = []
+        for r_index, ras in enumerate(raster_set):
+            if (str(ras).__len__() > 1) and (r_index < self.lifespans.__len__()):
+                rasters.append(ras)
+                lifespans.append(float(self.lifespans[r_index]))
+        if not (rasters.__len__() > 0):
+            self.logger.info("          * Nothing to do (no Rasters provided).")
+            return None
+        if isinstance(factor, cRa.Raster):
+            grid, stack = cRa.align(*(rasters + [factor]))
+            factor, factor_mask = stack.pop()
+        else:
+            grid, stack = cRa.align(*rasters)
+            factor_mask = None
+        return grid, stack, factor, factor_mask, lifespans, rasters[0].spatialReference
+
+    def monte_carlo(self, parameter, threshold, *args, **kwargs):
+        # probabilistic lifespan analysis (NumPy backend): draws samples of the uncertain threshold (and Manning's n)
+        # and evaluates them in batches against the parameter stack (see sweep) - every batch only updates per-pixel
+        # counts of the lifespan classes, thus the memory is bounded by the batch size and not the number of samples
+        # parameter = STR ("h", "u", "Fr", "taux" or "mobile_grains")
+        # threshold = TUPLE (mean, standard deviation) of the threshold (units of the threshold workbook)
+        # args[0] = TUPLE (mean, standard deviation) of Manning's n in s/m^(1/3) (mobile_grains only)
+        # kwargs: samples = INT number of samples (default: 1000)
+        #         batch = INT samples per vectorised batch (default: 32)
+        #         design_lifespan = FLOAT (years) of the probability of failure (default: longest lifespan)
+        #         percentiles = LIST of FLOATs (default: [10, 50, 90])
+        #         seed = INT random seed (default: None)
+        # samples are drawn from normal distributions truncated at zero (mean > 0 and standard deviation >= 0)
+        # returns DICT with percentiles ({FLOAT: (lifespan array, BOOL NoData array)}), failure (float64 array of the
+        #         probability of failure within design_lifespan), domain (BOOL array of pixels with data),
+        #         design_lifespan, samples (LIST of [threshold, n]), geotransform and spatial_reference - or None
+        if not fGl.numpy_backend():
+            self.logger.info("ERROR: Monte Carlo analyses require the NumPy backend (riverpy/arcpy).")
+            return None
+        self.set_extent()
+        n_samples = int(kwargs.get("samples", 1000))
+        batch = max(int(kwargs.get("batch", 32)), 1)
+        percentiles = [float(q) for q in kwargs.get("percentiles", [10, 50, 90])]
+        try:
+            design_lifespan = float(kwargs["design_lifespan"])
+        except KeyError:
+            design_lifespan = float(max(self.lifespans))
+        self.logger.info("      >>> Monte Carlo analysis of %s (%i samples, threshold = %s +- %s) ..." % (
+            parameter, n_samples, str(threshold[0]), str(threshold[1])))
+        distributions = [("threshold", threshold)]
+        if parameter == "mobile_grains" and args:
+            distributions.append(("Manning's n", args[0]))
+        for name, (mean, sd) in distributions:
+            if not (float(mean) > 0.0) or not (float(sd) >= 0.0):
+                self.logger.info("ERROR: The %s distribution requires mean > 0 and standard deviation >= 0 (mean = %s, "
+                                 "sd = %s)." % (name, str(mean), str(sd)))
+                return None
+        sweep_stack = self.get_sweep_stack(parameter)
+        if sweep_stack is None:
+            return None
+        grid, stack, factor, factor_mask, lifespans, spatial_reference = sweep_stack
+        rng = np.random.default_rng(kwargs.get("seed", None))
+
+        def draw(mean, sd):
+            # normal distribution truncated at zero by rejection: with mean > 0, at least half of the draws are
+            # accepted, thus the retries are bounded and the (practically impossible) rest is clipped
+            values = rng.normal(float(mean), float(sd), n_samples)
+            for retry in range(0, 64):
+                rejected = values <= 0
+                if not rejected.any():
+                    break
+                values[rejected] = rng.normal(float(mean), float(sd), int(rejected.sum()))
+            return np.maximum(values, np.finfo(np.float64).tiny)
+        thresholds = draw(threshold[0], threshold[1])
+        try:
+            n_values = draw(args[0][0], args[0][1]) if parameter == "mobile_grains" else [None] * n_samples
+        except IndexError:
+            n_values = [None] * n_samples
+        classes = sorted(set(lifespans))
+        counts = np.zeros((classes.__len__() + 1,) + tuple(grid[1]), dtype=np.uint32)
+        for start in range(0, n_samples, batch):
+            batch_thresholds = [factor * thresholds[i] * self.get_n_factor(n_values[i])
+                                for i in range(start, min(start + batch, n_samples))]
+            ras_lf, nodata = fLs.min_exceeded_lifespan_sweep([v[0] for v in stack], batch_thresholds, lifespans,
+                                                             [v[1] for v in stack], threshold_mask=factor_mask)
+            if (parameter == "mobile_grains") and not (self.threshold_freq == 0.0):
+                nodata |= ~(ras_lf > self.threshold_freq)
+            fLs.accumulate_class_counts(counts, ras_lf, nodata, classes)
+        domain = ~np.logical_and.reduce([v[1] for v in stack])
+        if factor_mask is not None:
+            domain &= ~np.asarray(factor_mask, dtype=bool)
+        result = {}
+        for q in percentiles:
+            values, not_exceeded = fLs.count_percentile(counts, classes, q)
+            result.update({q: (values, not_exceeded | ~domain)})
+        failure = fLs.failure_probability(counts, classes, design_lifespan)
+        self.logger.info("          * mean probability of failure within %s years: %.3f" % (
+            str(design_lifespan), float(failure[domain].mean()) if domain.any() else 0.0))
+        return {"percentiles": result, "failure": failure, "domain": domain, "design_lifespan": design_lifespan,
+                "samples": [[float(thresholds[i]), n_values[i]] for i in range(0, n_samples)],
+                "geotransform": grid[0], "spatial_reference": spatial_reference}
+
     def save_manager(self, ds, lf, name):
         self.set_extent()
         name = name + '.tif'
@@ -860,14 +1245,14 @@ class ArcPyAnalysis:
             for ras in self.raster_dict_ds.keys():
                 par_name = ras[4:]
                 self.logger.info("   >> Saving design map " + par_name + " (takes time) ... ")
-                try:
-                    self.raster_dict_ds[ras].save(self.cache + ras + '.tif')
-                except:
-                    self.logger.info("WARNING: Empty design raster (" + par_name + ")")
+                if not fGl.numpy_backend():
+                    try:
+                        self.raster_dict_ds[ras].save(self.cache + ras + '.tif')
+                    except:
+                        self.logger.info("WARNING: Empty design raster (" + par_name + ")")
 
-                __full_name__ = par_name.split('.')[0] + "_" + name.split('.')[0] + '.tif'
-                if __full_name__.__len__() > 17:
-                    __full_name__ = __full_name__[0:13] + '.tif'
+                __full_name__ = self.get_design_name(ras, name)
+                if __full_name__.__len__() < (par_name.split('.')[0] + "_" + name.split('.')[0] + '.tif').__len__():
                     self.logger.info("      Preparing Cast: Using shortened Raster name (%s)." % __full_name__)
                 self.logger.info("   >> Casting to " + self.output + __full_name__ + " (may take time) ...")
                 if os.path.isfile(self.output + __full_name__):
@@ -876,10 +1261,19 @@ class ArcPyAnalysis:
                     if file_locked:
                         self.logger.info(
                             "ERROR: Existing files are locked. Consider deleting manually or revise file structure.")
+                if fGl.numpy_backend():
+                    if self.write_output(self.raster_dict_ds[ras], __full_name__):
+                        self.written.append(__full_name__)
+                    else:
+                        self.logger.info("WARNING: Empty design raster (" + par_name + ")")
+                    continue
                 try:
                     arcpy.CopyRaster_management(self.cache + ras, self.output + __full_name__)
                 except:
                     arcpy.CopyRaster_management(self.cache + str(ras).split('.')[0] + '.tif', self.output + __full_name__)
+                self.written.append(__full_name__)
+            if fGl.numpy_backend():
+                return
             try:
                 self.logger.info("   >> Clearing .cache (arcpy.Delete_management - temp.designs - please wait) ...")
                 for ras in self.raster_dict_ds:
@@ -933,17 +1327,13 @@ class ArcPyAnalysis:
                 self.logger.info("      .cache: Modified lf raster name.")
         except:
             pass
-        try:
-            h = FlowDepth(self.condition)
-            save_ras = Con(Float(h.rasters[-1]) > 0.000, Float(self.raster_dict_lf[self.raster_info_lf]))
-            self.logger.info("      * cropping to wetted area of the highest discharge ... ")
-        except:
-            save_ras = self.raster_dict_lf[self.raster_info_lf]
-            self.logger.info("WARNING: Could not crop lifespan Raster extents to wetted area.")
-        try:
-            save_ras.save(self.cache + self.raster_info_lf)
-        except:
-            self.logger.info("WARNING: Empty lifespan raster (lf_" + name + ")")
+        self.logger.info("      * cropping to wetted area of the highest discharge ... ")
+        save_ras = self.get_lifespan_raster()
+        if not fGl.numpy_backend():
+            try:
+                save_ras.save(self.cache + self.raster_info_lf)
+            except:
+                self.logger.info("WARNING: Empty lifespan raster (lf_" + name + ")")
 
         __full_name__ = "lf_" + name
         if __full_name__.__len__() > 17:
@@ -957,7 +1347,14 @@ class ArcPyAnalysis:
             if file_locked:
                 self.logger.info(
                     "ERROR: Existing files are locked. Consider deleting manually or revise file structure.")
+        if fGl.numpy_backend():
+            if self.write_output(save_ras, __full_name__):
+                self.written.append(__full_name__)
+            else:
+                self.logger.info("WARNING: Empty lifespan raster (lf_" + name + ")")
+            return
         arcpy.CopyRaster_management(self.cache + self.raster_info_lf, self.output + __full_name__)
+        self.written.append(__full_name__)
         try:
             self.logger.info("   >> Clearing cache (arcpy.Delete_management - temp.lifespans - please wait) ...")
             for ras in self.raster_dict_lf:
@@ -970,8 +1367,74 @@ class ArcPyAnalysis:
             self.logger.info("ERROR: " + name + "- raster copy to Output/Rasters folder failed raster failed.")
             self.logger.info("WARNING: .cache folder will be removed by package control.")
 
+    def write_output(self, ras, full_name):
+        # NumPy backend: writes ras as self.output + full_name in a single pass on the background writer thread
+        # (cRasterWriter) instead of saving to .cache and copying - the pixel type and NoData value are those that
+        # CopyRaster_management writes
+        # returns True if ras is a Raster (else the output is empty)
+        if not isinstance(ras, cRa.Raster):
+            return False
+        cRW.raster_writer.submit(cRa.Raster(ras.data, ras.geotransform, mask=ras.mask,
+                                            spatial_reference=ras.spatialReference), self.output + full_name)
+        return True
+
+    def save_monte_carlo(self, name, monte_carlo):
+        # writes the results of monte_carlo to self.output: percentile lifespan GeoTIFFs (mc_NAME_pXX.tif), the
+        # probability of failure within the design lifespan (mc_NAME_pf.tif) and the drawn samples (mc_NAME.csv)
+        # name = STR (e.g., feature ID)
+        # monte_carlo = DICT returned by monte_carlo
+        name = "mc_" + str(name)
+        geotransform = monte_carlo["geotransform"]
+        spatial_reference = monte_carlo["spatial_reference"]
+        self.logger.info("   >> Saving Monte Carlo rasters to %s%s* ..." % (self.output, name))
+        fGl.chk_dir(self.output)
+        for q, (values, nodata) in sorted(monte_carlo["percentiles"].items()):
+            ras_name = "%s_p%02i.tif" % (name, int(round(q)))
+            cRa.Raster(values, geotransform, mask=nodata, spatial_reference=spatial_reference).save(
+                self.output + ras_name)
+            self.written.append(ras_name)
+        cRa.Raster(monte_carlo["failure"].astype(np.float32), geotransform, mask=~monte_carlo["domain"],
+                   spatial_reference=spatial_reference).save(self.output + name + "_pf.tif")
+        self.written.append(name + "_pf.tif")
+        with open(self.output + name + ".csv", "w") as f:
+            f.write("threshold,n\n")
+            for sample in monte_carlo["samples"]:
+                f.write("%f,%s\n" % (sample[0], "" if sample[1] is None else "%f" % sample[1]))
+        self.written.append(name + ".csv")
+
+    def save_sweep(self, name, sweep):
+        # writes the results of sweep to self.output: one lifespan GeoTIFF per sweep value (sw_NAME_XX.tif), the
+        # per-pixel stack of all values (sw_NAME.npy, NaN = no lifespan) and the area per lifespan class
+        # (sw_NAME_areas.csv)
+        # name = STR (e.g., feature ID)
+        # sweep = DICT returned by sweep
+        name = "sw_" + str(name)
+        geotransform = sweep["geotransform"]
+        self.logger.info("   >> Saving threshold sweep (%i values) to %s%s* ..." % (sweep["labels"].__len__(),
+                                                                                  self.output, name))
+        fGl.chk_dir(self.output)
+        for j, label in enumerate(sweep["labels"]):
+            ras = cRa.Raster(sweep["lifespans"][j], geotransform, mask=sweep["nodata"][j],
+                             spatial_reference=sweep["spatial_reference"])
+            ras.save(self.output + "%s_%02i.tif" % (name, j))
+            self.written.append("%s_%02i.tif" % (name, j))
+        np.save(self.output + name + ".npy", np.where(sweep["nodata"], np.nan, sweep["lifespans"]).astype(np.float32))
+        self.written.append(name + ".npy")
+        area_unit = "ft2" if self.unit_system == "us" else "m2"
+        with open(self.output + name + "_areas.csv", "w") as f:
+            f.write(",".join(["value"] + ["lf %s years (%s)" % (str(lf), area_unit) for lf in sweep["classes"]] +
+                             ["not exceeded (%s)" % area_unit]) + "\n")
+            for j, label in enumerate(sweep["labels"]):
+                f.write(",".join([label] + ["%f" % a for a in sweep["areas"][j]] +
+                                 ["%f" % sweep["not_exceeded"][j]]) + "\n")
+        self.written.append(name + "_areas.csv")
+
     def set_extent(self, *args, **kwargs):
         arcpy.env.workspace = self.cache
+        if self.tile_extent is not None:
+            # fused tile-wise analysis: the tile lies within the reach or raster extents of the planned grid
+            arcpy.env.extent = self.tile_extent
+            return
         if self.extent_type == "standard":
             if type(self.reach_extents) == list:
                 try:
@@ -993,6 +1456,53 @@ class ArcPyAnalysis:
                 self.logger.info("WARNING: Could not load /01_Conditions/" + self.condition + "/boundary.tif - using MAXOF extents.")
                 arcpy.env.extent = "MAXOF"
 
+    def sweep(self, parameter, values, *args):
+        # threshold sensitivity sweep (NumPy backend): evaluates the lifespan map of one parameter for several values
+        # at once - the thresholds are broadcast along a new axis against the stack of parameter rasters, thus the
+        # rasters are read (or derived) once for all values instead of one full analysis per value
+        # parameter = STR ("h", "u", "Fr", "taux" or "mobile_grains")
+        # values = LIST of threshold values (units of the threshold workbook, e.g., [0.030, 0.047, 0.060] for taux)
+        # args[0] = LIST of Manning's n values in s/m^(1/3) (mobile_grains only, default: [n of the analysis]) - every
+        #           threshold value is combined with every n (dcr scales with n^2)
+        # returns DICT with labels (LIST of STR), lifespans (float64 array (k, rows, cols)), nodata (BOOL array),
+        #         areas (float64 array (k, lifespan classes)), not_exceeded (float64 array (k,)), classes,
+        #         geotransform and spatial_reference - or None if the sweep failed
+        if not fGl.numpy_backend():
+            self.logger.info("ERROR: Threshold sweeps require the NumPy backend (riverpy/arcpy).")
+            return None
+        self.set_extent()
+        self.logger.info("      >>> Sweeping %s thresholds: %s" % (parameter, ", ".join([str(v) for v in values])))
+        try:
+            n_values = [float(n) for n in args[0]] if parameter == "mobile_grains" else [None]
+        except IndexError:
+            n_values = [None]
+        sweep_stack = self.get_sweep_stack(parameter)
+        if sweep_stack is None:
+            return None
+        grid, stack, factor, factor_mask, lifespans, spatial_reference = sweep_stack
+        labels = []
+        thresholds = []
+        for n in n_values:
+            for v in values:
+                labels.append("%s=%s" % (parameter, str(v)) + ("" if n is None else " n=%s" % str(n)))
+                thresholds.append(factor * float(v) * self.get_n_factor(n))
+        ras_lf, nodata = fLs.min_exceeded_lifespan_sweep([v[0] for v in stack], thresholds, lifespans,
+                                                         [v[1] for v in stack], threshold_mask=factor_mask)
+        # pixels with data that no discharge exceeds (lifespan greater than the longest lifespan)
+        domain = ~np.logical_and.reduce([v[1] for v in stack])
+        cell_area = abs(grid[0][1] * grid[0][5])
+        not_exceeded = np.count_nonzero(nodata & domain[np.newaxis], axis=(1, 2)) * cell_area
+        if (parameter == "mobile_grains") and not (self.threshold_freq == 0.0):
+            nodata |= ~(ras_lf > self.threshold_freq)
+        classes = sorted(set(lifespans))
+        areas = fLs.class_areas(ras_lf, nodata, classes, cell_area)
+        for j, label in enumerate(labels):
+            self.logger.info("          * %s: %s" % (label, ", ".join(
+                ["%s years = %.1f" % (str(lf), areas[j][i]) for i, lf in enumerate(classes)])))
+        return {"labels": labels, "lifespans": ras_lf, "nodata": nodata, "areas": areas,
+                "not_exceeded": not_exceeded, "classes": classes, "geotransform": grid[0],
+                "spatial_reference": spatial_reference}
+
     def verify_inverse_tcd(self, inverse):
         # inverse is boolean (False or True)
         self.inverse_tcd = inverse
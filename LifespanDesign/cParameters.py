@@ -10,9 +10,13 @@ except:
     print("ExceptionERROR: arcpy is not available (check license connection?).")
 
 try:
-    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\.site_packages\\riverpy\\")
+    sys.path.append(os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), ".site_packages", "riverpy"))
     import config
     import cInputOutput as cIO
+    import cHydraulicCube as cHC
+    import cRaster as cRa
+    import cRasterCache as cRC
+    import fGlobal as fGl
 except:
     print("ExceptionERROR: Cannot find package files (riverpy).")
 
@@ -32,17 +36,37 @@ class ParameterContainer:
         except:
             self.flood_dependent = False
 
+    def load_raster(self, ras_path, *args):
+        # returns the raster of ras_path from the process-wide raster cache (decoded once per raster_maker run)
+        # args[0] = BOOL categorical raster (e.g., MU classes) that is cached as UINT8 CodedRaster (NumPy backend)
+        if args and args[0] and fGl.numpy_backend():
+            return cRC.raster_cache.get(ras_path, lambda path: cRa.CodedRaster.encode(arcpy.Raster(path)))
+        return cRC.raster_cache.get(ras_path, arcpy.Raster)
+
+    def get_hydraulic_cube(self):
+        # returns the HydraulicCube of the condition if it is up to date and NumPy rasters are used (otherwise None)
+        # read-only: raster_maker updates stale cubes (cHydraulicCube.update_cube) before reaches are dispatched
+        if not fGl.numpy_backend():
+            return None
+        try:
+            cube = cHC.HydraulicCube(self.raster_path + self.condition)
+            if cube.is_current():
+                return cube
+        except:
+            pass
+        return None
+
 
 class CHSI(ParameterContainer):
     # This class stores all information about combined habitat suitability Rasters
     def __init__(self, condition):
         ParameterContainer.__init__(self, condition, "chsi")
         try:
-            self.raster = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
+            self.raster = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
         except:
             self.raster = ""
         self.logger.info(
-            "      * Source: " + self.raster_path + self.condition + "\\" + " --".join(self.raster_names))
+            "      * Source: " + self.raster_path + self.condition + os.sep + " --".join(self.raster_names))
 
 
 class DEM(ParameterContainer):
@@ -50,14 +74,14 @@ class DEM(ParameterContainer):
     def __init__(self, condition):
         ParameterContainer.__init__(self, condition, "dem")
         try:
-            self.raster = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
+            self.raster = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
         except:
             try:
-                self.raster = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
+                self.raster = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
             except:
                 self.raster = ""
         self.logger.info(
-            "      * Source: " + self.raster_path + self.condition + "\\" + " --".join(self.raster_names))
+            "      * Source: " + self.raster_path + self.condition + os.sep + " --".join(self.raster_names))
 
 
 class DEMdet(ParameterContainer):
@@ -65,14 +89,14 @@ class DEMdet(ParameterContainer):
     def __init__(self, condition):
         ParameterContainer.__init__(self, condition, "det")
         try:
-            self.raster = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
+            self.raster = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
         except:
             try:
-                self.raster = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
+                self.raster = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
             except:
                 self.raster = ""
         self.logger.info(
-            "      * Source: " + self.raster_path + self.condition + "\\" + " --".join(self.raster_names))
+            "      * Source: " + self.raster_path + self.condition + os.sep + " --".join(self.raster_names))
 
 
 class DoD(ParameterContainer):
@@ -81,21 +105,21 @@ class DoD(ParameterContainer):
     def __init__(self, condition):
         ParameterContainer.__init__(self, condition, "dod")
         try:
-            self.raster_scour = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
+            self.raster_scour = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
         except:
             try:
-                self.raster_scour = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
+                self.raster_scour = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
             except:
                 self.raster_scour = ""
         try:
-            self.raster_fill = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
+            self.raster_fill = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
         except:
             try:
-                self.raster_fill = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
+                self.raster_fill = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
             except:
                 self.raster_fill = ""
         self.logger.info(
-            "      * Source: " + self.raster_path + self.condition + "\\" + " --".join(self.raster_names))
+            "      * Source: " + self.raster_path + self.condition + os.sep + " --".join(self.raster_names))
 
 
 class FlowDepth(ParameterContainer):
@@ -103,18 +127,22 @@ class FlowDepth(ParameterContainer):
     def __init__(self, condition):
         ParameterContainer.__init__(self, condition, "h")
         self.rasters = []
+        cube = self.get_hydraulic_cube()
         for ras_name in self.raster_names:
-            ras_act = self.raster_path + self.condition + "\\" + ras_name.split(".")[0]
-            if arcpy.Exists(ras_act) or os.path.isfile(ras_act + '.tif'):
+            ras_act = os.path.join(self.raster_path + self.condition, ras_name.split(".")[0])
+            if cube and cube.get_index(ras_name):
+                # zero-copy slice of the condition's hydraulic cube
+                self.rasters.append(cube.get_raster(ras_name))
+            elif arcpy.Exists(ras_act) or os.path.isfile(ras_act + '.tif'):
                 try:
-                    self.rasters.append(arcpy.Raster(str(ras_act + '.tif')))
+                    self.rasters.append(self.load_raster(ras_act + '.tif'))
                 except:
-                    self.rasters.append(arcpy.Raster(ras_act))
+                    self.rasters.append(self.load_raster(ras_act))
             else:
                 self.rasters.append("")
                 self.logger.info("ERROR: Could not load %s." % str(ras_act + '.tif'))
         self.logger.info(
-            "      * Source(s): " + self.raster_path + self.condition + "\\" + " --".join(self.raster_names))
+            "      * Source(s): " + self.raster_path + self.condition + os.sep + " --".join(self.raster_names))
 
 
 class FlowVelocity(ParameterContainer):
@@ -122,32 +150,36 @@ class FlowVelocity(ParameterContainer):
     def __init__(self, condition):
         ParameterContainer.__init__(self, condition, "u")
         self.rasters = []
+        cube = self.get_hydraulic_cube()
         for ras_name in self.raster_names:
-            ras_act = self.raster_path + self.condition + "\\" + ras_name.split(".")[0]
-            if arcpy.Exists(ras_act) or os.path.isfile(ras_act + '.tif'):
+            ras_act = os.path.join(self.raster_path + self.condition, ras_name.split(".")[0])
+            if cube and cube.get_index(ras_name):
+                # zero-copy slice of the condition's hydraulic cube
+                self.rasters.append(cube.get_raster(ras_name))
+            elif arcpy.Exists(ras_act) or os.path.isfile(ras_act + '.tif'):
                 try:
-                    self.rasters.append(arcpy.Raster(ras_act + '.tif'))
+                    self.rasters.append(self.load_raster(ras_act + '.tif'))
                 except:
-                    self.rasters.append(arcpy.Raster(ras_act))
+                    self.rasters.append(self.load_raster(ras_act))
             else:
                 self.rasters.append("")
                 self.logger.info("ERROR: Could not load %s." % str(ras_act + '.tif'))
         self.logger.info(
-            "      * Source(s): " + self.raster_path + self.condition + "\\" + " --".join(self.raster_names))
+            "      * Source(s): " + self.raster_path + self.condition + os.sep + " --".join(self.raster_names))
 
 
 class GrainSizes(ParameterContainer):
     def __init__(self, condition):
         ParameterContainer.__init__(self, condition, "grains")
         try:
-            self.raster = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
+            self.raster = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
         except:
             try:
-                self.raster = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
+                self.raster = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
             except:
                 self.raster = ""
         self.logger.info(
-            "      * Source: " + self.raster_path + self.condition + "\\" + " --".join(self.raster_names))
+            "      * Source: " + self.raster_path + self.condition + os.sep + " --".join(self.raster_names))
 
 
 class MU(ParameterContainer):
@@ -159,14 +191,15 @@ class MU(ParameterContainer):
 
         self.raster_names = ["mu"]  # overwrites ParameterContainer.raster_names
         try:
-            self.raster = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
+            self.raster = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif",
+                                           True)
         except:
             try:
-                self.raster = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
+                self.raster = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0], True)
             except:
                 self.raster = ""
         self.logger.info(
-            "      * Source: " + self.raster_path + self.condition + "\\" + " --".join(self.raster_names))
+            "      * Source: " + self.raster_path + self.condition + os.sep + " --".join(self.raster_names))
 
     def read_mus(self):
         mu_xlsx = cIO.Read(config.xlsx_mu)
@@ -197,14 +230,14 @@ class SideChannelDelineation(ParameterContainer):
     def __init__(self, condition):
         ParameterContainer.__init__(self, condition, "sidech")
         try:
-            self.raster = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
+            self.raster = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
         except:
             try:
-                self.raster = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
+                self.raster = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
             except:
                 self.raster = ""
         self.logger.info(
-            "      * Source: " + self.raster_path + self.condition + "\\" + " --".join(self.raster_names))
+            "      * Source: " + self.raster_path + self.condition + os.sep + " --".join(self.raster_names))
 
 
 class WaterTable(ParameterContainer):
@@ -212,14 +245,14 @@ class WaterTable(ParameterContainer):
     def __init__(self, condition):
         ParameterContainer.__init__(self, condition, "d2w")
         try:
-            self.raster = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
+            self.raster = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
         except:
             try:
-                self.raster = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
+                self.raster = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
             except:
                 self.raster = ""
         self.logger.info(
-            "      * Source: " + self.raster_path + self.condition + "\\" + " --".join(self.raster_names))
+            "      * Source: " + self.raster_path + self.condition + os.sep + " --".join(self.raster_names))
 
 
 class Wildcard(ParameterContainer):
@@ -227,11 +260,11 @@ class Wildcard(ParameterContainer):
     def __init__(self, condition):
         ParameterContainer.__init__(self, condition, "wild")
         try:
-            self.raster = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
+            self.raster = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0].split(".")[0] + ".tif")
         except:
             try:
-                self.raster = arcpy.Raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
+                self.raster = self.load_raster(self.raster_path + self.condition + "\\" + self.raster_names[0])
             except:
                 self.raster = ""
         self.logger.info(
-            "      * Source: " + self.raster_path + self.condition + "\\" + " --".join(self.raster_names))
+            "      * Source: " + self.raster_path + self.condition + os.sep + " --".join(self.raster_names))
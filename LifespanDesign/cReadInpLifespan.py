@@ -6,7 +6,7 @@ except:
     print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging).")
 
 try:
-    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\.site_packages\\riverpy\\")
+    sys.path.append(os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), ".site_packages", "riverpy"))
     import config
     sys.path.append(config.dir2oxl)
     import openpyxl as oxl
@@ -18,8 +18,8 @@ class Info(object):
     def __init__(self, condition, *args):
         # type defines lines to read in .inp file
         self.alt_path = str()
-        self.inp_file = config.dir2conditions + condition + "\\input_definitions.inp"
-        self.inp_coord = r'' + os.path.dirname(os.path.abspath(__file__)) + "\\.templates\\mapping.inp"
+        self.inp_file = os.path.join(config.dir2conditions, condition, "input_definitions.inp")
+        self.inp_coord = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".templates", "mapping.inp")
         self.ras_names = []
         try:
             self.type = args[0]  # (str) corresponding to type_dict entries (e.g., type = "h")
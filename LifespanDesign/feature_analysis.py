@@ -1,21 +1,28 @@
 # !/usr/bin/python
 try:
-    import sys, os, logging
+    import sys, os, logging, multiprocessing, tempfile
 except:
-    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging).")
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, multiprocessing, tempfile).")
 
 try:
     # add folder containing package routines to the system path
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     import cLifespanDesignAnalysis as cLDA
+    import cFeaturePlan as cFP
     # add riverpy routines
-    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\.site_packages\\riverpy\\")
+    sys.path.append(os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), ".site_packages", "riverpy"))
     import config
     import cMapper as cMp
     import cDefinitions as cDef
     import cReachManager as cRM
     import fGlobal as fGl
     import cFeatures as cFe
+    import cLogger as cLog
+    import cRasterCache as cRC
+    import cRasterWriter as cRW
+    import cReachScheduler as cRS
+    import cResultCache as cRes
+    import cHydraulicCube as cHC
 except:
     print("ExceptionERROR: Cannot find RiverArchitect/.site_packages/riverpy.")
 
@@ -129,58 +136,62 @@ def analysis_call(parameter_name, feature, feature_analysis):
     return feature_analysis
 
 
-def analysis(feature, condition, reach_extents, habitat, output_dir, unit_system, wildcard, manning_n, extent_type):
+def analysis(feature, condition, reach_extents, habitat, output_dir, unit_system, wildcard, manning_n, extent_type, *args):
+    # args[0] = BOOL fused tile-wise evaluation of the parameter chain (NumPy backend only, default: False)
+    # args[1] = BOOL skip the analysis if the result cache has the outputs of unchanged inputs (default: False)
     logger = logging.getLogger("logfile")
     pot_err_msg = "FUNDAMENTAL APPLICATION ERROR - Revise River Architect usage instructions"
+    try:
+        fused = bool(args[0]) and fGl.numpy_backend()
+    except:
+        fused = False
+    try:
+        use_cache = bool(args[1])
+    except:
+        use_cache = False
+    key = None
+    if use_cache:
+        key = result_key(feature, condition, reach_extents, habitat, unit_system, wildcard, manning_n, extent_type)
+        if restore_results(key, output_dir):
+            return
+    complete = False
     try:
 
         # instantiate GIS Analysis Object
         pot_err_msg = "ArcPyAnalysis"
-        feature_analysis = cLDA.ArcPyAnalysis(condition, reach_extents, habitat, output_dir, unit_system, manning_n)  # arcpy class
-        feature_analysis.extent_type = extent_type
+        feature_analysis = make_feature_analysis(feature, condition, reach_extents, habitat, output_dir, unit_system,
+                                                 manning_n, extent_type)
 
-        # assign analysis specific parameters if applies
-        try:
-            inverse_tcd = feature.inverse_tcd
-            logger.info("   >> Inverse tcd analysis")
-        except:
-            inverse_tcd = False
-        pot_err_msg = "inverse threshold verification"
-        feature_analysis.verify_inverse_tcd(inverse_tcd)
-        try:
-            freq = feature.threshold_freq
-            logger.info("   >> Customary frequency threshold = " + str(freq))
-        except:
-            freq = 0.0
-        pot_err_msg = "frequency threshold verification"
-        feature_analysis.verify_threshold_freq(freq)
-        try:
-            sf = feature.sf
-            logger.info("   >> Customary safety factor (SF) = " + str(sf))
-        except:
-            sf = 1.0
-        pot_err_msg = "safety factor verification"
-        feature_analysis.verify_sf(sf)
-
-        # call parameter analysis
-        pot_err_msg = "parameter analysis"
-        for par in feature.parameter_list:
-            try:
-                logger.info("   >> Checking if %s applies ... " % par)
-                feature_analysis = analysis_call(par, feature, feature_analysis)
-            except:
-                logger.info("ERROR: Failed checking " + par + " of " + feature.name + ".")
-
-        pot_err_msg = "habitat join"
-        if habitat:
-            feature_analysis.join_with_habitat()
-        pot_err_msg = "wildcard join"
-        if wildcard:
-            feature_analysis.join_with_wildcard()
-        pot_err_msg = "non applicable feature: saving an empty results-Raster"
-        feature_analysis.save_manager(feature.ds, feature.lf, feature.id)
+        if fused:
+            # single pass over tiles of the analysis grid that writes the outputs tile-wise
+            pot_err_msg = "fused parameter analysis"
+            plan = cFP.FeaturePlan(feature, feature_analysis, habitat, wildcard)
+            plan.run(analysis_call)
+            complete = not plan.failed
+        else:
+            # call parameter analysis
+            pot_err_msg = "parameter analysis"
+            for par in feature.parameter_list:
+                try:
+                    logger.info("   >> Checking if %s applies ... " % par)
+                    feature_analysis = analysis_call(par, feature, feature_analysis)
+                except:
+                    logger.info("ERROR: Failed checking " + par + " of " + feature.name + ".")
+
+            pot_err_msg = "habitat join"
+            if habitat:
+                feature_analysis.join_with_habitat()
+            pot_err_msg = "wildcard join"
+            if wildcard:
+                feature_analysis.join_with_wildcard()
+            pot_err_msg = "non applicable feature: saving an empty results-Raster"
+            feature_analysis.save_manager(feature.ds, feature.lf, feature.id)
+            complete = True
     except:
         logger.info("ERROR: Analysis stopped (" + pot_err_msg + " failed).")
+    if key and complete:
+        # outputs of the NumPy backend are written on the background writer thread (cRasterWriter)
+        cRW.raster_writer.call(store_results, key, output_dir, feature_analysis.written, condition, feature)
     try:
         fGl.rm_dir(feature_analysis.cache)  # dump cache after feature analysis
     except:
@@ -190,6 +201,167 @@ def analysis(feature, condition, reach_extents, habitat, output_dir, unit_system
             logger.info("WARNING: Could not remove .cache folder.")
 
 
+def batch_analysis(features, condition, reach_extents, habitat, output_dir, unit_system, wildcard, manning_n, extent_type,
+                   *args):
+    # fused tile-wise analysis of multiple features in one sweep over the input tiles (NumPy backend only)
+    # features = LIST of Feature objects (cFeatures.FeatureContainer(...).feature)
+    # args[0] = BOOL skip features whose outputs of unchanged inputs are in the result cache (default: False)
+    logger = logging.getLogger("logfile")
+    try:
+        use_cache = bool(args[0])
+    except:
+        use_cache = False
+    plans = []
+    keys = []
+    for feature in features:
+        logger.info("   >> Planning %s ..." % str(feature.name))
+        key = None
+        if use_cache:
+            key = result_key(feature, condition, reach_extents, habitat, unit_system, wildcard, manning_n, extent_type)
+            if restore_results(key, output_dir):
+                continue
+        try:
+            feature_analysis = make_feature_analysis(feature, condition, reach_extents, habitat, output_dir,
+                                                     unit_system, manning_n, extent_type)
+        except:
+            logger.info("ERROR: Analysis of %s stopped (ArcPyAnalysis failed)." % str(feature.name))
+            continue
+        plans.append(cFP.FeaturePlan(feature, feature_analysis, habitat, wildcard))
+        keys.append(key)
+    if plans.__len__() < 1:
+        return
+    try:
+        cFP.FeatureBatch(plans).run(analysis_call)
+    except:
+        logger.info("ERROR: Analysis stopped (fused multi-feature analysis failed).")
+        for plan in plans:
+            plan.failed = True
+    for plan, key in zip(plans, keys):
+        if key and not plan.failed:
+            store_results(key, output_dir, plan.feature_analysis.written, condition, plan.feature)
+    for plan in plans:
+        try:
+            fGl.rm_dir(plan.feature_analysis.cache)  # dump caches after the batch analysis
+        except:
+            logger.info("WARNING: Could not remove .cache (%s) folder." % str(plan.feature_analysis.cache))
+
+
+def feature_call(feature_name, condition, reach_extents, reach_name, habitat, output_dir, unit_system, wildcard,
+                 manning_n, extent_type, fused, use_cache):
+    # runs analysis() of the feature (or sub-feature) feature_name from threshold_values.xlsx
+    # reach_name = STR of the reach name for logging ("" for MAXOF extents)
+    logger = logging.getLogger("logfile")
+    logger.info("----- ----- ----- ----- ----- ----- ----- ----- -----")
+    if reach_extents == "MAXOF":
+        logger.info("FEATURE: " + str(feature_name))
+    else:
+        logger.info("FEATURE (REACH: " + reach_name + "): " + str(feature_name))
+    logger.info("----- ----- ----- ----- ----- ----- ----- ----- -----")
+    feature = cFe.FeatureContainer(feature_name)  # instantiate object containing all restoration feature attributes
+
+    if not feature.sub:
+        analysis(feature.feature, condition, reach_extents, habitat, output_dir, unit_system, wildcard,
+                 manning_n, extent_type, fused, use_cache)
+    else:
+        sub_feature = cFe.FeatureContainer(feature_name, feature.sub)
+        analysis(sub_feature.feature, condition, reach_extents, habitat, output_dir, unit_system,
+                 wildcard, manning_n, extent_type, fused, use_cache)
+
+
+def feature_worker(task):
+    # process pool task that runs feature_call and collects its log messages instead of writing the logfile
+    # task = TUPLE (feature name, TUPLE of feature_call arguments after the feature name)
+    # returns TUPLE (LIST of log records (cLogger.LogCapture.records), TUPLE (INT result cache hits, INT misses),
+    #               TUPLE (INT raster cache hits, INT misses)) of the task
+    logger = logging.getLogger("logfile")
+    capture = cLog.LogCapture()
+    hits, misses = cRes.result_cache.hits, cRes.result_cache.misses
+    raster_hits, raster_misses = cRC.raster_cache.hits, cRC.raster_cache.misses
+    handlers, propagate, level = logger.handlers, logger.propagate, logger.level
+    logger.handlers, logger.propagate = [capture], False
+    logger.setLevel(logging.DEBUG)
+    try:
+        feature_call(task[0], *task[1])
+    except:
+        logger.info("ERROR: Analysis of %s failed in process %i." % (str(task[0]), os.getpid()))
+    finally:
+        cRW.raster_writer.flush()
+        logger.handlers, logger.propagate = handlers, propagate
+        logger.setLevel(level)
+    return (capture.records, (cRes.result_cache.hits - hits, cRes.result_cache.misses - misses),
+            (cRC.raster_cache.hits - raster_hits, cRC.raster_cache.misses - raster_misses))
+
+
+def init_worker(cache_dir):
+    # process pool initializer: every worker creates the .cache folders of its feature analyses in its own directory
+    cLDA.cache_root = os.path.join(cache_dir, "worker%i" % os.getpid()) + os.sep
+    fGl.chk_dir(cLDA.cache_root)
+
+
+def make_feature_analysis(feature, condition, reach_extents, habitat, output_dir, unit_system, manning_n, extent_type):
+    # returns cLifespanDesignAnalysis.ArcPyAnalysis object with verified feature-specific settings
+    logger = logging.getLogger("logfile")
+    feature_analysis = cLDA.ArcPyAnalysis(condition, reach_extents, habitat, output_dir, unit_system, manning_n)  # arcpy class
+    feature_analysis.extent_type = extent_type
+
+    # assign analysis specific parameters if applies
+    try:
+        inverse_tcd = feature.inverse_tcd
+        logger.info("   >> Inverse tcd analysis")
+    except:
+        inverse_tcd = False
+    feature_analysis.verify_inverse_tcd(inverse_tcd)
+    try:
+        freq = feature.threshold_freq
+        logger.info("   >> Customary frequency threshold = " + str(freq))
+    except:
+        freq = 0.0
+    feature_analysis.verify_threshold_freq(freq)
+    try:
+        sf = feature.sf
+        logger.info("   >> Customary safety factor (SF) = " + str(sf))
+    except:
+        sf = 1.0
+    feature_analysis.verify_sf(sf)
+    return feature_analysis
+
+
+def result_key(feature, condition, reach_extents, habitat, unit_system, wildcard, manning_n, extent_type):
+    # returns STR result cache key of the feature outputs (None if the inputs cannot be identified)
+    # the key covers the condition's input files (path + mtime + size), the feature's threshold row, the reach
+    # extents and all analysis settings - cResultCache adds the code version
+    try:
+        return cRes.result_cache.make_key(
+            inputs=cRes.ResultCache.directory_stamp(config.dir2conditions + str(condition)),
+            feature=vars(feature), reach_extents=reach_extents, habitat=bool(habitat), wildcard=bool(wildcard),
+            unit_system=str(unit_system), manning_n=float(manning_n), extent_type=str(extent_type))
+    except:
+        logging.getLogger("logfile").info("WARNING: Cannot identify the inputs of %s (result cache disabled)." %
+                                          str(feature.id))
+        return None
+
+
+def restore_results(key, output_dir):
+    # copies the result cache outputs of key to output_dir
+    # returns BOOL (True if the analysis can be skipped)
+    if not key:
+        return False
+    outputs = cRes.result_cache.get(key, output_dir)
+    if outputs is None:
+        return False
+    logging.getLogger("logfile").info("   >> Unchanged inputs and settings - copied from result cache: %s" % (
+        ", ".join(outputs) if outputs else "no outputs (non applicable feature)"))
+    return True
+
+
+def store_results(key, output_dir, outputs, condition, feature):
+    # stores copies of the outputs (LIST of file names in output_dir) of a complete feature analysis under key
+    try:
+        cRes.result_cache.put(key, output_dir, outputs, condition=condition, feature=feature.id)
+    except:
+        logging.getLogger("logfile").info("WARNING: Could not store %s in the result cache." % str(feature.id))
+
+
 def map_maker(*args, **kwargs):
     # prepares layout of all available rasters in Output folder
     # *args[0] = LIST with (optional) directory for input rasters
@@ -248,7 +420,33 @@ def map_maker(*args, **kwargs):
     return config.dir2map + condition_new + "\\"
 
 
-def raster_maker(condition, reach_ids, *args):
+def parallel_analysis(tasks, workers):
+    # runs feature_worker tasks in a pool of worker processes - the log messages of every feature are written to the
+    # logfile in the order of tasks (independent of the order in which the workers finish)
+    # tasks = LIST of TUPLES (feature name, TUPLE of feature_call arguments after the feature name)
+    # workers = INT of worker processes
+    logger = logging.getLogger("logfile")
+    workers = min(workers, tasks.__len__())
+    logger.info("   >> Analysing %i features in %i worker processes ..." % (tasks.__len__(), workers))
+    cache_dir = tempfile.mkdtemp(prefix=".workers", dir=cLDA.cache_root)
+    pool = multiprocessing.Pool(workers, initializer=init_worker, initargs=(cache_dir,))
+    try:
+        # imap returns results in task order while chunksize=1 keeps all workers busy until the last feature
+        for records, result_stats, raster_stats in pool.imap(feature_worker, tasks, chunksize=1):
+            cLog.LogCapture.replay(logger, records)
+            cRes.result_cache.hits += result_stats[0]
+            cRes.result_cache.misses += result_stats[1]
+            cRC.raster_cache.add_statistics(*raster_stats)
+    finally:
+        pool.close()
+        pool.join()
+        try:
+            fGl.rm_dir(cache_dir)
+        except:
+            logger.info("WARNING: Could not remove worker .cache folders (%s)." % cache_dir)
+
+
+def raster_maker(condition, reach_ids, *args, **kwargs):
     # args[0] = feature_list (list from threshold_values.xlsx)
     # args[1] = mapping (True/False)
     # args[2] = habitat analysis (True/False)
@@ -256,11 +454,25 @@ def raster_maker(condition, reach_ids, *args):
     # args[4] = wildcard raster application
     # args[5] = FLOAT manning n in s/m^(1/3)
     # args[6] = STR extent_type either "standard" (reaches) or "raster" (background raster)
+    # kwargs: fused = BOOL fused tile-wise evaluation of each feature (default: True with the NumPy backend)
+    #         batch = BOOL evaluate all features in one sweep over the input tiles (default: fused)
+    #         workers = INT of worker processes that analyse features in parallel (default: 1, 0 = all CPUs)
+    #                   parallel feature analyses replace the batch sweep
+    #         reach_workers = INT of concurrently analysed reaches (default: 1 with workers > 1, else 0 = all CPUs)
+    #         use_cache = BOOL skip features and reaches with unchanged inputs and settings (default: False)
+    #                     cResultCache.result_cache.invalidate() or Run > Clear result cache (GUI) removes stored results
     features = cDef.FeatureDefinitions(False)
     logger = logging.getLogger("logfile")
+    fused = bool(kwargs.get("fused", True)) and fGl.numpy_backend()
+    workers = int(kwargs.get("workers", 1))
+    if workers < 1:
+        workers = multiprocessing.cpu_count()
+    batch = bool(kwargs.get("batch", fused)) and fused and not (workers > 1)
+    reach_workers = int(kwargs.get("reach_workers", 1 if workers > 1 else 0))
+    use_cache = bool(kwargs.get("use_cache", False))
     if not args:
         # use general feature list and default settings if no arguments are provided
-        feature_list = features.feature_name_list
+        feature_list = features.name_list
         mapping = False
         habitat_analysis = False
         unit_system = "us"
@@ -270,10 +482,10 @@ def raster_maker(condition, reach_ids, *args):
             if args[0].__len__() > 0:
                 feature_list = args[0]
             else:
-                feature_list = features.feature_name_list
+                feature_list = features.name_list
         except:
             # use simplified feature list
-            feature_list = features.feature_name_list
+            feature_list = features.name_list
         try:
             mapping = args[1]
             logger.info("Integrated mapping (layout creation) activated.")
@@ -305,38 +517,59 @@ def raster_maker(condition, reach_ids, *args):
     logger.info("lifespan_design.raster_maker initiated with feature list = " + str(feature_list) + "\nUnit system: " +
                 str(unit_system))
 
-    reach_reader = cRM.Read()
     reaches = cDef.ReachDefinitions()
+    if reach_ids.__len__() < 8:
+        scheduler = cRS.ReachScheduler(reach_ids, workers=reach_workers)
+    else:
+        scheduler = cRS.ReachScheduler(reach_ids[0:1], workers=1, extents={reach_ids[0]: "MAXOF"})
+    maxof_ids = [r for r in scheduler.reach_ids if scheduler.extents[r] == "MAXOF"]
+    if maxof_ids:
+        # MAXOF extents include all other reaches
+        scheduler.reach_ids = scheduler.reach_ids[0:scheduler.reach_ids.index(maxof_ids[0]) + 1]
 
-    outputs = []
-
-    for r in reach_ids:
-        if reach_ids.__len__() < 8:
-            reach_extents = reach_reader.get_reach_coordinates(reaches.dict_id_int_id[r])
-        else:
-            reach_extents = "MAXOF"
+    def reach_analysis(r, reach_extents):
+        # runs the features on one reach (concurrent reaches work in their own geoprocessing environment)
         output_dir = fGl.make_output_dir(condition, [r], habitat_analysis, feature_list)
-        outputs.append(output_dir)
         # fGl.clean_dir(output_dir)
-        for f in feature_list:
+        if batch:
             logger.info("----- ----- ----- ----- ----- ----- ----- ----- -----")
             if reach_extents == "MAXOF":
-                logger.info("FEATURE: " + str(f))
+                logger.info("FEATURES: " + ", ".join([str(f) for f in feature_list]))
             else:
-                logger.info("FEATURE (REACH: " + reaches.dict_id_names[r] + "): " + str(f))
+                logger.info("FEATURES (REACH: " + reaches.dict_id_names[r] + "): " + ", ".join(
+                    [str(f) for f in feature_list]))
             logger.info("----- ----- ----- ----- ----- ----- ----- ----- -----")
-            feature = cFe.FeatureContainer(f)  # instantiate object containing all restoration feature attributes
-
-            if not feature.sub:
-                analysis(feature.feature, condition, reach_extents, habitat_analysis, output_dir, unit_system, wildcard,
-                         manning_n, extent_type)
+            batch_features = []
+            for f in feature_list:
+                feature = cFe.FeatureContainer(f)
+                if not feature.sub:
+                    batch_features.append(feature.feature)
+                else:
+                    batch_features.append(cFe.FeatureContainer(f, feature.sub).feature)
+            batch_analysis(batch_features, condition, reach_extents, habitat_analysis, output_dir, unit_system,
+                           wildcard, manning_n, extent_type, use_cache)
+        else:
+            reach_name = "" if reach_extents == "MAXOF" else reaches.dict_id_names[r]
+            feature_args = (condition, reach_extents, reach_name, habitat_analysis, output_dir, unit_system, wildcard,
+                            manning_n, extent_type, fused, use_cache)
+            if workers > 1:
+                parallel_analysis([(f, feature_args) for f in feature_list], workers)
             else:
-                sub_feature = cFe.FeatureContainer(f, feature.sub)
-                analysis(sub_feature.feature, condition, reach_extents, habitat_analysis, output_dir, unit_system,
-                         wildcard, manning_n, extent_type)
-        if reach_extents == "MAXOF":
-            break
+                for f in feature_list:
+                    feature_call(f, *feature_args)
+        return output_dir
+
+    if fGl.numpy_backend():
+        # build a missing or update a stale hydraulic cube once - FlowDepth and FlowVelocity of concurrent reaches only
+        # read it
+        cHC.update_cube(config.dir2conditions + condition)
+    reach_outputs = scheduler.run(reach_analysis)
+    cRW.raster_writer.flush()
+    outputs = [reach_outputs[r] for r in scheduler.reach_ids if reach_outputs[r] is not None]
 
+    cRC.raster_cache.log_statistics()
+    if use_cache:
+        cRes.result_cache.log_statistics()
     logger.info("RASTERS FINISHED.")
 
     if mapping:
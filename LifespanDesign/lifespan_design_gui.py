@@ -16,6 +16,7 @@ try:
     import cDefinitions as cDef
     import fGlobal as fGl
     import cReachManager as cRM
+    import cResultCache as cRes
 except:
     print("ExceptionERROR: Cannot find riverpy.")
 
@@ -60,9 +61,11 @@ class RunGui:
         self.wy = (self.master.winfo_screenheight() - self.wh) / 2
         self.master.geometry("%dx%d+%d+%d" % (self.ww, self.wh, self.wx, self.wy))
 
-    def gui_raster_maker(self, condition, reach_ids_applied, feature_list, mapping, habitat, units, wild, n, ext_type):
+    def gui_raster_maker(self, condition, reach_ids_applied, feature_list, mapping, habitat, units, wild, n, ext_type,
+                         use_cache=False):
         import feature_analysis as fa
-        out_dir = fa.raster_maker(condition, reach_ids_applied, feature_list, mapping, habitat, units, wild, n, ext_type)
+        out_dir = fa.raster_maker(condition, reach_ids_applied, feature_list, mapping, habitat, units, wild, n, ext_type,
+                                  use_cache=use_cache)
         self.master.iconbitmap(config.code_icon)
         return out_dir
 
@@ -94,7 +97,7 @@ class FaGui(sg.RaModuleGui):
     def __init__(self, from_master):
         sg.RaModuleGui.__init__(self, from_master)
         self.ww = 700  # window width
-        self.wh = 490  # window height
+        self.wh = 520  # window height
         self.title = "Lifespan Design"
         self.set_geometry(self.ww, self.wh, self.title)
 
@@ -115,6 +118,7 @@ class FaGui(sg.RaModuleGui):
         self.gui_condition = tk.StringVar()
         self.gui_interpreter = tk.StringVar()
         self.extent_type = tk.StringVar()
+        self.use_cache = tk.BooleanVar()
 
         # LABELS
         self.l_s_feat = tk.Label(self, text="Selected features: ")
@@ -180,6 +184,10 @@ class FaGui(sg.RaModuleGui):
                                         variable=self.extent_type, onvalue="raster", offvalue="standard")
         self.cb_extent.grid(sticky=tk.W, row=11, column=0, columnspan=5, padx=self.xd, pady=self.yd)
         self.cb_extent.deselect()
+        self.cb_cache = tk.Checkbutton(self, text="Skip features with unchanged inputs (use result cache)",
+                                       variable=self.use_cache, onvalue=True, offvalue=False)
+        self.cb_cache.grid(sticky=tk.W, row=12, column=0, columnspan=5, padx=self.xd, pady=self.yd)
+        self.cb_cache.deselect()
 
     def complete_menus(self):
         # FEATURE DROP DOWN
@@ -200,6 +208,7 @@ class FaGui(sg.RaModuleGui):
         self.runmenu.add_command(label="Verify settings", command=lambda: self.verify())
         self.runmenu.add_command(label="Run: Raster Maker", command=lambda: self.run_raster_maker())
         self.runmenu.add_command(label="Run: Map Maker", command=lambda: self.run_map_maker())
+        self.runmenu.add_command(label="Clear result cache", command=lambda: self.clear_result_cache())
 
     def build_feat_menu(self):
         self.featmenu.add_command(label="Add: ALL", command=lambda: self.define_feature(""))
@@ -214,6 +223,13 @@ class FaGui(sg.RaModuleGui):
         self.featmenu.add_command(label="Group layer: Connectivity", command=lambda: self.define_feature("complementary"))
         self.featmenu.add_command(label="CLEAR ALL", command=lambda: self.define_feature("clear"))
 
+    def clear_result_cache(self):
+        # removes stored lifespan and design rasters - Raster Maker recomputes all features in the next run
+        if askokcancel("Clear result cache", "Remove all stored lifespan and design rasters?\n(Raster Maker will "
+                                             "recompute all features.)"):
+            removed = cRes.result_cache.invalidate()
+            showinfo("INFORMATION", "Removed %i result cache entries." % removed)
+
     def define_feature(self, feature_name):
         if feature_name.__len__() < 1:
             # append all available
@@ -309,7 +325,7 @@ class FaGui(sg.RaModuleGui):
             run = RunGui(self)
             out_dir = run.gui_raster_maker(self.condition, self.reach_ids_applied, self.feature_list,
                                            self.mapping, self.habitat, self.unit, self.wild, self.manning_n,
-                                           str(self.extent_type.get()))
+                                           str(self.extent_type.get()), use_cache=bool(self.use_cache.get()))
             if self.mapping:
                 self.out_lyt_dir = out_dir
             else:
@@ -7,6 +7,8 @@ try:
     import config
     import fGlobal as fGl
     import cDefinitions as cDef  # contains reach and feature definitions
+    import cRaster as cRa
+    import fRasterAlgebra as fRA
 except:
     print("ExceptionERROR: Missing packages (required: os, logging, sys, riverpy")
 
@@ -42,6 +44,7 @@ class ArcPyContainer:
             # one zero-raster that is updated, another wont be updated
             self.make_zero_ras(dir_base_ras)
             self.best_lf_ras = arcpy.Raster(config.dir2ml + ".templates\\rasters\\zeros.tif")
+            self.best_feat_ras = None  # NumPy backend: UINT8 positions in raster_dict of the features with best_lf_ras
             self.null_ras = arcpy.Raster(config.dir2ml + ".templates\\rasters\\zeros.tif")
         except:
             print("ExceptionERROR: Could not find base Raster for assigning lifespans.")
@@ -78,7 +81,7 @@ class ArcPyContainer:
             shortname = "ds_" + sn
             self.logger.info("   >> Adding design raster for " + shortname + " ...")
             try:
-                self.raster_dict.update({shortname: Float(Con((self.features.ds_rasters[i] > 0), 0.8))})
+                self.raster_dict.update({shortname: self.encode(Float(Con((self.features.ds_rasters[i] > 0), 0.8)))})
                 self.logger.info("      Success: Added applicability of " + str(sn) + " (ds).")
             except:
                 self.errors = True
@@ -99,7 +102,7 @@ class ArcPyContainer:
             shortname = "lf_" + sn
             self.logger.info("   >> Adding lifespan raster for " + shortname + " ...")
             try:
-                self.raster_dict.update({shortname: self.features.lf_rasters[i]})
+                self.raster_dict.update({shortname: self.encode(self.features.lf_rasters[i])})
                 self.logger.info("      Success: Added highest lifespans from " + str(sn) + " (lf).")
             except:
                 self.errors = True
@@ -107,6 +110,21 @@ class ArcPyContainer:
                 self.logger.info("ERROR: Lifespan/Design data fetch failed.")
         self.logger.info("   >> Finished lifespan map look-up.")
 
+    def encode(self, ras):
+        # NumPy backend: returns ras as CodedRaster (UINT8 lifespan codes) - lifespan and design rasters only contain
+        # a few classes, thus all features' rasters stay in memory with one byte per cell for CellStatistics
+        if fGl.numpy_backend():
+            return cRa.CodedRaster.encode(ras)
+        return ras
+
+    def get_feature_mask(self, sn):
+        # sn = STR of a raster_dict key (e.g., "lf_grav")
+        # returns Raster that is 1 where the feature has the highest lifespan (NoData elsewhere) - the NumPy backend
+        # derives the mask from the feature positions of identify_best_features (ties: the first feature wins)
+        if self.best_feat_ras is None:
+            return Con((Float(self.raster_dict[sn]) == Float(self.best_lf_ras)), 1)
+        return Con((self.best_feat_ras == (list(self.raster_dict.keys()).index(sn) + 1)), 1)
+
     def get_feat_name(self, raster_name):
         for sn in self.feature_info.id_list:
             if sn in raster_name:
@@ -138,9 +156,18 @@ class ArcPyContainer:
         self.logger.info("   >> Identification of features with highest lifespans  ...")
         try:
             self.logger.info("   >> Calculating cell statistics ...")
-            self.raster_dict.update({"temp": self.null_ras})  # temporal raster extension
-            self.best_lf_ras = CellStatistics(fGl.dict_values2list(self.raster_dict.values()), "MAXIMUM", "DATA")
+            self.raster_dict.update({"temp": self.encode(self.null_ras)})  # temporal raster extension
+            if fGl.numpy_backend():
+                # one pass over all features for the highest lifespans and the features that have them (temp is
+                # the last raster, thus features win ties with the zero raster)
+                self.best_lf_ras, self.best_feat_ras = fRA.max_position(
+                    fGl.dict_values2list(self.raster_dict.values()), "FIRST")
+            else:
+                self.best_lf_ras = CellStatistics(fGl.dict_values2list(self.raster_dict.values()), "MAXIMUM", "DATA")
             del self.raster_dict["temp"]  # remove temp entry
+            if self.best_feat_ras is not None:
+                self.best_feat_ras = SetNull((self.best_feat_ras > self.raster_dict.__len__()), self.best_feat_ras)
+                self.save_best_features()
             self.logger.info("      -> Extending raster ...")
         except:
             self.logger.info("ERROR: Calculation of cell statistics failed.")
@@ -154,7 +181,10 @@ class ArcPyContainer:
 
             try:
                 self.logger.info("      -> Applying best performance of " + str(sn) + " ...")
-                __temp_ras__ = Con((Float(feat_ras) == Float(self.best_lf_ras)), 1)
+                __temp_ras__ = self.get_feature_mask(sn)
+                if (self.best_feat_ras is not None) and __temp_ras__.mask.all():
+                    self.logger.info("       > No cells with the highest lifespan (" + str(sn) + ").")
+                    continue
 
                 self.logger.info("       > Saving raster " + str(sn) + " *** takes time *** ")
                 __temp_ras__.save(self.output_ras + str(sn) + ".tif")
@@ -206,6 +236,28 @@ class ArcPyContainer:
             self.logger.info("   >> Best suitable feature shapefiles are stored in:\n%s" % str(self.output_shp))
             self.logger.info("   >> Best lifespans raster is stored in:\n%s"% str(self.output_ras))
 
+    def save_best_features(self):
+        # NumPy backend: saves best_feat_ras (1-based positions of the features with the highest lifespans) as
+        # best_feat*.tif and its legend (position, raster_dict key) as best_feat*.txt
+        suffix = ""
+        control_str = " ".join(fGl.dict_values2list(self.raster_dict.keys()))
+        try:
+            if self.feature_info.id_list_plants[0] in control_str:
+                suffix = "_plants"
+            elif "bio" in control_str:
+                suffix = "_bio"
+        except:
+            pass
+        self.logger.info("   >> Saving best feature raster (best_feat%s.tif) ..." % suffix)
+        try:
+            self.best_feat_ras.save(self.output_ras + "best_feat%s.tif" % suffix)
+            with open(self.output_ras + "best_feat%s.txt" % suffix, "w") as f:
+                for i, sn in enumerate(self.raster_dict.keys()):
+                    f.write("%i, %s\n" % (i + 1, str(sn)))
+        except:
+            self.errors = True
+            self.logger.info("ERROR: Could not save best feature raster.")
+
     @fGl.spatial_license
     def make_zero_ras(self, dir_base_ras):
         if dir_base_ras == "blank":
@@ -1,16 +1,17 @@
 
 # !/usr/bin/python
 try:
-    import sys, os, arcpy, logging, random
+    import sys, os, arcpy, logging, random, copy
     from arcpy.sa import *
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\.site_packages\\riverpy\\")
     import config
     import cReachManager as cRM
+    import cReachScheduler as cRS
     import cDefinitions as cDef
     import fGlobal as fGl
     import cFeatures as cFe
 except:
-    print("ExceptionERROR: Missing fundamental packages (required: arcpy, os, sys, logging, random).")
+    print("ExceptionERROR: Missing fundamental packages (required: arcpy, copy, os, sys, logging, random).")
 
 
 class ModifyTerrain:
@@ -36,6 +37,7 @@ class ModifyTerrain:
         self.raster_info = ""
         self.reader = cRM.Read()
         self.reaches = cDef.ReachDefinitions()
+        self.scheduler = None  # cReachScheduler.ReachScheduler of the applied reaches (see __call__)
 
         # set relevant reaches
         try:
@@ -108,7 +110,7 @@ class ModifyTerrain:
         for ras_name in self.all_rasters:
             if feature_name in ras_name:
                 ras_act = self.input_dir_ap + ras_name
-                raster = Float(arcpy.Raster(ras_act))
+                raster = Float(self.read_window(arcpy.Raster(ras_act)))
                 break
         arcpy.env.workspace = self.cache
         if "raster" in locals():
@@ -199,17 +201,50 @@ class ModifyTerrain:
             print("ExceptionERROR: Unable to create ZERO Raster.")
         arcpy.CheckInExtension('Spatial')  # check in license
 
-    def modification_manager(self, feat_id):
-        if not self.reach_delineation:
-            extents = "MAXOF"
-        else:
-            try:
-                extents = self.reader.get_reach_coordinates(self.reaches.dict_id_int_id[self.current_reach_id])
-            except:
+    def modification_manager(self, feat_id, *args):
+        # args[0] = LIST [XMin, YMin, XMax, YMax] or "MAXOF" of the current reach (default: computation_extents.xlsx)
+        try:
+            extents = args[0]
+        except IndexError:
+            if not self.reach_delineation:
                 extents = "MAXOF"
-                self.logger.info("ERROR: Could not retrieve reach coordinates.")
+            else:
+                try:
+                    extents = self.reader.get_reach_coordinates(self.reaches.dict_id_int_id[self.current_reach_id])
+                except:
+                    extents = "MAXOF"
+                    self.logger.info("ERROR: Could not retrieve reach coordinates.")
         self.lower_dem_for_plants(feat_id, extents)
 
+    def read_window(self, ras):
+        # returns ras limited to the bounding box of the current reach (NumPy backend) or ras
+        try:
+            return self.scheduler.read_window(self.current_reach_id, ras)
+        except AttributeError:
+            return ras
+
+    def run_reach(self, reach_id, extents):
+        # modifies the terrain of one reach on a shallow copy of self with its own raster storage and .cache folder,
+        # thus reaches can run concurrently (cReachScheduler)
+        # extents = LIST [XMin, YMin, XMax, YMax] or "MAXOF"
+        reach = copy.copy(self)
+        reach.current_reach_id = reach_id
+        reach.raster_dict = {}
+        reach.raster_info = ""
+        reach.cache = self.cache + str(reach_id) + "\\"
+        fGl.chk_dir(reach.cache)
+        reach.ras_dem = reach.read_window(self.ras_dem)
+        reach.ras_d2w = reach.read_window(self.ras_d2w)
+        reach.zero_ras = reach.read_window(self.zero_ras)
+        reach_name = self.reaches.dict_id_names[reach_id]
+        self.logger.info("\n\n     REACH NAME: " + str(reach_name).capitalize())
+        self.logger.info("----- ----- ----- ----- ----- ----- ----- ----- -----")
+
+        for feat_id in reach.applied_feat_ids:
+            reach.modification_manager(feat_id, extents)
+
+        reach.save_rasters()
+
     def save_rasters(self):
         # Writes Raster Dataset as Esri Grid file to Output/Rasters/condition folder
         self.logger.info("")
@@ -252,20 +287,13 @@ class ModifyTerrain:
             self.logger.info(arcpy.GetMessages())
 
     def __call__(self):
-
-        for rn in self.reach_ids_applied:
-            self.current_reach_id = rn
-            reach_name = self.reaches.dict_id_names[rn]
-            self.logger.info("\n\n     REACH NAME: " + str(reach_name).capitalize())
-            self.logger.info("----- ----- ----- ----- ----- ----- ----- ----- -----")
-
-            for feat_id in self.applied_feat_ids:
-                self.modification_manager(feat_id)
-
-            self.save_rasters()
-            # reset raster storage
-            self.raster_dict = {}
-            self.raster_info = ""
+        # reaches run concurrently with the NumPy backend (windowed reads of the reach bounding boxes)
+        if self.reach_delineation:
+            self.scheduler = cRS.ReachScheduler(self.reach_ids_applied)
+        else:
+            self.scheduler = cRS.ReachScheduler(self.reach_ids_applied,
+                                                extents={rn: "MAXOF" for rn in self.reach_ids_applied})
+        self.scheduler.run(self.run_reach)
 
         try:
             self.logger.info("  >> Clearing .cache (arcpy.Delete_management - temp.designs - please wait) ...")
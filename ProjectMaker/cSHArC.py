@@ -14,6 +14,7 @@ try:
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\.site_packages\\riverpy\\")
     import config
     import fGlobal as fGl
+    import fZonalStatistics as fZS
 except:
     print("ExceptionERROR: Missing RiverArchitect packages (required: riverpy).")
 
@@ -106,59 +107,69 @@ class SHArC:
         if apply_wua:
             ras4wua = Con(~IsNull(self.ras_project), Con(~IsNull(ras_csi), Float(ras_csi)))
 
-        self.logger.info("   * converting snapped CHSI raster to Polygon shapefile:")
-        try:
-            shp_name = self.cache + "aua%s.shp" % str(self.cache_count)
-            self.logger.info("     " + shp_name)
-            arcpy.RasterToPolygon_conversion(ras4shp, shp_name, "NO_SIMPLIFY")
-        except arcpy.ExecuteError:
-            self.logger.info("ExecuteERROR: (arcpy) in RasterToPolygon_conversion.")
-            self.logger.info(arcpy.GetMessages(2))
-            arcpy.AddError(arcpy.GetMessages(2))
-            return -1
-        except Exception as e:
-            self.logger.info("ExceptionERROR: (arcpy) in RasterToPolygon_conversion.")
-            self.logger.info(e.args[0])
-            arcpy.AddError(e.args[0])
-            return -1
-        except:
-            self.logger.info("ERROR: Shapefile conversion failed.")
-            return -1
+        if fGl.numpy_backend():
+            # count the cells instead of summing the F_AREA of polygons
+            self.logger.info("   * calculating usable habitat area (zonal statistics) ... ")
+            try:
+                stats = fZS.mask_statistics(ras4shp, weights=ras4wua if apply_wua else None)
+            except Exception as e:
+                self.logger.info("ExceptionERROR: Area calculation failed (%s)." % str(e))
+                return -1
+            area = stats["weighted_area"] if apply_wua else stats["area"]
+        else:
+            self.logger.info("   * converting snapped CHSI raster to Polygon shapefile:")
+            try:
+                shp_name = self.cache + "aua%s.shp" % str(self.cache_count)
+                self.logger.info("     " + shp_name)
+                arcpy.RasterToPolygon_conversion(ras4shp, shp_name, "NO_SIMPLIFY")
+            except arcpy.ExecuteError:
+                self.logger.info("ExecuteERROR: (arcpy) in RasterToPolygon_conversion.")
+                self.logger.info(arcpy.GetMessages(2))
+                arcpy.AddError(arcpy.GetMessages(2))
+                return -1
+            except Exception as e:
+                self.logger.info("ExceptionERROR: (arcpy) in RasterToPolygon_conversion.")
+                self.logger.info(e.args[0])
+                arcpy.AddError(e.args[0])
+                return -1
+            except:
+                self.logger.info("ERROR: Shapefile conversion failed.")
+                return -1
 
-        self.logger.info("   * calculating usable habitat area ... ")
-        try:
-            arcpy.AddField_management(shp_name, "F_AREA", "FLOAT", 9)
-        except:
-            pass
-        try:
-            arcpy.CalculateGeometryAttributes_management(shp_name, geometry_property=[["F_AREA", "AREA"]],
-                                                         area_unit=self.area_unit)
-            self.logger.info("   * summing up area ...")
-            area = 0.0
-            if apply_wua:
-                mean_csi = float(arcpy.GetRasterProperties_management(ras4wua, property_type="MEAN")[0])
-                self.logger.info("       * weighing area with cHSI = %s ..." % str(mean_csi))
-            else:
-                mean_csi = 1.0
-            with arcpy.da.UpdateCursor(shp_name, "F_AREA") as cursor:
-                for row in cursor:
-                    try:
-                        area += float(row[0]) * mean_csi
-                    except:
-                        self.logger.info("       WARNING: Bad value (" + str(row) + ")")
-        except arcpy.ExecuteError:
-            self.logger.info("ExecuteERROR: (arcpy) in CalculateGeometryAttributes_management.")
-            self.logger.info(arcpy.GetMessages(2))
-            arcpy.AddError(arcpy.GetMessages(2))
-            return -1
-        except Exception as e:
-            self.logger.info("ExceptionERROR: (arcpy) in CalculateGeometryAttributes_management.")
-            self.logger.info(e.args[0])
-            arcpy.AddError(e.args[0])
-            return -1
-        except:
-            self.logger.info("ERROR: Area calculation failed.")
-            return -1
+            self.logger.info("   * calculating usable habitat area ... ")
+            try:
+                arcpy.AddField_management(shp_name, "F_AREA", "FLOAT", 9)
+            except:
+                pass
+            try:
+                arcpy.CalculateGeometryAttributes_management(shp_name, geometry_property=[["F_AREA", "AREA"]],
+                                                             area_unit=self.area_unit)
+                self.logger.info("   * summing up area ...")
+                area = 0.0
+                if apply_wua:
+                    mean_csi = float(arcpy.GetRasterProperties_management(ras4wua, property_type="MEAN")[0])
+                    self.logger.info("       * weighing area with cHSI = %s ..." % str(mean_csi))
+                else:
+                    mean_csi = 1.0
+                with arcpy.da.UpdateCursor(shp_name, "F_AREA") as cursor:
+                    for row in cursor:
+                        try:
+                            area += float(row[0]) * mean_csi
+                        except:
+                            self.logger.info("       WARNING: Bad value (" + str(row) + ")")
+            except arcpy.ExecuteError:
+                self.logger.info("ExecuteERROR: (arcpy) in CalculateGeometryAttributes_management.")
+                self.logger.info(arcpy.GetMessages(2))
+                arcpy.AddError(arcpy.GetMessages(2))
+                return -1
+            except Exception as e:
+                self.logger.info("ExceptionERROR: (arcpy) in CalculateGeometryAttributes_management.")
+                self.logger.info(e.args[0])
+                arcpy.AddError(e.args[0])
+                return -1
+            except:
+                self.logger.info("ERROR: Area calculation failed.")
+                return -1
 
         self.cache_count += 1
         self.result = area * self.ft2ac
@@ -4,21 +4,25 @@ except:
     print("ExceptionERROR: Missing fundamental packages (required: os, sys, logging, random).")
 
 try:
-    import arcpy
-    from arcpy.sa import *
-except:
-    print("ExceptionERROR: No valid arcpy found.")
-
-try:
-    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\.site_packages\\riverpy\\")
+    sys.path.append(os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), ".site_packages", "riverpy"))
     import config
     import cFish as cFi
     import cMakeTable as cMkT
     import cInputOutput as cIO
+    import cPartialStore as cPS
+    import cTileExecutor as cTE
     import fGlobal as fGl
+    import fRasterAlgebra as fRA
+    import fZonalStatistics as fZS
 except:
     print("ExceptionERROR: Missing RiverArchitect packages (required: riverpy).")
 
+try:
+    import arcpy
+    from arcpy.sa import *
+except:
+    print("ExceptionERROR: No valid arcpy found.")
+
 
 class CHSI:
     def __init__(self, hab_condition, cover_applies, unit):
@@ -86,59 +90,80 @@ class CHSI:
                         continue
                     dsc = arcpy.Describe(ras_csi)
                     coord_sys = dsc.SpatialReference
-                    rel_ras = Con(Float(ras_csi) > float(sha_threshold), Float(ras_csi))
                     self.logger.info("       * saving SHArea-CHSI raster: " + self.path_sha_ras + str(csi))
-                    try:
-                        rel_ras.save(self.path_sha_ras + str(csi))
-                    except:
-                        self.logger.info("ERROR: Could not save SHArea-CHSI raster.")
+                    if fGl.numpy_backend():
+                        # tile-wise threshold (cTileExecutor) - rel_ras reads the written raster lazily
+                        try:
+                            rel_ras = cTE.TileExecutor({"csi": ras_csi}).run_algebra(
+                                lambda tiles: Con(Float(tiles["csi"]) > float(sha_threshold), Float(tiles["csi"])),
+                                self.path_sha_ras + str(csi))
+                        except:
+                            rel_ras = None
+                            self.logger.info("ERROR: Could not save SHArea-CHSI raster.")
+                    else:
+                        rel_ras = Con(Float(ras_csi) > float(sha_threshold), Float(ras_csi))
+                        try:
+                            rel_ras.save(self.path_sha_ras + str(csi))
+                        except:
+                            self.logger.info("ERROR: Could not save SHArea-CHSI raster.")
 
-                    ras4shp = Con(~IsNull(rel_ras), 1)
+                    if fGl.numpy_backend():
+                        # count the cells instead of summing the F_AREA of polygons
+                        self.logger.info("       * calculating area (zonal statistics) ...")
+                        try:
+                            stats = fZS.mask_statistics(rel_ras, weights=rel_ras if apply_weighing else None)
+                            area = stats["weighted_area"] if apply_weighing else stats["area"]
+                        except Exception as e:
+                            area = 0.0
+                            self.logger.info("ExceptionERROR: Area calculation failed (%s)." % str(e))
+                    else:
+                        ras4shp = Con(~IsNull(rel_ras), 1)
 
-                    self.logger.info("       * converting SHArea-CHSI raster to shapefile ...")
-                    try:
-                        shp_name = self.cache + str(cc) + "sharea.shp"
-                        arcpy.RasterToPolygon_conversion(ras4shp, shp_name, "NO_SIMPLIFY")
-                        arcpy.DefineProjection_management(shp_name, coord_sys)
-                    except arcpy.ExecuteError:
-                        self.logger.info("ExecuteERROR: (arcpy) in RasterToPolygon_conversion.")
-                        self.logger.info(arcpy.GetMessages(2))
-                        arcpy.AddError(arcpy.GetMessages(2))
-                    except Exception as e:
-                        self.logger.info("ExceptionERROR: (arcpy) in RasterToPolygon_conversion.")
-                        self.logger.info(e.args[0])
-                        arcpy.AddError(e.args[0])
-                    except:
-                        self.logger.info("ERROR: Shapefile conversion failed.")
+                        self.logger.info("       * converting SHArea-CHSI raster to shapefile ...")
+                        try:
+                            shp_name = self.cache + str(cc) + "sharea.shp"
+                            arcpy.RasterToPolygon_conversion(ras4shp, shp_name, "NO_SIMPLIFY")
+                            arcpy.DefineProjection_management(shp_name, coord_sys)
+                        except arcpy.ExecuteError:
+                            self.logger.info("ExecuteERROR: (arcpy) in RasterToPolygon_conversion.")
+                            self.logger.info(arcpy.GetMessages(2))
+                            arcpy.AddError(arcpy.GetMessages(2))
+                        except Exception as e:
+                            self.logger.info("ExceptionERROR: (arcpy) in RasterToPolygon_conversion.")
+                            self.logger.info(e.args[0])
+                            arcpy.AddError(e.args[0])
+                        except:
+                            self.logger.info("ERROR: Shapefile conversion failed.")
 
-                    self.logger.info("       * calculating area ...")
-                    area = 0.0
-                    try:
-                        arcpy.AddField_management(shp_name, "F_AREA", "FLOAT", 9)
-                        arcpy.CalculateGeometryAttributes_management(shp_name, geometry_property=[["F_AREA", "AREA"]],
-                                                                     area_unit=self.area_unit)
-                        self.logger.info("         ... summing up area ...")
-                        if apply_weighing:
-                            mean_csi = float(arcpy.GetRasterProperties_management(rel_ras, property_type="MEAN")[0])
-                            self.logger.info("       * weighing area with cHSI = %s ..." % str(mean_csi))
-                        else:
-                            mean_csi = 1.0
-                        with arcpy.da.UpdateCursor(shp_name, "F_AREA") as cursor:
-                            for row in cursor:
-                                try:
-                                    area += float(row[0]) * mean_csi
-                                except:
-                                    self.logger.info("       WARNING: Bad value (" + str(row) + ")")
-                    except arcpy.ExecuteError:
-                        self.logger.info("ExecuteERROR: (arcpy) in CalculateGeometryAttributes_management.")
-                        self.logger.info(arcpy.GetMessages(2))
-                        arcpy.AddError(arcpy.GetMessages(2))
-                    except Exception as e:
-                        self.logger.info("ExceptionERROR: (arcpy) in CalculateGeometryAttributes_management.")
-                        self.logger.info(e.args[0])
-                        arcpy.AddError(e.args[0])
-                    except:
-                        self.logger.info("ERROR: Area calculation failed.")
+                        self.logger.info("       * calculating area ...")
+                        area = 0.0
+                        try:
+                            arcpy.AddField_management(shp_name, "F_AREA", "FLOAT", 9)
+                            arcpy.CalculateGeometryAttributes_management(shp_name,
+                                                                         geometry_property=[["F_AREA", "AREA"]],
+                                                                         area_unit=self.area_unit)
+                            self.logger.info("         ... summing up area ...")
+                            if apply_weighing:
+                                mean_csi = float(arcpy.GetRasterProperties_management(rel_ras, property_type="MEAN")[0])
+                                self.logger.info("       * weighing area with cHSI = %s ..." % str(mean_csi))
+                            else:
+                                mean_csi = 1.0
+                            with arcpy.da.UpdateCursor(shp_name, "F_AREA") as cursor:
+                                for row in cursor:
+                                    try:
+                                        area += float(row[0]) * mean_csi
+                                    except:
+                                        self.logger.info("       WARNING: Bad value (" + str(row) + ")")
+                        except arcpy.ExecuteError:
+                            self.logger.info("ExecuteERROR: (arcpy) in CalculateGeometryAttributes_management.")
+                            self.logger.info(arcpy.GetMessages(2))
+                            arcpy.AddError(arcpy.GetMessages(2))
+                        except Exception as e:
+                            self.logger.info("ExceptionERROR: (arcpy) in CalculateGeometryAttributes_management.")
+                            self.logger.info(e.args[0])
+                            arcpy.AddError(e.args[0])
+                        except:
+                            self.logger.info("ERROR: Area calculation failed.")
 
                     self.logger.info("       * writing Usable Area to workbook ...")
                     for q in Q.keys():
@@ -195,14 +220,191 @@ class CHSI:
         except:
             self.logger.info("WARNING: .cache folder will be removed by package controls.")
 
+    def combine_hsi(self, inundation_ras, dsi, vsi, cov_hsi=None, *args):
+        # returns the CHSI Raster of the wetted cells (inundation_ras > 0) of the hydraulic (and cover) HSI rasters
+        # args[0] = BOOL log the combination method (default: True, False for tiles)
+        try:
+            verbose = bool(args[0])
+        except IndexError:
+            verbose = True
+        if cov_hsi is not None:
+            if self.combine_method == "geometric_mean":
+                if verbose:
+                    self.logger.info("        * combining hydraulic and cover HSI rasters (geometric mean)...")
+                return Con(~IsNull(inundation_ras), Con(Float(inundation_ras) > 0.0, Float(Float(dsi * vsi * cov_hsi) ** Float(1/3))))
+            if self.combine_method == "product":
+                if verbose:
+                    self.logger.info("        * combining hydraulic and cover HSI rasters (product)...")
+                return Con(~IsNull(inundation_ras), Con(Float(inundation_ras) > 0.0, Float(dsi * vsi * cov_hsi)))
+        else:
+            if self.combine_method == "geometric_mean":
+                if verbose:
+                    self.logger.info("        * combining hydraulic HSI rasters (geometric mean)...")
+                return Con(~IsNull(inundation_ras), Con(Float(inundation_ras) > 0.0, Float(SquareRoot(dsi * vsi))))
+            if self.combine_method == "product":
+                if verbose:
+                    self.logger.info("        * combining hydraulic HSI rasters (product)...")
+                return Con(~IsNull(inundation_ras), Con(Float(inundation_ras) > 0.0, Float(dsi * vsi)))
+
+    def get_cover_hsi(self):
+        # returns the Raster of the maximum cover HSI values (substrate, boulders, cobbles, wood, plants)
+        relevant_cov = []
+        for covt in ["substrate", "boulders", "cobbles", "wood", "plants"]:
+            if arcpy.Exists(self.path_hsi + covt + "_hsi"):
+                self.logger.info("        * adding cover: " + covt + "_hsi")
+                relevant_cov.append(Float(arcpy.Raster(self.path_hsi + covt + "_hsi")))
+            if arcpy.Exists(self.path_hsi + covt + "_hsi.tif"):
+                self.logger.info("        * adding cover: " + covt + "_hsi.tif")
+                relevant_cov.append(Float(arcpy.Raster(self.path_hsi + covt + "_hsi.tif")))
+        self.logger.info("        * calculating cell statistics (maximum HSI values) ...")
+        return Float(CellStatistics(relevant_cov, "MAXIMUM", "DATA"))
+
     def launch_chsi_maker(self, fish, combine_method, boundary_shp):
         try:
             self.combine_method = combine_method
         except:
             self.combine_method = "geometric_mean"
 
+        if fGl.numpy_backend():
+            # HSI and CHSI in one pass over the flow depth and velocity rasters of every discharge
+            return self.make_chsi_batch(fish, boundary_shp)
         return self.make_chsi(fish, boundary_shp)
 
+    def make_chsi_batch(self, fish, boundary_shp, *args):
+        # batched HHSI.make_hhsi and make_chsi (NumPy backend): the tiles of the flow depth and velocity rasters of
+        # every discharge are read once (cTileExecutor), the depth and velocity HSI curves of all species and
+        # lifestages are evaluated and combined (with cover) per tile and the CHSI tiles are written incrementally
+        # fish is a dictionary with fish species listed in Fish.xlsx
+        # boundary_shp is either a full path of a shape file or an empty string for using "MAXOF"
+        # args[0] = BOOL save the DSI and VSI rasters in path_hsi as well (default: False)
+        try:
+            save_hsi = bool(args[0])
+        except IndexError:
+            save_hsi = False
+        self.logger.info(" >> Raster combination method: " + str(self.combine_method) + " (batched HSI)")
+        hhsi = HHSI(self.path_condition, self.condition, self.unit)
+        hhsi.read_hyd_rasters()
+        arcpy.CheckOutExtension('Spatial')
+        arcpy.env.overwriteOutput = True
+        arcpy.env.workspace = self.cache
+        arcpy.env.extent = "MAXOF"
+
+        boundary_files = []
+        if boundary_shp.__len__() > 0:
+            self.logger.info(" >> Applying boundary shapefile ... ")
+            boundary_ras = self.make_boundary_ras(boundary_shp)
+            try:
+                if boundary_ras == -1:
+                    self.logger.info("ERROR: Boundary shapefile provided but raster conversion failed.")
+                    return -1
+            except:
+                pass
+            boundary_files = [boundary_shp]
+
+        curves = {}
+        curve_points = {}
+        for species in fish.keys():
+            for ls in fish[species]:
+                self.logger.info(" -- Reading HSI curves of " + str(species).upper() + " - " + str(ls).upper())
+                fish_shortname = str(species).lower()[0:2] + str(ls[0:2])
+                curves.update({fish_shortname: (hhsi.fish.get_hsi_curve(species, ls, "h"),
+                                                hhsi.fish.get_hsi_curve(species, ls, "u"))})
+                curve_points.update({fish_shortname: (hhsi.read_curve_points(curves[fish_shortname][0]),
+                                                      hhsi.read_curve_points(curves[fish_shortname][1]))})
+
+        cover_files = []
+        cover_rasters = []
+        if self.cover_applies:
+            for covt in ["substrate", "boulders", "cobbles", "wood", "plants"]:
+                cover_files += [self.path_hsi + covt + "_hsi", self.path_hsi + covt + "_hsi.tif"]
+            for cover_file in cover_files:
+                if arcpy.Exists(cover_file):
+                    self.logger.info("        * adding cover: " + os.path.basename(cover_file))
+                    cover_rasters.append(cover_file)
+            if not cover_rasters:
+                self.logger.info("ERROR: Could not add cover HSI.")
+                return "NoMatch"
+
+        # per-discharge partials: CHSI rasters of unchanged flow, curve, cover and boundary inputs are kept
+        partials = cPS.PartialStore(self.path_csi, "chsi")
+        u_names = {q: name for name, q in hhsi.flow_dict_u.items()}
+        csi_names = []
+        cc = 0
+        for h_name, q in sorted(hhsi.flow_dict_h.items(), key=lambda item: item[1]):
+            if q not in u_names.keys():
+                self.logger.info("ERROR: Cannot find flow velocity raster for Q = " + str(q))
+                continue
+            flow_files = [self.path_condition + h_name, self.path_condition + u_names[q]]
+            pending = {}
+            for fish_shortname, curve_data in curves.items():
+                cc += 1
+                csi_name = "csi_" + fish_shortname + str(q) + ".tif"
+                csi_names.append(csi_name)
+                key = partials.make_key(flow_files + cover_files + boundary_files, curve=curve_data,
+                                        combine_method=self.combine_method, cover=self.cover_applies)
+                if not save_hsi and partials.is_current(csi_name, key):
+                    self.logger.info("        * unchanged inputs: using existing " + csi_name)
+                    continue
+                pending.update({fish_shortname: (csi_name, key)})
+            if not pending:
+                continue
+
+            inputs = {"h": flow_files[0], "u": flow_files[1]}
+            if boundary_files:
+                self.logger.info("        * clipping to boundary ...")
+                inputs.update({"boundary": boundary_ras})
+            for k, cover_file in enumerate(cover_rasters):
+                inputs.update({"cov%i" % k: cover_file})
+            out_paths = {}
+            for fish_shortname, (csi_name, key) in pending.items():
+                self.logger.info("    --- " + csi_name + " (" + self.combine_method + ") ...")
+                out_paths.update({fish_shortname: self.path_csi + csi_name})
+                if save_hsi:
+                    out_paths.update({"dsi_" + fish_shortname: self.path_hsi + "dsi_" + fish_shortname + str(q) + ".tif",
+                                      "vsi_" + fish_shortname: self.path_hsi + "vsi_" + fish_shortname + str(q) + ".tif"})
+            self.logger.info("    --- Q = " + str(q) + ": tiles of the flow depth and velocity rasters ...")
+            try:
+                if self.cover_applies:
+                    arcpy.env.extent = arcpy.Raster(flow_files[0]).extent
+                executor = cTE.TileExecutor(inputs)
+                executor.run_algebra(lambda tiles: self.make_chsi_tile(tiles, list(pending.keys()), curve_points,
+                                                                       save_hsi), out_paths)
+                for csi_name, key in pending.values():
+                    partials.update(csi_name, key)
+            except:
+                self.logger.info("ERROR: Could not calculate CSI rasters for Q = " + str(q) + ".")
+            arcpy.env.extent = "MAXOF"
+        # CHSI rasters of removed discharges
+        for fish_shortname in curves.keys():
+            for csi_name in partials.prune(csi_names, True, prefix="csi_" + fish_shortname):
+                self.logger.info("    --- removed %s (discharge no longer in the condition)" % csi_name)
+        partials.log_statistics()
+        self.logger.info(" >> OK")
+        if cc > 0:
+            return "OK"
+        else:
+            return "NoMatch"
+
+    def make_chsi_tile(self, tiles, fish_shortnames, curve_points, save_hsi):
+        # tiles = DICT {"h", "u", "boundary" (optional), "cov0", "cov1", ... (optional): Raster} of one tile
+        # fish_shortnames = LIST of species-lifestage short names (keys of curve_points)
+        # curve_points = DICT {fish_shortname: (depth curve points, velocity curve points)} (see read_curve_points)
+        # returns DICT {fish_shortname: CHSI Raster (and "dsi_"/"vsi_" + fish_shortname: HSI Raster if save_hsi)}
+        h_ras, u_ras = tiles["h"], tiles["u"]
+        if "boundary" in tiles.keys():
+            h_ras = Con(~IsNull(tiles["boundary"]), Float(h_ras))
+            u_ras = Con(~IsNull(tiles["boundary"]), Float(u_ras))
+        cov_tiles = [Float(tiles[name]) for name in sorted(tiles.keys()) if name.startswith("cov")]
+        cov_hsi = Float(CellStatistics(cov_tiles, "MAXIMUM", "DATA")) if cov_tiles else None
+        results = {}
+        for fish_shortname in fish_shortnames:
+            dsi = fRA.piecewise_linear(h_ras, *curve_points[fish_shortname][0])
+            vsi = fRA.piecewise_linear(u_ras, *curve_points[fish_shortname][1])
+            results.update({fish_shortname: self.combine_hsi(h_ras, dsi, vsi, cov_hsi, False)})
+            if save_hsi:
+                results.update({"dsi_" + fish_shortname: dsi, "vsi_" + fish_shortname: vsi})
+        return results
+
     def make_boundary_ras(self, shapef):
         if not arcpy.Exists(self.path_hsi + "boundras.tif"):
             self.logger.info("    * Converting to raster ...")
@@ -250,11 +452,18 @@ class CHSI:
         del __temp_list__
         arcpy.env.workspace = self.cache
 
+        # per-discharge partials: CHSI rasters of unchanged HSI, flow depth, cover and boundary rasters are kept
+        partials = cPS.PartialStore(self.path_csi, "chsi")
+        cover_files = []
+        if self.cover_applies:
+            for covt in ["substrate", "boulders", "cobbles", "wood", "plants"]:
+                cover_files += [self.path_hsi + covt + "_hsi", self.path_hsi + covt + "_hsi.tif"]
         cc = 0
         for species in fish.keys():
             for ls in fish[species]:
                 self.logger.info(" -- Usable Area for " + str(species).upper() + " - " + str(ls).upper())
                 fish_shortname = str(species).lower()[0:2] + str(ls[0:2])
+                csi_names = []
                 for ras in hsi_list:
                     if not (fish_shortname in str(ras)):
                         continue
@@ -266,6 +475,19 @@ class CHSI:
                         except:
                             q = int(str(ras).split(fish_shortname)[-1].split('.tif')[0])
                         self.logger.info("    --- combining rasters for Q = " + str(q) + " (" + self.combine_method + ") ...")
+                        if not ('.tif' in str(ras)):
+                            csi_name = "csi" + str(ras).strip("dsi") + ".tif"
+                        else:
+                            csi_name = "csi" + str(ras).strip("dsi")
+                        csi_names.append(csi_name)
+                        hsi_files = [self.path_hsi + n + e for n in (str(ras), "vsi" + str(ras).strip("dsi"))
+                                     for e in ("", ".tif")]
+                        key = partials.make_key(
+                            hsi_files + [self.path_condition + "h%0000006d.tif" % int(q)] + cover_files + [boundary_shp],
+                            combine_method=self.combine_method, cover=self.cover_applies)
+                        if partials.is_current(csi_name, key):
+                            self.logger.info("        * unchanged inputs: using existing " + csi_name)
+                            continue
 
                         # load inundation area Raster (wetted area)
                         try:
@@ -287,19 +509,9 @@ class CHSI:
                         if self.cover_applies:
                             try:
                                 # use higher hsi pixels if cover indicates relevance
-                                cover_types = ["substrate", "boulders", "cobbles", "wood", "plants"]
                                 arcpy.env.extent = arcpy.Extent(inundation_ras.extent.XMin, inundation_ras.extent.YMin,
                                                                 inundation_ras.extent.XMax, inundation_ras.extent.YMax)
-                                relevant_cov = []
-                                for covt in cover_types:
-                                    if arcpy.Exists(self.path_hsi + covt + "_hsi"):
-                                        self.logger.info("        * adding cover: " + covt + "_hsi")
-                                        relevant_cov.append(Float(arcpy.Raster(self.path_hsi + covt + "_hsi")))
-                                    if arcpy.Exists(self.path_hsi + covt + "_hsi.tif"):
-                                        self.logger.info("        * adding cover: " + covt + "_hsi.tif")
-                                        relevant_cov.append(Float(arcpy.Raster(self.path_hsi + covt + "_hsi.tif")))
-                                self.logger.info("        * calculating cell statistics (maximum HSI values) ...")
-                                cov_hsi = Float(CellStatistics(relevant_cov, "MAXIMUM", "DATA"))
+                                cov_hsi = self.get_cover_hsi()
                             except:
                                 self.logger.info("ERROR: Could not add cover HSI.")
                                 continue
@@ -313,27 +525,11 @@ class CHSI:
                                 vsi = Float(arcpy.Raster(self.path_hsi + "vsi" + str(ras).strip("dsi")))
                             except:
                                 vsi = Float(arcpy.Raster(self.path_hsi + "vsi" + str(ras).strip("dsi") + ".tif"))
-                            if self.cover_applies:
-                                if self.combine_method == "geometric_mean":
-                                    self.logger.info("        * combining hydraulic and cover HSI rasters (geometric mean)...")
-                                    chsi = Con(~IsNull(inundation_ras), Con(Float(inundation_ras) > 0.0, Float(Float(dsi * vsi * cov_hsi) ** Float(1/3))))
-                                if self.combine_method == "product":
-                                    self.logger.info("        * combining hydraulic and cover HSI rasters (product)...")
-                                    chsi = Con(~IsNull(inundation_ras), Con(Float(inundation_ras) > 0.0, Float(dsi * vsi * cov_hsi)))
-                            else:
-                                if self.combine_method == "geometric_mean":
-                                    self.logger.info("        * combining hydraulic HSI rasters (geometric mean)...")
-                                    chsi = Con(~IsNull(inundation_ras), Con(Float(inundation_ras) > 0.0, Float(SquareRoot(dsi * vsi))))
-                                if self.combine_method == "product":
-                                    self.logger.info("        * combining hydraulic HSI rasters (product)...")
-                                    chsi = Con(~IsNull(inundation_ras), Con(Float(inundation_ras) > 0.0, Float(dsi * vsi)))
-
-                            if not ('.tif' in str(ras)):
-                                self.logger.info("        * saving as: csi" + str(ras).strip("dsi") + ".tif")
-                                chsi.save(self.path_csi + "csi" + str(ras).strip("dsi") + ".tif")
-                            else:
-                                self.logger.info("        * saving as: csi" + str(ras).strip("dsi"))
-                                chsi.save(self.path_csi + "csi" + str(ras).strip("dsi"))
+                            chsi = self.combine_hsi(inundation_ras, dsi, vsi, cov_hsi if self.cover_applies else None)
+
+                            self.logger.info("        * saving as: " + csi_name)
+                            chsi.save(self.path_csi + csi_name)
+                            partials.update(csi_name, key)
 
                             self.logger.info("        * clearing cache buffer ...")
                             del chsi, dsi, vsi
@@ -342,8 +538,12 @@ class CHSI:
                         except:
                             self.logger.info("ERROR: Could not save CSI raster associated with " + str(ras) + ".")
                             continue
+                # CHSI rasters of removed discharges
+                for csi_name in partials.prune(csi_names, True, prefix="csi_" + fish_shortname):
+                    self.logger.info("    --- removed %s (discharge no longer in the condition)" % csi_name)
                 self.logger.info(" >> OK")
                 arcpy.CheckOutExtension('Spatial')
+        partials.log_statistics()
         if cc > 0:
             return "OK"
         else:
@@ -434,6 +634,8 @@ class HHSI:
         # habitat suitability curves from Fish.xlsx
         # fish_applied is a dictionary with fish species listed in Fish.xlsx
         # boundary_shp is either a full path of a shape file or an empty string for using "MAXOF"
+        if fGl.numpy_backend():
+            return self.make_hhsi_batch(fish_applied, boundary_shp)
 
         self.read_hyd_rasters()
 
@@ -452,16 +654,27 @@ class HHSI:
             except:
                 pass
 
+        # per-discharge partials: HSI rasters of unchanged flow rasters, curves and boundaries are not recomputed
+        partials = cPS.PartialStore(self.path_hsi, "hhsi")
+        boundary_files = [boundary_shp] if boundary_shp.__len__() > 0 else []
         for species in fish_applied.keys():
             self.logger.info(" >> SPECIES  : " + str(species))
             for ls in fish_applied[species]:
                 self.logger.info("         LIFESTAGE: " + str(ls))
+                fish_shortname = str(species[0:2]).lower() + str(ls)[0:2]
+                hsi_names = []
                 self.logger.info("   >> Calculating DEPTH HSI (DSI)")
                 self.logger.info("    > Retrieving hhsi curve from Fish.xlsx ...")
                 curve_data = self.fish.get_hsi_curve(species, ls, "h")
                 self.logger.info("      - OK")
                 for rh in self.ras_h:
                     self.logger.info("   -> DISCHARGE: " + str(self.flow_dict_h[str(rh)]))
+                    ras_name = "dsi_" + fish_shortname + str(self.flow_dict_h[str(rh)]) + ".tif"
+                    hsi_names.append(ras_name)
+                    key = partials.make_key([self.dir_in_geo + rh] + boundary_files, curve=curve_data)
+                    if partials.is_current(ras_name, key):
+                        self.logger.info("    > Unchanged flow depth and curve: using existing " + ras_name)
+                        continue
                     rh_ras = arcpy.Raster(self.dir_in_geo + rh)
 
                     self.logger.info("    > Raster calculation: Depth HSI ...")
@@ -470,10 +683,10 @@ class HHSI:
                         rh_ras = __temp_h_ras__
                     ras_out = self.nested_con_raster_calc(rh_ras, curve_data)
                     self.logger.info("      - OK")
-                    ras_name = "dsi_" + str(species[0:2]).lower() + str(ls)[0:2] + str(self.flow_dict_h[str(rh)]) + ".tif"
                     self.logger.info("    > Saving: " + self.path_hsi + ras_name + " ...")
                     try:
                         ras_out.save(self.path_hsi + ras_name)
+                        partials.update(ras_name, key)
                         self.logger.info("      - OK")
                     except:
                         self.logger.info("ERROR: Could not save HHSI (depth) raster (corrupted data?).")
@@ -484,6 +697,12 @@ class HHSI:
                 self.logger.info("      - OK")
                 for ru in self.ras_u:
                     self.logger.info("   -> DISCHARGE: " + str(self.flow_dict_u[str(ru)]))
+                    ras_name = "vsi_" + fish_shortname + str(self.flow_dict_u[str(ru)]) + ".tif"
+                    hsi_names.append(ras_name)
+                    key = partials.make_key([self.dir_in_geo + ru] + boundary_files, curve=curve_data)
+                    if partials.is_current(ras_name, key):
+                        self.logger.info("    > Unchanged flow velocity and curve: using existing " + ras_name)
+                        continue
                     rh_ras = arcpy.Raster(self.dir_in_geo + ru)
                     self.logger.info("    > Raster calculation: Velocity HSI  ... ")
                     if boundary_shp.__len__() > 0:
@@ -491,22 +710,126 @@ class HHSI:
                         rh_ras = __temp_h_ras__
                     ras_out = self.nested_con_raster_calc(rh_ras, curve_data)
                     self.logger.info("      - OK")
-                    ras_name = "vsi_" + str(species[0:2]).lower() + str(ls)[0:2] + str(self.flow_dict_u[str(ru)]) + ".tif"
                     self.logger.info(
                         "    > Saving: " + self.path_hsi + ras_name + " ...")
                     try:
                         ras_out.save(self.path_hsi + ras_name)
+                        partials.update(ras_name, key)
                         self.logger.info("      - OK")
                     except:
                         self.logger.info("ERROR: Could not save HHSI (velocity) raster (corrupted data?).")
+                # HSI rasters of removed discharges
+                for prefix in ("dsi_" + fish_shortname, "vsi_" + fish_shortname):
+                    for ras_name in partials.prune(hsi_names, True, prefix=prefix):
+                        self.logger.info("    > Removed %s (discharge no longer in the condition)." % ras_name)
 
             self.logger.info(" >> FISH SPECIES " + str(species).upper() + " COMPLETE.")
+        partials.log_statistics()
+        arcpy.env.workspace = self.cache
+        arcpy.CheckInExtension('Spatial')
+
+    def make_hhsi_batch(self, fish_applied, boundary_shp):
+        # batched make_hhsi (NumPy backend): the tiles of the flow depth and velocity rasters of every discharge in
+        # dir_in_geo are read once (cTileExecutor) and the depth and velocity HSI curves of all species and lifestages
+        # are evaluated per tile - writes the same DSI and VSI rasters (and partials) as make_hhsi and no CHSI rasters
+        # fish_applied is a dictionary with fish species listed in Fish.xlsx
+        # boundary_shp is either a full path of a shape file or an empty string for using "MAXOF"
+        self.read_hyd_rasters()
+        arcpy.CheckOutExtension('Spatial')
+        arcpy.env.overwriteOutput = True
+        arcpy.env.workspace = self.cache
+        arcpy.env.extent = "MAXOF"
+
+        boundary_files = []
+        if boundary_shp.__len__() > 0:
+            self.logger.info("     * using external boundary shapefile (%s)" % str(boundary_shp))
+            boundary_ras = self.make_boundary_ras(boundary_shp)
+            try:
+                if boundary_ras == -1:
+                    self.logger.info("ERROR: Boundary shapefile provided but raster conversion failed.")
+                    self.error = True
+                    return -1
+            except:
+                pass
+            boundary_files = [boundary_shp]
+
+        curves = {}
+        curve_points = {}
+        for species in fish_applied.keys():
+            for ls in fish_applied[species]:
+                self.logger.info(" >> Reading HSI curves of " + str(species).upper() + " - " + str(ls).upper())
+                fish_shortname = str(species[0:2]).lower() + str(ls)[0:2]
+                for par in ("h", "u"):
+                    curves.update({(fish_shortname, par): self.fish.get_hsi_curve(species, ls, par)})
+                    curve_points.update({(fish_shortname, par): self.read_curve_points(curves[(fish_shortname, par)])})
+
+        # per-discharge partials: HSI rasters of unchanged flow rasters, curves and boundaries are not recomputed
+        partials = cPS.PartialStore(self.path_hsi, "hhsi")
+        flow_files = {}  # {discharge: {"h": raster name, "u": raster name}}
+        for par, flow_dict in (("h", self.flow_dict_h), ("u", self.flow_dict_u)):
+            for ras_name, q in flow_dict.items():
+                flow_files.setdefault(q, {}).update({par: ras_name})
+        hsi_names = []
+        for q in sorted(flow_files.keys()):
+            pending = {}  # {HSI raster name: ((fish_shortname, par), key)}
+            for (fish_shortname, par), curve_data in curves.items():
+                if par not in flow_files[q].keys():
+                    continue
+                ras_name = {"h": "dsi_", "u": "vsi_"}[par] + fish_shortname + str(q) + ".tif"
+                hsi_names.append(ras_name)
+                key = partials.make_key([self.dir_in_geo + flow_files[q][par]] + boundary_files, curve=curve_data)
+                if partials.is_current(ras_name, key):
+                    self.logger.info("    > Unchanged flow raster and curve: using existing " + ras_name)
+                    continue
+                pending.update({ras_name: ((fish_shortname, par), key)})
+            if not pending:
+                continue
+            inputs = {par: self.dir_in_geo + ras_name for par, ras_name in flow_files[q].items()}
+            if boundary_files:
+                inputs.update({"boundary": boundary_ras})
+            self.logger.info("   -> DISCHARGE: %s (%i HSI rasters from one pass over the flow raster tiles)" % (
+                str(q), pending.__len__()))
+            try:
+                cTE.TileExecutor(inputs).run_algebra(
+                    lambda tiles: self.make_hsi_tile(tiles, pending, curve_points),
+                    {ras_name: self.path_hsi + ras_name for ras_name in pending.keys()})
+                for ras_name, (curve_key, key) in pending.items():
+                    partials.update(ras_name, key)
+            except:
+                self.error = True
+                self.logger.info("ERROR: Could not calculate HSI rasters for Q = " + str(q) + ".")
+            arcpy.env.extent = "MAXOF"
+        # HSI rasters of removed discharges
+        for fish_shortname in set(name for name, par in curves.keys()):
+            for prefix in ("dsi_" + fish_shortname, "vsi_" + fish_shortname):
+                for ras_name in partials.prune(hsi_names, True, prefix=prefix):
+                    self.logger.info("    > Removed %s (discharge no longer in the condition)." % ras_name)
+        partials.log_statistics()
         arcpy.env.workspace = self.cache
         arcpy.CheckInExtension('Spatial')
 
+    def make_hsi_tile(self, tiles, pending, curve_points):
+        # tiles = DICT {"h" and/or "u", "boundary" (optional): Raster} of one tile
+        # pending = DICT {HSI raster name: ((fish_shortname, par), partial key)} of the HSI rasters to evaluate
+        # curve_points = DICT {(fish_shortname, par): curve points} (see read_curve_points)
+        # returns DICT {HSI raster name: HSI Raster}
+        flow_tiles = {}
+        for par in ("h", "u"):
+            if par in tiles.keys():
+                flow_tiles.update({par: tiles[par]})
+                if "boundary" in tiles.keys():
+                    flow_tiles.update({par: Con(~IsNull(tiles["boundary"]), Float(tiles[par]))})
+        results = {}
+        for ras_name, (curve_key, key) in pending.items():
+            results.update({ras_name: fRA.piecewise_linear(flow_tiles[curve_key[1]], *curve_points[curve_key])})
+        return results
+
     def nested_con_raster_calc(self, ras, curve_data):
         arcpy.env.extent = "MAXOF"
         # curve_data = [[x-values], [y-values(hsi)]]
+        if fGl.numpy_backend():
+            # one pass over the raster instead of one Con raster per curve segment
+            return fRA.piecewise_linear(ras, *self.read_curve_points(curve_data))
         __ras__ = [ras * 0.0]  # initial raster assignment
         index = 0
         i_par_prev = 0.0
@@ -530,6 +853,26 @@ class HHSI:
 
         return Float(CellStatistics(__ras__, "MAXIMUM", "DATA"))
 
+    def read_curve_points(self, curve_data):
+        # curve_data = [[x-values], [y-values(hsi)]]
+        # returns TUPLE of LISTS (x-values, y-values) up to the first non-numeric x-value - invalid y-values are NaN
+        # (the segments of invalid y-values are 0.0 as in nested_con_raster_calc)
+        x_values, y_values = [], []
+        for index, i_par in enumerate(curve_data[0]):
+            try:
+                x_values.append(float(i_par))
+            except:
+                self.logger.info("      * skipping all values larger than {0} (no data provided).".format(
+                    str(x_values[-1] if x_values else 0.0)))
+                break
+            try:
+                y_values.append(float(curve_data[1][index]))
+            except:
+                self.logger.info("WARNING: Invalid curve data (Fish.xlsx): PAR={0}, HSI={1}.".format(
+                    str(i_par), str(curve_data[1][index] if index < curve_data[1].__len__() else None)))
+                y_values.append(float("nan"))
+        return x_values, y_values
+
     def read_hyd_rasters(self):
         # uses negotiated HHSI script
         arcpy.CheckOutExtension('Spatial')
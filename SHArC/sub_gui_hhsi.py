@@ -25,6 +25,7 @@ except:
 
 class HHSIgui(object):
     def __init__(self, master, unit, fish_applied, *args):
+        # args[0] = STR of a boundary shapefile (optional)
         top = self.top = tk.Toplevel(master)
         self.dir_input_ras = ""
         self.condition = ""
@@ -149,8 +150,8 @@ class HHSIgui(object):
         msg0 = "Analysis takes a while. \nPython windows seem unresponsive in the meanwhile. \nCheck console messages."
         msg1 = "\n\nClick OK to start DHSI and VHSI calculation."
         showinfo("INFORMATION ", msg0 + msg1)
+        # DSI and VSI rasters of the selected input directory only (NumPy backend: one tile-wise pass per discharge)
         hhsi = chsi.HHSI(self.dir_input_ras, self.condition, self.unit)
-
         hhsi.make_hhsi(self.fish_applied, self.boundary_shp)
         self.top.bell()
 
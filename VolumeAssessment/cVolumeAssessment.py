@@ -3,11 +3,14 @@
 try:
     import sys, os, arcpy, logging, random
     from arcpy.sa import *
-    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) + "\\.site_packages\\riverpy\\")
+    sys.path.append(os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), ".site_packages", "riverpy"))
     import config
     import cReachManager as cRM
+    import cReachScheduler as cRS
+    import cTileExecutor as cTE
     import cDefinitions as cDef
     import fGlobal as fGl
+    import fZonalStatistics as fZS
 except:
     print("ExceptionERROR: Missing fundamental packages (required: arcpy, os, sys, logging, random).")
 
@@ -33,6 +36,7 @@ class VolumeAssessment:
         self.rasters_for_neg_vol = {}
         self.reader = cRM.Read()
         self.reaches = cDef.ReachDefinitions()
+        self.scheduler = None  # cReachScheduler.ReachScheduler of the applied reaches
         self.volume_neg_dict = {}
         self.volume_pos_dict = {}
 
@@ -79,79 +83,127 @@ class VolumeAssessment:
         # Writes Raster Dataset to Output/Rasters/vol_name folder
         self.logger.info("")
         self.logger.info(" * creating volume difference Rasters ...")
+        # reaches run concurrently with the NumPy backend (windowed reads of the reach bounding boxes)
+        self.scheduler = cRS.ReachScheduler(self.reach_ids_applied)
+        diff_rasters = self.scheduler.run(self.make_reach_diff_rasters)
 
         for rn in self.reach_ids_applied:
-            if not (rn == "none"):
-                reach_name = str(rn)
-            else:
-                reach_name = "ras" + str(rn)[0]
-            arcpy.gp.overwriteOutput = True
-            arcpy.env.workspace = self.cache
-            try:
-                extents = self.reader.get_reach_coordinates(self.reaches.dict_id_int_id[rn])
-            except:
-                extents = "MAXOF"
-                self.logger.info("ERROR: Could not retrieve reach coordinates.")
-            if not (type(extents) == str):
-                try:
-                    # XMin, YMin, XMax, YMax
-                    arcpy.env.extent = arcpy.Extent(extents[0], extents[1], extents[2], extents[3])
-                except:
-                    self.logger.info("ERROR: Failed to set reach extents -- output is corrupted.")
-                    continue
-            else:
-                arcpy.env.extent = extents
-
-            if str(self.vol_name).__len__() > 5:
-                ras_name = reach_name + "_" + str(self.vol_name)[0:5]
-            else:
-                ras_name = reach_name + "_" + str(self.vol_name)
-
-            self.logger.info("   * making excavation Raster ... ")
-            try:
-                excav_ras = Con(Float(self.modified_raster) <= Float(self.orig_raster),
-                                Con(Float(Abs(self.orig_raster - self.modified_raster)) >= self.volume_threshold,
-                                    Float(Abs(self.orig_raster - self.modified_raster)), Float(0.0)),
-                                Float(0.0))
-            except arcpy.ExecuteError:
-                self.logger.info(arcpy.GetMessages(2))
-                arcpy.AddError(arcpy.GetMessages(2))
-            except Exception as e:
-                self.logger.info(e.args[0])
-                arcpy.AddError(e.args[0])
-            except:
-                self.logger.info("ERROR: (arcpy).")
-                self.logger.info(arcpy.GetMessages())
-            try:
-                self.rasters_for_neg_vol.update({rn: excav_ras})
+            if not diff_rasters[rn]:
+                continue
+            if diff_rasters[rn]["exc"] is not None:
+                self.rasters_for_neg_vol.update({rn: diff_rasters[rn]["exc"]})
                 self.volume_neg_dict.update({rn: -0.0})
-                self.rasters.append(ras_name + "exc.tif")
-                excav_ras.save(self.output_ras_dir + ras_name + "exc.tif")
-            except:
-                self.logger.info("ERROR: Raster could not be saved.")
+                self.rasters.append(diff_rasters[rn]["name"] + "exc.tif")
+            if diff_rasters[rn]["fill"] is not None:
+                self.rasters_for_pos_vol.update({rn: diff_rasters[rn]["fill"]})
+                self.volume_pos_dict.update({rn: +0.0})
+                self.rasters.append(diff_rasters[rn]["name"] + "fill.tif")
 
-            self.logger.info("   * making fill Raster ... ")
+    def make_reach_diff_rasters(self, rn, extents):
+        # makes and saves the excavation and fill Rasters of one reach (reaches may run concurrently)
+        # rn = STR of the reach ID
+        # extents = LIST [XMin, YMin, XMax, YMax] or "MAXOF"
+        # returns DICT {"exc": Raster or None, "fill": Raster or None, "name": STR of the raster name} or None
+        if not (rn == "none"):
+            reach_name = str(rn)
+        else:
+            reach_name = "ras" + str(rn)[0]
+        arcpy.gp.overwriteOutput = True
+        arcpy.env.workspace = self.cache
+        if not (type(extents) == str):
             try:
-                fill_ras = Con(Float(self.modified_raster) > Float(self.orig_raster),
-                               Con(Float(Abs(self.modified_raster - self.orig_raster)) >= self.volume_threshold,
-                                   Float(Abs(self.modified_raster - self.orig_raster)), Float(0.0)),
-                               Float(0.0))
-            except arcpy.ExecuteError:
-                self.logger.info(arcpy.GetMessages(2))
-                arcpy.AddError(arcpy.GetMessages(2))
-            except Exception as e:
-                self.logger.info(e.args[0])
-                arcpy.AddError(e.args[0])
+                # XMin, YMin, XMax, YMax
+                arcpy.env.extent = arcpy.Extent(extents[0], extents[1], extents[2], extents[3])
             except:
-                self.logger.info("ERROR: (arcpy).")
-                self.logger.info(arcpy.GetMessages())
+                self.logger.info("ERROR: Failed to set reach extents -- output is corrupted.")
+                return None
+        else:
+            arcpy.env.extent = extents
+        if str(self.vol_name).__len__() > 5:
+            ras_name = reach_name + "_" + str(self.vol_name)[0:5]
+        else:
+            ras_name = reach_name + "_" + str(self.vol_name)
+
+        if fGl.numpy_backend():
+            # excavation and fill tiles of the reach extent (cTileExecutor): peak memory does not grow with the reach
+            self.logger.info("   * making excavation and fill Rasters ... ")
             try:
-                self.rasters_for_pos_vol.update({rn: fill_ras})
-                self.volume_pos_dict.update({rn: +0.0})
-                self.rasters.append(ras_name + "fill.tif")
-                fill_ras.save(self.output_ras_dir + ras_name + "fill.tif")
-            except:
-                self.logger.info("ERROR: Raster could not be saved.")
+                executor = cTE.TileExecutor({"orig": self.orig_raster, "mod": self.modified_raster})
+                outputs = executor.run_algebra(self.make_diff_tile, {"exc": self.output_ras_dir + ras_name + "exc.tif",
+                                                                     "fill": self.output_ras_dir + ras_name + "fill.tif"})
+            except Exception as e:
+                self.logger.info("ERROR: Rasters could not be made (%s)." % str(e))
+                return {"exc": None, "fill": None, "name": ras_name}
+            return {"exc": outputs["exc"], "fill": outputs["fill"], "name": ras_name}
+
+        orig_raster = self.scheduler.read_window(rn, self.orig_raster)
+        modified_raster = self.scheduler.read_window(rn, self.modified_raster)
+
+        self.logger.info("   * making excavation Raster ... ")
+        excav_ras = None
+        try:
+            excav_ras = Con(Float(modified_raster) <= Float(orig_raster),
+                            Con(Float(Abs(orig_raster - modified_raster)) >= self.volume_threshold,
+                                Float(Abs(orig_raster - modified_raster)), Float(0.0)),
+                            Float(0.0))
+        except arcpy.ExecuteError:
+            self.logger.info(arcpy.GetMessages(2))
+            arcpy.AddError(arcpy.GetMessages(2))
+        except Exception as e:
+            self.logger.info(e.args[0])
+            arcpy.AddError(e.args[0])
+        except:
+            self.logger.info("ERROR: (arcpy).")
+            self.logger.info(arcpy.GetMessages())
+        try:
+            excav_ras.save(self.output_ras_dir + ras_name + "exc.tif")
+        except:
+            self.logger.info("ERROR: Raster could not be saved.")
+
+        self.logger.info("   * making fill Raster ... ")
+        fill_ras = None
+        try:
+            fill_ras = Con(Float(modified_raster) > Float(orig_raster),
+                           Con(Float(Abs(modified_raster - orig_raster)) >= self.volume_threshold,
+                               Float(Abs(modified_raster - orig_raster)), Float(0.0)),
+                           Float(0.0))
+        except arcpy.ExecuteError:
+            self.logger.info(arcpy.GetMessages(2))
+            arcpy.AddError(arcpy.GetMessages(2))
+        except Exception as e:
+            self.logger.info(e.args[0])
+            arcpy.AddError(e.args[0])
+        except:
+            self.logger.info("ERROR: (arcpy).")
+            self.logger.info(arcpy.GetMessages())
+        try:
+            fill_ras.save(self.output_ras_dir + ras_name + "fill.tif")
+        except:
+            self.logger.info("ERROR: Raster could not be saved.")
+        return {"exc": excav_ras, "fill": fill_ras, "name": ras_name}
+
+    def make_diff_tile(self, tiles):
+        # tiles = DICT {"orig": Raster, "mod": Raster} of one tile of the original and modified DEMs
+        # returns DICT {"exc": excavation Raster, "fill": fill Raster} of the tile
+        orig_raster, modified_raster = tiles["orig"], tiles["mod"]
+        excav_ras = Con(Float(modified_raster) <= Float(orig_raster),
+                        Con(Float(Abs(orig_raster - modified_raster)) >= self.volume_threshold,
+                            Float(Abs(orig_raster - modified_raster)), Float(0.0)),
+                        Float(0.0))
+        fill_ras = Con(Float(modified_raster) > Float(orig_raster),
+                       Con(Float(Abs(modified_raster - orig_raster)) >= self.volume_threshold,
+                           Float(Abs(modified_raster - orig_raster)), Float(0.0)),
+                       Float(0.0))
+        return {"exc": excav_ras, "fill": fill_ras}
+
+    def get_volume(self, ras):
+        # returns FLOAT of the volume of ras above the 0.0 reference plane in cubic yards (us) or cubic meters (si)
+        if fGl.numpy_backend():
+            # tile-wise sum of the cell volumes (cell area * height) instead of arcpy.SurfaceVolume_3d
+            return fZS.mask_statistics(ras, weights=ras)["weighted_area"] * self.convert_volume_to_cy
+        feat_vol = arcpy.SurfaceVolume_3d(ras, "", "ABOVE", 0.0, 1.0)
+        voltxt = feat_vol.getMessage(1).split("Volume=")[1]
+        return float(voltxt) * self.convert_volume_to_cy
 
     def volume_computation(self):
         self.logger.info(" * calculating volume differences ...")
@@ -163,20 +215,16 @@ class VolumeAssessment:
             try:
                 self.logger.info("   * calculating fill volume from " + str(self.rasters_for_pos_vol[rn]))
                 self.logger.info("     *** takes time ***")
-                feat_vol = arcpy.SurfaceVolume_3d(self.rasters_for_pos_vol[rn], "", "ABOVE", 0.0, 1.0)
-                voltxt = feat_vol.getMessage(1).split("Volume=")[1]
-                self.logger.info("     RESULT: " + str(float(voltxt)*self.convert_volume_to_cy) + self.unit_info + ".")
-                self.volume_pos_dict[rn] = float(voltxt) * self.convert_volume_to_cy
+                self.volume_pos_dict[rn] = self.get_volume(self.rasters_for_pos_vol[rn])
+                self.logger.info("     RESULT: " + str(self.volume_pos_dict[rn]) + self.unit_info + ".")
             except:
                 self.logger.info("ERROR: Calculation of volume from " + str(self.rasters_for_pos_vol[rn]) + " failed.")
 
             try:
                 self.logger.info("   * calculating excavation volume from " + str(self.rasters_for_neg_vol[rn]))
                 self.logger.info("     *** takes time ***")
-                feat_vol = arcpy.SurfaceVolume_3d(self.rasters_for_neg_vol[rn], "", "ABOVE", 0.0, 1.0)
-                voltxt = feat_vol.getMessage(1).split("Volume=")[1]
-                self.logger.info("     RESULT: " + str(float(voltxt)*self.convert_volume_to_cy) + self.unit_info + ".")
-                self.volume_neg_dict[rn] = float(voltxt) * self.convert_volume_to_cy
+                self.volume_neg_dict[rn] = self.get_volume(self.rasters_for_neg_vol[rn])
+                self.logger.info("     RESULT: " + str(self.volume_neg_dict[rn]) + self.unit_info + ".")
             except:
                 self.logger.info("ERROR: Calculation of volume from " + str(self.rasters_for_neg_vol[rn]) + " failed.")
 
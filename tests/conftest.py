@@ -0,0 +1,39 @@
+#!/usr/bin/python
+# pytest fixtures of the NumPy raster engine (riverpy and its arcpy stand-in) - all rasters are synthetic and written
+# to pytest's tmp_path, thus the tests do not depend on the example conditions in 01_Conditions
+try:
+    import os, sys
+    import numpy as np
+    import pytest
+except:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, numpy, pytest).")
+
+sys.path.append(os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), ".site_packages", "riverpy"))
+import cRaster as cRa
+
+
+@pytest.fixture(autouse=True)
+def environment():
+    # every test starts with the default geoprocessing environment of the test thread
+    settings = cRa.environment.copy()
+    yield cRa.environment
+    cRa.environment.settings = settings
+
+
+@pytest.fixture
+def write_raster(tmp_path):
+    # returns callable(name, data, nodata_cells=None, origin=(100.0, 200.0), cell_size=1.0) that saves data as GeoTIFF
+    # in tmp_path (nodata_cells = BOOL array of NoData cells) and returns the STR path
+    def write(name, data, nodata_cells=None, origin=(100.0, 200.0), cell_size=1.0):
+        data = np.asarray(data)
+        mask = np.zeros(data.shape, dtype=bool) if nodata_cells is None else np.asarray(nodata_cells, dtype=bool)
+        geotransform = (origin[0], cell_size, 0.0, origin[1], 0.0, -cell_size)
+        path = str(tmp_path / name)
+        cRa.Raster(data, geotransform, mask=mask, spatial_reference=cRa.SpatialReference(26910)).save(path)
+        return path
+    return write
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(2019)
@@ -0,0 +1,116 @@
+#!/usr/bin/python
+# arcpy stand-in (riverpy/arcpy) and the map algebra semantics of riverpy/fRasterAlgebra
+import numpy as np
+import arcpy
+from arcpy.sa import *
+import cRaster as cRa
+import fRasterAlgebra as fRA
+
+
+def nested_con(values, x_values, y_values):
+    # reference of fRA.piecewise_linear: maximum of 0.0 and the nested Con segments of cHSI.HHSI.nested_con_raster_calc
+    result = np.zeros(values.shape)
+    x_prev, y_prev = 0.0, y_values[0]
+    for x, y in zip(x_values, y_values):
+        inside = (values >= x_prev) & (values < x)
+        result[inside] = np.maximum(result[inside], y_prev + (values[inside] - x_prev) / (x - x_prev) * (y - y_prev))
+        x_prev, y_prev = x, y
+    return result
+
+
+def test_raster_roundtrip(write_raster):
+    data = np.arange(12, dtype=np.int16).reshape(3, 4)
+    nodata_cells = np.zeros(data.shape, dtype=bool)
+    nodata_cells[1, 2] = True
+    ras = arcpy.Raster(write_raster("ints.tif", data, nodata_cells))
+    assert ras.shape == (3, 4)
+    assert ras.geotransform == (100.0, 1.0, 0.0, 200.0, 0.0, -1.0)
+    assert ras.data.dtype == np.int16
+    assert np.array_equal(ras.mask, nodata_cells)
+    assert np.array_equal(ras.data[~nodata_cells], data[~nodata_cells])
+    assert (ras.extent.XMin, ras.extent.YMin, ras.extent.XMax, ras.extent.YMax) == (100.0, 197.0, 104.0, 200.0)
+
+
+def test_saved_rasters_are_uncompressed_by_default(write_raster):
+    import cGeoTiff as cGT
+    assert arcpy.env.compression == "NONE"
+    path = write_raster("default.tif", np.ones((4, 4)))
+    assert cGT.GeoTiffReader(path).compression == cGT.COMPRESSION_NONE
+
+
+def test_con_without_false_value_is_nodata(write_raster):
+    condition = arcpy.Raster(write_raster("c.tif", np.array([[1, 0], [2, 0]], dtype=np.int32)))
+    result = Con(condition, 5.0)
+    assert np.array_equal(result.mask, [[False, True], [False, True]])
+    assert np.all(result.data[~result.mask] == 5.0)
+
+
+def test_con_propagates_nodata(write_raster):
+    condition = arcpy.Raster(write_raster("c.tif", np.array([[1, 0], [1, 0]], dtype=np.int32),
+                                          nodata_cells=[[False, False], [True, True]]))
+    true_ras = arcpy.Raster(write_raster("t.tif", np.array([[1.5, 1.5], [1.5, 1.5]]),
+                                         nodata_cells=[[True, False], [False, False]]))
+    result = Con(condition, true_ras, 0.0)
+    # NoData where the condition is NoData or where the selected value is NoData
+    assert np.array_equal(result.mask, [[True, False], [True, True]])
+    assert result.data[0, 1] == 0.0
+
+
+def test_con_of_comparisons(write_raster):
+    ras = arcpy.Raster(write_raster("v.tif", np.array([[0.2, 0.7], [1.4, -1.0]])))
+    result = Con((Float(ras) > 0.5) & (Float(ras) < 1.0), 1, 0)
+    assert np.array_equal(result.data, [[0, 1], [0, 0]])
+    assert not result.mask.any()
+
+
+def test_cell_statistics_nodata_handling(write_raster):
+    a = arcpy.Raster(write_raster("a.tif", np.array([[1.0, 5.0], [2.0, 0.0]]),
+                                  nodata_cells=[[False, False], [True, True]]))
+    b = arcpy.Raster(write_raster("b.tif", np.array([[3.0, 4.0], [7.0, 0.0]]),
+                                  nodata_cells=[[False, True], [False, True]]))
+    data = CellStatistics([a, b], "MAXIMUM", "DATA")
+    assert np.array_equal(data.mask, [[False, False], [False, True]])
+    assert np.array_equal(data.data[~data.mask], [3.0, 5.0, 7.0])
+    nodata = CellStatistics([a, b], "MAXIMUM", "NODATA")
+    assert np.array_equal(nodata.mask, [[False, True], [True, True]])
+    mean = CellStatistics([a, b], "MEAN", "DATA")
+    assert np.allclose(mean.data[~mean.mask], [2.0, 5.0, 7.0])
+
+
+def test_cell_statistics_keeps_integers(write_raster):
+    a = arcpy.Raster(write_raster("a.tif", np.array([[1, 5]], dtype=np.int16)))
+    b = arcpy.Raster(write_raster("b.tif", np.array([[3, 4]], dtype=np.int16)))
+    result = CellStatistics([a, b], "MAXIMUM", "DATA")
+    assert result.data.dtype.kind == "i"
+    assert np.array_equal(result.data, [[3, 5]])
+
+
+def test_piecewise_linear_matches_nested_con(write_raster, rng):
+    x_values, y_values = [0.5, 1.0, 2.0, 3.5], [0.1, 1.0, 0.6, 0.0]
+    values = rng.uniform(-0.5, 4.5, size=(20, 30))
+    nodata_cells = rng.random(values.shape) < 0.1
+    ras = arcpy.Raster(write_raster("h.tif", values, nodata_cells))
+    result = fRA.piecewise_linear(ras, x_values, y_values)
+    assert result.data.dtype == np.float64
+    assert np.array_equal(result.mask, nodata_cells)
+    expected = nested_con(values, x_values, y_values)
+    assert np.allclose(result.data[~nodata_cells], expected[~nodata_cells])
+    # cells at or beyond the last x-value and negative cells are unsuitable
+    assert np.all(result.data[(values >= 3.5) & ~nodata_cells] == 0.0)
+    assert np.all(result.data[(values < 0.0) & ~nodata_cells] == 0.0)
+
+
+def test_map_algebra_follows_the_extent_environment(write_raster):
+    a = arcpy.Raster(write_raster("a.tif", np.ones((4, 4))))
+    b = arcpy.Raster(write_raster("b.tif", np.full((4, 4), 2.0), origin=(102.0, 200.0)))
+    arcpy.env.extent = "MAXOF"
+    union = a + b
+    assert union.shape == (4, 6)
+    assert union.mask[:, 0:2].all() and union.mask[:, 4:6].all()
+    assert np.all(union.data[~union.mask] == 3.0)
+    arcpy.env.extent = "MINOF"
+    intersection = a + b
+    assert intersection.shape == (4, 2)
+    assert not intersection.mask.any()
+    arcpy.env.extent = cRa.Extent(101.0, 197.0, 103.0, 199.0)
+    assert (a + b).shape == (2, 2)
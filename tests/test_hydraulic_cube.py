@@ -0,0 +1,97 @@
+#!/usr/bin/python
+# hydraulic cube build and stale detection (riverpy/cHydraulicCube)
+import os
+import numpy as np
+import cHydraulicCube as cHC
+
+
+def write_flows(write_raster, rng, discharges, shape=(12, 15)):
+    # writes h and u rasters of discharges and returns DICT {raster name: numpy array} (NaN = NoData)
+    arrays = {}
+    for q in discharges:
+        for par in ("h", "u"):
+            values = rng.uniform(0.0, 2.0, shape)
+            dry = rng.random(shape) < 0.2
+            write_raster("%s%06d.tif" % (par, q), values, dry)
+            arrays.update({"%s%06d" % (par, q): np.where(dry, np.nan, values)})
+    return arrays
+
+
+def touch_later(path):
+    # sets a distinct modification time (file systems with coarse time stamps)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10.0))
+
+
+def test_build_stores_all_slices(write_raster, rng, tmp_path):
+    arrays = write_flows(write_raster, rng, [1000, 100, 500])
+    cube = cHC.HydraulicCube(str(tmp_path))
+    assert not cube.is_current()
+    cube.build()
+    cube = cHC.HydraulicCube(str(tmp_path))
+    assert cube.is_current()
+    assert cube.discharges == [100.0, 500.0, 1000.0]
+    for name, expected in arrays.items():
+        ras = cube.get_raster(name)
+        assert np.array_equal(ras.mask, np.isnan(expected))
+        assert np.allclose(ras.data[~ras.mask], expected[~np.isnan(expected)].astype(np.float32))
+    assert np.allclose(cube.get_slice("u", 500), arrays["u000500"], equal_nan=True)
+
+
+def test_modified_raster_makes_the_cube_stale(write_raster, rng, tmp_path):
+    write_flows(write_raster, rng, [100, 200])
+    cHC.HydraulicCube(str(tmp_path)).build()
+    path = write_raster("h000200.tif", np.full((12, 15), 0.5))
+    touch_later(path)
+    cube = cHC.HydraulicCube(str(tmp_path))
+    assert not cube.is_current()
+    cube.build()
+    cube = cHC.HydraulicCube(str(tmp_path))
+    assert cube.is_current()
+    assert np.all(cube.get_slice("h", 200) == 0.5)
+
+
+def test_readers_share_slice_rasters_of_the_current_build(write_raster, rng, tmp_path):
+    write_flows(write_raster, rng, [100, 200])
+    cHC.HydraulicCube(str(tmp_path)).build()
+    first = cHC.HydraulicCube(str(tmp_path)).get_raster("h000200")
+    assert cHC.HydraulicCube(str(tmp_path)).get_raster("h000200.tif") is first
+    touch_later(write_raster("h000200.tif", np.full((12, 15), 0.5)))
+    cHC.update_cube(str(tmp_path))
+    rebuilt = cHC.HydraulicCube(str(tmp_path)).get_raster("h000200")
+    assert rebuilt is not first
+    assert np.all(rebuilt.data == 0.5)
+
+
+def test_added_and_removed_discharges_make_the_cube_stale(write_raster, rng, tmp_path):
+    write_flows(write_raster, rng, [100, 200])
+    cHC.HydraulicCube(str(tmp_path)).build()
+    write_flows(write_raster, rng, [300])
+    assert not cHC.HydraulicCube(str(tmp_path)).is_current()
+    cube = cHC.update_cube(str(tmp_path))
+    assert cube.is_current()
+    assert cube.discharges == [100.0, 200.0, 300.0]
+    os.remove(str(tmp_path / "u000100.tif"))
+    assert not cHC.HydraulicCube(str(tmp_path)).is_current()
+
+
+def test_rebuild_reuses_unchanged_slices(write_raster, rng, tmp_path):
+    arrays = write_flows(write_raster, rng, [100, 200])
+    cHC.HydraulicCube(str(tmp_path)).build()
+    write_flows(write_raster, rng, [150])
+    cube = cHC.HydraulicCube(str(tmp_path))
+    cube.build()
+    cube = cHC.HydraulicCube(str(tmp_path))
+    assert cube.discharges == [100.0, 150.0, 200.0]
+    assert np.allclose(cube.get_slice("h", 200), arrays["h000200"], equal_nan=True)
+
+
+def test_update_cube_builds_a_missing_cube(write_raster, rng, tmp_path):
+    write_flows(write_raster, rng, [100])
+    assert not os.path.isdir(str(tmp_path / ".cube"))
+    cube = cHC.update_cube(str(tmp_path))
+    assert (cube is not None) and cube.is_current()
+
+
+def test_update_cube_without_flow_depth_rasters(tmp_path):
+    assert cHC.update_cube(str(tmp_path)) is None
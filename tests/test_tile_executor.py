@@ -0,0 +1,97 @@
+#!/usr/bin/python
+# tile-wise evaluation (riverpy/cTileExecutor) against whole-raster results
+import numpy as np
+import arcpy
+from arcpy.sa import *
+import cRaster as cRa
+import cTileExecutor as cTE
+import fTerrain as fTe
+
+
+def assert_same_raster(result, expected):
+    assert result.geotransform == expected.geotransform
+    assert result.shape == expected.shape
+    assert np.array_equal(result.mask, expected.mask)
+    assert np.allclose(result.data[~result.mask], expected.data[~expected.mask])
+
+
+def make_dem(write_raster, rng, shape=(45, 37)):
+    rows, cols = np.mgrid[0:shape[0], 0:shape[1]]
+    dem = 10.0 + 0.3 * rows - 0.1 * cols + np.sin(rows / 4.0) * np.cos(cols / 5.0) + rng.normal(0.0, 0.05, shape)
+    nodata_cells = np.zeros(shape, dtype=bool)
+    nodata_cells[20:24, 15:19] = True  # NoData hole that crosses tile edges
+    nodata_cells[0, :] = True
+    return write_raster("dem.tif", dem, nodata_cells)
+
+
+def test_terrain_halo_stitching_matches_whole_raster(write_raster, rng, tmp_path):
+    dem = arcpy.Raster(make_dem(write_raster, rng))
+    names = ["slope", "slope_percent", "aspect", "curvature"]
+    tiled = fTe.terrain_rasters(dem, names, 1.0, tile_size=16, cache_dir=str(tmp_path / ".terrain"))
+    whole = fTe.derive(dem, names, 1.0)
+    for name in names:
+        assert_same_raster(tiled[name], whole[name])
+    assert_same_raster(tiled["slope"], Slope(dem, "DEGREE"))
+
+
+def test_stored_terrain_is_reused(write_raster, rng, tmp_path):
+    dem = arcpy.Raster(make_dem(write_raster, rng))
+    first = fTe.terrain_rasters(dem, ["slope"], 1.0, tile_size=16, cache_dir=str(tmp_path / ".terrain"))["slope"]
+    second = fTe.terrain_rasters(dem, ["slope"], 1.0, tile_size=16, cache_dir=str(tmp_path / ".terrain"))["slope"]
+    assert first.path == second.path
+
+
+def test_run_algebra_matches_whole_raster(write_raster, rng, tmp_path):
+    h = arcpy.Raster(write_raster("h.tif", rng.uniform(0.0, 2.0, (40, 50)), rng.random((40, 50)) < 0.05))
+    u = arcpy.Raster(write_raster("u.tif", rng.uniform(0.0, 3.0, (30, 50)), origin=(100.0, 195.0)))
+
+    def function(tiles):
+        return Con(Float(tiles["h"]) > 0.5, Float(tiles["h"]) * Float(tiles["u"]), 0.0)
+    arcpy.env.extent = "MAXOF"
+    tiled = cTE.TileExecutor({"h": h, "u": u}, tile_size=16).run_algebra(function, str(tmp_path / "out.tif"))
+    assert_same_raster(tiled, function({"h": h, "u": u}))
+    # the geoprocessing extent is restored after the tile-wise run
+    assert cRa.environment["extent"] == "MAXOF"
+
+
+def test_run_with_halo_matches_whole_raster(write_raster, rng, tmp_path):
+    dem = arcpy.Raster(make_dem(write_raster, rng))
+    executor = cTE.TileExecutor({"dem": dem}, tile_size=16, halo=1)
+    tiled = executor.run(lambda tiles: Slope(tiles["dem"], "PERCENT_RISE"), str(tmp_path / "slope.tif"))
+    assert_same_raster(tiled, Slope(dem, "PERCENT_RISE"))
+
+
+def test_output_dtype_does_not_follow_the_first_tile(write_raster, tmp_path):
+    values = np.zeros((32, 32))
+    values[16:, :] = 0.25
+    ras = arcpy.Raster(write_raster("v.tif", values))
+
+    def function(tiles):
+        # integer results in the first tile row, float results in the second
+        if not (tiles["v"].data > 0.0).any():
+            return Int(tiles["v"])
+        return Float(tiles["v"]) + 1.0
+    tiled = cTE.TileExecutor({"v": ras}, tile_size=16).run_algebra(function, str(tmp_path / "out.tif"))
+    assert tiled.data.dtype == np.float64
+    assert np.all(tiled.data[16:, :] == 1.25)
+    typed = cTE.TileExecutor({"v": ras}, tile_size=16).run_algebra(lambda tiles: {"out": function(tiles)},
+                                                                   {"out": str(tmp_path / "out32.tif")},
+                                                                   dtype={"out": np.float32})
+    assert typed["out"].data.dtype == np.float32
+
+
+def test_run_named_writes_nodata_in_tiles_without_results(write_raster, tmp_path):
+    ras = arcpy.Raster(write_raster("v.tif", np.ones((32, 32))))
+    executor = cTE.TileExecutor({"v": ras}, tile_size=16)
+
+    def function(extent):
+        # results in the western tiles only
+        if extent.XMin > 110.0:
+            return {}
+        arcpy.env.extent = extent
+        return {"west.tif": Float(ras) * 2.0}
+    outputs = executor.run_named(function, str(tmp_path))
+    west = outputs["west.tif"]
+    assert west.shape == (32, 32)
+    assert np.all(west.data[:, 0:16] == 2.0)
+    assert west.mask[:, 16:].all()